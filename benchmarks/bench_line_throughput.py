@@ -0,0 +1,76 @@
+"""
+Benchmark cross-episode line generation throughput.
+
+Simulates several episodes generating lines concurrently (each episode strictly
+serial, like generate_script) and reports aggregate lines/second through one
+shared provider, whose concurrency limit (OLLAMA_NUM_PARALLEL) caps the
+requests in flight, for increasing episode counts.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_line_throughput.py --episodes 1,2,4,8 --lines 6
+    PYTHONPATH=src python benchmarks/bench_line_throughput.py --simulate-ms 800 --parallel 4
+"""
+import argparse
+import asyncio
+import time
+from brain import get_job_provider
+from llm.providers import LLMProvider, run_sync
+from llm.tiers import get_task_config
+
+PROMPT = """Generate ONE line of podcast dialogue about a TypeScript REST API.
+Return ONLY JSON: {"speaker": "Alex", "text": "..."}"""
+
+
+class SimulatedProvider(LLMProvider):
+    """Fixed-latency provider for measuring throughput without a server."""
+
+    name = "simulated"
+
+    def __init__(self, latency_ms, parallel):
+        super().__init__(max_concurrency=parallel)
+        self.latency = latency_ms / 1000
+
+    def describe(self):
+        return f"simulated ({self.latency * 1000:.0f}ms/line, {self.max_concurrency} parallel)"
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        await asyncio.sleep(self.latency)
+        return '{"speaker": "Alex", "text": "..."}'
+
+
+async def run_episodes(llm, episodes, lines, model, options):
+    async def episode():
+        for _ in range(lines):
+            await llm.complete(PROMPT, model=model, options=options)
+
+    await asyncio.gather(*[episode() for _ in range(episodes)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure aggregate lines/sec across concurrent episodes")
+    parser.add_argument("--episodes", default="1,2,4,8", help="Comma-separated episode counts")
+    parser.add_argument("--lines", type=int, default=6, help="Lines per episode")
+    parser.add_argument("--provider", default="Local (Ollama)")
+    parser.add_argument("--simulate-ms", type=float, help="Use a simulated provider with this per-line latency")
+    parser.add_argument("--parallel", type=int, default=4, help="Server parallelism for --simulate-ms")
+    args = parser.parse_args()
+
+    if args.simulate_ms:
+        llm = SimulatedProvider(args.simulate_ms, args.parallel)
+        model, options = None, None
+    else:
+        llm = get_job_provider(args.provider)
+        model, options = get_task_config("dialogue", llm)
+
+    print(f"📊 Line throughput on {llm.describe()} ({args.lines} lines per episode)\n")
+    print(f"{'episodes':>8} {'lines':>6} {'wall':>8} {'lines/s':>8}")
+    for episodes in [int(e) for e in args.episodes.split(",")]:
+        start = time.time()
+        run_sync(run_episodes(llm, episodes, args.lines, model, options))
+        wall = time.time() - start
+        total = episodes * args.lines
+        print(f"{episodes:>8} {total:>6} {wall:>7.1f}s {total / wall:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
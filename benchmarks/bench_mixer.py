@@ -0,0 +1,83 @@
+"""
+Benchmark episode assembly: pydub append loop vs one-allocation AudioBuffer timeline.
+
+pydub's `combined.append(seg, crossfade=200)` copies the whole episode so far
+on every line; concatenate() sizes the timeline once and writes each line
+into it. Lines are synthetic 24kHz mono clips like Kokoro's output.
+
+The music bed is compared too: pydub's fixed -20dB track looped by repeated
+appends and overlaid, against tile_loop + sidechain ducking + in-place mix.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_mixer.py --lines 50,100,200,400
+"""
+import argparse
+import time
+import numpy as np
+from pydub import AudioSegment
+from audio.buffer import AudioBuffer, concatenate
+from audio.mixer import duck_under, get_ducking_config, tile_loop
+
+
+def make_line(duration_ms, rng):
+    samples = (rng.standard_normal(24 * duration_ms) * 3000).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+
+
+def pydub_append(segments, crossfade_ms):
+    combined = segments[0]
+    for segment in segments[1:]:
+        combined = combined.append(segment, crossfade=crossfade_ms)
+    return combined
+
+
+def buffer_timeline(segments, crossfade_ms):
+    return concatenate([AudioBuffer.from_segment(segment) for segment in segments], crossfade_ms=crossfade_ms)
+
+
+def pydub_music(episode, track):
+    bed = track - 20
+    looped = bed
+    while len(looped) < len(episode):
+        looped = looped.append(bed, crossfade=1000)
+    return episode.overlay(looped[:len(episode)])
+
+
+def buffer_music(episode, track):
+    bed = tile_loop(track.gain(-20), episode.frames, crossfade_ms=1000)
+    return episode.mix(duck_under(bed, episode, **get_ducking_config()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pydub and NumPy episode assembly")
+    parser.add_argument("--lines", default="50,100,200,400", help="Comma-separated line counts")
+    parser.add_argument("--line-ms", type=int, default=4000, help="Duration of each line")
+    parser.add_argument("--crossfade", type=int, default=200, help="Crossfade between lines (ms)")
+    parser.add_argument("--music-ms", type=int, default=30000, help="Length of the looped music track")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"📊 Episode assembly ({args.line_ms}ms lines, {args.crossfade}ms crossfades)\n")
+    track = make_line(args.music_ms, rng).set_frame_rate(44100).set_channels(2)
+    track_buffer = AudioBuffer.from_segment(track)
+    print(f"{'lines':>6} {'episode':>9} {'pydub':>9} {'buffer':>9} {'speedup':>8} {'music pydub':>12} {'music duck':>11} {'speedup':>8}")
+    for count in [int(n) for n in args.lines.split(",")]:
+        segments = [make_line(args.line_ms, rng) for _ in range(count)]
+        start = time.time()
+        pydub_episode = pydub_append(segments, args.crossfade)
+        pydub_s = time.time() - start
+        start = time.time()
+        episode = buffer_timeline(segments, args.crossfade)
+        buffer_s = time.time() - start
+        start = time.time()
+        pydub_music(pydub_episode, track)
+        pydub_music_s = time.time() - start
+        start = time.time()
+        buffer_music(episode, track_buffer)
+        buffer_music_s = time.time() - start
+        print(f"{count:>6} {len(episode) / 60000:>7.1f}min {pydub_s:>8.2f}s {buffer_s:>8.2f}s {pydub_s / buffer_s:>7.1f}x "
+              f"{pydub_music_s:>11.2f}s {buffer_music_s:>10.2f}s {pydub_music_s / buffer_music_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark the speed cost of memory-mapped Kokoro weights (tts/weights.py).
+
+Mapped weights are shared between sessions and processes, but ONNX Runtime
+can't pre-pack them (pre-packing copies weights into a private layout), so
+every MatMul/Conv reads the unpacked layout. This measures what that costs:
+each mode loads in its own subprocess and reports load time, real-time
+factor (synthesis time over audio duration, lower is better) and RSS split
+into private and shared. A lone process is the only one mapping the weights,
+so they still count as private here; what they save across workers is
+measured by tests/test_tts_weights.py.
+
+--synthetic runs the same comparison on a MatMul chain like the one in
+tests/test_tts_weights.py, for machines without the Kokoro model; its
+numbers are per session.run, not an RTF, and say nothing certain about Kokoro.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_mmap_weights.py
+    PYTHONPATH=src python benchmarks/bench_mmap_weights.py --threads 4 --sessions 2
+    PYTHONPATH=src python benchmarks/bench_mmap_weights.py --synthetic
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+TEXTS = [
+    "Welcome back to RepoRadio, the only podcast that reads your code so you don't have to.",
+    "This project ships a utils folder with forty files, and honestly, respect.",
+    "Check package dot jason. Seventeen dependencies for a to do app? Bold.",
+]
+MODES = {"embedded": "0", "mapped": "1"}
+
+
+def memory():
+    """Private and shared RSS of this process in MB (tts.weights.mapped_rss; None off Linux)."""
+    from tts.weights import mapped_rss
+
+    rss = mapped_rss() or {}
+    return {"private_mb": rss.get("private"), "shared_mb": rss.get("shared")}
+
+
+def synthetic_model(path, layers=8, size=2048, seed=0):
+    """A MatMul chain with embedded float32 weights (layers * size^2 * 4 bytes)."""
+    from tts.weights import encode_field
+
+    rng = np.random.default_rng(seed)
+
+    def value_info(name):
+        dims = b"".join(encode_field(1, encode_field(1, d)) for d in (64, size))
+        return encode_field(1, name.encode()) + encode_field(2, encode_field(1, encode_field(1, 1) + encode_field(2, dims)))
+
+    nodes, initializers, previous = b"", b"", "x"
+    for i in range(layers):
+        output = "y" if i == layers - 1 else f"h{i}"
+        nodes += encode_field(1, encode_field(1, previous.encode()) + encode_field(1, f"w{i}".encode())
+                              + encode_field(2, output.encode()) + encode_field(4, b"MatMul"))
+        weights = (rng.standard_normal((size, size)) / np.sqrt(size)).astype("<f4")
+        initializers += encode_field(5, encode_field(1, size) + encode_field(1, size) + encode_field(2, 1)
+                                     + encode_field(8, f"w{i}".encode()) + encode_field(9, weights.tobytes()))
+        previous = output
+    graph = nodes + encode_field(2, b"g") + initializers + encode_field(11, value_info("x")) + encode_field(12, value_info("y"))
+    Path(path).write_bytes(encode_field(1, 8) + encode_field(8, encode_field(1, b"") + encode_field(2, 13))
+                           + encode_field(7, graph))
+    return path
+
+
+def run_kokoro(mode, threads, sessions):
+    """Load Kokoro with or without mapped weights and measure RTF over TEXTS on every session."""
+    os.environ["KOKORO_MMAP_WEIGHTS"] = MODES[mode]
+    from concurrent.futures import ThreadPoolExecutor
+    from tts.engine import KokoroEngine
+
+    engine = KokoroEngine(sessions=sessions, intra_op_threads=threads)
+    engine.wait()
+    engine.warmup()
+
+    def synthesize(text):
+        samples, sample_rate = engine.create(text, voice="af_bella")
+        return len(samples) / sample_rate
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        audio_seconds = sum(executor.map(synthesize, TEXTS * 2 * sessions))
+    return {"mode": mode, "mapped": engine.session_model_path != engine.model_path, "load_ms": engine.load_ms,
+            "rtf": (time.time() - start) / audio_seconds, **memory()}
+
+
+def run_synthetic(mode, threads, model_dir, rounds=20):
+    """The same comparison on synthetic_model: ms per session.run."""
+    from tts.engine import create_session
+    from tts.weights import prepare_mapped_model
+
+    model = Path(model_dir) / "model.onnx"
+    path = prepare_mapped_model(model, digest="bench") if mode == "mapped" else model
+    start = time.time()
+    session = create_session(path, threads, 1, mapped=mode == "mapped")
+    load_ms = (time.time() - start) * 1000
+    x = np.random.default_rng(1).standard_normal((64, int(session.get_inputs()[0].shape[1]))).astype(np.float32)
+    session.run(None, {"x": x})
+    start = time.time()
+    for _ in range(rounds):
+        session.run(None, {"x": x})
+    return {"mode": mode, "mapped": mode == "mapped", "load_ms": load_ms,
+            "run_ms": (time.time() - start) * 1000 / rounds, **memory()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Kokoro with embedded and memory-mapped weights")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads per session (0 = cores / sessions)")
+    parser.add_argument("--sessions", type=int, default=1, help="Kokoro sessions")
+    parser.add_argument("--synthetic", action="store_true", help="Use a synthetic MatMul model instead of Kokoro")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--model-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        if args.synthetic:
+            result = run_synthetic(args.worker, args.threads or os.cpu_count(), args.model_dir)
+        else:
+            result = run_kokoro(args.worker, args.threads, args.sessions)
+        print(json.dumps(result))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as model_dir:
+        if args.synthetic:
+            synthetic_model(Path(model_dir) / "model.onnx")
+        for mode in MODES:
+            print(f"⏳ {mode}...", file=sys.stderr)
+            command = [sys.executable, __file__, "--worker", mode, "--threads", str(args.threads),
+                       "--sessions", str(args.sessions), "--model-dir", model_dir]
+            proc = subprocess.run(command + (["--synthetic"] if args.synthetic else []),
+                                  capture_output=True, text=True, env=os.environ)
+            if proc.returncode != 0:
+                print(f"❌ {mode} failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+                continue
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if not results:
+        sys.exit(1)
+    metric = "run_ms" if args.synthetic else "rtf"
+    what = "synthetic MatMul chain, not Kokoro" if args.synthetic else f"Kokoro, {args.sessions} sessions"
+    print(f"📊 Embedded vs memory-mapped weights ({what}; {args.threads or 'default'} threads)\n")
+    print(f"{'mode':>9} {'load':>7} {'RTF' if metric == 'rtf' else 'ms/run':>7} {'x embedded':>11} {'private':>9} {'shared':>9}")
+    base = results.get("embedded", {}).get(metric)
+    for mode, r in results.items():
+        slowdown = f"{r[metric] / base:.2f}x" if base else "-"
+        value = f"{r[metric]:.3f}" if metric == "rtf" else f"{r[metric]:.1f}"
+        private, shared = (f"{r[key]:.0f}MB" if r[key] is not None else "-" for key in ("private_mb", "shared_mb"))
+        print(f"{mode:>9} {r['load_ms'] / 1000:>6.1f}s {value:>7} {slowdown:>11} {private:>9} {shared:>9}")
+
+
+if __name__ == "__main__":
+    main()
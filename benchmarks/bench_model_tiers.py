@@ -0,0 +1,156 @@
+"""
+Benchmark LLM model tiers for RepoRadio tasks.
+
+Runs the same task prompts against several models and prints latency
+and a simple quality score per model, to help pick LLM_<TASK>_MODEL values.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_model_tiers.py --task planning --models llama3.2:3b,llama3.1:8b
+    PYTHONPATH=src python benchmarks/bench_model_tiers.py --task dialogue --models llama3.2:3b,llama3.1:8b --runs 10
+"""
+import argparse
+import json
+import time
+from brain import PLANNER_PROMPT, get_job_provider
+from llm.providers import run_sync
+from llm.tiers import TASKS, get_task_config
+
+SAMPLE_TREE = """./README.md
+./LICENSE
+./package.json
+./package-lock.json
+./src/index.ts
+./src/server.ts
+./src/routes/users.ts
+./src/routes/auth.ts
+./src/db/schema.ts
+./src/db/migrations/001_init.sql
+./tests/users.test.ts
+./docs/CONTRIBUTING.md
+./.github/workflows/ci.yml"""
+
+SAMPLE_ANALYSIS = """README CONTENT:
+A TypeScript REST API for user management with JWT auth and Postgres.
+
+DEEP DIVE CODE:
+src/server.ts: const app = express(); app.use(helmet()); app.use('/auth', authRouter);
+src/db/schema.ts: export const users = pgTable('users', { id: serial('id'), email: text('email').unique() });"""
+
+SAMPLE_HOSTS = ["Alex", "Morgan"]
+
+
+def planning_prompt():
+    return f"{PLANNER_PROMPT}\n\nFile Structure:\n{SAMPLE_TREE}\n\nRespond with ONLY valid JSON."
+
+
+def score_planning(text):
+    """Fraction of returned paths that exist in the sample tree (0 if unparseable)."""
+    parsed = json.loads(text)
+    if isinstance(parsed, dict):
+        parsed = next((v for v in parsed.values() if isinstance(v, list)), list(parsed.keys()))
+    known = {line.lstrip("./") for line in SAMPLE_TREE.splitlines()}
+    files = [str(f).lstrip("./") for f in parsed][:3]
+    return sum(f in known for f in files) / 3 if files else 0.0
+
+
+def dialogue_prompt():
+    hosts = "\n".join(f"- {h.upper()}" for h in SAMPLE_HOSTS)
+    return f"""You are producing RepoRadio, a podcast where tech experts discuss GitHub projects.
+
+The Hosts:
+{hosts}
+
+Generate ONE line of natural podcast dialogue about this repo.
+
+Repo Analysis:
+{SAMPLE_ANALYSIS}
+
+Return ONLY JSON: {{"speaker": "Name", "text": "..."}}"""
+
+
+def score_dialogue(text):
+    """1.0 for a known speaker with a reasonably sized line, partial credit otherwise."""
+    parsed = json.loads(text)
+    speaker = str(parsed.get("speaker", ""))
+    line = str(parsed.get("text", ""))
+    score = 0.0
+    if speaker.split(" ")[0].capitalize() in SAMPLE_HOSTS:
+        score += 0.5
+    if 40 <= len(line) <= 400:
+        score += 0.5
+    return score
+
+
+def text_prompt(task):
+    if task == "summarization":
+        return f"Summarize this repository analysis in three sentences:\n\n{SAMPLE_ANALYSIS}"
+    return "Write a one-sentence humorous fake sponsor ad for the npm package 'express'."
+
+
+def score_text(text):
+    return 1.0 if 20 <= len(text) <= 800 else 0.0
+
+
+TASK_BENCHES = {
+    "planning": (planning_prompt, score_planning, True),
+    "dialogue": (dialogue_prompt, score_dialogue, True),
+    "summarization": (lambda: text_prompt("summarization"), score_text, False),
+    "ad_copy": (lambda: text_prompt("ad_copy"), score_text, False),
+}
+
+
+def bench_model(llm, task, model, runs):
+    """Run one task `runs` times on a model and collect latency/quality stats."""
+    _, options = get_task_config(task, llm)
+    make_prompt, score, json_mode = TASK_BENCHES[task]
+
+    # First call pays model load time; keep it out of the steady-state numbers
+    cold_start = time.time()
+    try:
+        run_sync(llm.warmup(model))
+    except Exception as e:
+        print(f"   ⚠️ warmup failed for {model}: {e}")
+    cold_ms = (time.time() - cold_start) * 1000
+
+    latencies, scores, failures = [], [], 0
+    for _ in range(runs):
+        start = time.time()
+        try:
+            text = run_sync(llm.complete(make_prompt(), model=model, options=options, json_mode=json_mode))
+            latencies.append((time.time() - start) * 1000)
+            scores.append(score(text))
+        except Exception:
+            failures += 1
+            scores.append(0.0)
+
+    latencies.sort()
+    return {
+        "model": model,
+        "cold_ms": cold_ms,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        "quality": sum(scores) / len(scores) if scores else 0.0,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare models for a RepoRadio LLM task")
+    parser.add_argument("--task", choices=TASKS, default="planning")
+    parser.add_argument("--models", required=True, help="Comma-separated model names")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="Local (Ollama)")
+    args = parser.parse_args()
+
+    llm = get_job_provider(args.provider)
+    print(f"📊 Task '{args.task}' on {llm.describe()} ({args.runs} runs per model)\n")
+    print(f"{'model':<24} {'cold':>9} {'p50':>9} {'p95':>9} {'quality':>8} {'fails':>6}")
+
+    for model in [m.strip() for m in args.models.split(",") if m.strip()]:
+        r = bench_model(llm, args.task, model, args.runs)
+        fmt = lambda ms: f"{ms:7.0f}ms" if ms is not None else "        -"
+        print(f"{r['model']:<24} {fmt(r['cold_ms'])} {fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {r['quality']:8.2f} {r['failures']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark Kokoro model variants (fp32 vs quantized fp16/int8).
+
+Each variant is loaded in its own subprocess so memory numbers don't bleed
+into each other. Reports load time, real-time factor (synthesis time over
+audio duration, lower is better), peak RSS, and how close each variant's
+output is to fp32 (spectral similarity and duration ratio).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_model_variants.py
+    PYTHONPATH=src python benchmarks/bench_model_variants.py --variants fp32,int8 --threads 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+TEXTS = [
+    "Welcome back to RepoRadio, the only podcast that reads your code so you don't have to.",
+    "This project ships a utils folder with forty files, and honestly, respect.",
+    "Check package dot jason. Seventeen dependencies for a to do app? Bold.",
+]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def log_spectrogram(samples, n_fft=1024, hop=256):
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop] * np.hanning(n_fft)
+    return np.log1p(np.abs(np.fft.rfft(frames, axis=1)))
+
+
+def spectral_similarity(a, b):
+    """Cosine similarity of log spectrograms over the shared length (1.0 = identical)."""
+    spec_a, spec_b = log_spectrogram(a), log_spectrogram(b)
+    frames = min(len(spec_a), len(spec_b))
+    x, y = spec_a[:frames].ravel(), spec_b[:frames].ravel()
+    return float(x @ y / (np.linalg.norm(x) * np.linalg.norm(y)))
+
+
+def run_worker(variant, threads, out_dir):
+    """Load one variant, synthesize TEXTS, save audio and print stats as JSON."""
+    from tts.engine import KokoroEngine
+
+    rss_before = peak_rss_mb()
+    engine = KokoroEngine(variant=variant, sessions=1, intra_op_threads=threads)
+    engine.wait()
+    engine.create("Warming up.", voice="af_bella")
+
+    synth_seconds = audio_seconds = 0.0
+    for i, text in enumerate(TEXTS):
+        start = time.time()
+        samples, sample_rate = engine.create(text, voice="af_bella")
+        synth_seconds += time.time() - start
+        audio_seconds += len(samples) / sample_rate
+        np.save(Path(out_dir) / f"{variant}_{i}.npy", samples)
+
+    print(json.dumps({
+        "variant": variant,
+        "model": engine.model_path.name,
+        "size_mb": engine.model_path.stat().st_size / 1e6,
+        "load_ms": engine.load_ms,
+        "rtf": synth_seconds / audio_seconds,
+        "rss_mb": peak_rss_mb(),
+        "model_rss_mb": peak_rss_mb() - rss_before,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32 and quantized Kokoro models")
+    parser.add_argument("--variants", default="fp32,fp16,int8", help="Comma-separated variants")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = all cores)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.threads, args.out)
+        return
+
+    variants = args.variants.split(",")
+    results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for variant in variants:
+            print(f"⏳ {variant}...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", variant, "--threads", str(args.threads), "--out", out_dir],
+                capture_output=True, text=True, env=os.environ,
+            )
+            if proc.returncode != 0:
+                print(f"❌ {variant} failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+                continue
+            results[variant] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+            if variant != "fp32" and "fp32" in results:
+                similarity, durations = [], []
+                for i in range(len(TEXTS)):
+                    ref = np.load(Path(out_dir) / f"fp32_{i}.npy")
+                    out = np.load(Path(out_dir) / f"{variant}_{i}.npy")
+                    similarity.append(spectral_similarity(ref, out))
+                    durations.append(len(out) / len(ref))
+                results[variant]["similarity"] = float(np.mean(similarity))
+                results[variant]["duration_ratio"] = float(np.mean(durations))
+
+    if not results:
+        sys.exit(1)
+    print(f"📊 Kokoro model variants ({args.threads or os.cpu_count()} threads)\n")
+    print(f"{'variant':>8} {'file MB':>8} {'load':>7} {'RTF':>6} {'x fp32':>7} {'peak RSS':>9} {'similarity':>11} {'duration':>9}")
+    base_rtf = results.get("fp32", {}).get("rtf")
+    for variant, r in results.items():
+        speedup = f"{base_rtf / r['rtf']:.2f}x" if base_rtf else "-"
+        similarity = f"{r['similarity']:.4f}" if "similarity" in r else "ref" if variant == "fp32" else "-"
+        duration = f"{r['duration_ratio']:.3f}" if "duration_ratio" in r else "-"
+        print(f"{variant:>8} {r['size_mb']:>8.0f} {r['load_ms'] / 1000:>6.1f}s {r['rtf']:>6.3f} {speedup:>7} "
+              f"{r['rss_mb']:>7.0f}MB {similarity:>11} {duration:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark peak memory of whole-episode mixing vs the streaming mixer.
+
+"whole" builds the full timeline, overlays the music bed and exports through
+pydub (the episode as float32, the bed, and the int16 export copy all live at
+once). "stream" lays out the same lines with plan_timeline and pipes
+stream_episode blocks into ffmpeg. Each run is a separate subprocess so peak
+RSS is its own. Lines are synthetic 24kHz mono clips like Kokoro's output;
+they are the only input that grows with episode length.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_streaming.py --minutes 10,30,60
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from pydub import AudioSegment
+
+MODES = ("whole", "stream")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_line(duration_ms, rng):
+    samples = (rng.standard_normal(24 * duration_ms) * 3000).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+
+
+def run_worker(mode, minutes, line_ms, out_dir):
+    """Mix one episode in one mode and print stats as JSON."""
+    from audio.buffer import AudioBuffer
+    from audio.encode import encode_stream
+    from audio.mixer import build_timeline, overlay_background_music, plan_timeline, stream_episode
+
+    rng = np.random.default_rng(0)
+    lines = [make_line(line_ms, rng) for _ in range(minutes * 60000 // line_ms)]
+    track_path = os.path.join(out_dir, "bed.wav")
+    make_line(30000, rng).set_frame_rate(44100).set_channels(2).export(track_path, format="wav")
+    output = os.path.join(out_dir, f"{mode}.mp3")
+    rss_before = peak_rss_mb()
+
+    start = time.time()
+    if mode == "whole":
+        episode = build_timeline([AudioBuffer.from_segment(line) for line in lines], crossfade_ms=200)
+        episode = overlay_background_music(episode, track_path)
+        episode.export(output, format="mp3")
+    else:
+        from audio.bank import get_asset_bank
+        music = get_asset_bank().load_file(track_path)
+        encode_stream(stream_episode(plan_timeline(lines, crossfade_ms=200), music), [(output, "mp3", None)])
+
+    print(json.dumps({"seconds": time.time() - start, "rss_mb": peak_rss_mb(), "mix_rss_mb": peak_rss_mb() - rss_before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare whole-episode and streaming mixer memory")
+    parser.add_argument("--minutes", default="10,30,60", help="Comma-separated episode lengths")
+    parser.add_argument("--line-ms", type=int, default=4000, help="Duration of each line")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--episode-minutes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.episode_minutes, args.line_ms, args.out)
+        return
+
+    env = dict(os.environ, ASSET_CACHE_DIR="")
+    print("📊 Episode mixing memory (with ducked music bed, MP3 output)\n")
+    print(f"{'episode':>8} {'whole':>8} {'peak RSS':>9} {'stream':>8} {'peak RSS':>9} {'mix RSS saved':>14}")
+    for minutes in [int(m) for m in args.minutes.split(",")]:
+        results = {}
+        for mode in MODES:
+            with tempfile.TemporaryDirectory() as out_dir:
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, "--episode-minutes", str(minutes),
+                     "--line-ms", str(args.line_ms), "--out", out_dir],
+                    capture_output=True, text=True, env=env,
+                )
+            if proc.returncode != 0:
+                print(f"❌ {mode} {minutes}min failed:\n{proc.stderr[-2000:]}", file=sys.stderr)
+                break
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+        if len(results) < len(MODES):
+            continue
+        whole, stream = results["whole"], results["stream"]
+        print(f"{minutes:>6}min {whole['seconds']:>7.1f}s {whole['rss_mb']:>7.0f}MB {stream['seconds']:>7.1f}s "
+              f"{stream['rss_mb']:>7.0f}MB {whole['mix_rss_mb'] - stream['mix_rss_mb']:>12.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark voice-grouped batched synthesis against per-line synthesis.
+
+Builds synthetic scripts of increasing size (hosts alternating, so lines of
+the same voice are non-adjacent) and times rendering every line through the
+Kokoro engine one call per line versus one create_batch call per voice.
+The segment cache is bypassed so both modes do the full work.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_tts_batching.py --lines 4,8,16,32
+    PYTHONPATH=src python benchmarks/bench_tts_batching.py --voices am_michael,bf_emma,af_bella --batch 16
+"""
+import argparse
+import time
+from tts.engine import get_engine
+from tts.scheduling import RenderJob, group_jobs_by_voice
+
+LINES = [
+    "Okay, so this repo has a utils folder with forty files in it.",
+    "That's not a utils folder, that's a cry for help.",
+    "Honestly the README is the best part. It has emojis.",
+    "Wait, they're mocking the database in the integration tests?",
+    "Bold move. I respect it. I would never ship it.",
+    "Let's talk about the dependency list, because wow.",
+]
+
+
+def make_jobs(count, voices):
+    return [RenderJob(i, 0, LINES[i % len(LINES)], voices[i % len(voices)]) for i in range(count)]
+
+
+def per_line(engine, jobs):
+    for job in jobs:
+        engine.create(job.text, voice=job.voice_id)
+
+
+def batched(engine, jobs, batch_size):
+    for batch in group_jobs_by_voice(jobs, batch_size):
+        engine.create_batch([job.text for job in batch], voice=batch[0].voice_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batched and per-line Kokoro throughput")
+    parser.add_argument("--lines", default="4,8,16,32", help="Comma-separated script sizes")
+    parser.add_argument("--voices", default="am_michael,bf_emma", help="Comma-separated Kokoro voices")
+    parser.add_argument("--batch", type=int, default=8, help="Max lines per batch")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per mode (best is reported)")
+    args = parser.parse_args()
+    voices = args.voices.split(",")
+
+    engine = get_engine()
+    engine.warmup(voices[0])
+    print(f"📊 Kokoro batching ({engine.sessions} sessions, voices: {', '.join(voices)}, batch {args.batch})\n")
+    print(f"{'lines':>6} {'per-line':>10} {'batched':>10} {'lines/s':>16} {'speedup':>8}")
+    for count in [int(n) for n in args.lines.split(",")]:
+        jobs = make_jobs(count, voices)
+        timings = {}
+        for mode, run in (("per_line", lambda: per_line(engine, jobs)),
+                          ("batched", lambda: batched(engine, jobs, args.batch))):
+            best = None
+            for _ in range(args.repeat):
+                start = time.time()
+                run()
+                elapsed = time.time() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[mode] = best
+        rates = f"{count / timings['per_line']:.1f} -> {count / timings['batched']:.1f}"
+        print(f"{count:>6} {timings['per_line']:>9.2f}s {timings['batched']:>9.2f}s {rates:>16} "
+              f"{timings['per_line'] / timings['batched']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
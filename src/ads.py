@@ -5,6 +5,8 @@ Creates humorous sponsor breaks based on project dependencies.
 import random
 import re
 import json
+import string
+import hashlib
 from debug_logger import brain_logger
 
 
@@ -48,6 +50,79 @@ AD_TEMPLATES = {
 }
 
 
+# Filled into generic templates
+AD_ACTIONS = [
+    "manipulate arrays",
+    "handle HTTP requests",
+    "parse JSON",
+    "validate forms",
+    "manage state",
+    "authenticate users",
+    "transform data",
+    "schedule tasks",
+    "cache responses",
+    "render templates",
+]
+
+AD_TAGLINES = [
+    "It's in your package.json. You don't remember adding it. But here we are.",
+    "Downloaded 50 million times last week. Most of those were bots.",
+    "Maintained by one person. Send coffee.",
+    "Now with 100% more TypeScript types! (That nobody reads.)",
+    "Because reinventing the wheel is so 2020.",
+]
+
+FALLBACK_AD = ("This episode is brought to you by Open Source Software. Free as in freedom, "
+               "expensive as in maintenance. Support your local maintainer.")
+
+# Packages whose generic ads are worth pre-rendering (tts/catalog.py), most common first
+COMMON_PACKAGES = [
+    "express", "requests", "numpy", "typescript", "eslint", "pandas", "webpack", "jest",
+    "flask", "pytest", "prettier", "babel", "vue", "next", "moment", "chalk",
+    "dotenv", "uuid", "fastapi", "pydantic",
+]
+
+
+def template_key_for(package):
+    """Special template key for a package name ('react-dom' -> 'react'), or None for generic."""
+    package_lower = package.lower()
+    for key in AD_TEMPLATES.keys():
+        if key != "generic" and key in package_lower:
+            return key
+    return None
+
+
+def expand_ad_texts(packages=COMMON_PACKAGES):
+    """
+    Every ad text generate_fake_ad can produce for the given packages.
+    
+    Covers the fallback ad, every special template, and each generic
+    template filled with every action/tagline for packages without one.
+    
+    Returns:
+        List of unique texts in a stable order
+    """
+    texts = [FALLBACK_AD]
+    for key, templates in AD_TEMPLATES.items():
+        if key != "generic":
+            texts.extend(templates)
+    for package in packages:
+        if template_key_for(package):
+            continue
+        for template in AD_TEMPLATES["generic"]:
+            fields = {name for _, name, _, _ in string.Formatter().parse(template) if name}
+            for action in (AD_ACTIONS if "action" in fields else [None]):
+                for tagline in (AD_TAGLINES if "tagline" in fields else [None]):
+                    texts.append(template.format(package=package, action=action, tagline=tagline))
+    return list(dict.fromkeys(texts))
+
+
+def ad_templates_version():
+    """Short hash of every template and filler; changes invalidate pre-rendered ads."""
+    data = [AD_TEMPLATES, AD_ACTIONS, AD_TAGLINES, FALLBACK_AD]
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:12]
+
+
 def extract_dependencies(dependencies_content):
     """
     Extract package names from dependency file content.
@@ -122,22 +197,17 @@ def generate_fake_ad(dependencies_content, host_names=None):
         brain_logger.debug("No dependencies found, using generic ad")
         return {
             "speaker": ad_speaker,
-            "text": "This episode is brought to you by Open Source Software. Free as in freedom, expensive as in maintenance. Support your local maintainer.",
+            "text": FALLBACK_AD,
             "type": "ad"
         }
     
     # Pick a random package
     package = random.choice(packages)
-    package_lower = package.lower()
     
     brain_logger.info(f"Generating fake ad for package: {package}")
     
     # Check for special templates
-    template_key = None
-    for key in AD_TEMPLATES.keys():
-        if key != "generic" and key in package_lower:
-            template_key = key
-            break
+    template_key = template_key_for(package)
     
     # Select template
     if template_key:
@@ -145,33 +215,11 @@ def generate_fake_ad(dependencies_content, host_names=None):
     else:
         template = random.choice(AD_TEMPLATES["generic"])
     
-    # Generate action/tagline if template needs it
-    actions = [
-        "manipulate arrays",
-        "handle HTTP requests",
-        "parse JSON",
-        "validate forms",
-        "manage state",
-        "authenticate users",
-        "transform data",
-        "schedule tasks",
-        "cache responses",
-        "render templates",
-    ]
-    
-    taglines = [
-        "It's in your package.json. You don't remember adding it. But here we are.",
-        "Downloaded 50 million times last week. Most of those were bots.",
-        "Maintained by one person. Send coffee.",
-        "Now with 100% more TypeScript types! (That nobody reads.)",
-        "Because reinventing the wheel is so 2020.",
-    ]
-    
     # Format the ad
     ad_text = template.format(
         package=package,
-        action=random.choice(actions),
-        tagline=random.choice(taglines)
+        action=random.choice(AD_ACTIONS),
+        tagline=random.choice(AD_TAGLINES)
     )
     
     brain_logger.debug(f"Generated ad text: {ad_text[:100]}...")
@@ -1,12 +1,10 @@
 import streamlit as st
-import glob
-import os
-import json
 from ingest import get_repo_content
 from brain import generate_script
-# IMPORTS THE SMART VOICE ENGINE (Triggers auto-download)
-from voice import render_audio
+from voice import render_audio, get_local_tts
 from ads import inject_ad_break
+from warmup import start_warmup, format_warmup_report
+from character_registry import get_registry
 from debug_logger import app_logger, log_app_event, log_script_generation 
 
 st.set_page_config(page_title="RepoRadio", page_icon="📻", layout="wide")
@@ -24,17 +22,11 @@ if 'generated_content' not in st.session_state:
 # --- 1. LOAD CHARACTER DATA ---
 # Load full character data including descriptions
 def load_all_characters():
-    """Load all character JSON files with full metadata."""
-    character_files = glob.glob("src/characters/*.json")
-    characters = {}
-    for filepath in character_files:
-        name = os.path.basename(filepath).replace(".json", "").capitalize()
-        try:
-            with open(filepath, "r") as f:
-                data = json.load(f)
-                characters[name] = data
-        except Exception as e:
-            st.warning(f"Failed to load {name}: {e}")
+    """All character metadata from the shared registry (re-read only when files change)."""
+    registry = get_registry()
+    characters = registry.all()
+    for filename, error in registry.errors.items():
+        st.warning(f"Failed to load {filename}: {error}")
     return characters
 
 characters_data = load_all_characters()
@@ -156,6 +148,12 @@ with st.expander("⚙️ Settings"):
     c1, c2 = st.columns(2)
     provider = c1.selectbox("AI Brain", ["Local (Ollama)", "Cloud (Siray/OpenAI)"])
     voice_provider = c2.selectbox("Voice Engine", ["Local (Kokoro)", "Cloud (ElevenLabs)"])
+    if "Local" in voice_provider:
+        # Load (and if needed download) Kokoro in the background while the user sets up,
+        # unless a TTS daemon on this host already has it loaded
+        engine = get_local_tts().start()
+        where = f"daemon at {engine.url}" if hasattr(engine, "url") else engine.state
+        c2.caption(f"Kokoro: {where}" + (f" ({engine.error})" if engine.error else ""))
     
     # Deep mode toggle
     deep_mode = st.checkbox("🕵️ Enable Deep Radio (Agentic Read)", value=True)
@@ -169,6 +167,7 @@ with st.expander("⚙️ Settings"):
     c5, c6 = st.columns(2)
     enable_ads = c5.checkbox("📢 Sponsor Breaks", value=True, help="Insert humorous fake ads based on dependencies")
     enable_crossfade = c6.checkbox("🎚️ Crossfade Transitions", value=True, help="Smooth audio transitions between speakers")
+    enable_sfx = st.checkbox("🔔 Sound Effects", value=True, help="Gavels, applause and alerts triggered by what the hosts say")
 
 # --- 3. GENERATE BUTTON ---
 if st.button("GENERATE VIBE"):
@@ -178,6 +177,9 @@ if st.button("GENERATE VIBE"):
         log_app_event("Generate button clicked", f"URL: {repo_url}, Hosts: {', '.join(hosts)}")
         status = st.empty()
         
+        # 0. Warm up models in the background while ingest runs
+        warmup = start_warmup(provider, voice_provider, hosts)
+        
         # 1. Ingest
         status.info(f"🚀 Spinning up Daytona Sandbox...")
         log_app_event("Stage 1: Ingesting repository", repo_url)
@@ -201,6 +203,10 @@ if st.button("GENERATE VIBE"):
         
         st.session_state.generated_script = script
         
+        # TTS warmup must be done before rendering; report cold vs steady latency
+        warmup_summary = format_warmup_report(warmup.wait().report())
+        log_app_event("Warmup report", warmup_summary)
+        
         # 3. Voice
         status.info(f"🔊 Synthesizing audio...")
         log_app_event("Stage 3: Rendering audio", f"Provider: {voice_provider}")
@@ -210,12 +216,14 @@ if st.button("GENERATE VIBE"):
             voice_provider,
             enable_music=enable_music,
             enable_jingles=enable_jingles,
-            crossfade=enable_crossfade
+            crossfade=enable_crossfade,
+            enable_sfx=enable_sfx
         )
         
         st.session_state.generated_audio = audio_file
         log_app_event("Pipeline complete", f"Output: {audio_file}")
         status.success("✅ Episode Ready!")
+        st.caption(f"⏱️ {warmup_summary}")
 
 # Display generated content from session state (persists across setting changes)
 if st.session_state.generated_content:
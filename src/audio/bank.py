@@ -0,0 +1,185 @@
+"""
+Preloaded audio assets for RepoRadio.
+Jingles, background beds, transitions and sound effects are decoded once into
+the mixer's format (audio/buffer.py) instead of through ffmpeg every episode.
+Decoded audio is cached on disk as .npy and memory-mapped read-only, so a
+restart skips decoding and resampling too; callers get zero-copy AudioBuffer
+views of the shared arrays.
+"""
+import os
+import random
+import hashlib
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from debug_logger import voice_logger
+from audio.buffer import AudioBuffer, SAMPLE_RATE, CHANNELS
+
+MUSIC_DIR = Path(__file__).parent.parent / "music"
+SFX_DIR = Path(__file__).parent / "assets"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac")
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "reporadio" / "assets"
+
+# category -> directory holding its files (jingles are the loose files in music/)
+DEFAULT_DIRECTORIES = {
+    "jingles": MUSIC_DIR,
+    "background": MUSIC_DIR / "background",
+    "transitions": MUSIC_DIR / "transitions",
+    "sfx": SFX_DIR,
+}
+
+
+class AssetBank:
+    """Decode-once store of every music, transition and SFX asset."""
+
+    def __init__(self, directories=None, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Args:
+            directories: Dict of category -> directory (default: DEFAULT_DIRECTORIES)
+            cache_dir: Where decoded .npy files are kept (None = memory only)
+        """
+        self.directories = {k: Path(v) for k, v in (directories or DEFAULT_DIRECTORIES).items()}
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._arrays = {}   # (resolved path, size, mtime) -> read-only samples
+        self._lock = threading.Lock()
+        self.decoded = 0
+        self.mapped = 0
+
+    def scan(self, category):
+        """Name (file stem) -> path for the category's audio files."""
+        directory = self.directories.get(category)
+        if directory is None or not directory.is_dir():
+            return {}
+        return {p.stem: p for p in sorted(directory.iterdir())
+                if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS}
+
+    def names(self, category):
+        return sorted(self.scan(category))
+
+    def _cache_prefix(self, path):
+        return f"{path.stem}-{hashlib.sha256(str(path).encode()).hexdigest()[:8]}"
+
+    def _cache_path(self, path, stat):
+        version = f"{stat.st_size}|{stat.st_mtime_ns}|{SAMPLE_RATE}|{CHANNELS}"
+        return self.cache_dir / f"{self._cache_prefix(path)}-{hashlib.sha256(version.encode()).hexdigest()[:12]}.npy"
+
+    def _decode(self, path, stat):
+        if self.cache_dir is not None:
+            cached = self._cache_path(path, stat)
+            if cached.exists():
+                try:
+                    samples = np.load(cached, mmap_mode="r")
+                    self.mapped += 1
+                    return samples
+                except (OSError, ValueError) as e:
+                    voice_logger.warning(f"Ignoring unreadable asset cache {cached}: {e}")
+
+        samples = AudioBuffer.from_file(path).samples
+        self.decoded += 1
+        if self.cache_dir is None:
+            samples.setflags(write=False)
+            return samples
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            partial = cached.with_name(f"{cached.name}.{threading.get_ident()}.part")
+            with open(partial, "wb") as f:
+                np.save(f, samples)
+            os.replace(partial, cached)
+            # Older decodes of the same file are stale now
+            for old in self.cache_dir.glob(f"{self._cache_prefix(path)}-*.npy"):
+                if old != cached:
+                    old.unlink(missing_ok=True)
+            return np.load(cached, mmap_mode="r")
+        except OSError as e:
+            voice_logger.warning(f"Could not cache decoded asset {path.name}: {e}")
+            samples.setflags(write=False)
+            return samples
+
+    def load_file(self, path):
+        """AudioBuffer view of any audio file, decoded at most once per version.
+
+        Returns:
+            AudioBuffer (read-only samples), or None if the file is missing or unreadable
+        """
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        samples = self._arrays.get(key)
+        if samples is None:
+            with self._lock:
+                samples = self._arrays.get(key)
+                if samples is None:
+                    try:
+                        samples = self._decode(path, stat)
+                    except Exception as e:
+                        voice_logger.warning(f"Failed to load audio asset {path.name}: {e}")
+                        return None
+                    self._arrays[key] = samples
+        return AudioBuffer(samples)
+
+    def get(self, category, name):
+        """AudioBuffer for a named asset (e.g. ("jingles", "intro")), or None."""
+        path = self.scan(category).get(name)
+        return self.load_file(path) if path else None
+
+    def label(self, path):
+        """Stable name for one version of an asset file: its path and mtime.
+
+        Episode projects compare these to tell whether a clip changed, so a
+        file replaced under the same name counts as a change.
+        """
+        path = Path(path).resolve()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        return f"asset:{path}@{mtime}"
+
+    def choice(self, category):
+        """Path of a random asset from a category, or None if it has none."""
+        paths = list(self.scan(category).values())
+        if not paths:
+            voice_logger.debug(f"No {category} assets found")
+            return None
+        path = random.choice(paths)
+        voice_logger.debug(f"Selected {category} asset: {path.name}")
+        return path
+
+    def random(self, category):
+        """A random asset from a category, or None if it has none."""
+        path = self.choice(category)
+        return self.load_file(path) if path else None
+
+    def preload(self):
+        """Decode (or map) every asset now, e.g. while the script is being written.
+
+        Returns:
+            Time taken in ms
+        """
+        start_time = time.time()
+        count = 0
+        for category in self.directories:
+            for path in self.scan(category).values():
+                count += self.load_file(path) is not None
+        duration_ms = (time.time() - start_time) * 1000
+        voice_logger.info(f"Asset bank ready: {count} assets ({self.decoded} decoded, "
+                          f"{self.mapped} memory-mapped) in {duration_ms:.0f}ms")
+        return duration_ms
+
+
+_asset_bank = None
+_asset_bank_lock = threading.Lock()
+
+
+def get_asset_bank():
+    """Return the process-wide asset bank (ASSET_CACHE_DIR, empty = memory only)."""
+    global _asset_bank
+    with _asset_bank_lock:
+        if _asset_bank is None:
+            cache_dir = os.getenv("ASSET_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+            _asset_bank = AssetBank(cache_dir=cache_dir or None)
+        return _asset_bank
@@ -0,0 +1,191 @@
+"""
+NumPy audio buffers for RepoRadio's mixer.
+Every buffer holds float32 samples shaped (frames, CHANNELS) at SAMPLE_RATE,
+so mixing never negotiates formats. Sources (TTS lines, jingles, music) are
+converted once on the way in; gain, fades, crossfades and overlays are array
+operations, and concatenate() sizes the timeline up front and writes each
+part into it once instead of re-copying the episode on every append.
+"""
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def ms_to_frames(ms):
+    return int(round(ms * SAMPLE_RATE / 1000))
+
+
+def resampled_length(frames, source_rate, target_rate=SAMPLE_RATE):
+    """Frames after resample(); lets timelines be laid out before decoding."""
+    return frames if source_rate == target_rate else int(round(frames * target_rate / source_rate))
+
+
+def resample(samples, source_rate, target_rate=SAMPLE_RATE):
+    """Linear-interpolation resample of (frames, channels) float samples."""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    frames = resampled_length(len(samples), source_rate, target_rate)
+    positions = np.arange(frames) * (source_rate / target_rate)
+    source = np.arange(len(samples))
+    return np.stack([np.interp(positions, source, samples[:, c]) for c in range(samples.shape[1])],
+                    axis=1).astype(np.float32)
+
+
+def to_channels(samples, channels=CHANNELS):
+    """Map (frames, n) samples to `channels` (mono is duplicated, extra channels averaged)."""
+    if samples.shape[1] == channels:
+        return samples
+    mono = samples.mean(axis=1, keepdims=True) if samples.shape[1] > 1 else samples
+    return np.repeat(mono, channels, axis=1)
+
+
+class AudioBuffer:
+    """Float32 audio in the mixer's fixed format.
+
+    len() is the duration in ms and slicing takes ms, like pydub's
+    AudioSegment, so call sites read the same. Slices are views; only mix()
+    writes in place.
+    """
+
+    __slots__ = ("samples",)
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    @classmethod
+    def silent(cls, duration_ms=0):
+        return cls(np.zeros((ms_to_frames(duration_ms), CHANNELS), dtype=np.float32))
+
+    @classmethod
+    def from_pcm(cls, samples, sample_rate):
+        """From float samples in [-1, 1], shaped (frames,) or (frames, channels)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        return cls(np.ascontiguousarray(to_channels(resample(samples, sample_rate))))
+
+    @classmethod
+    def from_segment(cls, segment):
+        """From a pydub AudioSegment (any rate, width and channel count)."""
+        scale = float(1 << (8 * segment.sample_width - 1))
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32).reshape(-1, segment.channels) / scale
+        return cls.from_pcm(samples, segment.frame_rate)
+
+    @classmethod
+    def from_file(cls, path):
+        """Decode a file; libsndfile handles WAV/FLAC/OGG, ffmpeg the rest."""
+        try:
+            samples, sample_rate = sf.read(str(path), dtype="float32", always_2d=True)
+        except (RuntimeError, sf.LibsndfileError):
+            return cls.from_segment(AudioSegment.from_file(str(path)))
+        return cls.from_pcm(samples, sample_rate)
+
+    @property
+    def frames(self):
+        return len(self.samples)
+
+    def __len__(self):
+        return int(round(self.frames * 1000 / SAMPLE_RATE))
+
+    def __getitem__(self, ms):
+        if not isinstance(ms, slice) or ms.step is not None:
+            raise TypeError("AudioBuffer slices take [start_ms:end_ms]")
+        start = None if ms.start is None else ms_to_frames(ms.start)
+        stop = None if ms.stop is None else ms_to_frames(ms.stop)
+        return AudioBuffer(self.samples[start:stop])
+
+    def copy(self):
+        return AudioBuffer(self.samples.copy())
+
+    def gain(self, db):
+        """New buffer scaled by `db` decibels."""
+        return AudioBuffer(self.samples * np.float32(10 ** (db / 20)))
+
+    def fade_in(self, duration_ms):
+        """New buffer with a linear fade in."""
+        result = self.copy()
+        n = min(self.frames, ms_to_frames(duration_ms))
+        result.samples[:n] *= np.linspace(0, 1, n, endpoint=False, dtype=np.float32)[:, None]
+        return result
+
+    def fade_out(self, duration_ms):
+        """New buffer with a linear fade out."""
+        result = self.copy()
+        n = min(self.frames, ms_to_frames(duration_ms))
+        if n:
+            result.samples[-n:] *= np.linspace(1, 0, n, endpoint=False, dtype=np.float32)[:, None]
+        return result
+
+    def mix(self, other, position_ms=0):
+        """Add `other` into this buffer at a position (in place, clipped to this length)."""
+        start = ms_to_frames(position_ms)
+        if start >= self.frames:
+            return self
+        end = min(self.frames, start + other.frames)
+        self.samples[start:end] += other.samples[:end - start]
+        return self
+
+    def overlay(self, other, position_ms=0):
+        """Copy of this buffer with `other` mixed in (same length, like pydub)."""
+        return self.copy().mix(other, position_ms)
+
+    def to_segment(self):
+        """16-bit pydub AudioSegment, for export and legacy callers."""
+        pcm = (np.clip(self.samples, -1.0, 1.0) * 32767).astype(np.int16)
+        return AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=CHANNELS)
+
+    def export(self, path, format="mp3", **kwargs):
+        return self.to_segment().export(path, format=format, **kwargs)
+
+
+def crossfade_overlaps(lengths, joins_ms):
+    """Overlap in frames before each part (plus a trailing 0), clamped to what parts have left.
+
+    Args:
+        lengths: Part lengths in frames
+        joins_ms: Requested crossfade for each of the len(lengths) - 1 joins
+    """
+    overlaps = [0]
+    for i in range(1, len(lengths)):
+        available = min(lengths[i - 1] - overlaps[i - 1], lengths[i])
+        overlaps.append(max(0, min(ms_to_frames(joins_ms[i - 1]), available)))
+    overlaps.append(0)
+    return overlaps
+
+
+def concatenate(buffers, crossfade_ms=0):
+    """Join buffers end to end into one newly allocated buffer.
+
+    Args:
+        buffers: AudioBuffers in order
+        crossfade_ms: Overlap at each join, or a list with one value per join.
+            Overlaps are clamped so they never exceed either neighbour.
+
+    Returns:
+        AudioBuffer
+    """
+    buffers = [b for b in buffers if b is not None]
+    if not buffers:
+        return AudioBuffer.silent(0)
+    joins = crossfade_ms if isinstance(crossfade_ms, (list, tuple)) else [crossfade_ms] * (len(buffers) - 1)
+
+    overlaps = crossfade_overlaps([b.frames for b in buffers], joins)
+
+    total = sum(b.frames for b in buffers) - sum(overlaps)
+    out = np.zeros((total, CHANNELS), dtype=np.float32)
+    end = 0
+    for i, buffer in enumerate(buffers):
+        samples, head, tail = buffer.samples, overlaps[i], overlaps[i + 1]
+        n = len(samples)
+        start = end - head
+        # The head lands on the previous buffer's faded-out tail
+        if head:
+            out[start:start + head] += samples[:head] * np.linspace(0, 1, head, endpoint=False, dtype=np.float32)[:, None]
+        out[start + head:start + n - tail] = samples[head:n - tail]
+        if tail:
+            out[start + n - tail:start + n] = samples[n - tail:] * np.linspace(1, 0, tail, endpoint=False, dtype=np.float32)[:, None]
+        end = start + n
+    return AudioBuffer(out)
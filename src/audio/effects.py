@@ -1,59 +1,218 @@
 """
 Sound effects and audio enhancement for RepoRadio.
-Handles dynamic SFX triggers based on context.
+Handles dynamic SFX triggers based on context. Triggers live in a rule file
+(src/audio/sfx_rules.json) compiled into one regex that is run once over the
+whole script; each cue becomes a clip on the episode timeline at the point
+its trigger word is spoken (tts/alignment.py), mixed together with everything else.
 """
+import os
+import re
+import json
+import bisect
+import threading
 from pathlib import Path
-from pydub import AudioSegment
+from collections import namedtuple
 from debug_logger import voice_logger
+from audio.bank import get_asset_bank
+from audio.buffer import ms_to_frames
+from audio.timeline import Clip
+from tts.alignment import time_at
 
+RULES_PATH = Path(__file__).parent / "sfx_rules.json"
+ANCHORS = ("word", "start", "end")
 
-class SoundEffectsLibrary:
-    """Manages sound effects library for context-aware audio enhancement."""
+# position: where a "start"/"end" anchor lands in the line (0 or 1); char: the trigger's
+# character offset in the line's text for a "word" anchor, else None
+SfxCue = namedtuple("SfxCue", ["line_index", "sfx", "rule", "position", "char", "offset_ms", "gain_db"])
+
+
+def normalize_phrase(phrase):
+    return " ".join(phrase.lower().split())
+
+
+class SfxMatcher:
+    """Every trigger phrase of every rule in a single case-insensitive regex."""
+    
+    def __init__(self, rules):
+        """
+        Args:
+            rules: List of rule dicts in priority order: name, sfx, words, and optionally
+                speakers (only these speakers trigger it), anchor ("word", "start" or "end"),
+                offset_ms and gain_db
+        
+        Raises:
+            ValueError: If a rule is malformed
+        """
+        self.rules = []
+        self.phrases = {}   # normalized phrase -> indices of rules it triggers, in priority order
+        for rule in rules:
+            anchor = rule.get("anchor", "word")
+            if anchor not in ANCHORS or not rule.get("sfx") or not rule.get("words"):
+                raise ValueError(f"Invalid SFX rule {rule.get('name')!r}: needs sfx, words and an anchor in {ANCHORS}")
+            self.rules.append(dict(rule, anchor=anchor, speakers=set(rule.get("speakers", [])),
+                                   offset_ms=rule.get("offset_ms", 0), gain_db=rule.get("gain_db", 0)))
+            for word in rule["words"]:
+                self.phrases.setdefault(normalize_phrase(word), []).append(len(self.rules) - 1)
+        # Longest phrases first so "security flaw" wins over a shorter overlapping trigger
+        alternatives = [re.escape(p).replace(r"\ ", r"\s+") for p in sorted(self.phrases, key=len, reverse=True)]
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE) if alternatives else None
     
-    def __init__(self):
-        self.assets_dir = Path(__file__).parent / "assets"
-        self.sfx_cache = {}
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, "r") as f:
+            return cls(json.load(f).get("rules", []))
     
-    def load_sfx(self, sfx_name):
-        """Load a sound effect from assets folder."""
-        if sfx_name in self.sfx_cache:
-            return self.sfx_cache[sfx_name]
+    def match(self, script):
+        """
+        Find SFX cues for a whole script in one regex pass.
         
-        sfx_path = self.assets_dir / f"{sfx_name}.mp3"
-        if not sfx_path.exists():
-            sfx_path = self.assets_dir / f"{sfx_name}.wav"
+        Each line gets at most one cue: the highest-priority rule it triggers
+        (respecting the rule's speakers), at that rule's first trigger.
         
-        if sfx_path.exists():
-            try:
-                sfx = AudioSegment.from_file(sfx_path)
-                self.sfx_cache[sfx_name] = sfx
-                voice_logger.debug(f"Loaded SFX: {sfx_name}")
-                return sfx
-            except Exception as e:
-                voice_logger.error(f"Failed to load SFX {sfx_name}: {str(e)}")
-                return None
+        Args:
+            script: List of line dicts with 'speaker' and 'text'
         
-        voice_logger.debug(f"SFX not found: {sfx_name}")
-        return None
+        Returns:
+            List of SfxCue, in line order
+        """
+        if self.pattern is None:
+            return []
+        texts = [line.get("text", "") if isinstance(line, dict) else "" for line in script]
+        starts, position = [], 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + 1
+        # NUL can't be matched by \s+ or \w, so a phrase never spans two lines
+        joined = "\0".join(texts)
+        
+        best = {}   # line index -> (rule index, character offset)
+        for m in self.pattern.finditer(joined):
+            line = bisect.bisect_right(starts, m.start()) - 1
+            speaker = script[line].get("speaker", "")
+            for rule_index in self.phrases[normalize_phrase(m.group())]:
+                speakers = self.rules[rule_index]["speakers"]
+                if speakers and speaker not in speakers:
+                    continue
+                if line not in best or rule_index < best[line][0]:
+                    best[line] = (rule_index, m.start() - starts[line])
+                break
+        
+        cues = []
+        for line, (rule_index, offset) in sorted(best.items()):
+            rule = self.rules[rule_index]
+            position = {"start": 0.0, "end": 1.0}.get(rule["anchor"])
+            char = offset if position is None else None
+            cues.append(SfxCue(line, rule["sfx"], rule.get("name", rule["sfx"]), position, char,
+                               rule["offset_ms"], rule["gain_db"]))
+        return cues
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_sfx_matcher():
+    """Compiled matcher for SFX_RULES_PATH (default src/audio/sfx_rules.json), rebuilt when the file changes."""
+    path = Path(os.getenv("SFX_RULES_PATH") or RULES_PATH)
+    key = (str(path), path.stat().st_mtime_ns)
+    with _matchers_lock:
+        if key not in _matchers:
+            _matchers[key] = SfxMatcher.from_file(path)
+            voice_logger.info(f"Compiled {len(_matchers[key].phrases)} SFX triggers from {path.name}")
+        return _matchers[key]
+
+
+def cue_time_ms(cue, text, segment):
+    """
+    Where a cue lands in its rendered line, before offset_ms.
+    
+    Args:
+        cue: SfxCue
+        text: The line's text
+        segment: The line's AudioSegment (its .alignment times the trigger word)
+    
+    Returns:
+        Milliseconds from the start of the line
+    """
+    if cue.char is None:
+        return cue.position * len(segment)
+    # Lines are rendered (and aligned) stripped, like voice.prepare_line
+    lead = len(text) - len(text.lstrip())
+    return time_at(text.strip(), segment, max(0, cue.char - lead))
+
+
+def add_sfx_to_timeline(timeline, script, line_sources, labels=None, matcher=None):
+    """
+    Place context-aware sound effects on an episode timeline.
+    
+    A cue anchored to a word lands where that word is spoken (cue_time_ms);
+    effects are mixed with the rest of the timeline rather than copied into
+    each line.
+    
+    Args:
+        timeline: Episode Timeline (plan_timeline)
+        script: List of script line dicts
+        line_sources: Dict of line index -> the source placed on the timeline for that line
+        labels: Optional dict of id(source) -> name to record the effects in (see audio/project.py)
+        matcher: SfxMatcher (default: get_sfx_matcher())
+    
+    Returns:
+        Number of effects placed
+    """
+    matcher = matcher or get_sfx_matcher()
+    clips = {id(clip.source): clip for clip in timeline.clips}
+    bank = get_asset_bank()
+    placed = 0
+    for cue in matcher.match(script):
+        segment = line_sources.get(cue.line_index)
+        line_clip = clips.get(id(segment))
+        sfx = bank.get("sfx", cue.sfx)
+        if line_clip is None or sfx is None:
+            voice_logger.debug(f"Skipping SFX '{cue.sfx}' for line {cue.line_index}")
+            continue
+        if cue.gain_db:
+            sfx = sfx.gain(cue.gain_db)
+        at_ms = cue_time_ms(cue, script[cue.line_index].get("text", ""), segment)
+        start = line_clip.start + ms_to_frames(at_ms + cue.offset_ms)
+        start = min(max(line_clip.start, start), line_clip.end)
+        timeline.add(Clip(sfx, start))
+        if labels is not None:
+            labels[id(sfx)] = f"sfx:{cue.sfx}:{cue.gain_db}"
+        placed += 1
+        voice_logger.debug(f"SFX '{cue.sfx}' ({cue.rule}) on line {cue.line_index} at {start}")
+    if placed:
+        voice_logger.info(f"Placed {placed} sound effects")
+    return placed
+
+
+class SoundEffectsLibrary:
+    """Manages sound effects library for context-aware audio enhancement."""
+    
+    def load_sfx(self, sfx_name):
+        """Get a sound effect from the asset bank (src/audio/assets/)."""
+        sfx = get_asset_bank().get("sfx", sfx_name)
+        if sfx is None:
+            voice_logger.debug(f"SFX not found: {sfx_name}")
+        return sfx
     
     def overlay_sfx_on_segment(self, audio_segment, sfx_name, position_ms=0):
         """
         Overlay a sound effect on an audio segment.
         
         Args:
-            audio_segment: AudioSegment to add effect to
+            audio_segment: AudioBuffer to add effect to
             sfx_name: Name of the sound effect file (without extension)
             position_ms: Position in ms to overlay the effect
         
         Returns:
-            AudioSegment with effect overlaid
+            AudioBuffer with effect overlaid
         """
         sfx = self.load_sfx(sfx_name)
         if sfx is None:
             return audio_segment
         
         try:
-            result = audio_segment.overlay(sfx, position=position_ms)
+            result = audio_segment.overlay(sfx, position_ms=max(0, position_ms))
             voice_logger.debug(f"Overlaid SFX '{sfx_name}' at {position_ms}ms")
             return result
         except Exception as e:
@@ -62,35 +221,18 @@ class SoundEffectsLibrary:
     
     def detect_and_add_sfx(self, script_line, audio_segment):
         """
-        Analyze script text and add appropriate sound effects.
+        Analyze script text and add the matching sound effect (see SfxMatcher).
         
         Args:
             script_line: Dict with 'speaker' and 'text' keys
-            audio_segment: AudioSegment to potentially add effects to
+            audio_segment: AudioBuffer to potentially add effects to
         
         Returns:
-            AudioSegment (potentially with SFX added)
+            AudioBuffer (potentially with SFX added)
         """
-        text = script_line.get("text", "").lower()
-        speaker = script_line.get("speaker", "")
-        
-        # Detect criticism/negative reactions (Sam, Marcus)
-        if any(word in text for word in ["terrible", "awful", "horrible", "wrong", "hate", "nightmare"]):
-            if speaker in ["Sam", "Marcus"]:
-                return self.overlay_sfx_on_segment(audio_segment, "gavel", position_ms=100)
-        
-        # Detect excitement/celebration
-        if any(word in text for word in ["amazing", "awesome", "perfect", "brilliant", "love it"]):
-            return self.overlay_sfx_on_segment(audio_segment, "applause", position_ms=len(audio_segment) - 500)
-        
-        # Detect security/danger mentions
-        if any(word in text for word in ["vulnerability", "security flaw", "exploit", "hack"]):
-            if speaker == "Marcus":
-                return self.overlay_sfx_on_segment(audio_segment, "alert", position_ms=50)
-        
-        # Detect tech jargon overload
-        if any(word in text for word in ["kubernetes", "microservices", "blockchain", "quantum"]):
-            return self.overlay_sfx_on_segment(audio_segment, "tech_whoosh", position_ms=0)
+        for cue in get_sfx_matcher().match([script_line]):
+            position_ms = int(cue_time_ms(cue, script_line.get("text", ""), audio_segment)) + cue.offset_ms
+            return self.overlay_sfx_on_segment(audio_segment, cue.sfx, position_ms=position_ms)
         
         # Return unmodified if no triggers detected
         return audio_segment
@@ -104,19 +246,20 @@ def add_context_aware_sfx(script, audio_segments):
     """
     Add sound effects to audio segments based on script context.
     
+    The render pipeline places effects on the timeline instead
+    (add_sfx_to_timeline); this copies them into each line's buffer.
+    
     Args:
         script: List of script line dicts
-        audio_segments: Dict of index -> AudioSegment
+        audio_segments: Dict of index -> AudioBuffer
     
     Returns:
-        Dict of index -> AudioSegment (with SFX added where appropriate)
+        Dict of index -> AudioBuffer (with SFX added where appropriate)
     """
-    enhanced_segments = {}
-    
-    for i, line in enumerate(script):
-        if i in audio_segments:
-            enhanced_segments[i] = sfx_library.detect_and_add_sfx(line, audio_segments[i])
-        else:
-            enhanced_segments[i] = audio_segments.get(i)
-    
-    return enhanced_segments
+    enhanced_segments = dict(audio_segments)
+    for cue in get_sfx_matcher().match(script):
+        segment = audio_segments.get(cue.line_index)
+        if segment is not None:
+            position_ms = int(cue_time_ms(cue, script[cue.line_index].get("text", ""), segment)) + cue.offset_ms
+            enhanced_segments[cue.line_index] = sfx_library.overlay_sfx_on_segment(segment, cue.sfx, position_ms)
+    return {i: enhanced_segments.get(i) for i in range(len(script))}
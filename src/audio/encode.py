@@ -0,0 +1,237 @@
+"""
+Pipelined encoder stage for RepoRadio episodes.
+Mixed blocks (audio/mixer.py stream_episode) are converted to 16-bit PCM once
+and handed to one ffmpeg process per output format. Each process is fed from
+its own thread through a small bounded queue, so encoding runs alongside
+mixing instead of after it, and one mix pass can write MP3, Opus and AAC.
+"""
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from pydub.utils import get_encoder_name
+from debug_logger import voice_logger
+from audio.buffer import SAMPLE_RATE, CHANNELS
+
+OutputFormat = namedtuple("OutputFormat", ["muxer", "codec", "bitrate", "extension"])
+
+# Episode formats: ffmpeg muxer, encoder, default bitrate, file extension
+OUTPUT_FORMATS = {
+    "mp3": OutputFormat("mp3", "libmp3lame", "128k", ".mp3"),
+    "opus": OutputFormat("ogg", "libopus", "64k", ".opus"),  # ffmpeg resamples to Opus' 48kHz
+    "aac": OutputFormat("ipod", "aac", "128k", ".m4a"),
+}
+QUEUE_BLOCKS = 8
+
+
+class EncoderError(Exception):
+    """ffmpeg failed to encode the stream."""
+
+
+def get_output_formats():
+    """Episode formats from the environment.
+
+    EPISODE_FORMATS: comma-separated formats to write from one mix (default "mp3"; first is
+        the one played in the app)
+    EPISODE_<FORMAT>_BITRATE: bitrate per format, e.g. EPISODE_OPUS_BITRATE=48k
+
+    Returns:
+        List of (format, bitrate) tuples
+    """
+    formats = [f.strip().lower() for f in os.getenv("EPISODE_FORMATS", "mp3").split(",") if f.strip()]
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        raise EncoderError(f"Unknown EPISODE_FORMATS {unknown}; choose from {sorted(OUTPUT_FORMATS)}")
+    return [(f, os.getenv(f"EPISODE_{f.upper()}_BITRATE", OUTPUT_FORMATS[f].bitrate)) for f in formats or ["mp3"]]
+
+
+def to_pcm16(block):
+    """float32 block -> interleaved little-endian int16 bytes (clipped like AudioBuffer.to_segment)."""
+    return (np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class Encoder:
+    """One ffmpeg process encoding PCM on its own feeder thread."""
+
+    def __init__(self, path, format="mp3", bitrate=None, queue_blocks=QUEUE_BLOCKS):
+        """
+        Args:
+            path: Output file
+            format: Key of OUTPUT_FORMATS
+            bitrate: ffmpeg bitrate, e.g. "96k" (None = the format's default)
+            queue_blocks: Blocks buffered before the mixer waits on this encoder
+        """
+        if format not in OUTPUT_FORMATS:
+            raise EncoderError(f"Unknown output format {format!r}; choose from {sorted(OUTPUT_FORMATS)}")
+        self.path = str(path)
+        self.format = format
+        self.bitrate = bitrate or OUTPUT_FORMATS[format].bitrate
+        self.stall_s = 0.0      # time the mixer spent waiting for room in the queue
+        self.cpu_s = None       # ffmpeg user + system time, where the platform reports it
+        self.wall_s = 0.0
+        self._queue = queue.Queue(maxsize=queue_blocks)
+        self._error = None
+        self._process = None
+        self._thread = None
+        self._started_at = None
+
+    def command(self):
+        spec = OUTPUT_FORMATS[self.format]
+        return [
+            get_encoder_name(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-i", "pipe:0",
+            "-c:a", spec.codec, "-b:a", self.bitrate, "-f", spec.muxer, self.path,
+        ]
+
+    def start(self):
+        self._started_at = time.time()
+        # stderr goes to a file so a chatty ffmpeg can't fill the pipe and stall the feeder
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(self.command(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=self._stderr)
+        self._thread = threading.Thread(target=self._feed, name=f"encode-{self.format}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _feed(self):
+        while True:
+            pcm = self._queue.get()
+            if pcm is None:
+                break
+            if self._error is not None:
+                continue  # keep draining so the mixer never blocks on a dead encoder
+            try:
+                self._process.stdin.write(pcm)
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def write(self, pcm):
+        """Queue 16-bit PCM bytes for encoding."""
+        try:
+            self._queue.put_nowait(pcm)
+        except queue.Full:
+            start = time.time()
+            self._queue.put(pcm)
+            self.stall_s += time.time() - start
+
+    def _wait(self):
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(self._process.pid, 0)
+            self._process.returncode = os.waitstatus_to_exitcode(status)
+            self.cpu_s = usage.ru_utime + usage.ru_stime
+            return self._process.returncode
+        return self._process.wait()
+
+    def close(self):
+        """Finish the stream and wait for ffmpeg.
+
+        Raises:
+            EncoderError: If ffmpeg exits with an error
+        """
+        self._queue.put(None)
+        self._thread.join()
+        returncode = self._wait()
+        self.wall_s = time.time() - self._started_at
+        with self._stderr:
+            if returncode != 0:
+                self._stderr.seek(0)
+                message = self._stderr.read().decode(errors="replace").strip()
+                raise EncoderError(f"ffmpeg ({self.format}) exited with {returncode}: {message[-500:]}")
+
+    def abort(self):
+        """Stop ffmpeg without finishing the file (the mix failed)."""
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._process.wait()
+            self._stderr.close()
+
+    def stats(self):
+        return {
+            "path": self.path, "format": self.format, "bitrate": self.bitrate, "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s, "stall_s": self.stall_s,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+def encode_stream(blocks, outputs, queue_blocks=QUEUE_BLOCKS):
+    """
+    Encode an iterable of float32 (frames, CHANNELS) blocks to one or more files.
+
+    Blocks are pulled (i.e. mixed) on the calling thread while every output's
+    ffmpeg encodes the previous ones.
+
+    Args:
+        blocks: Iterable of blocks at SAMPLE_RATE
+        outputs: List of (path, format, bitrate) tuples (bitrate None = format default)
+        queue_blocks: Blocks buffered per encoder
+
+    Returns:
+        Dict with duration_ms, mix_s (producing blocks), drain_s (waiting for encoders after the
+        last block) and a stats dict per output
+
+    Raises:
+        EncoderError: If any ffmpeg exits with an error
+    """
+    encoders = [Encoder(path, format, bitrate, queue_blocks) for path, format, bitrate in outputs]
+    frames = 0
+    mix_s = 0.0
+    try:
+        for encoder in encoders:
+            encoder.start()
+        iterator = iter(blocks)
+        while True:
+            start = time.time()
+            block = next(iterator, None)
+            mix_s += time.time() - start
+            if block is None:
+                break
+            pcm = to_pcm16(block)
+            frames += len(block)
+            for encoder in encoders:
+                encoder.write(pcm)
+    except BaseException:
+        for encoder in encoders:
+            encoder.abort()
+        raise
+
+    drain_start = time.time()
+    errors = []
+    for encoder in encoders:
+        try:
+            encoder.close()
+        except EncoderError as e:
+            errors.append(e)
+    if errors:
+        raise EncoderError("; ".join(str(e) for e in errors))
+
+    report = {
+        "duration_ms": frames * 1000 / SAMPLE_RATE,
+        "mix_s": mix_s,
+        "drain_s": time.time() - drain_start,
+        "outputs": [encoder.stats() for encoder in encoders],
+    }
+    voice_logger.info(format_encode_report(report))
+    return report
+
+
+def format_encode_report(report):
+    """One-line summary of an encode_stream report."""
+    outputs = ", ".join(
+        f"{o['format']} {o['bitrate']} ({o['bytes'] / 1e6:.1f}MB"
+        + (f", {o['cpu_s']:.1f}s CPU" if o["cpu_s"] is not None else "")
+        + (f", mixer waited {o['stall_s']:.1f}s" if o["stall_s"] >= 0.05 else "") + ")"
+        for o in report["outputs"]
+    )
+    return (f"Encoded {report['duration_ms'] / 1000:.0f}s of audio to {outputs}; "
+            f"mixing {report['mix_s']:.1f}s, encoder finish {report['drain_s']:.1f}s after mixing")
@@ -1,82 +1,213 @@
 """
 Audio mixing module for RepoRadio.
 Handles background music overlay, crossfading, and audio effects.
+Works on AudioBuffers (audio/buffer.py): the episode is laid out as a
+Timeline (audio/timeline.py) and either rendered whole or streamed in
+fixed-size blocks with the music bed mixed in, so long episodes never need a
+full-length copy. The music bed is ducked under speech from the dialogue's
+own RMS envelope.
 """
 import os
-import random
-from pathlib import Path
-from pydub import AudioSegment
+import numpy as np
 from debug_logger import voice_logger
+from audio.bank import get_asset_bank
+from audio.buffer import AudioBuffer, concatenate, ms_to_frames
+from audio.timeline import Timeline
 
+ENVELOPE_BLOCK_MS = 10
+STREAM_BLOCK_MS = 1000
 
-def get_random_background_track():
-    """Get a random background music track from src/music/background/ folder."""
-    background_dir = Path(__file__).parent.parent / "music" / "background"
+
+def get_ducking_config():
+    """Music-bed ducking settings from the environment.
     
-    if not background_dir.exists():
-        voice_logger.warning("Background music directory not found, skipping background music")
-        return None
+    MUSIC_DUCK_DB: how much louder the bed gets when nobody speaks (default 10, 0 = fixed level)
+    MUSIC_DUCK_THRESHOLD_DB: dialogue RMS (dBFS) that counts as speech (default -45)
+    MUSIC_DUCK_ATTACK_MS: fade down ahead of speech (default 120)
+    MUSIC_DUCK_RELEASE_MS: fade back up after speech (default 600)
+    """
+    return {
+        "duck_db": float(os.getenv("MUSIC_DUCK_DB", "10")),
+        "threshold_db": float(os.getenv("MUSIC_DUCK_THRESHOLD_DB", "-45")),
+        "attack_ms": float(os.getenv("MUSIC_DUCK_ATTACK_MS", "120")),
+        "release_ms": float(os.getenv("MUSIC_DUCK_RELEASE_MS", "600")),
+    }
+
+
+class MusicBed:
+    """
+    A music track looped or trimmed to an episode's length, read range by range.
     
-    # Find all audio files (mp3, wav, ogg)
-    audio_files = list(background_dir.glob("*.mp3")) + list(background_dir.glob("*.wav")) + list(background_dir.glob("*.ogg"))
+    A short track loops with its loop point (tail fading into head) mixed
+    once; every pass after the first is that seam plus the track body, so any
+    frame of the bed is an index into one track-sized array. A long track is
+    trimmed and faded out over its last fade_out_ms.
+    """
     
-    if not audio_files:
-        voice_logger.warning("No music files found in src/music/background/, skipping background music")
-        return None
+    def __init__(self, track, frames, crossfade_ms=1000, fade_out_ms=0, gain_db=0):
+        """
+        Args:
+            track: AudioBuffer to loop or trim
+            frames: Bed length in frames
+            crossfade_ms: Loop-point crossfade (clamped to half the track)
+            fade_out_ms: Fade at the end of a trimmed track
+            gain_db: Level change applied to every frame read
+        """
+        samples = track.samples
+        n = len(samples)
+        self.frames = frames
+        self.gain = np.float32(10 ** (gain_db / 20))
+        self.fade_out = 0
+        self.unit = None
+        if n >= frames:
+            self.head = samples[:frames]
+            self.fade_out = min(frames, ms_to_frames(fade_out_ms))
+            return
+        overlap = min(ms_to_frames(crossfade_ms), n // 2)
+        ramp = np.linspace(0, 1, overlap, endpoint=False, dtype=np.float32)[:, None]
+        seam = samples[n - overlap:] * (1 - ramp) + samples[:overlap] * ramp
+        # First pass plays up to the seam; every later pass is seam + body
+        self.head = samples[:n - overlap]
+        self.unit = np.concatenate([seam, samples[overlap:n - overlap]])
     
-    selected_track = random.choice(audio_files)
-    voice_logger.info(f"Selected background track: {selected_track.name}")
-    return str(selected_track)
+    def read(self, start, stop):
+        """New float32 array of bed frames [start, stop)."""
+        head = len(self.head)
+        if self.unit is None or stop <= head:
+            out = self.head[start:stop] * self.gain
+        else:
+            positions = (np.arange(max(start, head), stop) - head) % len(self.unit)
+            looped = np.take(self.unit, positions, axis=0) * self.gain
+            out = looped if start >= head else np.concatenate([self.head[start:] * self.gain, looped])
+        if self.fade_out and stop > self.frames - self.fade_out:
+            first = max(start, self.frames - self.fade_out)
+            out[first - start:] *= (1 - (np.arange(first, stop) - (self.frames - self.fade_out))
+                                    / np.float32(self.fade_out)).astype(np.float32)[:, None]
+        return out
 
 
-def overlay_background_music(dialogue_audio, bg_track_path=None, volume_reduction_db=20):
+def tile_loop(track, frames, crossfade_ms=1000):
     """
-    Overlay background music on dialogue audio.
+    Loop a music track to an exact length in one pass (see MusicBed).
     
     Args:
-        dialogue_audio: AudioSegment of the dialogue
-        bg_track_path: Path to background music file (None = auto-select random)
-        volume_reduction_db: How much to reduce background music volume (default: 20dB)
+        track: AudioBuffer to loop
+        frames: Output length in frames
+        crossfade_ms: Loop-point crossfade (clamped to half the track)
     
     Returns:
-        AudioSegment with background music overlaid
+        AudioBuffer of exactly `frames` frames
     """
-    if bg_track_path is None:
-        bg_track_path = get_random_background_track()
+    if track.frames >= frames:
+        return AudioBuffer(track.samples[:frames])
+    return AudioBuffer(MusicBed(track, frames, crossfade_ms).read(0, frames))
+
+
+def rms_envelope(audio, block_ms=ENVELOPE_BLOCK_MS):
+    """Per-block RMS level of a buffer in dBFS (over all channels)."""
+    block = ms_to_frames(block_ms)
+    samples = audio.samples
+    full = len(samples) // block * block
+    blocks = [samples[:full].reshape(len(samples) // block, -1)]
+    if full < len(samples):
+        blocks.append(samples[full:].reshape(1, -1))
+    power = np.concatenate([np.einsum("ij,ij->i", b, b) / b.shape[1] for b in blocks])
+    return 10 * np.log10(np.maximum(power, 1e-18))
+
+
+def ducking_gain(envelope_db, duck_db=10, threshold_db=-45, attack_ms=120, release_ms=600, block_ms=ENVELOPE_BLOCK_MS):
+    """
+    Per-block ducking amount in dB (0 during speech, up to +duck_db in pauses).
+    
+    The whole dialogue is known up front, so instead of a sample-by-sample
+    compressor this measures, for every block, the distance to the nearest
+    speech before it (release) and after it (attack, i.e. look-ahead) and
+    ramps linearly over those times. Every step is a whole-array operation.
+    
+    Returns:
+        Float array, one value per envelope block
+    """
+    blocks = len(envelope_db)
+    active = envelope_db > threshold_db
+    if not active.any():
+        return np.full(blocks, float(duck_db))
+    index = np.arange(blocks)
+    last = np.maximum.accumulate(np.where(active, index, -blocks * 10))
+    following = np.minimum.accumulate(np.where(active, index, blocks * 10)[::-1])[::-1]
+    release = np.clip(1 - (index - last) * block_ms / max(release_ms, block_ms), 0, 1)
+    attack = np.clip(1 - (following - index) * block_ms / max(attack_ms, block_ms), 0, 1)
+    return duck_db * (1 - np.maximum(release, attack))
+
+
+def duck_under(music, dialogue, duck_db=10, threshold_db=-45, attack_ms=120, release_ms=600):
+    """
+    Ducked copy of a music bed: raised by up to duck_db wherever the dialogue is quiet.
+    
+    Args:
+        music: AudioBuffer at its level under speech, same length as dialogue
+        dialogue: AudioBuffer driving the sidechain
     
-    if bg_track_path is None:
+    Returns:
+        AudioBuffer
+    """
+    gain_db = ducking_gain(rms_envelope(dialogue), duck_db, threshold_db, attack_ms, release_ms)
+    return AudioBuffer(music.samples * gain_curve(10 ** (gain_db / 20), 0, music.frames)[:, None])
+
+
+def gain_curve(gains, start, stop):
+    """Per-frame gains for frames [start, stop), joining per-envelope-block gains with linear ramps."""
+    block = ms_to_frames(ENVELOPE_BLOCK_MS)
+    gains = np.asarray(gains, dtype=np.float32)
+    frames = np.arange(start, stop)
+    current = frames // block
+    following = np.minimum(current + 1, len(gains) - 1)
+    ramp = (frames % block).astype(np.float32) / block
+    return gains[current] + (gains[following] - gains[current]) * ramp
+
+
+def load_background_music(bg_track_path=None):
+    """Background track from the asset bank (None = random track), or None if unavailable."""
+    bank = get_asset_bank()
+    bg_music = bank.random("background") if bg_track_path is None else bank.load_file(bg_track_path)
+    if bg_music is None:
         voice_logger.warning("No background music available, returning dialogue only")
+    return bg_music
+
+
+def overlay_background_music(dialogue_audio, bg_track_path=None, volume_reduction_db=20, ducking=None):
+    """
+    Overlay background music on dialogue audio, ducked under speech.
+    
+    Args:
+        dialogue_audio: AudioBuffer of the dialogue (the music is mixed into it in place)
+        bg_track_path: Path to background music file (None = random track from the asset bank)
+        volume_reduction_db: Music level under speech (default: 20dB below the track)
+        ducking: Dict of duck_under settings (None = get_ducking_config())
+    
+    Returns:
+        AudioBuffer with background music overlaid
+    """
+    bg_music = load_background_music(bg_track_path)
+    if bg_music is None:
         return dialogue_audio
     
+    ducking = ducking if ducking is not None else get_ducking_config()
+    
     try:
-        # Load background music
-        bg_music = AudioSegment.from_file(bg_track_path)
         voice_logger.debug(f"Background music loaded: {len(bg_music)}ms, dialogue: {len(dialogue_audio)}ms")
         
-        # Reduce background music volume so it doesn't overpower dialogue
-        bg_music = bg_music - volume_reduction_db
-        
-        # Loop or trim background music to match dialogue length
-        dialogue_len = len(dialogue_audio)
-        bg_len = len(bg_music)
+        # Reduced so it doesn't overpower dialogue; looped with a 1 second crossfade
+        # at loop points, or trimmed with a 3 second fade out at the end
+        bed = MusicBed(bg_music, dialogue_audio.frames, crossfade_ms=1000, fade_out_ms=3000, gain_db=-volume_reduction_db)
+        bg_music = AudioBuffer(bed.read(0, dialogue_audio.frames))
         
-        if bg_len < dialogue_len:
-            # Loop the music with crossfade at loop points for seamless playback
-            loops_needed = (dialogue_len // bg_len) + 1
-            looped_bg = bg_music
-            for _ in range(loops_needed - 1):
-                looped_bg = looped_bg.append(bg_music, crossfade=1000)  # 1 second crossfade
-            bg_music = looped_bg[:dialogue_len]
-            voice_logger.debug(f"Looped background music {loops_needed} times")
-        else:
-            # Trim and fade out
-            bg_music = bg_music[:dialogue_len]
-            bg_music = bg_music.fade_out(3000)  # 3 second fade out at the end
-            voice_logger.debug("Trimmed background music to dialogue length")
+        if ducking.get("duck_db"):
+            bg_music = duck_under(bg_music, dialogue_audio, **ducking)
         
         # Overlay the background music
-        mixed_audio = dialogue_audio.overlay(bg_music)
-        voice_logger.info(f"Background music overlaid successfully ({volume_reduction_db}dB reduction)")
+        mixed_audio = dialogue_audio.mix(bg_music)
+        voice_logger.info(f"Background music overlaid successfully ({volume_reduction_db}dB under speech, "
+                          f"+{ducking.get('duck_db', 0):g}dB in pauses)")
         
         return mixed_audio
         
@@ -90,27 +221,140 @@ def add_crossfade_between_segments(segments, crossfade_ms=200):
     Combine audio segments with crossfade between them.
     
     Args:
-        segments: List of AudioSegment objects
+        segments: List of AudioBuffer objects
         crossfade_ms: Crossfade duration in milliseconds
     
     Returns:
-        Combined AudioSegment with crossfades
+        Combined AudioBuffer with crossfades
     """
     if not segments:
-        return AudioSegment.empty()
+        return AudioBuffer.silent(0)
+    
+    combined = concatenate(segments, crossfade_ms=crossfade_ms)
+    voice_logger.info(f"Combined {len(segments)} segments with crossfading")
+    return combined
+
+
+def load_jingles(intro_path=None, outro_path=None):
+    """
+    Load the intro and outro jingles.
     
-    if len(segments) == 1:
-        return segments[0]
+    Args:
+        intro_path: Path to intro jingle (None = music/intro.* from the asset bank)
+        outro_path: Path to outro jingle (None = music/outro.* from the asset bank)
     
-    combined = segments[0]
+    Returns:
+        Tuple of (intro, outro) AudioBuffers, None for any that is missing
+    """
+    bank = get_asset_bank()
+    jingles = []
+    for name, path in (("intro", intro_path), ("outro", outro_path)):
+        jingle = bank.get("jingles", name) if path is None else bank.load_file(path)
+        if jingle is None:
+            voice_logger.debug(f"No {name} jingle found")
+        else:
+            voice_logger.info(f"Loaded {name} jingle")
+        jingles.append(jingle)
+    return tuple(jingles)
+
+
+def plan_timeline(segments, crossfade_ms=200, gap_ms=0, intro=None, outro=None, jingle_gap_ms=500):
+    """
+    Lay out the whole episode without mixing it.
     
-    for i in range(1, len(segments)):
-        # Add crossfade between segments for smoother transitions
-        combined = combined.append(segments[i], crossfade=crossfade_ms)
-        voice_logger.debug(f"Added segment {i} with {crossfade_ms}ms crossfade")
+    Args:
+        segments: List of AudioBuffers / AudioSegments (dialogue lines and transitions) in order
+        crossfade_ms: Crossfade between segments (0 = butt joins)
+        gap_ms: Silence after every segment (used instead of crossfades)
+        intro: Optional intro jingle AudioBuffer
+        outro: Optional outro jingle AudioBuffer
+        jingle_gap_ms: Silence between a jingle and the dialogue
     
-    voice_logger.info(f"Combined {len(segments)} segments with crossfading")
-    return combined
+    Returns:
+        Timeline of the episode
+    """
+    parts, joins = [], []
+    
+    def add(part, join_ms=0):
+        if parts:
+            joins.append(join_ms)
+        parts.append(part)
+    
+    if intro is not None:
+        add(intro)
+        add(AudioBuffer.silent(jingle_gap_ms))
+    gap = AudioBuffer.silent(gap_ms) if gap_ms else None
+    for i, segment in enumerate(segments):
+        add(segment, crossfade_ms if i else 0)
+        if gap is not None:
+            add(gap)
+    if outro is not None:
+        add(AudioBuffer.silent(jingle_gap_ms))
+        add(outro)
+    
+    timeline = Timeline.sequence(parts, crossfade_ms=joins)
+    voice_logger.info(f"Planned {len(timeline)}ms timeline from {len(segments)} segments")
+    return timeline
+
+
+def build_timeline(segments, crossfade_ms=200, gap_ms=0, intro=None, outro=None, jingle_gap_ms=500):
+    """
+    Assemble the whole episode in a single allocation (see plan_timeline).
+    
+    Returns:
+        AudioBuffer of the episode
+    """
+    return plan_timeline(segments, crossfade_ms, gap_ms, intro, outro, jingle_gap_ms).render()
+
+
+def stream_block_frames(block_ms=STREAM_BLOCK_MS):
+    """Stream block size in frames, a whole number of envelope blocks."""
+    return max(1, round(block_ms / ENVELOPE_BLOCK_MS)) * ms_to_frames(ENVELOPE_BLOCK_MS)
+
+
+def stream_episode(timeline, music=None, volume_reduction_db=20, ducking=None, block_ms=STREAM_BLOCK_MS):
+    """
+    Mix an episode block by block, for piping straight into an encoder.
+    
+    Memory stays at a few blocks plus the music track however long the
+    episode is. With ducking, a first pass over the dialogue blocks measures
+    the RMS envelope (100 values a second), then the second pass mixes each
+    block with its slice of the looped, ducked bed; the result matches
+    overlay_background_music(timeline.render()).
+    
+    Args:
+        timeline: Timeline of the episode (plan_timeline)
+        music: Background track AudioBuffer (None = dialogue only)
+        volume_reduction_db: Music level under speech
+        ducking: Dict of duck_under settings (None = get_ducking_config())
+        block_ms: Block length (rounded to whole envelope blocks)
+    
+    Yields:
+        float32 (frames, CHANNELS) arrays
+    """
+    block = stream_block_frames(block_ms)
+    if music is None:
+        yield from timeline.blocks(block)
+        return
+    
+    ducking = ducking if ducking is not None else get_ducking_config()
+    bed = MusicBed(music, timeline.frames, crossfade_ms=1000, fade_out_ms=3000, gain_db=-volume_reduction_db)
+    gains = None
+    if ducking.get("duck_db"):
+        envelope = [rms_envelope(AudioBuffer(dialogue)) for dialogue in timeline.blocks(block)]
+        gain_db = ducking_gain(np.concatenate(envelope) if envelope else np.zeros(0), **ducking)
+        gains = (10 ** (gain_db / 20)).astype(np.float32)
+    voice_logger.info(f"Streaming {len(timeline)}ms episode in {block}-frame blocks with background music")
+    
+    start = 0
+    for out in timeline.blocks(block):
+        stop = start + len(out)
+        music_block = bed.read(start, stop)
+        if gains is not None:
+            music_block *= gain_curve(gains, start, stop)[:, None]
+        out += music_block
+        start = stop
+        yield out
 
 
 def add_intro_outro(dialogue_audio, intro_path=None, outro_path=None):
@@ -118,46 +362,17 @@ def add_intro_outro(dialogue_audio, intro_path=None, outro_path=None):
     Add intro and/or outro jingles to the podcast.
     
     Args:
-        dialogue_audio: AudioSegment of the main dialogue
+        dialogue_audio: AudioBuffer of the main dialogue
         intro_path: Path to intro jingle (None = use default)
         outro_path: Path to outro jingle (None = use default)
     
     Returns:
-        AudioSegment with intro/outro added
-    """
-    music_dir = Path(__file__).parent.parent / "music"
-    
-    # Default intro/outro paths - use intro.wav and outro.wav from music folder
-    if intro_path is None:
-        intro_path = music_dir / "intro.wav"
-    if outro_path is None:
-        outro_path = music_dir / "outro.wav"
-    
-    result = dialogue_audio
-    
-    # Add intro if it exists
-    if os.path.exists(intro_path):
-        try:
-            intro = AudioSegment.from_file(intro_path)
-            result = intro + AudioSegment.silent(duration=500) + result
-            voice_logger.info("Added intro jingle")
-        except Exception as e:
-            voice_logger.warning(f"Failed to add intro jingle: {str(e)}")
-    else:
-        voice_logger.debug(f"No intro jingle found at {intro_path}")
-    
-    # Add outro if it exists
-    if os.path.exists(outro_path):
-        try:
-            outro = AudioSegment.from_file(outro_path)
-            result = result + AudioSegment.silent(duration=500) + outro
-            voice_logger.info("Added outro jingle")
-        except Exception as e:
-            voice_logger.warning(f"Failed to add outro jingle: {str(e)}")
-    else:
-        voice_logger.debug(f"No outro jingle found at {outro_path}")
-    
-    return result
+        AudioBuffer with intro/outro added
+    """
+    intro, outro = load_jingles(intro_path, outro_path)
+    if intro is None and outro is None:
+        return dialogue_audio
+    return build_timeline([dialogue_audio], intro=intro, outro=outro)
 
 
 def add_ad_break_transition(dialogue_audio, ad_audio, ad_position=None):
@@ -165,12 +380,12 @@ def add_ad_break_transition(dialogue_audio, ad_audio, ad_position=None):
     Insert an ad break into the dialogue at a specific position.
     
     Args:
-        dialogue_audio: AudioSegment of the main dialogue
-        ad_audio: AudioSegment of the ad break
+        dialogue_audio: AudioBuffer of the main dialogue
+        ad_audio: AudioBuffer of the ad break
         ad_position: Position in ms to insert ad (None = middle)
     
     Returns:
-        AudioSegment with ad break inserted
+        AudioBuffer with ad break inserted
     """
     if ad_position is None:
         ad_position = len(dialogue_audio) // 2
@@ -179,26 +394,16 @@ def add_ad_break_transition(dialogue_audio, ad_audio, ad_position=None):
     before_ad = dialogue_audio[:ad_position]
     after_ad = dialogue_audio[ad_position:]
     
-    # Get random transition sound from music/transitions/ folder
-    transitions_dir = Path(__file__).parent.parent / "music" / "transitions"
-    transition = None
-    
-    if transitions_dir.exists():
-        transition_files = list(transitions_dir.glob("*.wav")) + list(transitions_dir.glob("*.mp3")) + list(transitions_dir.glob("*.ogg"))
-        if transition_files:
-            try:
-                transition_path = random.choice(transition_files)
-                transition = AudioSegment.from_file(transition_path)
-                voice_logger.info(f"Using transition: {transition_path.name}")
-            except Exception as e:
-                voice_logger.warning(f"Failed to load transition sound: {str(e)}")
-    
-    if transition:
-        result = before_ad + transition + ad_audio + transition + after_ad
+    # Random transition sound from the asset bank (music/transitions/)
+    transition = get_asset_bank().random("transitions")
+    
+    if transition is not None:
+        result = concatenate([before_ad, transition, ad_audio, transition, after_ad])
         voice_logger.info("Added ad break with transition sounds")
     else:
         # No transition sound, use silence
-        result = before_ad + AudioSegment.silent(duration=300) + ad_audio + AudioSegment.silent(duration=300) + after_ad
+        silence = AudioBuffer.silent(300)
+        result = concatenate([before_ad, silence, ad_audio, silence, after_ad])
         voice_logger.debug("Added ad break with silence (no transition sound)")
     
     return result
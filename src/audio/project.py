@@ -0,0 +1,204 @@
+"""
+Episode projects for incremental re-renders.
+A project directory keeps what an episode was built from, so editing one
+line of a script doesn't mean rendering the whole episode again:
+
+    stems/<key>.flac   every rendered line, keyed like the TTS segment cache
+    master.npy         the mixed dialogue timeline (before music), float32
+    edl.json           the edit decision list: every clip's source, position
+                       and fades, plus the transitions and music bed used
+
+On a re-render the new timeline's clips are compared with the EDL. Unchanged
+clips at the start and (shifted) at the end keep their frames from the old
+master; only the region in between is mixed again. The music bed and the
+encode run over the whole master, as both depend on absolute position.
+"""
+import os
+import json
+import threading
+from pathlib import Path
+import numpy as np
+from debug_logger import voice_logger
+from audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE
+from audio.timeline import Clip, Timeline
+from tts.cache import read_flac, write_flac
+
+EDL_VERSION = 1
+COPY_BLOCK_FRAMES = SAMPLE_RATE * 10
+
+
+def clip_entries(timeline, labels):
+    """EDL entries for a timeline's clips.
+
+    Args:
+        timeline: Timeline to describe
+        labels: Dict of id(source) -> stable name (stem key, asset path, ...). Unlabeled
+            silence is "silence"; any other unlabeled source never matches a previous render.
+    """
+    entries = []
+    for i, clip in enumerate(timeline.clips):
+        label = labels.get(id(clip.source))
+        if label is None:
+            samples = getattr(clip.source, "samples", None)
+            label = "silence" if samples is not None and not samples.any() else f"unlabeled:{i}"
+        entries.append({"source": label, "start": clip.start, "frames": clip.frames,
+                        "fade_in": clip.fade_in, "fade_out": clip.fade_out})
+    return entries
+
+
+def changed_region(old, old_frames, new, new_frames):
+    """
+    Where a new timeline differs from the old one.
+
+    Clips matching at the start (same source, position and fades) and at the
+    end (same source and fades, shifted by the change in length) are left
+    alone; everything else is the changed region.
+
+    Args:
+        old, new: Lists of clip entries (clip_entries)
+        old_frames, new_frames: Timeline lengths
+
+    Returns:
+        (start, stop, shift): new frames outside [start, stop) equal old frames at the same
+        position before start and at position - shift from stop on. None if nothing changed.
+    """
+    def shape(entry):
+        return entry["source"], entry["frames"], entry["fade_in"], entry["fade_out"]
+
+    shift = new_frames - old_frames
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+        prefix += 1
+    if prefix == len(old) == len(new) and shift == 0:
+        return None
+    suffix = 0
+    while (suffix < min(len(old), len(new)) - prefix
+           and shape(old[-1 - suffix]) == shape(new[-1 - suffix])
+           and new[-1 - suffix]["start"] == old[-1 - suffix]["start"] + shift):
+        suffix += 1
+
+    kept_new_tail, kept_old_tail = new[len(new) - suffix:], old[len(old) - suffix:]
+    changed_new, changed_old = new[prefix:len(new) - suffix], old[prefix:len(old) - suffix]
+    # Old frames are in old positions: before the region they coincide, after it they move by shift
+    starts = ([e["start"] for e in changed_new + kept_new_tail] +
+              [e["start"] for e in changed_old + kept_old_tail] + [new_frames])
+    stops = ([e["start"] + e["frames"] for e in changed_new + new[:prefix]] +
+             [e["start"] + e["frames"] + shift for e in changed_old + old[:prefix]] + [0])
+    start = max(0, min(starts))
+    stop = min(new_frames, max(start, max(stops)))
+    if not kept_new_tail:
+        stop = new_frames
+    return start, stop, shift
+
+
+class EpisodeProject:
+    """Stems, edit decision list and dialogue master of one episode."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.stems_dir = self.directory / "stems"
+        self.edl_path = self.directory / "edl.json"
+        self.master_path = self.directory / "master.npy"
+
+    def load_edl(self):
+        """The previous render's EDL, or None if there is none (or it can't be used)."""
+        try:
+            edl = json.loads(self.edl_path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            voice_logger.warning(f"Ignoring unreadable EDL {self.edl_path}: {e}")
+            return None
+        if edl.get("version") != EDL_VERSION or edl.get("sample_rate") != SAMPLE_RATE:
+            voice_logger.info(f"EDL {self.edl_path} is from another format; rendering from scratch")
+            return None
+        return edl
+
+    def save_edl(self, edl):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.edl_path.with_name(f"{self.edl_path.name}.{threading.get_ident()}.part")
+        partial.write_text(json.dumps(dict(edl, version=EDL_VERSION, sample_rate=SAMPLE_RATE), indent=2))
+        os.replace(partial, self.edl_path)
+
+    def _stem_path(self, key):
+        return self.stems_dir / f"{key}.flac"
+
+    def load_stem(self, key):
+        """AudioSegment of a rendered line, or None if the project doesn't have it."""
+        path = self._stem_path(key)
+        if not path.exists():
+            return None
+        try:
+            return read_flac(path)
+        except Exception as e:
+            voice_logger.warning(f"Ignoring unreadable stem {path.name}: {e}")
+            return None
+
+    def save_stem(self, key, segment):
+        self.stems_dir.mkdir(parents=True, exist_ok=True)
+        path = self._stem_path(key)
+        partial = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        write_flac(partial, segment)
+        os.replace(partial, path)
+
+    def prune_stems(self, keep):
+        """Delete stems of lines no longer in the script."""
+        if not self.stems_dir.is_dir():
+            return
+        for path in self.stems_dir.glob("*.flac"):
+            if path.stem not in keep:
+                path.unlink(missing_ok=True)
+
+    def master(self):
+        """Read-only memory map of the dialogue master, or None."""
+        try:
+            return np.load(self.master_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+    def update_master(self, timeline, labels, previous=None, block_frames=SAMPLE_RATE):
+        """
+        Bring the dialogue master in line with a timeline, re-mixing only what changed.
+
+        Args:
+            timeline: The episode's new Timeline
+            labels: Dict of id(source) -> stable name (see clip_entries)
+            previous: EDL of the last render (None = mix everything)
+            block_frames: Mixing block size
+
+        Returns:
+            (entries, region): the new clip entries for the EDL and the (start, stop) frames that
+            were mixed; (0, 0) if the master was already up to date
+        """
+        entries = clip_entries(timeline, labels)
+        old = self.master()
+        region = (0, timeline.frames, 0)
+        if previous is not None and old is not None and len(old) == previous.get("frames"):
+            region = changed_region(previous["clips"], previous["frames"], entries, timeline.frames)
+            if region is None:
+                return entries, (0, 0)
+        start, stop, shift = region
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.master_path.with_name(f"{self.master_path.name}.{threading.get_ident()}.part")
+        out = np.lib.format.open_memmap(partial, mode="w+", dtype=np.float32, shape=(timeline.frames, CHANNELS))
+        for offset in range(0, start, COPY_BLOCK_FRAMES):
+            end = min(start, offset + COPY_BLOCK_FRAMES)
+            out[offset:end] = old[offset:end]
+        position = start
+        for block in timeline.blocks(block_frames, start, stop):
+            out[position:position + len(block)] = block
+            position += len(block)
+        for offset in range(stop, timeline.frames, COPY_BLOCK_FRAMES):
+            end = min(timeline.frames, offset + COPY_BLOCK_FRAMES)
+            out[offset:end] = old[offset - shift:end - shift]
+        out.flush()
+        del out, old
+        os.replace(partial, self.master_path)
+        voice_logger.info(f"Re-mixed {(stop - start) * 1000 / SAMPLE_RATE:.0f}ms of a "
+                          f"{timeline.frames * 1000 / SAMPLE_RATE:.0f}ms episode")
+        return entries, (start, stop)
+
+    def master_timeline(self):
+        """The dialogue master as a one-clip Timeline, for stream_episode."""
+        return Timeline([Clip(AudioBuffer(self.master()), 0)])
@@ -0,0 +1,140 @@
+"""
+Episode timelines for RepoRadio's mixer.
+A timeline places clips (lines, transitions, jingles) at frame offsets with
+crossfade ramps, without mixing anything yet. It can be rendered whole or
+read as fixed-size blocks, in which case each clip is converted to the mixer
+format only while a block overlaps it, so the mixed episode never has to
+exist in memory at once.
+"""
+import bisect
+import numpy as np
+from audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE, crossfade_overlaps, resampled_length
+
+
+class Clip:
+    """One source placed on the timeline, with linear fades at either end.
+
+    The source is an AudioBuffer (e.g. an asset bank view) or a pydub
+    AudioSegment, which is converted on first use and dropped by release().
+    """
+
+    __slots__ = ("start", "frames", "fade_in", "fade_out", "_source", "_samples")
+
+    def __init__(self, source, start, fade_in=0, fade_out=0):
+        self._source = source
+        self._samples = getattr(source, "samples", None)
+        self.start = start
+        self.frames = clip_frames(source)
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+
+    @property
+    def end(self):
+        return self.start + self.frames
+
+    @property
+    def source(self):
+        return self._source
+
+    def samples(self):
+        if self._samples is None:
+            self._samples = AudioBuffer.from_segment(self._source).samples
+        return self._samples
+
+    def release(self):
+        """Forget converted samples once the clip has been mixed."""
+        if not hasattr(self._source, "samples"):
+            self._samples = None
+
+    def mix_into(self, out, block_start):
+        """Add this clip's part of [block_start, block_start + len(out)) into out."""
+        start = max(block_start, self.start)
+        stop = min(block_start + len(out), self.end)
+        if start >= stop:
+            return
+        data = self.samples()[start - self.start:stop - self.start]
+        positions = np.arange(start - self.start, stop - self.start)
+        gain = None
+        if self.fade_in and positions[0] < self.fade_in:
+            gain = np.minimum(1, positions / np.float32(self.fade_in))
+        if self.fade_out and positions[-1] >= self.frames - self.fade_out:
+            tail = np.minimum(1, 1 - (positions - (self.frames - self.fade_out)) / np.float32(self.fade_out))
+            gain = tail if gain is None else np.minimum(gain, tail)
+        target = out[start - block_start:stop - block_start]
+        if gain is None:
+            target += data
+        else:
+            target += data * gain.astype(np.float32)[:, None]
+
+
+def clip_frames(source):
+    """Length in mixer frames of an AudioBuffer or AudioSegment, without converting it."""
+    if hasattr(source, "samples"):
+        return len(source.samples)
+    return resampled_length(int(source.frame_count()), source.frame_rate)
+
+
+class Timeline:
+    """Clips laid out end to end (and optionally overlapping) on one timeline."""
+
+    def __init__(self, clips, frames=None):
+        self.clips = sorted(clips, key=lambda clip: clip.start)
+        self.frames = frames if frames is not None else max((clip.end for clip in self.clips), default=0)
+
+    @classmethod
+    def sequence(cls, sources, crossfade_ms=0):
+        """Sources back to back with the same crossfades concatenate() would use.
+
+        Args:
+            sources: AudioBuffers / AudioSegments in order
+            crossfade_ms: Overlap at each join, or a list with one value per join
+        """
+        sources = [s for s in sources if s is not None]
+        joins = crossfade_ms if isinstance(crossfade_ms, (list, tuple)) else [crossfade_ms] * max(0, len(sources) - 1)
+        lengths = [clip_frames(s) for s in sources]
+        overlaps = crossfade_overlaps(lengths, joins)
+        clips, end = [], 0
+        for i, source in enumerate(sources):
+            start = end - overlaps[i]
+            clips.append(Clip(source, start, fade_in=overlaps[i], fade_out=overlaps[i + 1]))
+            end = start + lengths[i]
+        return cls(clips, end)
+
+    def __len__(self):
+        return int(round(self.frames * 1000 / SAMPLE_RATE))
+
+    def add(self, clip):
+        """Place one more clip (e.g. a sound effect), extending the timeline if it runs past the end."""
+        self.clips.insert(bisect.bisect_right([c.start for c in self.clips], clip.start), clip)
+        self.frames = max(self.frames, clip.end)
+
+    def blocks(self, block_frames, start=0, stop=None):
+        """Yield the mixed timeline as float32 (frames, CHANNELS) arrays of block_frames (last may be shorter).
+
+        Args:
+            block_frames: Block size
+            start, stop: Frame range to mix (default: the whole timeline)
+        """
+        stop = self.frames if stop is None else min(stop, self.frames)
+        active, upcoming = [], iter(self.clips)
+        following = next(upcoming, None)
+        for block_start in range(start, stop, block_frames):
+            block_end = min(stop, block_start + block_frames)
+            while following is not None and following.start < block_end:
+                if following.end > block_start:
+                    active.append(following)
+                following = next(upcoming, None)
+            out = np.zeros((block_end - block_start, CHANNELS), dtype=np.float32)
+            for clip in active:
+                clip.mix_into(out, block_start)
+            for clip in active:
+                if clip.end <= block_end:
+                    clip.release()
+            active = [clip for clip in active if clip.end > block_end]
+            yield out
+
+    def render(self):
+        """The whole timeline as one AudioBuffer."""
+        if not self.frames:
+            return AudioBuffer.silent(0)
+        return AudioBuffer(next(self.blocks(self.frames)))
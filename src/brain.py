@@ -4,8 +4,10 @@ import requests
 import subprocess
 import time
 import random
-from openai import OpenAI
 from debug_logger import brain_logger, log_ollama_request, log_ollama_response, log_ollama_error, log_character_load
+from llm.providers import get_provider, run_sync
+from llm.tiers import get_model_options, get_task_config
+from character_registry import get_registry
 
 # Updated Prompt: Enforces education and explanation over pure banter
 BASE_PROMPT = """
@@ -55,97 +57,108 @@ def get_host_ip():
     if os.getenv("OLLAMA_IP"): return os.getenv("OLLAMA_IP")
     return "192.168.1.119"
 
+def get_host_ips():
+    """All Ollama hosts to route across (OLLAMA_HOSTS, comma-separated).
+
+    Falls back to the single get_host_ip() host when OLLAMA_HOSTS is unset.
+    """
+    hosts = [h.strip() for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()]
+    return hosts or [get_host_ip()]
+
+def get_job_provider(provider="Local (Ollama)"):
+    """Shared LLM provider used for a job's script generation."""
+    return get_provider(provider, hosts=get_host_ips())
+
+def get_job_models(provider="Local (Ollama)"):
+    """Models a generation job will call (planning + dialogue), for warmup.
+
+    Returns:
+        Dict of model -> the options it must be loaded with (its shared num_ctx)
+    """
+    llm = get_job_provider(provider)
+    models = dict.fromkeys(get_task_config(task, llm)[0] for task in ("planning", "dialogue"))
+    return {model: get_model_options(model, llm) for model in models}
+
 def load_character(char_name):
-    """Reads the JSON file for a specific character from src/characters."""
-    try:
-        # PATH FIX: Now points to src/characters/
-        filename = f"src/characters/{char_name.lower()}.json"
-        with open(filename, "r") as f:
-            data = json.load(f)
-            log_character_load(char_name, True)
-            return data
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"⚠️ Could not load character {char_name}: {e}")
-        log_character_load(char_name, False, str(e))
-        return {"name": char_name, "description": "A standard radio host."}
+    """Look up a character from the shared registry (src/characters)."""
+    character = get_registry().resolve(char_name)
+    if character is not None:
+        log_character_load(char_name, True)
+        return character
+    error = get_registry().errors.get(f"{char_name.lower()}.json", "no matching character file")
+    print(f"⚠️ Could not load character {char_name}: {error}")
+    log_character_load(char_name, False, error)
+    return {"name": char_name, "description": "A standard radio host."}
 
 def plan_research(file_tree, provider="Local (Ollama)"):
     """Use AI to identify 3 most important files from file tree."""
-    host_ip = get_host_ip()
-    if "Local" in provider:
-        url_base = f"http://{host_ip}:11434/api/generate"
-        try:
-            prompt = f"{PLANNER_PROMPT}\n\nFile Structure:\n{file_tree}\n\nRespond with ONLY valid JSON."
-            payload = {"model": "llama3.1:8b", "prompt": prompt, "stream": False, "format": "json"}
-            brain_logger.debug(f"Plan research request to {url_base}")
-            res = requests.post(url_base, json=payload, timeout=20)
-            res.raise_for_status()
-            
-            response_data = res.json()
-            response_text = response_data.get("response", "").strip()
-            
-            if not response_text:
-                brain_logger.warning("Plan research got empty response")
-                return []
+    llm = get_job_provider(provider)
+    model, options = get_task_config("planning", llm)
+    try:
+        prompt = f"{PLANNER_PROMPT}\n\nFile Structure:\n{file_tree}\n\nRespond with ONLY valid JSON."
+        brain_logger.debug(f"Plan research request to {llm.describe()} (model={model})")
+        response_text = run_sync(llm.complete(prompt, model=model, options=options, json_mode=True))
+        
+        if not response_text:
+            brain_logger.warning("Plan research got empty response")
+            return []
+        
+        brain_logger.debug(f"Plan research raw response: {response_text[:200]}")
+        parsed = json.loads(response_text)
+        
+        # Handle wrapped responses (e.g., {"files": [...]} or {"list": [...]})
+        file_list = None
+        if isinstance(parsed, list):
+            file_list = parsed
+        elif isinstance(parsed, dict):
+            brain_logger.debug(f"Plan research got dict with keys: {list(parsed.keys())}")
+            brain_logger.debug(f"Full dict: {parsed}")
             
-            brain_logger.debug(f"Plan research raw response: {response_text[:200]}")
-            parsed = json.loads(response_text)
+            # Try common wrapper keys first
+            for key in ["files", "list", "priority_files", "important_files", "paths", "result"]:
+                if key in parsed:
+                    value = parsed[key]
+                    if isinstance(value, list):
+                        file_list = value
+                        brain_logger.debug(f"Extracted file list from '{key}' wrapper")
+                        break
+                    elif isinstance(value, str):
+                        # Sometimes returns comma-separated string
+                        file_list = [f.strip() for f in value.split(',')]
+                        brain_logger.debug(f"Split string from '{key}' into list")
+                        break
             
-            # Handle wrapped responses (e.g., {"files": [...]} or {"list": [...]})
-            file_list = None
-            if isinstance(parsed, list):
-                file_list = parsed
-            elif isinstance(parsed, dict):
-                brain_logger.debug(f"Plan research got dict with keys: {list(parsed.keys())}")
-                brain_logger.debug(f"Full dict: {parsed}")
-                
-                # Try common wrapper keys first
-                for key in ["files", "list", "priority_files", "important_files", "paths", "result"]:
-                    if key in parsed:
-                        value = parsed[key]
-                        if isinstance(value, list):
-                            file_list = value
-                            brain_logger.debug(f"Extracted file list from '{key}' wrapper")
-                            break
-                        elif isinstance(value, str):
-                            # Sometimes returns comma-separated string
-                            file_list = [f.strip() for f in value.split(',')]
-                            brain_logger.debug(f"Split string from '{key}' into list")
-                            break
-                
-                # If no wrapper found, treat dict keys as file paths (LLM explaining each file)
-                if file_list is None:
-                    # Extract keys where value indicates file exists
-                    file_list = []
-                    for filepath, status in parsed.items():
-                        # Handle None or empty string - treat as valid file path
-                        if status is None or status == "":
-                            file_list.append(filepath)
-                            brain_logger.debug(f"Extracted '{filepath}' from dict (status: {repr(status)})")
-                            continue
-                        
-                        status_lower = str(status).lower()
-                        # Include if status indicates file exists/is valid
-                        if any(word in status_lower for word in ["found", "exists", "critical", "entry", "main"]):
-                            file_list.append(filepath)
-                            brain_logger.debug(f"Extracted '{filepath}' from dict (status: {status})")
-                        elif "no such" in status_lower or "not found" in status_lower:
-                            brain_logger.debug(f"Skipped '{filepath}' (status: {status})")
+            # If no wrapper found, treat dict keys as file paths (LLM explaining each file)
+            if file_list is None:
+                # Extract keys where value indicates file exists
+                file_list = []
+                for filepath, status in parsed.items():
+                    # Handle None or empty string - treat as valid file path
+                    if status is None or status == "":
+                        file_list.append(filepath)
+                        brain_logger.debug(f"Extracted '{filepath}' from dict (status: {repr(status)})")
+                        continue
                     
-                    if file_list:
-                        brain_logger.info(f"Extracted {len(file_list)} files from explanatory dict")
-            
-            if file_list and len(file_list) > 0:
-                brain_logger.info(f"Plan research identified {len(file_list)} files: {file_list}")
-                return file_list[:3]  # Limit to 3 files max
-            else:
-                brain_logger.warning(f"Plan research returned unexpected format: {type(parsed)}, value: {parsed}")
-                return []
+                    status_lower = str(status).lower()
+                    # Include if status indicates file exists/is valid
+                    if any(word in status_lower for word in ["found", "exists", "critical", "entry", "main"]):
+                        file_list.append(filepath)
+                        brain_logger.debug(f"Extracted '{filepath}' from dict (status: {status})")
+                    elif "no such" in status_lower or "not found" in status_lower:
+                        brain_logger.debug(f"Skipped '{filepath}' (status: {status})")
                 
-        except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError, Exception) as e:
-            brain_logger.error(f"Plan research failed: {str(e)}")
+                if file_list:
+                    brain_logger.info(f"Extracted {len(file_list)} files from explanatory dict")
+        
+        if file_list and len(file_list) > 0:
+            brain_logger.info(f"Plan research identified {len(file_list)} files: {file_list}")
+            return file_list[:3]  # Limit to 3 files max
+        else:
+            brain_logger.warning(f"Plan research returned unexpected format: {type(parsed)}, value: {parsed}")
             return []
-    else:
+            
+    except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError, Exception) as e:
+        brain_logger.error(f"Plan research failed: {str(e)}")
         return []
 
 def generate_script(repo_content, host_names, provider="Local (Ollama)", include_ad_break=False, dependencies=""):
@@ -153,6 +166,7 @@ def generate_script(repo_content, host_names, provider="Local (Ollama)", include
     
     New reliable approach: Generate one dialogue line at a time for 8-12 iterations.
     This avoids Ollama's JSON truncation issues with large outputs.
+    Local and cloud providers share the same flow via llm.providers.
     
     Args:
         repo_content: Repository analysis text
@@ -191,26 +205,25 @@ Return ONLY a JSON object with two fields:
 {{"speaker": "HostName", "text": "What they say..."}}
 """
     
-    host_ip = get_host_ip()
+    llm = get_job_provider(provider)
+    model, options = get_task_config("dialogue", llm)
+    # Concurrent episodes share this provider; its semaphore admits up to
+    # OLLAMA_NUM_PARALLEL requests in arrival order
     
-    if "Local" in provider:
-        url_base = f"http://{host_ip}:11434/api/generate"
-        model = "llama3.1:8b"
-        
-        # Generate 4-6 lines before ad, 4-6 after (8-12 total)
-        PRE_BREAK_LINES = random.randint(4, 6)
-        POST_BREAK_LINES = random.randint(4, 6)
-        
-        # Truncate content to avoid token limits
-        max_chars = 2500
-        content_preview = repo_content[:max_chars] if len(repo_content) > max_chars else repo_content
+    # Generate 4-6 lines before ad, 4-6 after (8-12 total)
+    PRE_BREAK_LINES = random.randint(4, 6)
+    POST_BREAK_LINES = random.randint(4, 6)
+    
+    # Truncate content to avoid token limits
+    max_chars = 2500
+    content_preview = repo_content[:max_chars] if len(repo_content) > max_chars else repo_content
+    
+    def generate_one_line(conversation_so_far, context_note=""):
+        """Generate a single dialogue line."""
+        # Build context from previous lines
+        prev_lines = "\n".join([f"{line['speaker']}: {line['text']}" for line in conversation_so_far[-3:]])  # Last 3 lines
         
-        def generate_one_line(conversation_so_far, context_note=""):
-            """Generate a single dialogue line."""
-            # Build context from previous lines
-            prev_lines = "\n".join([f"{line['speaker']}: {line['text']}" for line in conversation_so_far[-3:]])  # Last 3 lines
-            
-            prompt = f"""{ONE_LINE_PROMPT}
+        prompt = f"""{ONE_LINE_PROMPT}
 
 Repo Analysis:
 {content_preview}
@@ -221,90 +234,74 @@ Previous dialogue:
 {prev_lines if prev_lines else "(This is the opening line)"}
 
 Generate the next line of dialogue. Return ONLY JSON: {{"speaker": "Name", "text": "..."}}"""
+        
+        try:
+            brain_logger.debug(f"Requesting one line (conversation length: {len(conversation_so_far)})")
+            response_text = run_sync(llm.complete(prompt, model=model, options=options, json_mode=True))
             
-            try:
-                payload = {
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "format": "json",
-                    "options": {
-                        "num_predict": 200,  # Short - one line only
-                        "temperature": 0.9,
-                        "top_p": 0.95,
-                    }
-                }
-                
-                brain_logger.debug(f"Requesting one line (conversation length: {len(conversation_so_far)})")
-                response = requests.post(url_base, json=payload, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                response_text = data.get("response", "").strip()
-                
-                if not response_text:
-                    brain_logger.warning("Empty response for one-line generation")
-                    return None
-                
-                parsed = json.loads(response_text)
-                
-                # Extract speaker and text
-                speaker = parsed.get("speaker", "")
-                text = parsed.get("text", "")
-                
-                if speaker and text:
-                    return {"speaker": speaker.strip(), "text": text.strip()}
-                else:
-                    brain_logger.warning(f"Missing speaker or text in response: {parsed}")
-                    return None
-                    
-            except Exception as e:
-                brain_logger.warning(f"One-line generation error: {str(e)}")
+            if not response_text:
+                brain_logger.warning("Empty response for one-line generation")
                 return None
-        
-        # PART 1: Pre-break conversation
-        script = []
-        brain_logger.info(f"Generating pre-break conversation ({PRE_BREAK_LINES} lines)")
-        for i in range(PRE_BREAK_LINES):
-            line = generate_one_line(script, context_note="Build excitement and introduce the project.")
-            if line:
-                script.append(line)
-                print(f"   🎙️ {line['speaker']}: {line['text'][:60]}...")
-            else:
-                brain_logger.warning(f"Failed to generate pre-break line {i+1}")
-        
-        # PART 2: Ad break (if enabled)
-        if include_ad_break and dependencies:
-            brain_logger.info("Inserting sponsor ad break")
-            from ads import generate_fake_ad
-            ad_line = generate_fake_ad(dependencies, host_names)
-            if ad_line:
-                script.append(ad_line)
-                print(f"   📢 {ad_line['speaker']}: {ad_line['text'][:60]}...")
-        
-        # PART 3: Post-break conversation
-        brain_logger.info(f"Generating post-break conversation ({POST_BREAK_LINES} lines)")
-        for i in range(POST_BREAK_LINES):
-            # First line after ad should acknowledge the break
-            if i == 0 and include_ad_break and dependencies:
-                context_note = "We just came back from the sponsor break. Smoothly transition back to discussing the project. Maybe say something like 'Alright, back to the code!' or 'So where were we?' or just continue naturally."
-            else:
-                context_note = "Continue the technical discussion, dive deeper into implementation details, and build toward a conclusion."
             
-            line = generate_one_line(script, context_note=context_note)
-            if line:
-                script.append(line)
-                print(f"   🎙️ {line['speaker']}: {line['text'][:60]}...")
+            parsed = json.loads(response_text)
+            
+            # Extract speaker and text
+            speaker = parsed.get("speaker", "")
+            text = parsed.get("text", "")
+            
+            if speaker and text:
+                # Normalize LLM spellings ("ALEX", "Host Alex:") to the character's name
+                character = get_registry().resolve(speaker)
+                if character is not None:
+                    speaker = character["name"]
+                return {"speaker": speaker.strip(), "text": text.strip()}
             else:
-                brain_logger.warning(f"Failed to generate post-break line {i+1}")
-        
-        if not script:
-            brain_logger.error("❌ All one-line generations failed")
-            return [{"speaker": "System", "text": f"Script generation failed. Check Ollama at {url_base}"}]
+                brain_logger.warning(f"Missing speaker or text in response: {parsed}")
+                return None
+                
+        except Exception as e:
+            brain_logger.warning(f"One-line generation error: {str(e)}")
+            return None
+    
+    # PART 1: Pre-break conversation
+    script = []
+    brain_logger.info(f"Generating pre-break conversation ({PRE_BREAK_LINES} lines)")
+    for i in range(PRE_BREAK_LINES):
+        line = generate_one_line(script, context_note="Build excitement and introduce the project.")
+        if line:
+            script.append(line)
+            print(f"   🎙️ {line['speaker']}: {line['text'][:60]}...")
+        else:
+            brain_logger.warning(f"Failed to generate pre-break line {i+1}")
+    
+    # PART 2: Ad break (if enabled)
+    if include_ad_break and dependencies:
+        brain_logger.info("Inserting sponsor ad break")
+        from ads import generate_fake_ad
+        ad_line = generate_fake_ad(dependencies, host_names)
+        if ad_line:
+            script.append(ad_line)
+            print(f"   📢 {ad_line['speaker']}: {ad_line['text'][:60]}...")
+    
+    # PART 3: Post-break conversation
+    brain_logger.info(f"Generating post-break conversation ({POST_BREAK_LINES} lines)")
+    for i in range(POST_BREAK_LINES):
+        # First line after ad should acknowledge the break
+        if i == 0 and include_ad_break and dependencies:
+            context_note = "We just came back from the sponsor break. Smoothly transition back to discussing the project. Maybe say something like 'Alright, back to the code!' or 'So where were we?' or just continue naturally."
+        else:
+            context_note = "Continue the technical discussion, dive deeper into implementation details, and build toward a conclusion."
         
-        brain_logger.info(f"✅ Successfully generated {len(script)} line script")
-        return script
+        line = generate_one_line(script, context_note=context_note)
+        if line:
+            script.append(line)
+            print(f"   🎙️ {line['speaker']}: {line['text'][:60]}...")
+        else:
+            brain_logger.warning(f"Failed to generate post-break line {i+1}")
+    
+    if not script:
+        brain_logger.error("❌ All one-line generations failed")
+        return [{"speaker": "System", "text": f"Script generation failed. Check {llm.name} at {llm.describe()}"}]
     
-    else:
-        # Cloud logic (OpenAI/other providers)
-        brain_logger.warning("Cloud providers not yet updated for new one-line approach")
-        return [{"speaker": "System", "text": "Cloud provider script generation not implemented yet."}]
+    brain_logger.info(f"✅ Successfully generated {len(script)} line script")
+    return script
@@ -0,0 +1,166 @@
+"""
+Character registry for RepoRadio.
+Loads host personalities from src/characters once, validates them, and
+resolves the speaker names the LLM emits ("ALEX", "Alex Chen", "Host Alex:")
+to characters. Shared by app, brain and voice; files are re-read only when
+their mtime changes.
+"""
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from debug_logger import brain_logger
+
+CHARACTERS_DIR = Path(__file__).parent / "characters"
+REQUIRED_FIELDS = ("name", "description")
+OPTIONAL_STRING_FIELDS = ("kokoro_voice", "elevenlabs_voice")
+
+
+class CharacterError(ValueError):
+    """Raised when a character file is malformed."""
+
+
+def validate_character(data, source="character"):
+    """Check a parsed character file and return it.
+
+    Raises:
+        CharacterError: if required fields are missing or have the wrong type
+    """
+    if not isinstance(data, dict):
+        raise CharacterError(f"{source}: expected a JSON object, got {type(data).__name__}")
+    for field in REQUIRED_FIELDS:
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            raise CharacterError(f"{source}: missing or empty '{field}'")
+    for field in OPTIONAL_STRING_FIELDS:
+        if field in data and not isinstance(data[field], str):
+            raise CharacterError(f"{source}: '{field}' must be a string")
+    aliases = data.get("aliases", [])
+    if not isinstance(aliases, list) or not all(isinstance(a, str) for a in aliases):
+        raise CharacterError(f"{source}: 'aliases' must be a list of strings")
+    return data
+
+
+def _name_tokens(name):
+    return re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split()
+
+
+class CharacterRegistry:
+    """In-memory view of a characters directory with mtime-based invalidation."""
+
+    def __init__(self, directory=CHARACTERS_DIR, check_interval=2.0):
+        """
+        Args:
+            directory: Folder containing <name>.json character files
+            check_interval: Minimum seconds between directory mtime checks
+        """
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self.characters = {}  # file stem -> character data
+        self.errors = {}      # file name -> validation error
+        self._mtimes = {}
+        self._aliases = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Reload any character files that were added, changed or removed."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                mtimes = {p: p.stat().st_mtime_ns for p in self.directory.glob("*.json")}
+            except OSError as e:
+                brain_logger.warning(f"Could not scan characters in {self.directory}: {e}")
+                mtimes = {}
+            if mtimes == self._mtimes:
+                return
+
+            characters = {stem: data for stem, data in self.characters.items()
+                          if self.directory / f"{stem}.json" in mtimes}
+            errors = {}
+            for path, mtime in mtimes.items():
+                if self._mtimes.get(path) == mtime and path.stem in characters:
+                    continue
+                try:
+                    with open(path, "r") as f:
+                        characters[path.stem] = validate_character(json.load(f), path.name)
+                except (OSError, json.JSONDecodeError, CharacterError) as e:
+                    characters.pop(path.stem, None)
+                    errors[path.name] = str(e)
+                    brain_logger.warning(f"⚠️ Skipping character file {path.name}: {e}")
+
+            self.characters = characters
+            self.errors = errors
+            self._mtimes = mtimes
+            self._aliases = self._build_aliases(characters)
+            brain_logger.debug(f"Character registry loaded {len(characters)} characters from {self.directory}")
+
+    @staticmethod
+    def _build_aliases(characters):
+        """Name key -> file stem, leaving out keys that fit more than one character."""
+        exact, first_names = {}, {}
+        for stem, data in characters.items():
+            for name in [stem, data["name"], *data.get("aliases", [])]:
+                key = " ".join(_name_tokens(name))
+                if key:
+                    exact.setdefault(key, set()).add(stem)
+            # First names resolve too ("Alex Chen" -> alex)
+            first = _name_tokens(data["name"])[:1]
+            if first:
+                first_names.setdefault(first[0], set()).add(stem)
+
+        aliases = {}
+        for key, stems in exact.items():
+            if len(stems) == 1:
+                aliases[key] = next(iter(stems))
+            else:
+                brain_logger.warning(f"Character name '{key}' matches {sorted(stems)}; not resolving it")
+        for key, stems in first_names.items():
+            # A full name or alias wins over someone else's first name
+            if key not in exact and len(stems) == 1:
+                aliases[key] = next(iter(stems))
+        return aliases
+
+    def all(self):
+        """All valid characters keyed by display name (capitalized file stem)."""
+        self.refresh()
+        return {stem.capitalize(): dict(data) for stem, data in sorted(self.characters.items())}
+
+    def resolve(self, speaker):
+        """Map a speaker name as written by the LLM or UI to its character.
+
+        Tries the whole name first, then each word ("Host Alex:" -> alex). A
+        name whose words point at different characters ("Sam and Alex") is
+        ambiguous and resolves to nothing.
+
+        Returns:
+            Character dict, or None if no single character matches
+        """
+        self.refresh()
+        tokens = _name_tokens(speaker)
+        if not tokens:
+            return None
+        aliases = self._aliases
+        stem = aliases.get(" ".join(tokens))
+        if stem is None:
+            matches = {aliases[t] for t in tokens if t in aliases}
+            stem = matches.pop() if len(matches) == 1 else None
+        if stem is None or stem not in self.characters:
+            return None
+        return dict(self.characters[stem])
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide character registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CharacterRegistry()
+        return _registry
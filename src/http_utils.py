@@ -0,0 +1,28 @@
+"""
+HTTP helpers shared by RepoRadio's API clients (LLM providers, ElevenLabs).
+"""
+
+
+def parse_retry_after(headers):
+    """Read a retry delay in seconds from rate-limit response headers.
+
+    Prefers retry-after-ms over retry-after; HTTP-date values are ignored.
+
+    Returns:
+        Delay in seconds, or None if the headers don't give one
+    """
+    if headers is None:
+        return None
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return None
@@ -0,0 +1,375 @@
+"""
+LLM provider abstraction for RepoRadio.
+Wraps Ollama and OpenAI-compatible endpoints behind one async interface,
+with per-provider concurrency limits and rate-limit-aware retries.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+import requests
+import openai
+from collections import deque
+from debug_logger import brain_logger, log_ollama_request, log_ollama_response, log_ollama_error
+from http_utils import parse_retry_after
+
+DEFAULT_OLLAMA_MODEL = "llama3.1:8b"
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+
+
+class ProviderError(Exception):
+    """Raised when a provider cannot produce a completion."""
+
+
+class RateLimitError(ProviderError):
+    """Raised when a provider keeps rejecting requests with HTTP 429."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# --- Background event loop ---
+# Streamlit runs every session in its own thread, so providers share one
+# long-lived loop. Concurrency limits then apply across all sessions.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Return the shared background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block until it finishes.
+
+    Args:
+        coro: Coroutine to execute
+        timeout: Optional timeout in seconds
+
+    Returns:
+        The coroutine's result
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result(timeout)
+
+
+class LLMProvider:
+    """Base class for text generation providers.
+
+    Subclasses implement `_complete_once`; retries, concurrency limiting and
+    timing live here so every provider behaves the same way.
+    """
+
+    name = "base"
+    default_model = None
+
+    def __init__(self, max_concurrency=4, max_retries=3, backoff_base=0.5, backoff_max=20.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = None
+        self._cooldown_until = 0.0
+        # Successful completion latencies (seconds), i.e. steady-state cost
+        self.latencies = deque(maxlen=200)
+
+    def describe(self):
+        """Human-readable endpoint description for logs and error messages."""
+        return self.name
+
+    def _get_semaphore(self):
+        # Created lazily so it belongs to whichever loop first uses it
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    async def _wait_for_cooldown(self):
+        # A 429 on one request pauses every request to the same provider
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def complete(self, prompt, model=None, options=None, json_mode=True):
+        """Generate a completion for a prompt.
+
+        Args:
+            prompt: Full prompt text
+            model: Model name (None = provider default)
+            options: Dict of sampling options (num_predict, temperature, top_p)
+            json_mode: Ask the provider to return a JSON object
+
+        Returns:
+            Completion text (stripped)
+        """
+        model = model or self.default_model
+        options = options or {}
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_cooldown()
+            try:
+                async with self._get_semaphore():
+                    start_time = time.time()
+                    text = await self._complete_once(prompt, model, options, json_mode)
+                    duration_ms = (time.time() - start_time) * 1000
+                    self.latencies.append(duration_ms / 1000)
+                    brain_logger.debug(f"{self.name} completion ({model}) in {duration_ms:.0f}ms")
+                    return text.strip()
+            except RateLimitError as e:
+                last_error = e
+                delay = e.retry_after if e.retry_after is not None else self._backoff_delay(attempt)
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                brain_logger.warning(f"{self.name} rate limited, retrying in {delay:.2f}s (attempt {attempt + 1})")
+            except ProviderError as e:
+                last_error = e
+                delay = self._backoff_delay(attempt)
+                brain_logger.warning(f"{self.name} request failed: {e}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+
+        raise last_error
+
+    async def stream(self, prompt, model=None, options=None, json_mode=True):
+        """Yield completion text incrementally. Default: one chunk."""
+        yield await self.complete(prompt, model, options, json_mode)
+
+    async def warmup(self, model, options=None):
+        """Make sure a model is loaded and ready to serve.
+
+        Args:
+            model: Model to load
+            options: Load-time options the job's requests will use (e.g. num_ctx),
+                so the first real request doesn't reload the model
+
+        Returns:
+            Load time in ms, or None if the provider has nothing to warm
+        """
+        return None
+
+    def latency_summary(self):
+        """Steady-state completion latency stats (ms) from recent requests."""
+        if not self.latencies:
+            return {"count": 0, "p50_ms": None, "p95_ms": None}
+        ordered = sorted(self.latencies)
+        return {
+            "count": len(ordered),
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        }
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        raise NotImplementedError
+
+
+class OllamaProvider(LLMProvider):
+    """Ollama `/api/generate` endpoint."""
+
+    name = "ollama"
+    default_model = DEFAULT_OLLAMA_MODEL
+
+    def __init__(self, base_url, timeout=30, keep_alive=None, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        # How long Ollama keeps the model loaded after each request (e.g. "30m")
+        self.keep_alive = keep_alive
+
+    def describe(self):
+        return f"{self.base_url}/api/generate"
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        url = f"{self.base_url}/api/generate"
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options}
+        if json_mode:
+            payload["format"] = "json"
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+
+        log_ollama_request(model, prompt, url)
+        start_time = time.time()
+        try:
+            # requests is blocking; keep it off the event loop
+            res = await asyncio.to_thread(requests.post, url, json=payload, timeout=self.timeout)
+            if res.status_code == 429:
+                raise RateLimitError("Ollama returned 429", parse_retry_after(res.headers))
+            res.raise_for_status()
+            text = res.json().get("response", "")
+        except requests.exceptions.RequestException as e:
+            log_ollama_error(str(e), url)
+            raise ProviderError(str(e)) from e
+
+        log_ollama_response(text, (time.time() - start_time) * 1000)
+        return text
+
+    async def warmup(self, model, options=None):
+        """Load a model with an empty prompt (Ollama generates nothing)."""
+        model = model or self.default_model
+        url = f"{self.base_url}/api/generate"
+        payload = {"model": model, "prompt": "", "stream": False}
+        if options:
+            payload["options"] = options
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+
+        start_time = time.time()
+        try:
+            # Loading a cold model can take far longer than a normal request
+            res = await asyncio.to_thread(requests.post, url, json=payload, timeout=max(self.timeout, 120))
+            res.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            log_ollama_error(f"Warmup of {model} failed: {e}", url)
+            raise ProviderError(str(e)) from e
+        duration_ms = (time.time() - start_time) * 1000
+        brain_logger.info(f"Warmed {model} on {self.base_url} in {duration_ms:.0f}ms")
+        return duration_ms
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any endpoint speaking the OpenAI chat completions API (OpenAI, Siray, vLLM...).
+
+    Completions are streamed so time-to-first-token can be logged and long
+    generations don't sit behind a single read timeout.
+    """
+
+    name = "openai"
+    default_model = DEFAULT_OPENAI_MODEL
+
+    def __init__(self, base_url=None, api_key=None, model=None, timeout=60, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+        self.default_model = model or self.default_model
+        # Retries are handled by LLMProvider.complete so 429s respect our cooldown
+        self.client = openai.AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key or "not-needed",
+            timeout=timeout,
+            max_retries=0,
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Build a provider from OPENAI_* environment variables."""
+        return cls(
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model=os.getenv("OPENAI_MODEL") or None,
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")),
+        )
+
+    def describe(self):
+        return self.base_url or "api.openai.com"
+
+    def _request_kwargs(self, prompt, model, options, json_mode):
+        kwargs = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        if "num_predict" in options:
+            kwargs["max_tokens"] = options["num_predict"]
+        if "temperature" in options:
+            kwargs["temperature"] = options["temperature"]
+        if "top_p" in options:
+            kwargs["top_p"] = options["top_p"]
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        chunks = []
+        async for piece in self._stream_once(prompt, model, options, json_mode):
+            chunks.append(piece)
+        return "".join(chunks)
+
+    async def _stream_once(self, prompt, model, options, json_mode):
+        start_time = time.time()
+        first_token_ms = None
+        try:
+            response = await self.client.chat.completions.create(
+                **self._request_kwargs(prompt, model, options, json_mode)
+            )
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                piece = chunk.choices[0].delta.content
+                if piece:
+                    if first_token_ms is None:
+                        first_token_ms = (time.time() - start_time) * 1000
+                    yield piece
+        except openai.RateLimitError as e:
+            raise RateLimitError(str(e), parse_retry_after(e.response.headers)) from e
+        except (openai.APIConnectionError, openai.APIStatusError) as e:
+            raise ProviderError(str(e)) from e
+
+        if first_token_ms is not None:
+            brain_logger.debug(f"{self.name} first token after {first_token_ms:.0f}ms")
+
+    async def stream(self, prompt, model=None, options=None, json_mode=True):
+        """Yield completion text as it arrives (single attempt, no retries)."""
+        async with self._get_semaphore():
+            async for piece in self._stream_once(prompt, model or self.default_model, options or {}, json_mode):
+                yield piece
+
+
+def ollama_base_url(host):
+    """Turn an OLLAMA_HOSTS entry (ip, host:port or URL) into a base URL."""
+    host = host.strip().rstrip("/")
+    if not host.startswith(("http://", "https://")):
+        host = f"http://{host}"
+    if host.count(":") < 2:
+        host = f"{host}:11434"
+    return host
+
+
+# Providers are cached so their concurrency limits are shared process-wide
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(provider, hosts=None):
+    """Return the shared provider instance for a UI provider string.
+
+    Args:
+        provider: Provider string from the UI ("Local (Ollama)" or "Cloud (...)")
+        hosts: List of Ollama hosts (only used for local providers). More than
+            one host returns an OllamaRouter balancing across them.
+
+    Returns:
+        LLMProvider instance
+    """
+    if "Local" in provider:
+        hosts = tuple(hosts or ())
+        key = ("ollama",) + hosts
+        if len(hosts) > 1:
+            from llm.router import OllamaRouter
+            factory = lambda: OllamaRouter.from_env(list(hosts))
+        else:
+            factory = lambda: OllamaProvider(
+                ollama_base_url(hosts[0]),
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+                max_concurrency=int(os.getenv("OLLAMA_NUM_PARALLEL", "4")),
+            )
+    else:
+        key = ("openai", os.getenv("OPENAI_BASE_URL"), os.getenv("OPENAI_MODEL"))
+        factory = OpenAICompatibleProvider.from_env
+
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = factory()
+            brain_logger.info(f"Initialized {_providers[key].name} provider: {_providers[key].describe()}")
+        return _providers[key]
@@ -0,0 +1,230 @@
+"""
+Multi-host Ollama routing for RepoRadio.
+Spreads generation over several Ollama servers with least-outstanding-requests
+balancing, periodic health/model probes and optional hedged requests.
+"""
+import os
+import time
+import asyncio
+import requests
+from collections import deque
+from debug_logger import brain_logger
+from llm.providers import LLMProvider, OllamaProvider, ProviderError, DEFAULT_OLLAMA_MODEL, ollama_base_url
+
+
+def normalize_model_name(model):
+    """Ollama reports untagged models as 'name:latest'."""
+    return model if ":" in model else f"{model}:latest"
+
+
+class OllamaEndpoint:
+    """Routing state for one Ollama server."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.outstanding = 0
+        self.healthy = True
+        self.models = None  # None = not probed yet
+        self.failures = 0
+
+    @property
+    def base_url(self):
+        return self.provider.base_url
+
+    def has_model(self, model):
+        return self.models is None or normalize_model_name(model) in self.models
+
+
+class OllamaRouter(LLMProvider):
+    """Routes completions across several Ollama servers.
+
+    Looks like a single LLMProvider to callers, so retries from
+    LLMProvider.complete land on a different (healthy) endpoint.
+    """
+
+    name = "ollama-router"
+    default_model = DEFAULT_OLLAMA_MODEL
+
+    def __init__(self, hosts, per_host_concurrency=4, probe_interval=15.0, probe_timeout=2.0,
+                 hedge_percentile=None, hedge_min_samples=20, timeout=30, keep_alive=None, **kwargs):
+        """
+        Args:
+            hosts: List of Ollama hosts (ip, host:port or URL)
+            per_host_concurrency: Parallel requests allowed per server
+            probe_interval: Seconds between health/model probes
+            probe_timeout: Timeout for each probe request
+            hedge_percentile: Fire a second copy once the first request is slower
+                than this latency percentile (None = no hedging)
+            hedge_min_samples: Latency samples needed before hedging kicks in
+            timeout: Per-request timeout in seconds
+            keep_alive: How long each server keeps models loaded (e.g. "30m")
+        """
+        kwargs.setdefault("max_concurrency", per_host_concurrency * len(hosts))
+        super().__init__(**kwargs)
+        self.endpoints = [
+            OllamaEndpoint(OllamaProvider(ollama_base_url(h), timeout=timeout, keep_alive=keep_alive,
+                                          max_concurrency=per_host_concurrency))
+            for h in hosts
+        ]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        # Per-server call latencies; LLMProvider.latencies holds end-to-end ones
+        self.call_latencies = deque(maxlen=200)
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self._probe_task = None
+
+    @classmethod
+    def from_env(cls, hosts):
+        """Build a router using OLLAMA_* environment settings."""
+        hedge = os.getenv("OLLAMA_HEDGE_PERCENTILE")
+        return cls(
+            hosts,
+            per_host_concurrency=int(os.getenv("OLLAMA_NUM_PARALLEL", "4")),
+            probe_interval=float(os.getenv("OLLAMA_PROBE_INTERVAL", "15")),
+            hedge_percentile=float(hedge) if hedge else None,
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+        )
+
+    def describe(self):
+        return ", ".join(e.base_url for e in self.endpoints)
+
+    # --- Health probes ---
+
+    async def probe(self, endpoint):
+        """Check one server's health and installed models via /api/tags."""
+        try:
+            res = await asyncio.to_thread(requests.get, f"{endpoint.base_url}/api/tags", timeout=self.probe_timeout)
+            res.raise_for_status()
+            models = {normalize_model_name(m["name"]) for m in res.json().get("models", [])}
+        except Exception as e:
+            if endpoint.healthy:
+                brain_logger.warning(f"Ollama endpoint {endpoint.base_url} failed health check: {e}")
+            endpoint.healthy = False
+            return
+
+        if not endpoint.healthy:
+            brain_logger.info(f"Ollama endpoint {endpoint.base_url} is back online")
+        endpoint.healthy = True
+        endpoint.failures = 0
+        endpoint.models = models
+
+    async def probe_all(self):
+        await asyncio.gather(*[self.probe(e) for e in self.endpoints])
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe_all()
+
+    async def _ensure_probing(self):
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+            await self.probe_all()
+
+    # --- Selection ---
+
+    def pick(self, model, exclude=()):
+        """Pick the endpoint with the fewest outstanding requests.
+
+        Prefers healthy servers that have the model; if none qualify, falls back
+        to any server with the model, then to any server at all. Ties go to the
+        server listed first.
+        """
+        pool = [e for e in self.endpoints if e not in exclude]
+        for candidates in (
+            [e for e in pool if e.healthy and e.has_model(model)],
+            [e for e in pool if e.has_model(model)],
+            pool,
+        ):
+            if candidates:
+                return min(candidates, key=lambda e: e.outstanding)
+        return None
+
+    def hedge_delay(self):
+        """Latency percentile (seconds) after which a hedge fires, or None."""
+        if not self.hedge_percentile or len(self.call_latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.call_latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    # --- Requests ---
+
+    async def _call(self, endpoint, prompt, model, options, json_mode):
+        endpoint.outstanding += 1
+        start_time = time.monotonic()
+        try:
+            async with endpoint.provider._get_semaphore():
+                text = await endpoint.provider._complete_once(prompt, model, options, json_mode)
+        except ProviderError:
+            endpoint.failures += 1
+            endpoint.healthy = False
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        self.call_latencies.append(time.monotonic() - start_time)
+        return text
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        await self._ensure_probing()
+        primary = self.pick(model)
+        first = asyncio.create_task(self._call(primary, prompt, model, options, json_mode))
+
+        delay = self.hedge_delay()
+        if delay is None or len(self.endpoints) < 2:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        secondary = self.pick(model, exclude=(primary,))
+        if secondary is None:
+            return await first
+
+        self.hedges_fired += 1
+        brain_logger.debug(f"Hedging request: {primary.base_url} slower than {delay:.2f}s, trying {secondary.base_url}")
+        second = asyncio.create_task(self._call(secondary, prompt, model, options, json_mode))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is second:
+                        self.hedges_won += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def warmup(self, model, options=None):
+        """Load the model on every reachable server; returns the slowest load (ms)."""
+        await self._ensure_probing()
+        targets = [e for e in self.endpoints if e.healthy] or self.endpoints
+        results = await asyncio.gather(*[e.provider.warmup(model, options) for e in targets], return_exceptions=True)
+        timings = [r for r in results if not isinstance(r, Exception)]
+        if not timings:
+            raise ProviderError(f"Warmup of {model} failed on all endpoints")
+        return max(timings)
+
+    def stats(self):
+        """Per-endpoint routing state for logging/benchmarks."""
+        return {
+            "endpoints": [
+                {
+                    "url": e.base_url,
+                    "healthy": e.healthy,
+                    "outstanding": e.outstanding,
+                    "failures": e.failures,
+                    "models": sorted(e.models) if e.models is not None else None,
+                }
+                for e in self.endpoints
+            ],
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
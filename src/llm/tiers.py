@@ -0,0 +1,92 @@
+"""
+Per-task model tiering for RepoRadio.
+Each LLM task (planning, dialogue, summarization, ad copy) gets its own
+model and generation settings, so cheap tasks can run on small fast models.
+"""
+import os
+from llm.providers import DEFAULT_OLLAMA_MODEL
+
+# Defaults keep every task on the original model; override per task with
+#   LLM_<TASK>_MODEL          local (Ollama) model, e.g. LLM_PLANNING_MODEL=llama3.2:3b
+#   LLM_<TASK>_CLOUD_MODEL    model for OpenAI-compatible providers (default: OPENAI_MODEL)
+#   LLM_<TASK>_NUM_PREDICT    max tokens to generate
+#   LLM_<TASK>_NUM_CTX        context window the task needs (Ollama only)
+#
+# Ollama reloads a model whenever num_ctx changes, so num_ctx is not sent per
+# task: every task on a model gets the largest context any of them needs
+# (get_model_options), and warmup loads the model with that same context.
+TASK_DEFAULTS = {
+    # Picks 3 paths out of a file tree: short output, long input, low creativity
+    "planning": {
+        "model": DEFAULT_OLLAMA_MODEL,
+        "options": {"num_predict": 256, "num_ctx": 8192, "temperature": 0.2},
+    },
+    # One line of in-character banter per call
+    "dialogue": {
+        "model": DEFAULT_OLLAMA_MODEL,
+        "options": {"num_predict": 200, "num_ctx": 4096, "temperature": 0.9, "top_p": 0.95},
+    },
+    "summarization": {
+        "model": DEFAULT_OLLAMA_MODEL,
+        "options": {"num_predict": 400, "num_ctx": 8192, "temperature": 0.3},
+    },
+    "ad_copy": {
+        "model": DEFAULT_OLLAMA_MODEL,
+        "options": {"num_predict": 120, "num_ctx": 2048, "temperature": 1.0},
+    },
+}
+
+TASKS = tuple(TASK_DEFAULTS)
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _task_model(task, llm):
+    prefix = f"LLM_{task.upper()}"
+    if llm.name.startswith("ollama"):
+        return os.getenv(f"{prefix}_MODEL") or TASK_DEFAULTS[task]["model"]
+    return os.getenv(f"{prefix}_CLOUD_MODEL") or llm.default_model
+
+
+def _task_num_ctx(task):
+    return _env_int(f"LLM_{task.upper()}_NUM_CTX") or TASK_DEFAULTS[task]["options"].get("num_ctx")
+
+
+def get_model_options(model, llm):
+    """Load-time options shared by every task that runs on a model.
+
+    Args:
+        model: Model name as returned by get_task_config
+        llm: LLMProvider the model runs on
+
+    Returns:
+        Dict with the model's num_ctx (empty if no task on it sets one)
+    """
+    sizes = [n for n in (_task_num_ctx(t) for t in TASKS if _task_model(t, llm) == model) if n]
+    return {"num_ctx": max(sizes)} if sizes else {}
+
+
+def get_task_config(task, llm):
+    """Resolve the model and generation options for a task on a provider.
+
+    Args:
+        task: One of TASKS
+        llm: LLMProvider the task will run on
+
+    Returns:
+        Tuple of (model name, options dict)
+    """
+    if task not in TASK_DEFAULTS:
+        raise ValueError(f"Unknown LLM task: {task}")
+
+    model = _task_model(task, llm)
+    options = {k: v for k, v in TASK_DEFAULTS[task]["options"].items() if k != "num_ctx"}
+    num_predict = _env_int(f"LLM_{task.upper()}_NUM_PREDICT")
+    if num_predict:
+        options["num_predict"] = num_predict
+    options.update(get_model_options(model, llm))
+
+    return model, options
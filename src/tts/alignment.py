@@ -0,0 +1,135 @@
+"""
+Spoken timing of rendered lines for RepoRadio.
+Sound effects land on their trigger word, so a line has to know when each
+part of its text is spoken. The engine speaks the normalized text
+(tts/normalize.py spells code tokens out, often at several times their
+written length), and a stitched line (tts/scheduling.py) is its sentence
+parts with a gap between them and some silence around each.
+
+An alignment is a list of [offset in the normalized text, ms] anchors,
+interpolated in between, kept on the AudioSegment as `.alignment` and stored
+with it in every FLAC the renderer writes (tts/cache.py write_flac):
+
+- ElevenLabs renders come with character start times (/with-timestamps), so
+  every character is an anchor.
+- Kokoro returns only audio. Each sentence is placed on the speech in its
+  part (pauses found in the audio, the one nearest where the sentence should
+  end by normalized length) and estimated linearly over normalized length
+  within the sentence.
+"""
+import numpy as np
+from pydub.silence import detect_leading_silence, detect_nonsilent
+from tts.normalize import spoken_offset
+from tts.scheduling import SENTENCE_END
+
+MIN_PAUSE_MS = 150
+SILENCE_BELOW_PEAK_DB = 40
+SEEK_STEP_MS = 10
+
+
+def sentence_spans(text):
+    """(start, end) of every sentence in text."""
+    spans, start = [], 0
+    for match in SENTENCE_END.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return [(start, end) for start, end in spans if end > start]
+
+
+def voiced_runs(segment):
+    """(start_ms, end_ms) of each stretch of speech, split at pauses of MIN_PAUSE_MS or more.
+
+    Args:
+        segment: AudioSegment, or an audio.buffer.AudioBuffer (anything with to_segment())
+    """
+    if hasattr(segment, "to_segment"):
+        segment = segment.to_segment()
+    if not len(segment) or segment.max_dBFS == float("-inf"):
+        return []
+    threshold = segment.max_dBFS - SILENCE_BELOW_PEAK_DB
+    runs = detect_nonsilent(segment, min_silence_len=MIN_PAUSE_MS, silence_thresh=threshold, seek_step=SEEK_STEP_MS)
+    if runs:
+        # Silence at either end counts however short it is
+        runs[0][0] = max(runs[0][0], detect_leading_silence(segment, threshold, SEEK_STEP_MS))
+        runs[-1][1] = min(runs[-1][1], len(segment) - detect_leading_silence(segment.reverse(), threshold, SEEK_STEP_MS))
+    return runs
+
+
+def estimate_alignment(text, segment, lexicon=None):
+    """
+    Alignment of one rendered piece of text that came without timestamps.
+
+    Args:
+        text: The text as written (offsets are mapped to its normalized form)
+        segment: Its rendered AudioSegment
+        lexicon: Lexicon dict (default: bundled lexicon)
+
+    Returns:
+        List of [normalized offset, ms]
+    """
+    spans = [(spoken_offset(text, start, lexicon), spoken_offset(text, end, lexicon))
+             for start, end in sentence_spans(text)] or [(0, 0)]
+    runs = voiced_runs(segment) or [[0, len(segment)]]
+    first, last = spans[0][0], spans[-1][1]
+    start_ms, end_ms = runs[0][0], runs[-1][1]
+    pauses = [(runs[i][1], runs[i + 1][0]) for i in range(len(runs) - 1)]
+
+    anchors = [[first, start_ms]]
+    used = -1
+    for i, (_, sentence_end) in enumerate(spans[:-1]):
+        # Leave enough later pauses for the sentence ends still to come
+        candidates = range(used + 1, len(pauses) - (len(spans) - 2 - i))
+        if not candidates:
+            break
+        expected = start_ms + (sentence_end - first) / max(1, last - first) * (end_ms - start_ms)
+        used = min(candidates, key=lambda j: abs((pauses[j][0] + pauses[j][1]) / 2 - expected))
+        anchors += [[sentence_end, pauses[used][0]], [spans[i + 1][0], pauses[used][1]]]
+    anchors.append([last, end_ms])
+    return anchors
+
+
+def line_alignment(text, parts, segments, gap_ms=0, lexicon=None):
+    """
+    Alignment of a line stitched from rendered parts (scheduling.stitch_segments).
+
+    Args:
+        text: The whole line as written
+        parts: Its chunks, in order (scheduling.split_sentences)
+        segments: Rendered AudioSegment of each chunk; ones with an .alignment
+            (ElevenLabs timestamps over the chunk's normalized text) use it
+        gap_ms: Silence stitched between parts
+        lexicon: Lexicon dict (default: bundled lexicon)
+
+    Returns:
+        List of [normalized offset, ms] over the whole line
+    """
+    anchors, position, start_ms = [], 0, 0
+    for part, segment in zip(parts, segments):
+        raw_start = text.find(part, position)
+        raw_start = position if raw_start < 0 else raw_start
+        position = raw_start + len(part)
+        base = spoken_offset(text, raw_start, lexicon)
+        part_anchors = getattr(segment, "alignment", None) or estimate_alignment(part, segment, lexicon)
+        anchors += [[base + offset, round(start_ms + ms)] for offset, ms in part_anchors]
+        start_ms += len(segment) + gap_ms
+    return anchors
+
+
+def time_at(text, segment, offset, lexicon=None):
+    """
+    When the character at `offset` of a rendered line's text is spoken.
+
+    Args:
+        text: The line as written
+        segment: The line's AudioSegment; its .alignment is used when present,
+            else the timing is estimated from the audio (estimate_alignment)
+        offset: Character offset in text
+        lexicon: Lexicon dict (default: bundled lexicon)
+
+    Returns:
+        Milliseconds from the start of the segment
+    """
+    anchors = getattr(segment, "alignment", None) or estimate_alignment(text, segment, lexicon)
+    offsets, times = zip(*anchors)
+    return float(np.interp(spoken_offset(text, offset, lexicon), offsets, times))
@@ -0,0 +1,267 @@
+"""
+Content-addressed TTS segment cache for RepoRadio.
+Rendered lines are keyed by everything that affects the audio (provider,
+voice, speed, language, normalized text, engine version) and stored as FLAC
+on disk behind an in-memory LRU. A hit skips synthesis entirely, which covers
+ad templates, stock openers and re-renders of an unchanged script.
+"""
+import io
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+from debug_logger import voice_logger
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "reporadio" / "tts"
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different spellings share an entry."""
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def segment_key(provider, voice_id, text, speed=1.0, lang="en-us", engine_version=""):
+    """Stable hex digest identifying one rendered line."""
+    fields = [provider, voice_id, float(speed), lang, normalize_text(text), engine_version]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+def segment_to_pcm(segment):
+    """AudioSegment -> (int16 array shaped (frames, channels), sample_rate)."""
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    pcm = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+    return pcm, segment.frame_rate
+
+
+def pcm_to_segment(pcm, sample_rate):
+    """Inverse of segment_to_pcm."""
+    pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+    channels = 1 if pcm.ndim == 1 else pcm.shape[1]
+    return AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=int(sample_rate), channels=channels)
+
+
+def write_flac(target, segment):
+    """Write a segment as 16-bit FLAC, keeping its spoken-time alignment (tts/alignment.py) in the comment tag.
+
+    Args:
+        target: Path or writable file object
+        segment: AudioSegment
+    """
+    pcm, sample_rate = segment_to_pcm(segment)
+    with sf.SoundFile(target if hasattr(target, "write") else str(target), "w", sample_rate, pcm.shape[1],
+                      "PCM_16", format="FLAC") as f:
+        alignment = getattr(segment, "alignment", None)
+        if alignment:
+            f.comment = json.dumps({"alignment": alignment}, separators=(",", ":"))
+        f.write(pcm)
+
+
+def read_flac(source):
+    """Inverse of write_flac: an AudioSegment, with .alignment if one was stored."""
+    with sf.SoundFile(source if hasattr(source, "read") else str(source)) as f:
+        pcm, sample_rate, comment = f.read(dtype="int16", always_2d=True), f.samplerate, f.comment
+    segment = pcm_to_segment(pcm, sample_rate)
+    if comment:
+        try:
+            segment.alignment = json.loads(comment)["alignment"]
+        except (ValueError, KeyError, TypeError):
+            pass
+    return segment
+
+
+class SegmentCache:
+    """Two-level (memory LRU + FLAC on disk) cache of rendered TTS lines.
+
+    Both levels are bounded in bytes. Disk entries are evicted oldest-access
+    first (hits refresh the file mtime). Safe to share between render threads.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_disk_bytes=500 * 1024 * 1024,
+                 max_memory_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            directory: Folder for FLAC entries (None = memory only)
+            max_disk_bytes: Disk budget; 0 disables the disk level
+            max_memory_bytes: Budget for decoded PCM kept in memory
+        """
+        self.directory = Path(directory) if directory and max_disk_bytes else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.memory = OrderedDict()  # key -> AudioSegment
+        self.memory_bytes = 0
+        self.disk_bytes = None       # computed on first write
+        self.stats_counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.flac"
+
+    def get(self, key):
+        """Cached segment for key, or None."""
+        with self._lock:
+            segment = self.memory.get(key)
+            if segment is not None:
+                self.memory.move_to_end(key)
+                self.stats_counts["memory_hits"] += 1
+        if segment is not None:
+            self._touch(key)
+            return segment
+
+        segment = self._read_disk(key)
+        with self._lock:
+            if segment is None:
+                self.stats_counts["misses"] += 1
+                return None
+            self.stats_counts["disk_hits"] += 1
+            self._remember(key, segment)
+        return segment
+
+    def put(self, key, segment):
+        """Store a rendered segment in memory and on disk."""
+        with self._lock:
+            self._remember(key, segment)
+            self.stats_counts["writes"] += 1
+        self._write_disk(key, segment)
+
+    def _remember(self, key, segment):
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key).raw_data)
+        size = len(segment.raw_data)
+        if size > self.max_memory_bytes:
+            return
+        self.memory[key] = segment
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted.raw_data)
+
+    def _touch(self, key):
+        # Disk eviction is by mtime, so hits mark the entry as recently used
+        if self.directory is not None:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            segment = read_flac(path)
+            os.utime(path)
+        except Exception:
+            # Missing, or a torn/corrupt entry; either way it's a miss
+            return None
+        return segment
+
+    def _write_disk(self, key, segment):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            buffer = io.BytesIO()
+            write_flac(buffer, segment)
+            data = buffer.getvalue()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+            partial.write_bytes(data)
+            os.replace(partial, path)
+        except Exception as e:
+            voice_logger.warning(f"TTS cache write failed for {key[:12]}: {e}")
+            return
+        with self._lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = self._scan_disk_bytes()
+            else:
+                self.disk_bytes += len(data)
+            over_budget = self.disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self.evict()
+
+    def _entries(self):
+        return list(self.directory.glob("*/*.flac")) if self.directory and self.directory.exists() else []
+
+    def _scan_disk_bytes(self):
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def evict(self, target_fraction=0.9):
+        """Delete least recently used disk entries until under target_fraction of the budget."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * target_fraction
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.disk_bytes = total
+            self.stats_counts["evictions"] += evicted
+        if evicted:
+            voice_logger.info(f"TTS cache evicted {evicted} entries ({total / 1e6:.1f}MB left)")
+
+    def stats(self):
+        """Hit/miss counts, hit rate and current sizes."""
+        with self._lock:
+            counts = dict(self.stats_counts)
+            lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+            counts["hit_rate"] = (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else 0.0
+            counts["memory_entries"] = len(self.memory)
+            counts["memory_bytes"] = self.memory_bytes
+            counts["disk_bytes"] = self.disk_bytes
+        return counts
+
+
+def format_cache_stats(stats):
+    """One-line summary of SegmentCache.stats() for logs and the UI."""
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    lookups = hits + stats["misses"]
+    return (f"TTS cache: {hits}/{lookups} hits ({stats['hit_rate']:.0%}; "
+            f"{stats['memory_hits']} memory, {stats['disk_hits']} disk)")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_segment_cache():
+    """Return the process-wide segment cache configured from the environment.
+
+    TTS_CACHE_DIR (default ~/.cache/reporadio/tts), TTS_CACHE_MAX_MB (disk
+    budget, default 500, 0 = memory only) and TTS_CACHE_MEMORY_MB (default 64).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SegmentCache(
+                directory=os.getenv("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR,
+                max_disk_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024),
+                max_memory_bytes=int(float(os.getenv("TTS_CACHE_MEMORY_MB", "64")) * 1024 * 1024),
+            )
+        return _cache
@@ -0,0 +1,162 @@
+"""
+Pre-rendered sponsor ad catalog for RepoRadio.
+Every text the ad generator can produce (ads.expand_ad_texts: the special
+templates, plus the generic templates for the most common packages) is
+rendered offline in every host voice and stored as FLAC:
+
+    <catalog dir>/manifest.json   fingerprint and the keys it was built with
+    <catalog dir>/<key>.flac      one ad line, keyed like a project stem
+
+At render time an ad line found in the catalog needs no TTS work. The
+fingerprint covers the templates, the voices and the TTS engine/lexicon/split
+settings; when any of them changes the catalog is stale and ignored until it
+is built again:
+
+    PYTHONPATH=src python -m tts.catalog --provider local --packages 20
+"""
+import os
+import json
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from debug_logger import voice_logger
+from ads import ad_templates_version
+from tts.cache import read_flac, write_flac
+from tts.scheduling import get_split_config
+
+DEFAULT_CATALOG_DIR = Path.home() / ".cache" / "reporadio" / "ads"
+PROVIDERS = {"local": "Local (Kokoro)", "cloud": "Cloud (ElevenLabs)"}
+CATALOG_VERSION = 1
+BUILD_CHUNK_LINES = 64
+
+
+def provider_dir_name(provider):
+    return "local" if "Local" in provider else "cloud"
+
+
+def catalog_fingerprint(provider, tts_version, voice_ids):
+    """Hash of everything that decides which ad lines exist and how they sound.
+
+    Args:
+        provider: Voice provider string
+        tts_version: voice.get_tts_version(provider) (engine/model and lexicon)
+        voice_ids: Voice ids of every host character
+    """
+    fields = [CATALOG_VERSION, ad_templates_version(), provider, tts_version,
+              sorted(set(voice_ids)), list(get_split_config())]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()[:16]
+
+
+def get_catalog_dir(provider):
+    """AD_CATALOG_DIR (default ~/.cache/reporadio/ads), one subfolder per provider."""
+    return Path(os.getenv("AD_CATALOG_DIR") or DEFAULT_CATALOG_DIR) / provider_dir_name(provider)
+
+
+class AdCatalog:
+    """One provider's catalog directory; entries count only while the fingerprint matches."""
+
+    def __init__(self, directory, fingerprint):
+        """
+        Args:
+            directory: Catalog directory for one provider
+            fingerprint: catalog_fingerprint() of the current templates, voices and engine
+        """
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+        self.keys = set()
+        self.stale = False
+        try:
+            manifest = json.loads((self.directory / "manifest.json").read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            voice_logger.warning(f"Ignoring unreadable ad catalog manifest in {self.directory}: {e}")
+            return
+        if manifest.get("fingerprint") != fingerprint:
+            self.stale = True
+            voice_logger.info(f"Ad catalog {self.directory} is stale (templates, voices or TTS changed); "
+                              "rebuild it with python -m tts.catalog")
+            return
+        self.keys = set(manifest.get("keys", []))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _path(self, key):
+        return self.directory / f"{key}.flac"
+
+    def get(self, key):
+        """Pre-rendered AudioSegment for a line stem key, or None."""
+        if key not in self.keys:
+            return None
+        try:
+            return read_flac(self._path(key))
+        except Exception as e:
+            voice_logger.warning(f"Ignoring unreadable catalog entry {key[:12]}: {e}")
+            return None
+
+    def put(self, key, segment):
+        """Store one rendered line (visible to get() once the manifest is written)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        partial = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        write_flac(partial, segment)
+        os.replace(partial, path)
+
+    def has_file(self, key):
+        return self._path(key).exists()
+
+    def write_manifest(self, keys, **info):
+        """Publish a build: keep only keys' files and record them under the current fingerprint."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keys = list(dict.fromkeys(keys))
+        for path in self.directory.glob("*.flac"):
+            if path.stem not in keys:
+                path.unlink(missing_ok=True)
+        manifest = self.directory / "manifest.json"
+        partial = manifest.with_name(f"manifest.json.{threading.get_ident()}.part")
+        partial.write_text(json.dumps(dict(info, fingerprint=self.fingerprint, keys=keys), indent=2))
+        os.replace(partial, manifest)
+        self.keys, self.stale = set(keys), False
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_ad_catalog(provider, fingerprint):
+    """Catalog for a provider, reloaded when its manifest or the fingerprint changes."""
+    directory = get_catalog_dir(provider)
+    manifest = directory / "manifest.json"
+    key = (str(directory), manifest.stat().st_mtime_ns if manifest.exists() else None, fingerprint)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = AdCatalog(directory, fingerprint)
+        return _catalogs[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render sponsor ads in every host voice")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="local", help="Voice provider")
+    parser.add_argument("--packages", type=int, default=None,
+                        help="Expand generic templates for this many of the most common packages")
+    parser.add_argument("--dir", help="Catalog directory (default: AD_CATALOG_DIR/<provider>)")
+    parser.add_argument("--workers", type=int, help="Parallel TTS workers")
+    args = parser.parse_args()
+
+    # Behind interactive renders when a TTS daemon does the synthesis
+    os.environ.setdefault("TTS_DAEMON_PRIORITY", "batch")
+    from ads import COMMON_PACKAGES
+    from voice import build_ad_catalog, get_local_tts
+    provider = PROVIDERS[args.provider]
+    if "Local" in provider:
+        get_local_tts().wait()
+    packages = COMMON_PACKAGES if args.packages is None else COMMON_PACKAGES[:args.packages]
+    result = build_ad_catalog(provider, packages, args.dir, args.workers)
+    print(f"📢 Ad catalog: {result['lines']} lines ({result['rendered']} rendered, {result['reused']} reused, "
+          f"{result['failed']} failed) in {result['seconds']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+ElevenLabs text-to-speech client for RepoRadio.
+One pooled HTTP session serves every render thread; audio is read from the
+streaming endpoint as it arrives (raw PCM by default, so nothing needs
+decoding), with character timestamps unless ELEVENLABS_TIMESTAMPS=0; they
+become the segment's .alignment (tts/alignment.py), which places sound
+effects. Concurrency adapts to the account's limit: a 429 halves the number
+of requests in flight and pauses new ones, successes grow it back one slot
+at a time. Rate-limited and transient failures are retried with backoff.
+"""
+import io
+import os
+import json
+import base64
+import time
+import random
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from pydub import AudioSegment
+from debug_logger import voice_logger, log_elevenlabs_request, log_elevenlabs_response, log_elevenlabs_error
+from http_utils import parse_retry_after
+
+DEFAULT_BASE_URL = "https://api.elevenlabs.io"
+DEFAULT_MODEL = "eleven_turbo_v2"
+DEFAULT_OUTPUT_FORMAT = "pcm_24000"
+STREAM_CHUNK_BYTES = 16384
+
+
+class CloudTTSError(Exception):
+    """Raised when ElevenLabs cannot render a line."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RateLimitError(CloudTTSError):
+    """Raised when ElevenLabs rejects a request with HTTP 429."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease cap on requests in flight.
+
+    Requests that were already in flight when the limit was cut don't cut it
+    again, so a burst of 429s from one window halves the limit once.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot; yields the time the request started."""
+        with self._cond:
+            while True:
+                delay = self.cooldown_until - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    break
+            self.in_flight += 1
+        try:
+            yield time.monotonic()
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def on_rate_limit(self, started_at, retry_after):
+        """Back off after a 429 on a request that started at `started_at`."""
+        with self._cond:
+            if started_at >= self._decreased_at:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._decreased_at = time.monotonic()
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+
+
+def pcm_format_rate(output_format):
+    """Sample rate of a raw PCM output format ('pcm_24000' -> 24000), else None."""
+    if output_format.startswith("pcm_"):
+        return int(output_format.split("_")[1])
+    return None
+
+
+def add_alignment(alignment, chunk_alignment):
+    """Append one streamed chunk's character timings to alignment ([[character offset, ms], ...]).
+
+    Chunks may time their characters from the start of the audio or from
+    their own start; times that go backwards continue from the last chunk.
+    """
+    if not chunk_alignment or not chunk_alignment.get("characters"):
+        return
+    starts = chunk_alignment["character_start_times_seconds"]
+    ends = chunk_alignment["character_end_times_seconds"]
+    offset, last_ms = (alignment[-1][0], alignment[-1][1]) if alignment else (0, 0)
+    if alignment:
+        alignment.pop()  # the previous chunk's end anchor; this chunk's first character replaces it
+    base_ms = last_ms if starts[0] * 1000 < last_ms - 1 else 0
+    for i, start in enumerate(starts):
+        alignment.append([offset + i, round(base_ms + start * 1000)])
+    alignment.append([offset + len(starts), round(base_ms + ends[-1] * 1000)])
+
+
+class ElevenLabsTTS:
+    """ElevenLabs `/v1/text-to-speech/{voice}/stream` over a shared session."""
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, output_format=DEFAULT_OUTPUT_FORMAT,
+                 max_concurrency=8, max_retries=4, backoff_base=0.5, backoff_max=20.0, timeout=60, timestamps=True):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.output_format = output_format
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.timestamps = timestamps
+        self.limiter = AdaptiveLimiter(max_concurrency)
+
+        # Keep-alive connections for every render thread, so lines skip TLS setup
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"xi-api-key": api_key or "", "Accept": "audio/*"})
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            api_key=os.getenv("ELEVENLABS_API_KEY"),
+            base_url=os.getenv("ELEVENLABS_BASE_URL", DEFAULT_BASE_URL),
+            model=os.getenv("ELEVENLABS_MODEL", DEFAULT_MODEL),
+            output_format=os.getenv("ELEVENLABS_OUTPUT_FORMAT", DEFAULT_OUTPUT_FORMAT),
+            max_concurrency=max(1, int(os.getenv("TTS_CLOUD_WORKERS", "8"))),
+            timestamps=os.getenv("ELEVENLABS_TIMESTAMPS", "1").strip().lower() not in ("0", "false", "no", "off"),
+        )
+
+    @property
+    def version(self):
+        """Model and output format, part of TTS cache keys."""
+        return f"elevenlabs:{self.model}:{self.output_format}"
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _decode(self, audio_bytes):
+        rate = pcm_format_rate(self.output_format)
+        if rate:
+            # Raw 16-bit little-endian mono
+            return AudioSegment(data=audio_bytes[:len(audio_bytes) // 2 * 2], sample_width=2, frame_rate=rate, channels=1)
+        # mp3_* formats, decoded through ffmpeg's stdin
+        return AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3", codec="mp3")
+
+    def _stream_once(self, text, voice_id):
+        """One streaming request.
+
+        Returns:
+            Tuple of (audio bytes, alignment or None, time to first byte in ms)
+        """
+        start_time = time.time()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/v1/text-to-speech/{voice_id}/stream" + ("/with-timestamps" if self.timestamps else ""),
+                params={"output_format": self.output_format},
+                json={"text": text, "model_id": self.model},
+                stream=True,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise CloudTTSError(f"ElevenLabs request failed: {e}") from e
+
+        with response:
+            if response.status_code == 429:
+                raise RateLimitError(f"ElevenLabs rate limited: {response.text[:200]}",
+                                     retry_after=parse_retry_after(response.headers))
+            if response.status_code >= 400:
+                raise CloudTTSError(f"ElevenLabs returned {response.status_code}: {response.text[:200]}",
+                                    retryable=response.status_code >= 500)
+            audio = bytearray()
+            alignment = [] if self.timestamps else None
+            first_byte_ms = None
+            try:
+                if self.timestamps:
+                    # One JSON object per line: base64 audio and the timings of the characters it speaks
+                    for line in response.iter_lines():
+                        if not line.strip():
+                            continue
+                        if first_byte_ms is None:
+                            first_byte_ms = (time.time() - start_time) * 1000
+                        chunk = json.loads(line)
+                        audio.extend(base64.b64decode(chunk.get("audio_base64") or ""))
+                        add_alignment(alignment, chunk.get("alignment"))
+                else:
+                    for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+                        if first_byte_ms is None:
+                            first_byte_ms = (time.time() - start_time) * 1000
+                        audio.extend(chunk)
+            except requests.RequestException as e:
+                raise CloudTTSError(f"ElevenLabs stream interrupted after {len(audio)} bytes: {e}") from e
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise CloudTTSError(f"ElevenLabs sent an unreadable timestamp chunk: {e}") from e
+        if not audio:
+            raise CloudTTSError("ElevenLabs returned no audio")
+        return bytes(audio), alignment or None, first_byte_ms
+
+    def synthesize(self, text, voice_id, speaker="System"):
+        """Render text in a voice, retrying rate limits and transient errors.
+
+        Returns:
+            AudioSegment, with .alignment over text when timestamps are on
+
+        Raises:
+            CloudTTSError: the line could not be rendered
+        """
+        if not self.api_key:
+            raise CloudTTSError("ELEVENLABS_API_KEY is not set", retryable=False)
+        log_elevenlabs_request(text, voice_id)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            with self.limiter.slot() as started_at:
+                try:
+                    start_time = time.time()
+                    audio, alignment, first_byte_ms = self._stream_once(text, voice_id)
+                    self.limiter.on_success()
+                    duration_ms = (time.time() - start_time) * 1000
+                    log_elevenlabs_response("<stream>", len(audio))
+                    voice_logger.debug(f"ElevenLabs rendered {speaker}: {len(audio)} bytes, "
+                                       f"first byte {first_byte_ms:.0f}ms, total {duration_ms:.0f}ms")
+                    segment = self._decode(audio)
+                    if alignment:
+                        segment.alignment = alignment
+                    return segment
+                except RateLimitError as e:
+                    last_error = e
+                    delay = e.retry_after if e.retry_after is not None else self._backoff_delay(attempt)
+                    self.limiter.on_rate_limit(started_at, delay)
+                    voice_logger.warning(f"ElevenLabs rate limited, concurrency now {int(self.limiter.limit)}, "
+                                         f"retrying in {delay:.2f}s (attempt {attempt + 1})")
+                    # The limiter's cooldown holds this and every other request back
+                    continue
+                except CloudTTSError as e:
+                    last_error = e
+                    if not e.retryable:
+                        break
+                    delay = self._backoff_delay(attempt)
+                    voice_logger.warning(f"{e}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+
+        log_elevenlabs_error(str(last_error))
+        raise last_error
+
+
+_cloud_tts = None
+_cloud_tts_lock = threading.Lock()
+
+
+def get_cloud_tts():
+    """Return the process-wide ElevenLabs client (its limiter spans all renders)."""
+    global _cloud_tts
+    with _cloud_tts_lock:
+        if _cloud_tts is None:
+            _cloud_tts = ElevenLabsTTS.from_env()
+        return _cloud_tts
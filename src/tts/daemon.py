@@ -0,0 +1,321 @@
+"""
+Standalone local TTS service for RepoRadio.
+One long-running process owns the Kokoro session pool (tts/engine.py) and
+serves synthesis over localhost HTTP, so several app servers and batch
+scripts on one render box share a single copy of the model instead of each
+loading their own:
+
+    PYTHONPATH=src python -m tts.daemon --port 8765
+
+    GET  /health       engine version, sessions and queue depth
+    POST /synthesize   {"texts": [...], "voice", "speed", "lang", "priority", "client"}
+                       -> float32 samples of every text back to back; the
+                       X-Sample-Rate and X-Lengths headers split them
+
+Requests are batches in one voice (like KokoroEngine.create_batch). They
+are served highest priority first ("interactive" before "batch"), and
+round-robin between clients of the same priority so one long render can't
+starve the others. voice.py picks the daemon for a render whenever
+TTS_DAEMON_URL answers at its start, and loads Kokoro in-process otherwise; a
+daemon that stops answering mid-render fails that render
+(DaemonUnavailableError) instead of switching backends partway through.
+"""
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from debug_logger import voice_logger
+from tts.engine import FAILED, READY, TTSEngineError, get_engine
+
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+PRIORITIES = {"interactive": 0, "batch": 10}
+PROBE_INTERVAL = 5.0
+REQUEST_TIMEOUT = 600
+
+
+class DaemonUnavailableError(TTSEngineError):
+    """Raised when the TTS daemon can't be reached (as opposed to a synthesis it reported failed)."""
+
+
+class SynthesisScheduler:
+    """Priority queue of synthesis batches in front of one engine.
+
+    One worker thread per engine session takes the next batch: lowest
+    priority number first, then round-robin over the clients waiting at that
+    priority, then first in first out.
+    """
+
+    def __init__(self, engine, workers=None):
+        self.engine = engine
+        self.workers = workers or max(1, engine.sessions)
+        self.pending = {}       # priority -> OrderedDict of client -> deque of (request, future)
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"tts-daemon-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, texts, voice, speed=1.0, lang="en-us", priority="interactive", client="anonymous"):
+        """Queue a batch; the Future resolves to a list of (samples, sample_rate)."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; choose from {sorted(PRIORITIES)}")
+        future = Future()
+        with self._cond:
+            clients = self.pending.setdefault(PRIORITIES[priority], OrderedDict())
+            clients.setdefault(client, deque()).append(((texts, voice, speed, lang), future))
+            self.queued += 1
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        priority = min(self.pending)
+        clients = self.pending[priority]
+        client, waiting = next(iter(clients.items()))
+        item = waiting.popleft()
+        del clients[client]
+        if waiting:
+            # Back of the line; other clients at this priority get a turn first
+            clients[client] = waiting
+        if not clients:
+            del self.pending[priority]
+        self.queued -= 1
+        return item
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self.pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                (texts, voice, speed, lang), future = self._next()
+                self.in_flight += 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(self.engine.create_batch(texts, voice, speed=speed, lang=lang))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self.in_flight -= 1
+                    self.completed += 1
+
+    def stats(self):
+        with self._cond:
+            return {"queued": self.queued, "in_flight": self.in_flight, "completed": self.completed}
+
+
+def make_handler(scheduler):
+    engine = scheduler.engine
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            voice_logger.debug(f"TTS daemon: {format % args}")
+
+        def _send(self, status, body, content_type="application/json", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({"error": message}).encode())
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._error(404, "not found")
+            self._send(200, json.dumps(dict(scheduler.stats(), status="ok", version=engine.version,
+                                            sessions=scheduler.workers)).encode())
+
+        def do_POST(self):
+            if self.path != "/synthesize":
+                return self._error(404, "not found")
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = [str(text) for text in body["texts"]]
+                future = scheduler.submit(texts, body["voice"], float(body.get("speed", 1.0)),
+                                          body.get("lang", "en-us"), body.get("priority", "interactive"),
+                                          body.get("client", self.client_address[0]))
+            except (KeyError, TypeError, ValueError) as e:
+                return self._error(400, f"bad request: {e}")
+            try:
+                results = future.result()
+            except Exception as e:
+                voice_logger.error(f"TTS daemon: synthesis failed: {e}")
+                return self._error(500, str(e))
+            samples = [np.asarray(s, dtype="<f4").reshape(-1) for s, _ in results]
+            self._send(200, b"".join(s.tobytes() for s in samples), "application/octet-stream", {
+                "X-Sample-Rate": str(results[0][1] if results else 0),
+                "X-Lengths": ",".join(str(len(s)) for s in samples),
+            })
+
+    return Handler
+
+
+def serve(scheduler, host="127.0.0.1", port=0):
+    """Start serving a running scheduler on a daemon thread.
+
+    Returns:
+        The ThreadingHTTPServer (server_address has the bound port; shutdown() stops it)
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(scheduler))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="tts-daemon-http", daemon=True).start()
+    return server
+
+
+class DaemonClient:
+    """Client for the TTS daemon with the parts of KokoroEngine that voice.py uses."""
+
+    def __init__(self, url=DEFAULT_DAEMON_URL, priority="interactive", client=None, timeout=REQUEST_TIMEOUT):
+        """
+        Args:
+            url: Daemon base URL
+            priority: Priority of this process's requests ("interactive" or "batch")
+            client: Name the daemon schedules this process under (default: host:pid)
+            timeout: Seconds to wait for one batch
+        """
+        self.url = url.rstrip("/")
+        self.priority = priority
+        self.client = client or f"{socket.gethostname()}:{os.getpid()}"
+        self.timeout = timeout
+        self.version = None
+        self.sessions = 0
+        self.error = None
+        self._checked_at = None
+        self._available = False
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+
+    def available(self, max_age=PROBE_INTERVAL):
+        """Whether the daemon answers /health (rechecked at most every max_age seconds)."""
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < max_age:
+                return self._available
+            try:
+                res = self._session.get(f"{self.url}/health", timeout=1)
+                res.raise_for_status()
+                health = res.json()
+                self.version, self.sessions, self.error = health["version"], health["sessions"], None
+                if not self._available:
+                    voice_logger.info(f"TTS daemon at {self.url}: {self.version}, {self.sessions} sessions")
+                self._available = True
+            except (requests.RequestException, ValueError, KeyError) as e:
+                self.error = e
+                self._available = False
+            self._checked_at = time.monotonic()
+            return self._available
+
+    @property
+    def state(self):
+        return READY if self._available else FAILED
+
+    def start(self):
+        self.available()
+        return self
+
+    def wait(self, timeout=None):
+        if not self.available(max_age=0):
+            raise TTSEngineError(f"TTS daemon at {self.url} is not reachable: {self.error}")
+        return self
+
+    def create(self, text, voice, speed=1.0, lang="en-us"):
+        return self.create_batch([text], voice, speed=speed, lang=lang)[0]
+
+    def create_batch(self, texts, voice, speed=1.0, lang="en-us"):
+        """Synthesize several texts in one voice on the daemon.
+
+        Returns:
+            List of (samples, sample_rate), one per text
+
+        Raises:
+            DaemonUnavailableError: If the daemon could not be reached
+            TTSEngineError: If the daemon failed the synthesis
+        """
+        payload = {"texts": list(texts), "voice": voice, "speed": speed, "lang": lang,
+                   "priority": self.priority, "client": self.client}
+        try:
+            res = self._session.post(f"{self.url}/synthesize", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            with self._lock:
+                self._checked_at = None  # probe again before the next render picks a backend
+            raise DaemonUnavailableError(f"TTS daemon at {self.url} failed: {e}")
+        if res.status_code != 200:
+            raise TTSEngineError(f"TTS daemon returned {res.status_code}: {res.text[:200]}")
+        sample_rate = int(res.headers["X-Sample-Rate"])
+        lengths = [int(n) for n in res.headers["X-Lengths"].split(",") if n]
+        data = np.frombuffer(res.content, dtype="<f4")
+        offsets = np.cumsum([0] + lengths)
+        return [(data[offsets[i]:offsets[i + 1]], sample_rate) for i in range(len(lengths))]
+
+    def warmup(self, voice="af_bella"):
+        """The daemon keeps its sessions warm; this only checks it is up."""
+        self.wait()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_daemon_client():
+    """Process-wide daemon client, or None if TTS_DAEMON_URL is empty.
+
+    TTS_DAEMON_URL (default http://127.0.0.1:8765) and TTS_DAEMON_PRIORITY
+    ("interactive" by default; batch scripts use "batch").
+    """
+    global _client
+    url = os.getenv("TTS_DAEMON_URL", DEFAULT_DAEMON_URL).strip()
+    if not url:
+        return None
+    with _client_lock:
+        if _client is None or _client.url != url.rstrip("/"):
+            _client = DaemonClient(url, priority=os.getenv("TTS_DAEMON_PRIORITY", "interactive"))
+        return _client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local Kokoro TTS to every RepoRadio process on this host")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    engine = get_engine().wait()
+    engine.warmup()
+    scheduler = SynthesisScheduler(engine).start()
+    server = serve(scheduler, args.host, args.port)
+    print(f"🛰️ TTS daemon on http://{args.host}:{server.server_address[1]} "
+          f"({engine.sessions} sessions, {engine.version})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
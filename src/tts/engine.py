@@ -0,0 +1,454 @@
+"""
+Kokoro engine lifecycle for RepoRadio.
+Downloads (if needed) and loads the Kokoro ONNX model lazily on a background
+thread instead of at import time, so importing voice never blocks. Callers
+check `state` or wait on the engine only when they actually synthesize.
+
+The engine is a pool of independent ONNX sessions, each with its own
+intra-/inter-op thread budget, so parallel lines don't contend on one session
+or oversubscribe the CPU. KOKORO_SESSIONS=auto benchmarks a few layouts at
+load time and keeps the one with the best real-time factor. With
+KOKORO_MMAP_WEIGHTS=1 sessions share one memory-mapped copy of the model and
+voice weights, trading speed for memory (tts/weights.py).
+"""
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from debug_logger import voice_logger
+from tts.normalize import phonemize_texts
+from tts.weights import get_mmap_weights, prepare_mapped_model, prepare_mapped_voices
+
+# URLs for the models
+MODEL_RELEASE = "https://github.com/thewh1teagle/kokoro-onnx/releases/download/model-files-v1.0"
+MODEL_URL = f"{MODEL_RELEASE}/kokoro-v1.0.onnx"
+VOICES_URL = f"{MODEL_RELEASE}/voices-v1.0.bin"
+MODEL_FILE = "kokoro-v1.0.onnx"
+VOICES_FILE = "voices-v1.0.bin"
+
+# Weight variants published alongside the fp32 reference model. Quantized
+# builds trade a little quality for throughput on CPU-only hosts.
+MODEL_VARIANTS = {
+    "fp32": MODEL_FILE,
+    "fp16": "kokoro-v1.0.fp16.onnx",
+    "int8": "kokoro-v1.0.int8.onnx",
+}
+
+# Project root, where the model files have always been downloaded to
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parents[2]
+
+IDLE, LOADING, READY, FAILED = "idle", "loading", "ready", "failed"
+
+# Text used to measure real-time factor when auto-tuning (~6s of speech)
+AUTOTUNE_TEXT = ("Welcome back to the show. Today we are digging through a repository "
+                 "that somebody clearly wrote at three in the morning.")
+
+
+class TTSEngineError(RuntimeError):
+    """Raised when the Kokoro engine could not be loaded."""
+
+
+def get_model_variant():
+    """KOKORO_MODEL_VARIANT: fp32 (default), fp16 or int8."""
+    variant = os.getenv("KOKORO_MODEL_VARIANT", "fp32").strip().lower() or "fp32"
+    if variant not in MODEL_VARIANTS:
+        raise TTSEngineError(f"Unknown KOKORO_MODEL_VARIANT '{variant}' (expected one of {', '.join(MODEL_VARIANTS)})")
+    return variant
+
+
+def get_model_paths(variant=None):
+    """Resolve the Kokoro model and voices files from the environment.
+
+    KOKORO_MODEL_PATH / KOKORO_VOICES_PATH name the files directly; otherwise
+    they live in KOKORO_MODEL_DIR (default: the project root). Quantized
+    variants get their own subfolder (<dir>/int8/, <dir>/fp16/) so they never
+    overwrite or get mistaken for the fp32 model; voices are shared.
+
+    Returns:
+        Tuple of (model_path, voices_path)
+    """
+    variant = variant or get_model_variant()
+    model_dir = Path(os.getenv("KOKORO_MODEL_DIR") or DEFAULT_MODEL_DIR).expanduser()
+    variant_dir = model_dir if variant == "fp32" else model_dir / variant
+    model_path = Path(os.getenv("KOKORO_MODEL_PATH") or variant_dir / MODEL_VARIANTS[variant]).expanduser()
+    voices_path = Path(os.getenv("KOKORO_VOICES_PATH") or model_dir / VOICES_FILE).expanduser()
+    return model_path, voices_path
+
+
+def engine_version(model_path):
+    """Identifier for cache keys: a new model file or kokoro-onnx release changes the audio."""
+    try:
+        from importlib.metadata import version
+        library = version("kokoro-onnx")
+    except Exception:
+        library = "unknown"
+    return f"kokoro-onnx-{library}:{Path(model_path).name}"
+
+
+def get_pool_config():
+    """Read the session pool layout from the environment.
+
+    KOKORO_SESSIONS: number of ONNX sessions, or "auto" to benchmark (default 1)
+    KOKORO_INTRA_OP_THREADS: threads per session (default: CPUs / sessions)
+    KOKORO_INTER_OP_THREADS: inter-op threads per session (default 1)
+
+    Returns:
+        Tuple of (sessions, intra_op_threads, inter_op_threads); sessions may be "auto"
+    """
+    sessions = os.getenv("KOKORO_SESSIONS", "1").strip().lower()
+    sessions = "auto" if sessions == "auto" else max(1, int(sessions))
+    intra = int(os.getenv("KOKORO_INTRA_OP_THREADS", "0"))
+    inter = max(1, int(os.getenv("KOKORO_INTER_OP_THREADS", "1")))
+    return sessions, intra, inter
+
+
+def split_threads(sessions, cpus=None):
+    """Intra-op threads per session so the pool uses every core once."""
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, cpus // sessions)
+
+
+def autotune_candidates(cpus=None):
+    """Pool layouts worth trying on this host, from one wide session to many narrow ones."""
+    cpus = cpus or os.cpu_count() or 1
+    layouts = []
+    sessions = 1
+    while sessions <= cpus and sessions <= 8:
+        layouts.append((sessions, split_threads(sessions, cpus), 1))
+        sessions *= 2
+    return layouts
+
+
+def measure_rtf(instances, text=AUTOTUNE_TEXT, voice="af_bella", rounds=2):
+    """Aggregate real-time factor of a set of Kokoro instances run in parallel.
+
+    Each instance synthesizes `text` `rounds` times concurrently with the
+    others. RTF is wall time over seconds of audio produced (lower is better).
+    """
+    def run(kokoro):
+        audio_seconds = 0.0
+        for _ in range(rounds):
+            samples, sample_rate = kokoro.create(text, voice=voice, speed=1.0, lang="en-us")
+            audio_seconds += len(samples) / sample_rate
+        return audio_seconds
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+        audio_seconds = sum(executor.map(run, instances))
+    return (time.time() - start_time) / audio_seconds if audio_seconds else float("inf")
+
+
+def create_session(model_path, intra_op_threads, inter_op_threads, mapped=False):
+    """Build an ONNX Runtime session with an explicit thread budget.
+
+    mapped: model_path has memory-mapped weights (prepare_mapped_model); pre-packing
+        is turned off so the session computes on the shared pages instead of a private copy
+    """
+    import onnxruntime as rt
+
+    options = rt.SessionOptions()
+    if mapped:
+        options.add_session_config_entry("session.disable_prepacking", "1")
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = rt.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1 else rt.ExecutionMode.ORT_SEQUENTIAL
+    # Same provider selection as kokoro_onnx itself
+    providers = [os.getenv("ONNX_PROVIDER")] if os.getenv("ONNX_PROVIDER") else ["CPUExecutionProvider"]
+    return rt.InferenceSession(str(model_path), sess_options=options, providers=providers)
+
+
+def phonemize_batch(kokoro, texts, lang="en-us"):
+    """Phonemize many texts with one espeak backend instead of one per text.
+
+    Produces the same phonemes as kokoro's Tokenizer.phonemize per text;
+    phonemizer builds a fresh backend on every call, which dominates for
+    short lines.
+    """
+    import phonemizer
+
+    # One input line per text; an embedded newline would shift every later result
+    lines = [text.strip().replace("\n", " ") for text in texts]
+    raw = phonemizer.phonemize(lines, lang, preserve_punctuation=True, with_stress=True)
+    vocab = kokoro.tokenizer.vocab
+    return ["".join(p for p in phonemes if p in vocab).strip() for phonemes in raw]
+
+
+def download_file(url, path):
+    """Stream a file to disk, renaming into place only once it is complete."""
+    path = Path(path)
+    partial = path.with_name(path.name + ".part")
+    print(f"⬇️  Downloading {path.name}...")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        response = requests.get(url, stream=True)
+        response.raise_for_status()
+        with open(partial, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+        os.replace(partial, path)
+        print(f"✅ Downloaded {path.name}")
+    except Exception as e:
+        print(f"❌ Failed to download {path.name}: {e}")
+        # Delete partial file so we try again next time
+        if partial.exists():
+            partial.unlink()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_checksum(path, expected=None):
+    """Check a model file against its pinned or recorded SHA-256.
+
+    The digest is recorded in <file>.sha256 the first time the file is seen
+    and later loads must match it, so a truncated or swapped file fails
+    loudly instead of loading garbage. `expected` (e.g. KOKORO_MODEL_SHA256)
+    pins the digest explicitly. Rehashing is skipped while size and mtime
+    still match the record.
+
+    Returns:
+        Hex digest
+
+    Raises:
+        TTSEngineError: on mismatch
+    """
+    path = Path(path)
+    record_path = path.with_name(path.name + ".sha256")
+    stat = path.stat()
+    try:
+        record = json.loads(record_path.read_text())
+    except (OSError, ValueError):
+        record = None
+
+    expected = expected.strip().lower() if expected else None
+    if record and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+        digest = record["sha256"]
+    else:
+        digest = file_sha256(path)
+        if record and not expected and record.get("sha256") != digest:
+            raise TTSEngineError(f"{path.name} changed since it was first verified "
+                                 f"(sha256 {digest[:12]}… != {record['sha256'][:12]}…); "
+                                 f"delete {record_path.name} if the new file is intended")
+    if expected and digest != expected:
+        raise TTSEngineError(f"{path.name} checksum mismatch: expected {expected[:12]}…, got {digest[:12]}…")
+
+    if not record or record.get("sha256") != digest or record.get("mtime_ns") != stat.st_mtime_ns:
+        record_path.write_text(json.dumps({"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}))
+    return digest
+
+
+def check_and_install_models(model_path, voices_path, model_url=MODEL_URL):
+    """Download the model and voices files if they are missing or empty, then verify them.
+
+    KOKORO_MODEL_SHA256 / KOKORO_VOICES_SHA256 optionally pin the digests.
+
+    Returns:
+        Dict of file name -> sha256
+    """
+    files = ((Path(model_path), model_url, os.getenv("KOKORO_MODEL_SHA256")),
+             (Path(voices_path), VOICES_URL, os.getenv("KOKORO_VOICES_SHA256")))
+    digests = {}
+    for path, url, expected in files:
+        if not path.exists() or path.stat().st_size == 0:
+            print(f"⚠️  {path} missing or empty. Downloading...")
+            download_file(url, path)
+            # A fresh download replaces whatever the old record described
+            path.with_name(path.name + ".sha256").unlink(missing_ok=True)
+        if path.exists():
+            digests[path.name] = verify_checksum(path, expected)
+    return digests
+
+
+class KokoroEngine:
+    """Lazily loaded pool of Kokoro sessions with a readiness state.
+
+    `start()` begins loading on a daemon thread and returns immediately;
+    `wait()` blocks until the pool is ready (starting the load if nobody
+    has yet). `create()` checks a session out of the pool for one line.
+    """
+
+    def __init__(self, model_path=None, voices_path=None, sessions=None,
+                 intra_op_threads=None, inter_op_threads=None, variant=None):
+        """
+        Args:
+            model_path, voices_path: Kokoro files (default: get_model_paths(variant))
+            sessions: Pool size, or "auto" to benchmark layouts at load time
+            intra_op_threads: Threads per session (0/None = CPUs / sessions)
+            inter_op_threads: Inter-op threads per session
+            variant: Model weights, "fp32", "fp16" or "int8" (default: KOKORO_MODEL_VARIANT)
+        """
+        self.variant = variant or get_model_variant()
+        if self.variant not in MODEL_VARIANTS:
+            raise TTSEngineError(f"Unknown Kokoro model variant '{self.variant}'")
+        self.model_url = f"{MODEL_RELEASE}/{MODEL_VARIANTS[self.variant]}"
+        self.checksums = {}
+        default_model, default_voices = get_model_paths(self.variant)
+        default_sessions, default_intra, default_inter = get_pool_config()
+        self.model_path = Path(model_path or default_model)
+        self.voices_path = Path(voices_path or default_voices)
+        self.version = engine_version(self.model_path)
+        self.requested_sessions = sessions or default_sessions
+        self.intra_op_threads = intra_op_threads if intra_op_threads is not None else default_intra
+        self.inter_op_threads = inter_op_threads or default_inter
+        self.sessions = 0
+        self.tuning = {}  # (sessions, intra, inter) -> RTF, filled by auto-tune
+        self.mmap_weights = get_mmap_weights()
+        self.session_model_path = self.model_path  # the mapped conversion once loaded
+        self.voices = None                         # shared MappedVoices once loaded
+        self.state = IDLE
+        self.error = None
+        self.load_ms = None
+        self._pool = queue.Queue()
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def start(self):
+        """Begin loading in the background (no-op if already started)."""
+        with self._lock:
+            if self.state == IDLE:
+                self.state = LOADING
+                self._thread = threading.Thread(target=self._load, name="kokoro-load", daemon=True)
+                self._thread.start()
+        return self
+
+    def _build(self, count, intra, inter):
+        from kokoro_onnx import Kokoro
+        mapped = self.session_model_path != self.model_path
+        instances = []
+        for _ in range(count):
+            kokoro = Kokoro.from_session(create_session(self.session_model_path, intra, inter, mapped=mapped),
+                                         str(self.voices_path))
+            if self.voices is not None:
+                # Every session reads styles from the one mapped table instead of its own zip
+                getattr(kokoro.voices, "close", lambda: None)()
+                kokoro.voices = self.voices
+            instances.append(kokoro)
+        return instances
+
+    def _map_weights(self):
+        """Switch to memory-mapped model and voices, converting them on first use."""
+        try:
+            self.session_model_path = prepare_mapped_model(self.model_path, self.checksums.get(self.model_path.name))
+            self.voices = prepare_mapped_voices(self.voices_path, self.checksums.get(self.voices_path.name))
+        except Exception as e:
+            voice_logger.warning(f"Loading Kokoro weights without memory mapping: {e}")
+            self.session_model_path, self.voices = self.model_path, None
+
+    def _autotune(self):
+        best, best_rtf = None, None
+        for layout in autotune_candidates():
+            instances = self._build(*layout)
+            measure_rtf(instances, rounds=1)  # first run pays graph init
+            rtf = measure_rtf(instances)
+            self.tuning[layout] = rtf
+            voice_logger.info(f"Kokoro auto-tune: {layout[0]} sessions x {layout[1]} threads -> RTF {rtf:.3f}")
+            if best_rtf is None or rtf < best_rtf:
+                best, best_rtf = (layout, instances), rtf
+        return best
+
+    def _load(self):
+        start_time = time.time()
+        try:
+            self.checksums = check_and_install_models(self.model_path, self.voices_path, self.model_url)
+            print("🔌 Loading Kokoro Model...")
+            if self.mmap_weights:
+                self._map_weights()
+            if self.requested_sessions == "auto":
+                (sessions, intra, inter), instances = self._autotune()
+            else:
+                sessions = int(self.requested_sessions)
+                intra = self.intra_op_threads or split_threads(sessions)
+                inter = self.inter_op_threads
+                instances = self._build(sessions, intra, inter)
+            for kokoro in instances:
+                self._pool.put(kokoro)
+            self.sessions, self.intra_op_threads, self.inter_op_threads = sessions, intra, inter
+            self.load_ms = (time.time() - start_time) * 1000
+            self.state = READY
+            print("✅ Local Kokoro TTS Ready.")
+            voice_logger.info(f"Kokoro ({self.variant}) loaded from {self.model_path} in {self.load_ms:.0f}ms: "
+                              f"{sessions} sessions x {intra} intra-op / {inter} inter-op threads")
+        except Exception as e:
+            print(f"❌ Critical Error loading Kokoro: {e}")
+            voice_logger.error(f"Kokoro failed to load from {self.model_path}: {e}")
+            self.error = e
+            self.state = FAILED
+        finally:
+            self._ready.set()
+
+    def wait(self, timeout=None):
+        """Block until the session pool is loaded.
+
+        Returns:
+            The engine itself
+
+        Raises:
+            TTSEngineError: if loading failed or did not finish within timeout
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TTSEngineError(f"Kokoro is still loading after {timeout}s")
+        if self.state == FAILED:
+            raise TTSEngineError(f"Kokoro failed to load: {self.error}")
+        return self
+
+    def create(self, text, voice, speed=1.0, lang="en-us"):
+        """Synthesize text on a free session, waiting for the model if it is still loading.
+
+        Returns:
+            Tuple of (samples, sample_rate)
+        """
+        return self.create_batch([text], voice, speed=speed, lang=lang)[0]
+
+    def create_batch(self, texts, voice, speed=1.0, lang="en-us"):
+        """Synthesize several texts in one voice on a single session.
+
+        The voice style is looked up once and all texts go through one
+        code-aware phonemization pass (cached code tokens skip G2P); each
+        text is then run through the session back to back.
+
+        Returns:
+            List of (samples, sample_rate), one per text
+        """
+        self.wait()
+        kokoro = self._pool.get()
+        try:
+            style = kokoro.get_voice_style(voice)
+            phonemes = phonemize_texts(texts, lang, lambda lines: phonemize_batch(kokoro, lines, lang))
+            return [kokoro.create(p, voice=style, speed=speed, lang=lang, is_phonemes=True) for p in phonemes]
+        finally:
+            self._pool.put(kokoro)
+
+    def warmup(self, voice="af_bella"):
+        """Run a tiny synthesis on every session so none of them starts cold."""
+        self.wait()
+        with ThreadPoolExecutor(max_workers=self.sessions) as executor:
+            list(executor.map(lambda _: self.create("Warming up.", voice=voice), range(self.sessions)))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide Kokoro engine (not started until needed)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = KokoroEngine()
+        return _engine
@@ -0,0 +1,317 @@
+"""
+Code-aware text normalization and phoneme caching for RepoRadio TTS.
+Hosts keep saying file paths, package names and identifiers ("package.json",
+"src/main.py", "useState") that espeak reads badly. This module finds those
+tokens, spells them out from a pronunciation lexicon (src/tts/lexicon.json),
+and caches each token's phonemes on disk so repeats skip G2P entirely.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+from debug_logger import voice_logger
+
+LEXICON_PATH = Path(__file__).parent / "lexicon.json"
+DEFAULT_PHONEME_CACHE = Path.home() / ".cache" / "reporadio" / "phonemes.json"
+
+# Code tokens: `backticked`, paths/dotted names/versions, dotfiles, snake_case,
+# camelCase and PascalCase-with-inner-capital; other words are checked
+# against the lexicon ("npm", "C++").
+TOKEN = re.compile(r"""
+    `(?P<tick>[^`\n]+)`
+  | (?P<code>[\w@~-]*\w(?:[./\\][\w@-]+)+/?
+           | (?<![\w.])\.[A-Za-z][\w-]*(?:[./][\w@-]+)*
+           | [A-Za-z0-9]+(?:_[A-Za-z0-9]+)+
+           | [a-z]+[A-Z][A-Za-z0-9]*
+           | [A-Z][a-z]+[A-Z][A-Za-z0-9]*)
+  | (?P<word>[A-Za-z][\w'+#]*)
+""", re.VERBOSE)
+# Only these dotted numbers are code; "3.50", "99.9%" and "5.30" are left for the engine
+VERSION = re.compile(r"v\d+(?:\.\d+)+|\d+(?:\.\d+){2,}", re.IGNORECASE)
+DOTTED_NUMBER = re.compile(r"v?\d+(?:\.\d+)+")
+DECIMAL = re.compile(r"\d+\.\d+[A-Za-z]*")
+# "U.S.", "p.m.": single letters with dots are prose, not code
+ABBREVIATION = re.compile(r"(?:[A-Za-z]\.)+[A-Za-z]\.?")
+VERSION_WORD_BEFORE = re.compile(r"\bversion\s+$", re.IGNORECASE)
+IDENTIFIER_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.!?;:…])")
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def load_lexicon(path=LEXICON_PATH):
+    """Read a lexicon file: {"words": {}, "extensions": {}, "phonemes": {}} (keys lowercase)."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    lexicon = {section: {k.lower(): v for k, v in data.get(section, {}).items()}
+               for section in ("words", "extensions", "phonemes")}
+    lexicon["version"] = hashlib.sha256(json.dumps(lexicon, sort_keys=True).encode()).hexdigest()[:12]
+    return lexicon
+
+
+def get_lexicon():
+    """Return the bundled lexicon (loaded once)."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = load_lexicon()
+        return _lexicon
+
+
+def lexicon_version():
+    """Short hash of the lexicon, part of TTS cache keys so edits re-render affected lines."""
+    return get_lexicon()["version"]
+
+
+def speak_identifier(name, lexicon):
+    """'node_modules' -> 'node modules', 'useState' -> 'use State', 'FastAPI' -> 'fast A P I'."""
+    words = lexicon["words"]
+    if name.lower() in words:
+        return words[name.lower()]
+    parts = IDENTIFIER_PART.findall(name)
+    return " ".join(words.get(part.lower(), part) for part in parts) or name
+
+
+def speak_token(token, lexicon=None):
+    """Spoken form of one code token.
+
+    Examples:
+        'src/main.py' -> 'source slash main dot pie'
+        'package.json' -> 'package dot jason'
+        'v1.2.3' -> 'version 1 point 2 point 3'
+    """
+    lexicon = lexicon or get_lexicon()
+    lower = token.lower()
+    if lower in lexicon["words"]:
+        return lexicon["words"][lower]
+    if DOTTED_NUMBER.fullmatch(lower):
+        prefix = "version " if lower.startswith("v") else ""
+        return prefix + " point ".join(lower.lstrip("v").split("."))
+
+    parts = re.split(r"([/\\.])", token.rstrip("/\\"))
+    spoken = []
+    for i, part in enumerate(parts):
+        if part in ("/", "\\"):
+            spoken.append("slash")
+        elif part == ".":
+            spoken.append("dot")
+        elif part:
+            is_extension = i == len(parts) - 1 and i > 0 and parts[i - 1] == "."
+            if is_extension and part.lower() in lexicon["extensions"]:
+                spoken.append(lexicon["extensions"][part.lower()])
+            else:
+                spoken.append(speak_identifier(part, lexicon))
+    return " ".join(spoken)
+
+
+def is_code_token(token):
+    """Whether a dotted match is code rather than a decimal, price or abbreviation."""
+    if DECIMAL.fullmatch(token) and not VERSION.fullmatch(token):
+        return False
+    return not ABBREVIATION.fullmatch(token)
+
+
+def iter_code_tokens(text, lexicon=None):
+    """Yield (start, end, token) for every code token in text.
+
+    start and end span the token as written (with backticks or an
+    abbreviation's final dot); token is what gets spoken, so a version's "v"
+    is dropped right after the word "version".
+    """
+    lexicon = lexicon or get_lexicon()
+    for match in TOKEN.finditer(text):
+        if match.group("word") and match.group("word").lower() not in lexicon["words"]:
+            continue
+        token, end = match.group("tick") or match.group(0), match.end()
+        # Abbreviations like "e.g." keep their final dot instead of ending a sentence
+        if not match.group("tick") and text[end:end + 1] == "." and f"{token}.".lower() in lexicon["words"]:
+            token, end = f"{token}.", end + 1
+        elif match.group("code") and token.lower() not in lexicon["words"] and not is_code_token(token):
+            continue
+        if token[:1] in "vV" and VERSION.fullmatch(token) and VERSION_WORD_BEFORE.search(text[:match.start()]):
+            token = token[1:]
+        yield match.start(), end, token
+
+
+def split_code_tokens(text, lexicon=None):
+    """Split text into plain runs and code tokens.
+
+    Returns:
+        List of (is_code, piece); code pieces are the tokens from iter_code_tokens
+    """
+    segments = []
+    position = 0
+    for start, end, token in iter_code_tokens(text, lexicon):
+        if start > position:
+            segments.append((False, text[position:start]))
+        segments.append((True, token))
+        position = end
+    if position < len(text):
+        segments.append((False, text[position:]))
+    return segments
+
+
+def spoken_offset(text, offset, lexicon=None):
+    """Where character `offset` of text falls in normalize_for_tts(text).
+
+    Inside a code token the offset is scaled to the token's spoken form.
+    """
+    lexicon = lexicon or get_lexicon()
+    shift = 0
+    for start, end, token in iter_code_tokens(text, lexicon):
+        if offset < start:
+            break
+        length = len(speak_token(token, lexicon))
+        if offset < end:
+            return start + shift + (offset - start) * length // (end - start)
+        shift += length - (end - start)
+    return offset + shift
+
+
+def normalize_for_tts(text, lexicon=None):
+    """Replace code tokens with their spoken form (for engines that take text, e.g. ElevenLabs)."""
+    lexicon = lexicon or get_lexicon()
+    return "".join(speak_token(piece, lexicon) if is_code else piece
+                   for is_code, piece in split_code_tokens(text, lexicon))
+
+
+class PhonemeCache:
+    """Persistent spoken-token -> phonemes map, stored as JSON.
+
+    Only code tokens are cached: their phonemes don't depend on context, and
+    they are what hosts repeat. Writes are batched through save().
+    """
+
+    def __init__(self, path=DEFAULT_PHONEME_CACHE, max_entries=50000):
+        """
+        Args:
+            path: JSON file (None = memory only)
+            max_entries: Stop adding new entries past this size
+        """
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.entries = None  # "lang|spoken" -> phonemes, loaded on first use
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                voice_logger.warning(f"Ignoring unreadable phoneme cache {self.path}: {e}")
+
+    def get(self, lang, spoken):
+        with self._lock:
+            self._load()
+            phonemes = self.entries.get(f"{lang}|{spoken}")
+            if phonemes is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return phonemes
+
+    def put(self, lang, spoken, phonemes):
+        with self._lock:
+            self._load()
+            if len(self.entries) < self.max_entries:
+                self.entries[f"{lang}|{spoken}"] = phonemes
+                self._dirty = True
+
+    def save(self):
+        """Write the cache if anything was added since the last save."""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            data = json.dumps(self.entries, ensure_ascii=False)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            partial = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.part")
+            partial.write_text(data, encoding="utf-8")
+            os.replace(partial, self.path)
+        except OSError as e:
+            voice_logger.warning(f"Could not save phoneme cache {self.path}: {e}")
+
+
+_phoneme_cache = None
+_phoneme_cache_lock = threading.Lock()
+
+
+def get_phoneme_cache():
+    """Return the process-wide phoneme cache (PHONEME_CACHE_PATH, empty = memory only)."""
+    global _phoneme_cache
+    with _phoneme_cache_lock:
+        if _phoneme_cache is None:
+            path = os.getenv("PHONEME_CACHE_PATH", str(DEFAULT_PHONEME_CACHE))
+            _phoneme_cache = PhonemeCache(path or None)
+        return _phoneme_cache
+
+
+def join_phonemes(parts):
+    """Join per-segment phonemes, keeping punctuation attached to the word before it."""
+    return SPACE_BEFORE_PUNCTUATION.sub(r"\1", " ".join(p.strip() for p in parts if p.strip()))
+
+
+def phonemize_texts(texts, lang, phonemize, cache=None, lexicon=None):
+    """Code-aware G2P for a batch of texts.
+
+    Plain runs and uncached code tokens are sent to `phonemize` in a single
+    call; code tokens use lexicon phoneme overrides or the persistent cache
+    when they can.
+
+    Args:
+        texts: Texts to phonemize
+        lang: espeak language, e.g. "en-us"
+        phonemize: Callable taking a list of strings and returning their phonemes
+        cache: PhonemeCache (default: get_phoneme_cache())
+        lexicon: Lexicon dict (default: bundled lexicon)
+
+    Returns:
+        List of phoneme strings, one per text
+    """
+    cache = cache or get_phoneme_cache()
+    lexicon = lexicon or get_lexicon()
+
+    plan = []        # per text: list of ("plain", index) / ("code", spoken)
+    plain_inputs = []
+    known = {}       # spoken -> phonemes already available
+    needed = []      # spoken forms to phonemize
+    for text in texts:
+        steps = []
+        for is_code, piece in split_code_tokens(text, lexicon):
+            if not is_code:
+                if piece.strip():
+                    steps.append(("plain", len(plain_inputs)))
+                    plain_inputs.append(piece.strip())
+                continue
+            spoken = speak_token(piece, lexicon)
+            steps.append(("code", spoken))
+            if spoken in known or spoken in needed:
+                continue
+            phonemes = lexicon["phonemes"].get(piece.lower()) or cache.get(lang, spoken)
+            if phonemes is None:
+                needed.append(spoken)
+            else:
+                known[spoken] = phonemes
+        plan.append(steps)
+
+    # phonemizer drops empty inputs, so only non-empty strings go in
+    outputs = phonemize(plain_inputs + needed) if plain_inputs or needed else []
+    for spoken, phonemes in zip(needed, outputs[len(plain_inputs):]):
+        known[spoken] = phonemes.strip()
+        cache.put(lang, spoken, phonemes.strip())
+    if needed:
+        cache.save()
+
+    return [join_phonemes(outputs[ref] if kind == "plain" else known[ref] for kind, ref in steps)
+            for steps in plan]
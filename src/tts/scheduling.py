@@ -0,0 +1,113 @@
+"""
+Length-aware TTS job planning for RepoRadio.
+Long lines are split at sentence boundaries into sub-jobs and all work is
+submitted longest-first, so one long monologue no longer sets the render's
+wall time. Sub-segments are stitched back with a short natural gap.
+"""
+import os
+import re
+from collections import namedtuple
+from pydub import AudioSegment
+
+# One unit of synthesis: part `part_index` of script line `line_index`
+RenderJob = namedtuple("RenderJob", ["line_index", "part_index", "text", "voice_id"])
+
+# Sentence ends: terminal punctuation (optionally closed by quotes/brackets) then whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+")
+
+
+def get_batch_size(provider):
+    """Lines per voice batch: KOKORO_BATCH_LINES for local TTS (default 8), 1 for cloud."""
+    if "Local" not in provider:
+        return 1
+    return max(1, int(os.getenv("KOKORO_BATCH_LINES", "8")))
+
+
+def get_split_config():
+    """Split length and stitch gap from the environment.
+
+    TTS_SPLIT_CHARS: lines longer than this are split (default 200, 0 = never)
+    TTS_SENTENCE_GAP_MS: silence between stitched parts (default 150)
+    """
+    return int(os.getenv("TTS_SPLIT_CHARS", "200")), int(os.getenv("TTS_SENTENCE_GAP_MS", "150"))
+
+
+def split_sentences(text, max_chars=200):
+    """Split text into chunks of whole sentences no longer than max_chars.
+
+    Sentences are packed greedily, so a line only splits where it has to; a
+    single sentence longer than max_chars is kept whole rather than cut
+    mid-clause.
+
+    Returns:
+        List of chunks (just [text] for short lines)
+    """
+    text = text.strip()
+    if not max_chars or len(text) <= max_chars:
+        return [text] if text else []
+
+    chunks = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def plan_render_jobs(lines, max_chars=200):
+    """Turn prepared lines into sub-jobs ordered longest-first.
+
+    Args:
+        lines: Iterable of (line_index, text, voice_id)
+        max_chars: Split threshold passed to split_sentences
+
+    Returns:
+        Tuple of (jobs, part_counts) where part_counts maps line_index to the
+        number of parts that line was split into
+    """
+    jobs = []
+    part_counts = {}
+    for line_index, text, voice_id in lines:
+        chunks = split_sentences(text, max_chars)
+        part_counts[line_index] = len(chunks)
+        jobs.extend(RenderJob(line_index, part, chunk, voice_id) for part, chunk in enumerate(chunks))
+    # Longest processing time first: big jobs start early, short ones fill the gaps
+    jobs.sort(key=lambda job: len(job.text), reverse=True)
+    return jobs, part_counts
+
+
+def group_jobs_by_voice(jobs, batch_size=8, workers=1):
+    """Pack jobs into same-voice batches for Engine.create_batch.
+
+    Jobs keep their longest-first order inside each voice. Batches are capped
+    at batch_size and shrunk if needed so there are at least `workers` units
+    of work, then ordered by total text length, longest first.
+
+    Returns:
+        List of job lists
+    """
+    by_voice = {}
+    for job in jobs:
+        by_voice.setdefault(job.voice_id, []).append(job)
+
+    # Don't batch so coarsely that workers sit idle
+    size = max(1, min(batch_size, -(-len(jobs) // max(1, workers))))
+    batches = [group[i:i + size] for group in by_voice.values() for i in range(0, len(group), size)]
+    batches.sort(key=lambda batch: sum(len(job.text) for job in batch), reverse=True)
+    return batches
+
+
+def stitch_segments(segments, gap_ms=150):
+    """Join the rendered parts of one line with a short pause between sentences."""
+    combined = segments[0]
+    for segment in segments[1:]:
+        combined += AudioSegment.silent(duration=gap_ms, frame_rate=combined.frame_rate) + segment
+    return combined
@@ -0,0 +1,283 @@
+"""
+Memory-mapped Kokoro weights for RepoRadio.
+Loaded the usual way, every ONNX session copies the model's weights into
+private memory and every Kokoro instance reads voices-v1.0.bin (a zip) on its
+own, so N sessions or N worker processes hold N copies of the same bytes.
+
+Here both are converted once into files that are only ever mapped read-only:
+
+    <model dir>/mmap/kokoro-v1.0.<sha>.onnx      graph with initializers marked external
+    <model dir>/mmap/kokoro-v1.0.<sha>.weights   the initializers, 64KB aligned
+    <model dir>/mmap/voices-v1.0.<sha>.npy       every voice style in one table
+    <model dir>/mmap/voices-v1.0.<sha>.json      voice name -> row
+
+ONNX Runtime maps aligned external initializers straight from the file, and
+with weight pre-packing off (pre-packing copies weights into a private layout)
+it computes on those pages. Voices are a read-only np.load(mmap_mode="r").
+All sessions and worker processes on a host then share one copy of each in
+the page cache; what a worker adds on top is the interpreter, ONNX Runtime
+and activations (measured on a synthetic MatMul model by
+tests/test_tts_weights.py, not on Kokoro).
+
+Without pre-packing every MatMul runs on the unpacked layout, about 2x slower
+on that synthetic model (benchmarks/bench_mmap_weights.py --synthetic, one
+thread), so mapping is opt-in: worth it only when memory, not speed, limits
+how many sessions or workers fit on a host. Run the benchmark without
+--synthetic to measure the real-time-factor cost on kokoro-v1.0.onnx.
+
+Only as much of the protobuf wire format as the ONNX graph needs is handled,
+so the onnx package isn't required.
+"""
+import os
+import json
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+import numpy as np
+from debug_logger import voice_logger
+
+# ONNX Runtime maps external data only at allocation-granularity offsets (64KB on Windows, a page elsewhere)
+ALIGNMENT = 65536
+MIN_EXTERNAL_BYTES = 1024
+
+# Field numbers from onnx.proto
+MODEL_GRAPH = 7
+GRAPH_INITIALIZER = 5
+TENSOR_RAW_DATA = 9
+TENSOR_EXTERNAL_DATA = 13
+TENSOR_DATA_LOCATION = 14
+DATA_LOCATION_EXTERNAL = 1
+
+
+def get_mmap_weights():
+    """KOKORO_MMAP_WEIGHTS: share model and voice weights through memory-mapped files (default off)."""
+    return os.getenv("KOKORO_MMAP_WEIGHTS", "0").strip().lower() not in ("0", "false", "no", "off")
+
+
+def read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_field(number, value):
+    """One protobuf field: varint for ints, length-delimited for bytes."""
+    if isinstance(value, int):
+        return encode_varint(number << 3) + encode_varint(value)
+    return encode_varint(number << 3 | 2) + encode_varint(len(value)) + bytes(value)
+
+
+def iter_fields(buf):
+    """Yield (field number, value, raw bytes of the whole field) for a protobuf message."""
+    pos = 0
+    while pos < len(buf):
+        start = pos
+        key, pos = read_varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type in (1, 5):
+            size = 8 if wire_type == 1 else 4
+            value = buf[pos:pos + size]
+            pos += size
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield number, value, buf[start:pos]
+
+
+def externalize_initializers(model_path, out_path, data_path, location=None, min_bytes=MIN_EXTERNAL_BYTES):
+    """
+    Rewrite an ONNX model so its large initializers live in a separate, aligned data file.
+
+    Args:
+        model_path: Source .onnx with embedded weights
+        out_path: Model to write
+        data_path: Weights file to write
+        location: Data file name recorded in the model, relative to it (default: data_path's name)
+        min_bytes: Smaller initializers stay in the model
+
+    Returns:
+        Dict with tensors and bytes moved
+    """
+    data_path = Path(data_path)
+    location = location or data_path.name
+    with open(model_path, "rb") as f:
+        model = memoryview(f.read())
+    moved = {"tensors": 0, "bytes": 0}
+
+    with open(data_path, "wb") as data:
+        def tensor(message):
+            raw = next((value for number, value, _ in iter_fields(message) if number == TENSOR_RAW_DATA), None)
+            if raw is None or len(raw) < min_bytes:
+                return bytes(message)
+            offset = data.seek(0, os.SEEK_END)
+            offset += data.write(b"\0" * (-offset % ALIGNMENT))
+            data.write(raw)
+            kept = b"".join(bytes(field) for number, _, field in iter_fields(message)
+                            if number not in (TENSOR_RAW_DATA, TENSOR_EXTERNAL_DATA, TENSOR_DATA_LOCATION))
+            entries = (("location", location), ("offset", str(offset)), ("length", str(len(raw))))
+            moved["tensors"] += 1
+            moved["bytes"] += len(raw)
+            return (kept + b"".join(encode_field(TENSOR_EXTERNAL_DATA, encode_field(1, k.encode()) + encode_field(2, v.encode()))
+                                    for k, v in entries)
+                    + encode_field(TENSOR_DATA_LOCATION, DATA_LOCATION_EXTERNAL))
+
+        def graph(message):
+            return b"".join(encode_field(GRAPH_INITIALIZER, tensor(value)) if number == GRAPH_INITIALIZER else bytes(field)
+                            for number, value, field in iter_fields(message))
+
+        rewritten = b"".join(encode_field(MODEL_GRAPH, graph(value)) if number == MODEL_GRAPH else bytes(field)
+                             for number, value, field in iter_fields(model))
+    Path(out_path).write_bytes(rewritten)
+    return moved
+
+
+def mapped_dir(path):
+    return Path(path).parent / "mmap"
+
+
+def _stem(path, digest):
+    """Converted files are named after the source's digest, or its size and mtime if there is none."""
+    path = Path(path)
+    if not digest:
+        stat = path.stat()
+        digest = f"{stat.st_size:x}{stat.st_mtime_ns:x}"[-12:]
+    return mapped_dir(path) / f"{path.stem}.{digest[:12]}"
+
+
+_convert_lock = threading.Lock()
+
+
+def _publish(files):
+    """Move finished .part files into place, data files before the one that refers to them."""
+    for partial, path in files:
+        os.replace(partial, path)
+
+
+def prepare_mapped_model(model_path, digest=None):
+    """
+    The model with its weights in a mappable file, converting it on first use.
+
+    Args:
+        model_path: Kokoro .onnx
+        digest: Its sha256 (engine.verify_checksum), so a new model gets a new conversion
+
+    Returns:
+        Path of the converted .onnx (its .weights file sits next to it)
+    """
+    stem = _stem(model_path, digest)
+    out_path, data_path = stem.with_name(stem.name + ".onnx"), stem.with_name(stem.name + ".weights")
+    with _convert_lock:
+        if out_path.exists() and data_path.exists():
+            return out_path
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.part"
+        partial_model = out_path.with_name(out_path.name + suffix)
+        partial_data = data_path.with_name(data_path.name + suffix)
+        try:
+            moved = externalize_initializers(model_path, partial_model, partial_data, location=data_path.name)
+            _publish([(partial_data, data_path), (partial_model, out_path)])
+        finally:
+            partial_model.unlink(missing_ok=True)
+            partial_data.unlink(missing_ok=True)
+    voice_logger.info(f"Moved {moved['tensors']} Kokoro initializers ({moved['bytes'] / 1e6:.0f}MB) "
+                      f"into mappable {data_path.name}")
+    return out_path
+
+
+class MappedVoices(Mapping):
+    """Voice name -> style array, all rows of one read-only memory-mapped table."""
+
+    def __init__(self, table, names):
+        self.table = table
+        self.rows = {name: i for i, name in enumerate(names)}
+
+    def __getitem__(self, name):
+        return self.table[self.rows[name]]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def prepare_mapped_voices(voices_path, digest=None):
+    """
+    Kokoro's voices as one memory-mapped table, converting voices-v1.0.bin on first use.
+
+    Returns:
+        MappedVoices, usable wherever kokoro_onnx expects its voices dict
+    """
+    stem = _stem(voices_path, digest)
+    table_path, names_path = stem.with_name(stem.name + ".npy"), stem.with_name(stem.name + ".json")
+    with _convert_lock:
+        if not (table_path.exists() and names_path.exists()):
+            table_path.parent.mkdir(parents=True, exist_ok=True)
+            with np.load(voices_path) as voices:
+                names = sorted(voices.files)
+                first = voices[names[0]]
+                suffix = f".{os.getpid()}.part"
+                partial_table = table_path.with_name(table_path.name + suffix)
+                partial_names = names_path.with_name(names_path.name + suffix)
+                table = np.lib.format.open_memmap(partial_table, mode="w+", dtype=first.dtype,
+                                                  shape=(len(names),) + first.shape)
+                for i, name in enumerate(names):
+                    table[i] = voices[name]
+                table.flush()
+                del table
+            partial_names.write_text(json.dumps(names))
+            _publish([(partial_table, table_path), (partial_names, names_path)])
+            voice_logger.info(f"Converted {len(names)} Kokoro voices into mappable {table_path.name}")
+    return MappedVoices(np.load(table_path, mmap_mode="r"), json.loads(names_path.read_text()))
+
+
+def mapped_rss(path_fragment=None):
+    """
+    This process's memory from /proc/self/smaps, in MB (Linux only).
+
+    Args:
+        path_fragment: Only count mappings whose path contains this (None = everything)
+
+    Returns:
+        Dict with rss, shared (pages other processes map too) and private, or None off Linux
+    """
+    try:
+        with open("/proc/self/smaps") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    totals = {"Rss": 0, "Shared_Clean": 0, "Shared_Dirty": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    counting = path_fragment is None
+    for line in lines:
+        parts = line.split()
+        if parts and "-" in parts[0] and not parts[0].endswith(":"):
+            counting = path_fragment is None or (len(parts) > 5 and path_fragment in parts[-1])
+        elif counting and parts and parts[0].rstrip(":") in totals:
+            totals[parts[0].rstrip(":")] += int(parts[1])
+    return {
+        "rss": totals["Rss"] / 1024,
+        "shared": (totals["Shared_Clean"] + totals["Shared_Dirty"]) / 1024,
+        "private": (totals["Private_Clean"] + totals["Private_Dirty"]) / 1024,
+    }
@@ -1,123 +1,117 @@
 import os
-import requests
-import soundfile as sf
+import numpy as np
 import time
-from kokoro_onnx import Kokoro
-from elevenlabs import ElevenLabs, save
 from pydub import AudioSegment
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from debug_logger import voice_logger, log_elevenlabs_request, log_elevenlabs_response, log_elevenlabs_error, log_audio_rendering
-from audio.mixer import overlay_background_music, add_crossfade_between_segments, add_intro_outro
+from debug_logger import voice_logger, log_audio_rendering
+from character_registry import get_registry
+from tts.engine import get_engine, TTSEngineError
+from tts.daemon import DaemonUnavailableError, get_daemon_client
+from tts.cloud import get_cloud_tts
+from tts.cache import get_segment_cache, segment_key, format_cache_stats
+from tts.normalize import normalize_for_tts, lexicon_version
+from tts.catalog import BUILD_CHUNK_LINES, AdCatalog, catalog_fingerprint, get_ad_catalog, get_catalog_dir
+from tts.scheduling import get_split_config, get_batch_size, split_sentences, plan_render_jobs, group_jobs_by_voice, stitch_segments
+from tts.alignment import line_alignment
+from audio.bank import get_asset_bank
+from audio.effects import add_sfx_to_timeline
+from audio.encode import OUTPUT_FORMATS, encode_stream, format_encode_report, get_output_formats
+from audio.mixer import plan_timeline, stream_episode, load_background_music, load_jingles
+from audio.project import EpisodeProject
 
-# URLs for the models
-MODEL_URL = "https://github.com/thewh1teagle/kokoro-onnx/releases/download/model-files-v1.0/kokoro-v1.0.onnx"
-VOICES_URL = "https://github.com/thewh1teagle/kokoro-onnx/releases/download/model-files-v1.0/voices-v1.0.bin"
-MODEL_FILE = "kokoro-v1.0.onnx"
-VOICES_FILE = "voices-v1.0.bin"
-
-def download_file(url, filename):
-    print(f"⬇️  Downloading {filename}...")
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with open(filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"✅ Downloaded {filename}")
-    except Exception as e:
-        print(f"❌ Failed to download {filename}: {e}")
-        # Delete partial file so we try again next time
-        if os.path.exists(filename):
-            os.remove(filename)
-
-def check_and_install_models():
-    """Checks if models exist and are valid (not empty)."""
+def get_voice_id(character_name, provider):
+    character = get_registry().resolve(character_name)
+    if character is None:
+        return "af_bella"
     
-    # Check Model File
-    if not os.path.exists(MODEL_FILE) or os.path.getsize(MODEL_FILE) == 0:
-        print(f"⚠️  {MODEL_FILE} missing or empty. Downloading...")
-        download_file(MODEL_URL, MODEL_FILE)
-
-    # Check Voices File
-    if not os.path.exists(VOICES_FILE) or os.path.getsize(VOICES_FILE) == 0:
-        print(f"⚠️  {VOICES_FILE} missing or empty. Downloading...")
-        download_file(VOICES_URL, VOICES_FILE)
-
-# Run check immediately
-check_and_install_models()
-
-# Initialize Kokoro
-try:
-    print("🔌 Loading Kokoro Model...")
-    kokoro = Kokoro(MODEL_FILE, VOICES_FILE)
-    print("✅ Local Kokoro TTS Ready.")
-except Exception as e:
-    print(f"❌ Critical Error loading Kokoro: {e}")
-    kokoro = None
+    if "Local" in provider:
+        return character.get("kokoro_voice", "af_bella")
+    else:
+        return character.get("elevenlabs_voice", "JBFqnCBsd6RMkjVDRZzb")
 
-# ... [Keep your existing helper functions below] ...
+def get_local_tts():
+    """The shared TTS daemon if one answers (tts/daemon.py), else the in-process Kokoro engine.
+    
+    Both offer version, wait(), create(), create_batch() and warmup().
+    """
+    client = get_daemon_client()
+    if client is not None and client.available():
+        return client
+    return get_engine()
 
-def get_voice_id(character_name, provider):
-    try:
-        clean_name = character_name.split(" ")[0].lower()
-        # PATH FIX: src/characters/
-        filename = f"src/characters/{clean_name}.json" 
-        
-        with open(filename, "r") as f:
-            data = json.load(f)
-            
-        if "Local" in provider:
-            return data.get("kokoro_voice", "af_bella")
-        else:
-            return data.get("elevenlabs_voice", "JBFqnCBsd6RMkjVDRZzb")
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
-        return "af_bella"
+def get_tts(provider):
+    """The TTS backend for a provider: get_local_tts() or the shared ElevenLabs client.
+    
+    A render resolves this once and passes it down, so its lines, cache keys
+    and worker count all come from the same backend.
+    """
+    return get_local_tts() if "Local" in provider else get_cloud_tts()
 
-def get_transition_sound():
-    """Load a random transition sound from music/transitions/ folder.
+def warmup_tts(provider, voice_id="af_bella"):
+    """Run a tiny synthesis so the first real line doesn't pay ONNX init/page-in cost.
+    
+    Args:
+        provider: Voice provider string (only local providers are warmed)
+        voice_id: Kokoro voice to exercise
     
     Returns:
-        AudioSegment or None if no transition sounds available
+        Warmup time in ms, or None if there was nothing to warm
     """
-    from pathlib import Path
-    import random
-    
-    transitions_dir = Path("src/music/transitions")
-    if not transitions_dir.exists():
-        voice_logger.debug("Transitions directory not found")
+    if "Local" not in provider:
         return None
     
-    transition_files = list(transitions_dir.glob("*.wav")) + list(transitions_dir.glob("*.mp3")) + list(transitions_dir.glob("*.ogg"))
-    if not transition_files:
-        voice_logger.debug("No transition sound files found")
-        return None
+    # Loading the model is part of the cold start being measured
+    start_time = time.time()
+    get_local_tts().warmup(voice_id)
+    duration_ms = (time.time() - start_time) * 1000
+    voice_logger.info(f"Kokoro warmup ({voice_id}) took {duration_ms:.0f}ms")
+    return duration_ms
+
+def get_transition_sound():
+    """Pick a random transition sound (music/transitions/, preloaded in the asset bank).
     
-    try:
-        transition_path = random.choice(transition_files)
-        transition = AudioSegment.from_file(str(transition_path))
-        voice_logger.debug(f"Loaded transition: {transition_path.name}")
-        return transition
-    except Exception as e:
-        voice_logger.warning(f"Failed to load transition sound: {str(e)}")
-        return None
+    Returns:
+        AudioBuffer or None if no transition sounds available
+    """
+    return pick_asset("transitions")[1]
+
+def pick_asset(category, recorded=None):
+    """An asset recorded by an earlier render if it is still there, else a random one.
     
-def render_audio_line(line_index, line_data, provider):
-    """Render a single line of audio. Used for parallel processing.
+    Returns:
+        Tuple of (path, AudioBuffer), or (None, None) if the category is empty
+    """
+    bank = get_asset_bank()
+    if recorded:
+        audio = bank.load_file(recorded)
+        if audio is not None:
+            return recorded, audio
+    path = bank.choice(category)
+    audio = bank.load_file(path) if path else None
+    return (str(path), audio) if audio is not None else (None, None)
+
+def samples_to_segment(samples, sample_rate):
+    """Wrap Kokoro's float samples as an in-memory 16-bit mono AudioSegment.
     
-    Args:
-        line_index: Index of the line in the script
-        line_data: Dict with 'speaker' and 'text' fields
-        provider: Voice provider string
+    Matches what writing a WAV with soundfile produced (PCM_16), without
+    the temp file round trip.
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    return AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=int(sample_rate), channels=1)
+
+def prepare_line(line_index, line_data, provider):
+    """Validate a script line and resolve its voice.
     
     Returns:
-        Tuple of (line_index, audio_segment) or (line_index, None) on error
+        Tuple of (speaker, text, voice_id), or None if the line can't be rendered
     """
     # Validate line is a dict
     if not isinstance(line_data, dict):
         voice_logger.warning(f"Line {line_index}: expected dict, got {type(line_data)}")
         print(f"⚠️ Skipping line {line_index}: expected dict, got {type(line_data)}")
-        return (line_index, None)
+        return None
     
     speaker = line_data.get("speaker", "System")
     text = line_data.get("text", "")
@@ -128,92 +122,415 @@ def render_audio_line(line_index, line_data, provider):
     if not text:
         voice_logger.warning(f"Line {line_index}: no text content")
         print(f"⚠️ Skipping line {line_index}: no text content")
-        return (line_index, None)
+        return None
     
     voice_id = get_voice_id(speaker, provider)
     print(f"   🎙️ {speaker}: {text[:50]}...")
     voice_logger.debug(f"Line {line_index} - {speaker} (voice_id={voice_id}): {text[:100]}...")
+    return speaker, text, voice_id
+
+def get_tts_version(provider, tts=None):
+    """Everything besides the text that changes rendered audio: engine/model and lexicon.
     
-    filename = f"temp_{line_index}_{time.time()}.wav"
+    Args:
+        provider: Voice provider string
+        tts: The render's backend (default: get_tts(provider))
+    """
+    tts = get_tts(provider) if tts is None else tts
+    return f"{tts.version}+lexicon:{lexicon_version()}"
+
+def synthesize_text(text, voice_id, provider, speaker="System", tts=None):
+    """Synthesize one piece of text, using the segment cache when possible.
     
-    try:
-        start_time = time.time()
-        
-        if "Local" in provider:
-            samples, sample_rate = kokoro.create(text, voice=voice_id, speed=1.0, lang="en-us")
-            sf.write(filename, samples, sample_rate)
-            duration_ms = (time.time() - start_time) * 1000
-            log_audio_rendering(speaker, filename, duration_ms)
-            voice_logger.debug(f"Kokoro rendered {speaker}: {len(samples)} samples @ {sample_rate}Hz")
-        else:
-            client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
-            log_elevenlabs_request(text, voice_id)
-            audio_gen = client.generate(text=text, voice=voice_id, model="eleven_turbo_v2")
-            save(audio_gen, filename)
-            duration_ms = (time.time() - start_time) * 1000
-            file_size = os.path.getsize(filename)
-            log_elevenlabs_response(filename, file_size)
-            log_audio_rendering(speaker, filename, duration_ms)
-            voice_logger.debug(f"ElevenLabs rendered {speaker}: {file_size} bytes")
+    Args:
+        tts: The render's backend (default: get_tts(provider))
+    
+    Returns:
+        AudioSegment
+    
+    Raises:
+        Exception: whatever the TTS provider raised
+    """
+    tts = get_tts(provider) if tts is None else tts
+    cache = get_segment_cache()
+    key = segment_key(provider, voice_id, text, speed=1.0, lang="en-us", engine_version=get_tts_version(provider, tts))
+    segment = cache.get(key)
+    if segment is not None:
+        voice_logger.debug(f"{speaker}: TTS cache hit ({key[:12]})")
+        return segment
+    
+    start_time = time.time()
+    
+    if "Local" in provider:
+        samples, sample_rate = tts.create(text, voice=voice_id, speed=1.0, lang="en-us")
+        segment = samples_to_segment(samples, sample_rate)
+        duration_ms = (time.time() - start_time) * 1000
+        log_audio_rendering(speaker, "<memory>", duration_ms)
+        voice_logger.debug(f"Kokoro rendered {speaker}: {len(samples)} samples @ {sample_rate}Hz")
+    else:
+        # Kokoro handles code tokens in its phonemizer; ElevenLabs gets them spelled out
+        segment = tts.synthesize(normalize_for_tts(text), voice_id, speaker)
+        log_audio_rendering(speaker, "<memory>", (time.time() - start_time) * 1000)
+    
+    cache.put(key, segment)
+    return segment
 
-        if os.path.exists(filename):
-            segment = AudioSegment.from_wav(filename)
-            os.remove(filename)
-            return (line_index, segment)
-        else:
-            return (line_index, None)
-            
+def synthesize_batch(texts, voice_id, provider, speaker="System", tts=None):
+    """Synthesize several texts in one Kokoro voice, skipping cached ones.
+    
+    Args:
+        tts: The render's backend (default: get_tts(provider))
+    
+    Returns:
+        List of AudioSegments in the order of texts
+    
+    Raises:
+        Exception: whatever the engine raised
+    """
+    cache = get_segment_cache()
+    engine = get_tts(provider) if tts is None else tts
+    version = get_tts_version(provider, engine)
+    keys = [segment_key(provider, voice_id, text, speed=1.0, lang="en-us", engine_version=version) for text in texts]
+    segments = [cache.get(key) for key in keys]
+    missing = [i for i, segment in enumerate(segments) if segment is None]
+    if not missing:
+        return segments
+    
+    start_time = time.time()
+    results = engine.create_batch([texts[i] for i in missing], voice=voice_id, speed=1.0, lang="en-us")
+    for i, (samples, sample_rate) in zip(missing, results):
+        segments[i] = samples_to_segment(samples, sample_rate)
+        cache.put(keys[i], segments[i])
+    duration_ms = (time.time() - start_time) * 1000
+    log_audio_rendering(speaker, "<memory>", duration_ms)
+    voice_logger.debug(f"Kokoro batch-rendered {len(missing)} texts for {voice_id} in {duration_ms:.0f}ms")
+    return segments
+
+def stitch_line(text, chunks, segments, gap_ms):
+    """Stitch a line's rendered parts and attach when each part of its text is spoken (tts/alignment.py).
+    
+    Returns:
+        AudioSegment with .alignment
+    """
+    line = stitch_segments(segments, gap_ms)
+    line.alignment = line_alignment(text, chunks, segments, gap_ms)
+    return line
+
+def render_audio_line(line_index, line_data, provider, tts=None):
+    """Render a single line of audio, sentence by sentence if it is long.
+    
+    Args:
+        line_index: Index of the line in the script
+        line_data: Dict with 'speaker' and 'text' fields
+        provider: Voice provider string
+        tts: The render's backend (default: get_tts(provider))
+    
+    Returns:
+        Tuple of (line_index, audio_segment) or (line_index, None) on error
+    """
+    prepared = prepare_line(line_index, line_data, provider)
+    if prepared is None:
+        return (line_index, None)
+    speaker, text, voice_id = prepared
+    max_chars, gap_ms = get_split_config()
+    
+    try:
+        chunks = split_sentences(text, max_chars)
+        tts = get_tts(provider) if tts is None else tts
+        parts = [synthesize_text(chunk, voice_id, provider, speaker, tts=tts) for chunk in chunks]
+        return (line_index, stitch_line(text, chunks, parts, gap_ms))
     except Exception as e:
         voice_logger.error(f"Line {line_index}: {str(e)}")
         print(f"⚠️ Error rendering line {line_index}: {e}")
-        # Clean up temp file if it exists
-        if os.path.exists(filename):
-            os.remove(filename)
         return (line_index, None)
 
+def render_script_lines(script, provider, max_workers, prepared=None, tts=None):
+    """Render every line of a script in parallel, longest work first.
+    
+    Long lines are split into sentence sub-jobs so they spread across workers
+    instead of setting the wall time on their own; parts are stitched back in
+    order. A line with any failed part is dropped, like a failed line. Ad lines
+    found in the pre-rendered ad catalog (tts/catalog.py) skip TTS.
+    
+    Args:
+        prepared: Dict of line_index -> prepare_line() result to render (default: every line)
+        tts: The render's backend (default: get_tts(provider))
+    
+    Returns:
+        Dict of line_index -> AudioSegment for lines that rendered
+    
+    Raises:
+        DaemonUnavailableError: If the TTS daemon stops answering; the render
+            stops rather than loading Kokoro in-process
+    """
+    tts = get_tts(provider) if tts is None else tts
+    if prepared is None:
+        prepared = {}
+        for i, line in enumerate(script):
+            result = prepare_line(i, line, provider)
+            if result is not None:
+                prepared[i] = result
+    
+    catalog_hits = {}
+    ad_lines = [i for i in prepared if script and isinstance(script[i], dict) and script[i].get("type") == "ad"]
+    if ad_lines:
+        catalog = get_ad_catalog(provider, ad_catalog_fingerprint(provider, tts))
+        for i in ad_lines:
+            segment = catalog.get(line_stem_key(prepared[i][1], prepared[i][2], provider, tts))
+            if segment is not None:
+                catalog_hits[i] = segment
+        if catalog_hits:
+            print(f"   📢 {len(catalog_hits)} ad lines from the catalog")
+            voice_logger.info(f"Ad catalog: {len(catalog_hits)}/{len(ad_lines)} ad lines pre-rendered")
+        prepared = {i: result for i, result in prepared.items() if i not in catalog_hits}
+    
+    max_chars, gap_ms = get_split_config()
+    jobs, part_counts = plan_render_jobs(
+        ((i, text, voice_id) for i, (_, text, voice_id) in prepared.items()), max_chars
+    )
+    split_lines = sum(1 for count in part_counts.values() if count > 1)
+    voice_logger.info(f"Planned {len(jobs)} TTS jobs for {len(prepared)} lines ({split_lines} split at sentences)")
+    
+    parts = {i: [None] * count for i, count in part_counts.items()}
+    chunks = {i: [None] * count for i, count in part_counts.items()}
+    for job in jobs:
+        chunks[job.line_index][job.part_index] = job.text
+    failed = set()
+    
+    batch_size = get_batch_size(provider)
+    if batch_size > 1:
+        units = group_jobs_by_voice(jobs, batch_size, workers=max_workers)
+        voice_logger.info(f"Batched {len(jobs)} TTS jobs into {len(units)} same-voice batches")
+    else:
+        units = [[job] for job in jobs]
+    
+    def run(unit):
+        speaker = prepared[unit[0].line_index][0]
+        if len(unit) == 1:
+            return [synthesize_text(unit[0].text, unit[0].voice_id, provider, speaker, tts=tts)]
+        try:
+            return synthesize_batch([job.text for job in unit], unit[0].voice_id, provider, speaker, tts=tts)
+        except DaemonUnavailableError:
+            raise
+        except Exception as e:
+            # One bad line shouldn't sink the batch; retry each on its own
+            voice_logger.warning(f"Batch of {len(unit)} failed ({e}); rendering lines individually")
+            results = []
+            for job in unit:
+                try:
+                    results.append(synthesize_text(job.text, job.voice_id, provider, prepared[job.line_index][0], tts=tts))
+                except DaemonUnavailableError:
+                    raise
+                except Exception as line_error:
+                    results.append(line_error)
+            return results
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Units are already sorted longest-first; the pool starts them in that order
+        future_to_unit = {executor.submit(run, unit): unit for unit in units}
+        
+        for future in as_completed(future_to_unit):
+            unit = future_to_unit[future]
+            try:
+                results = future.result()
+            except DaemonUnavailableError:
+                for pending in future_to_unit:
+                    pending.cancel()
+                raise
+            except Exception as e:
+                results = [e] * len(unit)
+            for job, result in zip(unit, results):
+                if isinstance(result, Exception):
+                    failed.add(job.line_index)
+                    voice_logger.error(f"Line {job.line_index} part {job.part_index}: {str(result)}")
+                    print(f"⚠️ Error rendering line {job.line_index}: {result}")
+                else:
+                    parts[job.line_index][job.part_index] = result
+    
+    rendered = {i: stitch_line(prepared[i][1], chunks[i], segments, gap_ms)
+                for i, segments in parts.items() if i not in failed}
+    rendered.update(catalog_hits)
+    return rendered
+
+
+def line_stem_key(text, voice_id, provider, tts=None):
+    """Project stem key of a whole line: its TTS cache key plus the sentence-split settings."""
+    max_chars, gap_ms = get_split_config()
+    return segment_key(provider, voice_id, text, speed=1.0, lang="en-us",
+                       engine_version=f"{get_tts_version(provider, tts)}+split:{max_chars}:{gap_ms}")
+
+def ad_catalog_voices(provider):
+    """Voice id -> a speaker using it, for every host character (the voices ads are pre-rendered in)."""
+    voices = {}
+    for name in get_registry().all():
+        voices.setdefault(get_voice_id(name, provider), name)
+    return dict(sorted(voices.items()))
 
-def render_audio(script, provider="Local (Kokoro)", max_workers=4, enable_music=False, enable_jingles=False, crossfade=True):
+def ad_catalog_fingerprint(provider, tts=None):
+    return catalog_fingerprint(provider, get_tts_version(provider, tts), ad_catalog_voices(provider))
+
+def build_ad_catalog(provider, packages=None, directory=None, max_workers=None):
+    """Pre-render every sponsor ad text in every host voice (tts/catalog.py).
+    
+    Entries already present from an earlier build are kept; entries the
+    templates no longer produce are deleted.
+    
+    Args:
+        provider: Voice provider string
+        packages: Packages to expand generic templates for (default: ads.COMMON_PACKAGES)
+        directory: Catalog directory (default: AD_CATALOG_DIR/<provider>)
+        max_workers: Parallel TTS workers (default: get_render_workers)
+    
+    Returns:
+        Dict with lines, rendered, reused, failed and seconds
+    """
+    from ads import COMMON_PACKAGES, expand_ad_texts
+    start_time = time.time()
+    tts = get_tts(provider)
+    voices = ad_catalog_voices(provider)
+    texts = expand_ad_texts(COMMON_PACKAGES if packages is None else packages)
+    catalog = AdCatalog(directory or get_catalog_dir(provider),
+                        catalog_fingerprint(provider, get_tts_version(provider, tts), voices))
+    
+    # (speaker, text, voice_id) like prepare_line, without printing every line
+    lines = [(speaker, text, voice_id) for voice_id, speaker in voices.items() for text in texts]
+    keys = [line_stem_key(text, voice_id, provider, tts) for _, text, voice_id in lines]
+    todo = [i for i, key in enumerate(keys) if not catalog.has_file(key)]
+    print(f"📢 Ad catalog: {len(texts)} texts x {len(voices)} voices, {len(todo)} lines to render")
+    
+    failed = set()
+    max_workers = max_workers or get_render_workers(provider, tts)
+    for chunk_start in range(0, len(todo), BUILD_CHUNK_LINES):
+        chunk = todo[chunk_start:chunk_start + BUILD_CHUNK_LINES]
+        rendered = render_script_lines(None, provider, max_workers, prepared={i: lines[i] for i in chunk}, tts=tts)
+        for i in chunk:
+            if i in rendered:
+                catalog.put(keys[i], rendered[i])
+            else:
+                failed.add(keys[i])
+        voice_logger.info(f"Ad catalog: {chunk_start + len(chunk)}/{len(todo)} lines rendered")
+    
+    catalog.write_manifest([key for key in keys if key not in failed], provider=provider,
+                           voices=voices, texts=len(texts))
+    return {"lines": len(lines), "rendered": len(todo) - len(failed), "reused": len(lines) - len(todo),
+            "failed": len(failed), "seconds": time.time() - start_time}
+
+def render_project_lines(script, provider, max_workers, project, tts=None):
+    """Render only the lines an episode project has no stem for.
+    
+    Unchanged lines come back from the project's stems; new or edited lines
+    are synthesized and saved as stems.
+    
+    Args:
+        tts: The render's backend (default: get_tts(provider))
+    
+    Returns:
+        Tuple of (dict of line_index -> AudioSegment, dict of line_index -> stem key)
+    """
+    tts = get_tts(provider) if tts is None else tts
+    prepared, keys, segments = {}, {}, {}
+    for i, line in enumerate(script):
+        result = prepare_line(i, line, provider)
+        if result is None:
+            continue
+        keys[i] = line_stem_key(result[1], result[2], provider, tts)
+        stem = project.load_stem(keys[i])
+        if stem is not None:
+            segments[i] = stem
+        else:
+            prepared[i] = result
+    
+    print(f"   ♻️ Reusing {len(segments)} line stems, rendering {len(prepared)} lines")
+    voice_logger.info(f"Project {project.directory}: {len(segments)} stems reused, {len(prepared)} lines to render")
+    if prepared:
+        rendered = render_script_lines(script, provider, max_workers, prepared=prepared, tts=tts)
+        for i, segment in rendered.items():
+            project.save_stem(keys[i], segment)
+        segments.update(rendered)
+    return segments, {i: key for i, key in keys.items() if i in segments}
+
+def get_render_workers(provider, tts=None):
+    """Parallel lines for a voice provider.
+    
+    Local TTS is CPU-bound, so it gets one worker per Kokoro session (more
+    would just queue on the pool), in-process or on the TTS daemon. Cloud TTS is network-bound and can keep
+    TTS_CLOUD_WORKERS requests in flight (default 8).
+    
+    Args:
+        tts: The render's local backend (default: get_local_tts())
+    """
+    if "Local" in provider:
+        return max(1, (get_local_tts() if tts is None else tts).wait().sessions)
+    return max(1, int(os.getenv("TTS_CLOUD_WORKERS", "8")))
+
+def render_audio(script, provider="Local (Kokoro)", max_workers=None, enable_music=False, enable_jingles=False, crossfade=True,
+                 project_dir=None, enable_sfx=False):
     """Render podcast script to audio with parallel processing and production effects.
     
+    With an episode project (audio/project.py), rendering an edited script
+    again re-synthesizes only new or changed lines and re-mixes only the part
+    of the episode they affect.
+    
     Args:
         script: List of line objects with 'speaker' and 'text' fields
         provider: Voice provider ('Local (Kokoro)' or 'Cloud (ElevenLabs)')
-        max_workers: Maximum number of parallel workers (default: 4)
+        max_workers: Maximum number of parallel workers (default: get_render_workers)
         enable_music: Whether to add background music (default: False)
         enable_jingles: Whether to add intro/outro jingles (default: False)
         crossfade: Whether to crossfade between dialogue segments (default: True)
+        project_dir: Episode project directory (default: EPISODE_PROJECT_DIR; empty = no project)
+        enable_sfx: Whether to add context-aware sound effects (audio/sfx_rules.json) (default: False)
     
     Returns:
-        Path to final MP3 file
+        Path to the final episode in the first of EPISODE_FORMATS (default MP3)
     """
-    print(f"🔊 Voice: Rendering audio using {provider} (parallel mode: {max_workers} workers)...")
-    voice_logger.info(f"Starting parallel audio render with {provider}, max_workers={max_workers}")
-    
-    if "Local" in provider and kokoro is None:
-        raise Exception("Kokoro failed to load. Check logs.")
-    
     # Validate script format
     if not isinstance(script, list):
         voice_logger.error(f"Script format error: expected list, got {type(script)}")
         raise Exception(f"Script must be a list, got {type(script)}")
     
+    # One backend for the whole render: every line, cache key and worker count uses it
+    tts = get_tts(provider)
+    if "Local" in provider:
+        # Client mode: a running TTS daemon synthesizes for every process on the host
+        if tts is not get_engine():
+            print(f"🛰️ Voice: Using the TTS daemon at {tts.url}")
+        # Usually already loaded by the warmup; otherwise this waits for it
+        try:
+            tts.wait()
+        except TTSEngineError as e:
+            raise Exception(f"Kokoro failed to load. Check logs. ({e})")
+    
+    max_workers = max_workers or get_render_workers(provider, tts)
+    print(f"🔊 Voice: Rendering audio using {provider} (parallel mode: {max_workers} workers)...")
+    voice_logger.info(f"Starting parallel audio render with {provider}, max_workers={max_workers}")
+    
     voice_logger.debug(f"Script contains {len(script)} lines")
     
+    project_dir = project_dir or os.getenv("EPISODE_PROJECT_DIR") or None
+    project = EpisodeProject(project_dir) if project_dir else None
+    previous = (project.load_edl() if project else None) or {}
+    
     # Parallel rendering
-    audio_segments = {}
+    cache_before = get_segment_cache().stats()
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all lines for parallel processing
-        future_to_index = {
-            executor.submit(render_audio_line, i, line, provider): i 
-            for i, line in enumerate(script)
-        }
-        
-        # Collect results as they complete
-        for future in as_completed(future_to_index):
-            line_index, segment = future.result()
-            if segment is not None:
-                audio_segments[line_index] = segment
+    stem_keys = {}
+    try:
+        if project:
+            audio_segments, stem_keys = render_project_lines(script, provider, max_workers, project, tts=tts)
+        else:
+            audio_segments = render_script_lines(script, provider, max_workers, tts=tts)
+    except DaemonUnavailableError as e:
+        raise Exception(f"The TTS daemon stopped answering mid-render; start it again or set TTS_DAEMON_URL= "
+                        f"to render in-process. ({e})")
+    
+    cache_stats = get_segment_cache().stats()
+    for field in ("memory_hits", "disk_hits", "misses"):
+        cache_stats[field] -= cache_before[field]
+    lookups = cache_stats["memory_hits"] + cache_stats["disk_hits"] + cache_stats["misses"]
+    cache_stats["hit_rate"] = (lookups - cache_stats["misses"]) / lookups if lookups else 0.0
+    print(f"   💾 {format_cache_stats(cache_stats)}")
+    voice_logger.info(format_cache_stats(cache_stats))
     
     # Combine segments in correct order
     voice_logger.info(f"Combining {len(audio_segments)} audio segments in order...")
@@ -226,50 +543,83 @@ def render_audio(script, provider="Local (Kokoro)", max_workers=4, enable_music=
             voice_logger.info(f"Detected sponsor ad at index {i}")
             break
     
-    if crossfade:
-        # Build segments list and add transitions around ad if present
-        segments_list = []
-        for i in range(len(script)):
-            if i in audio_segments:
-                # Add transition before ad
-                if i == ad_index:
-                    transition_sound = get_transition_sound()
-                    if transition_sound:
-                        segments_list.append(transition_sound)
-                        voice_logger.info("Added transition sound before sponsor ad")
-                
-                segments_list.append(audio_segments[i])
-                
-                # Add transition after ad
-                if i == ad_index:
-                    transition_sound = get_transition_sound()
-                    if transition_sound:
-                        segments_list.append(transition_sound)
-                        voice_logger.info("Added transition sound after sponsor ad")
-            else:
-                voice_logger.warning(f"Missing audio for line {i}, skipping")
-        
-        combined_audio = add_crossfade_between_segments(segments_list, crossfade_ms=200)
-    else:
-        # Original method with silence gaps
-        combined_audio = AudioSegment.empty()
-        for i in range(len(script)):
-            if i in audio_segments:
-                combined_audio += audio_segments[i] + AudioSegment.silent(duration=300)
-            else:
-                voice_logger.warning(f"Missing audio for line {i}, skipping")
+    # Lines, transitions and jingles are laid out here and mixed block by block below;
+    # lines stay as rendered and are only converted while a block overlaps them.
+    # labels name each source stably so a project can tell what changed since last time.
+    segments_list, labels = [], {}
+    recorded_transitions = list(previous.get("transitions", []))
+    transitions = []
+    
+    def add_transition(where):
+        path, transition_sound = pick_asset("transitions", recorded_transitions.pop(0) if recorded_transitions else None)
+        if transition_sound is not None:
+            segments_list.append(transition_sound)
+            labels[id(transition_sound)] = get_asset_bank().label(path)
+            transitions.append(path)
+            voice_logger.info(f"Added transition sound {where} sponsor ad")
+    
+    for i in range(len(script)):
+        if i in audio_segments:
+            line_audio = audio_segments[i]
+            # Transitions around the ad only in crossfade mode, as before
+            if crossfade and i == ad_index:
+                add_transition("before")
+            
+            segments_list.append(line_audio)
+            labels[id(line_audio)] = f"line:{stem_keys.get(i, i)}"
+            
+            if crossfade and i == ad_index:
+                add_transition("after")
+        else:
+            voice_logger.warning(f"Missing audio for line {i}, skipping")
     
     # Add intro/outro jingles if enabled
+    intro, outro = (None, None)
     if enable_jingles:
         voice_logger.info("Adding intro/outro jingles...")
-        combined_audio = add_intro_outro(combined_audio)
+        intro, outro = load_jingles()
+        bank = get_asset_bank()
+        jingle_paths = bank.scan("jingles")
+        labels.update({id(jingle): bank.label(jingle_paths[name])
+                       for name, jingle in (("intro", intro), ("outro", outro)) if jingle is not None})
+    
+    # Crossfades between lines, or the original 300ms silence gaps
+    timeline = plan_timeline(
+        segments_list,
+        crossfade_ms=200 if crossfade else 0,
+        gap_ms=0 if crossfade else 300,
+        intro=intro,
+        outro=outro,
+    )
+    
+    # Sound effects go on the timeline at their trigger words, mixed with everything else
+    if enable_sfx:
+        placed = add_sfx_to_timeline(timeline, script, audio_segments, labels)
+        voice_logger.info(f"Added {placed} context-aware sound effects")
     
     # Add background music if enabled
+    music, music_path = None, None
     if enable_music:
         voice_logger.info("Overlaying background music...")
-        combined_audio = overlay_background_music(combined_audio)
+        music_path, music = pick_asset("background", previous.get("music"))
+        music = music if music is not None else load_background_music()
+    
+    if project:
+        # Only the changed region of the dialogue master is mixed again; music and encode read all of it
+        clips, (start, stop) = project.update_master(timeline, labels, previous or None)
+        print(f"   ✂️ Re-mixed {(stop - start) / timeline.frames if timeline.frames else 0:.0%} of the episode")
+        project.save_edl({
+            "frames": timeline.frames, "clips": clips, "transitions": transitions, "music": music_path,
+            "lines": [{"index": i, "speaker": script[i].get("speaker"), "stem": key} for i, key in stem_keys.items()],
+        })
+        project.prune_stems(set(stem_keys.values()))
+        timeline = project.master_timeline()
     
-    output_file = "final_episode.mp3"
-    combined_audio.export(output_file, format="mp3")
+    # Mixed in fixed-size blocks straight into the encoders (one per EPISODE_FORMATS entry),
+    # which run alongside mixing; memory doesn't grow with episode length
+    outputs = [(f"final_episode{OUTPUT_FORMATS[fmt].extension}", fmt, bitrate) for fmt, bitrate in get_output_formats()]
+    encode_report = encode_stream(stream_episode(timeline, music), outputs)
+    print(f"   🎚️ {format_encode_report(encode_report)}")
+    output_file = outputs[0][0]
     voice_logger.info(f"Audio render complete: {output_file}")
     return output_file
\ No newline at end of file
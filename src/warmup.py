@@ -0,0 +1,112 @@
+"""
+Pipeline warmup for RepoRadio.
+Preloads the LLM models, TTS engine and audio assets a job will use while
+ingest runs, so the first script line and first rendered line don't pay
+cold-start cost.
+"""
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from debug_logger import app_logger
+from brain import get_job_provider, get_job_models
+from llm.providers import run_sync
+from voice import get_voice_id, warmup_tts
+from audio.bank import get_asset_bank
+
+# Shared across Streamlit sessions; warmups are short and mostly waiting on I/O
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="warmup")
+
+
+class WarmupJob:
+    """Background warmup for one generation job.
+
+    Started before ingest; `report()` then separates cold-start cost (model
+    loading, ONNX init) from steady-state per-line latency.
+    """
+
+    def __init__(self, provider, voice_provider, host_names=None):
+        self.provider = provider
+        self.voice_provider = voice_provider
+        self.host_names = host_names or []
+        self.llm_timings = {}
+        self.tts_ms = None
+        self.assets_ms = None
+        self._llm_future = _executor.submit(self._warm_llm)
+        self._tts_future = _executor.submit(self._warm_tts)
+        self._assets_future = _executor.submit(self._warm_assets)
+
+    def _warm_llm(self):
+        llm = get_job_provider(self.provider)
+        models = get_job_models(self.provider)
+
+        async def warm_all():
+            return await asyncio.gather(*[llm.warmup(m, options) for m, options in models.items()],
+                                        return_exceptions=True)
+
+        for model, result in zip(models, run_sync(warm_all())):
+            if isinstance(result, Exception):
+                app_logger.warning(f"LLM warmup failed for {model}: {result}")
+            elif result is not None:
+                self.llm_timings[model] = result
+
+    def _warm_tts(self):
+        voice_id = get_voice_id(self.host_names[0], self.voice_provider) if self.host_names else "af_bella"
+        try:
+            self.tts_ms = warmup_tts(self.voice_provider, voice_id)
+        except Exception as e:
+            app_logger.warning(f"TTS warmup failed: {e}")
+
+    def _warm_assets(self):
+        try:
+            self.assets_ms = get_asset_bank().preload()
+        except Exception as e:
+            app_logger.warning(f"Asset preload failed: {e}")
+
+    def wait(self, timeout=None):
+        """Block until all warmups finish (errors are logged, not raised)."""
+        start_time = time.time()
+        for future in (self._llm_future, self._tts_future, self._assets_future):
+            remaining = None if timeout is None else max(0, timeout - (time.time() - start_time))
+            try:
+                future.result(remaining)
+            except Exception as e:
+                app_logger.warning(f"Warmup did not finish: {e}")
+        return self
+
+    def report(self):
+        """Cold-start timings plus steady-state LLM latency observed since.
+
+        Returns:
+            Dict with 'cold_start' (ms per model / TTS) and 'steady_state' stats
+        """
+        return {
+            "cold_start": {
+                "llm_ms": dict(self.llm_timings),
+                "tts_ms": self.tts_ms,
+                "assets_ms": self.assets_ms,
+            },
+            "steady_state": {
+                "llm": get_job_provider(self.provider).latency_summary(),
+            },
+        }
+
+
+def start_warmup(provider, voice_provider, host_names=None):
+    """Kick off model/TTS warmup in the background and return the job."""
+    app_logger.debug(f"Starting warmup: llm={provider}, voice={voice_provider}")
+    return WarmupJob(provider, voice_provider, host_names)
+
+
+def format_warmup_report(report):
+    """One-line summary of a WarmupJob report for logs and the UI."""
+    cold = [f"{model} load {ms / 1000:.1f}s" for model, ms in report["cold_start"]["llm_ms"].items()]
+    if report["cold_start"]["tts_ms"] is not None:
+        cold.append(f"TTS init {report['cold_start']['tts_ms'] / 1000:.1f}s")
+    if report["cold_start"].get("assets_ms") is not None:
+        cold.append(f"audio assets {report['cold_start']['assets_ms'] / 1000:.1f}s")
+    summary = "Cold start: " + (", ".join(cold) if cold else "nothing to warm")
+
+    steady = report["steady_state"]["llm"]
+    if steady["count"]:
+        summary += f" | Steady state: line p50 {steady['p50_ms'] / 1000:.1f}s, p95 {steady['p95_ms'] / 1000:.1f}s"
+    return summary
@@ -0,0 +1,132 @@
+"""
+Unit tests for audio/bank.py module.
+
+Tests decode-once loading, the memory-mapped .npy cache and
+zero-copy views of preloaded assets.
+"""
+
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+from unittest.mock import patch
+from src.audio import bank as bank_module
+from src.audio.bank import AssetBank
+from src.audio.buffer import CHANNELS, SAMPLE_RATE
+
+
+def write_wav(path, duration_ms=200, value=0.25, sample_rate=24000, channels=1):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), np.full((int(sample_rate * duration_ms / 1000), channels), value, dtype=np.float32), sample_rate)
+    return path
+
+
+@pytest.fixture
+def music(tmp_path):
+    """Asset folders laid out like src/music and src/audio/assets."""
+    root = tmp_path / "music"
+    write_wav(root / "intro.wav", 300, sample_rate=48000, channels=2)
+    write_wav(root / "transitions" / "swoosh.wav", 100)
+    write_wav(root / "transitions" / "whoosh.wav", 150)
+    write_wav(root / "sfx" / "gavel.wav", 50)
+    (root / "transitions" / "notes.txt").write_text("not audio")
+    return {"jingles": root, "transitions": root / "transitions", "background": root / "background", "sfx": root / "sfx"}
+
+
+class TestAssetBank:
+    """Test loading assets into the canonical format."""
+
+    def test_assets_are_converted_to_canonical_format(self, music):
+        bank = AssetBank(music, cache_dir=None)
+        intro = bank.get("jingles", "intro")
+
+        assert intro.samples.shape == (int(SAMPLE_RATE * 0.3), CHANNELS)
+        assert intro.samples.dtype == np.float32
+        assert len(bank.get("sfx", "gavel")) == 50
+
+    def test_scan_ignores_non_audio_and_missing_folders(self, music):
+        bank = AssetBank(music, cache_dir=None)
+
+        assert bank.names("transitions") == ["swoosh", "whoosh"]
+        assert bank.random("background") is None
+        assert bank.get("sfx", "missing") is None
+
+    def test_assets_are_decoded_once_and_shared(self, music):
+        bank = AssetBank(music, cache_dir=None)
+
+        with patch.object(bank_module.AudioBuffer, "from_file", wraps=bank_module.AudioBuffer.from_file) as decode:
+            first = bank.get("jingles", "intro")
+            second = bank.get("jingles", "intro")
+
+        assert decode.call_count == 1
+        assert np.shares_memory(first.samples, second.samples)
+
+    def test_views_are_read_only(self, music):
+        intro = AssetBank(music, cache_dir=None).get("jingles", "intro")
+
+        with pytest.raises(ValueError):
+            intro.samples[0] = 1.0
+        assert intro.gain(-6).samples.flags.writeable
+
+    def test_preload_loads_everything(self, music):
+        bank = AssetBank(music, cache_dir=None)
+        bank.preload()
+
+        assert bank.decoded == 4
+
+    def test_unreadable_asset_returns_none(self, music):
+        (music["sfx"] / "broken.wav").write_bytes(b"RIFF nope")
+
+        assert AssetBank(music, cache_dir=None).get("sfx", "broken") is None
+
+
+class TestDiskCache:
+    """Test the memory-mapped decode cache."""
+
+    def test_restart_maps_cached_decode(self, music, tmp_path):
+        cache_dir = tmp_path / "cache"
+        AssetBank(music, cache_dir=cache_dir).preload()
+
+        bank = AssetBank(music, cache_dir=cache_dir)
+        with patch("src.audio.bank.AudioBuffer.from_file", side_effect=AssertionError("decoded again")):
+            intro = bank.get("jingles", "intro")
+
+        assert isinstance(intro.samples, np.memmap)
+        assert bank.mapped == 1 and bank.decoded == 0
+        assert len(intro) == 300
+
+    def test_changed_file_is_decoded_again(self, music, tmp_path):
+        cache_dir = tmp_path / "cache"
+        AssetBank(music, cache_dir=cache_dir).get("sfx", "gavel")
+        gavel = write_wav(music["sfx"] / "gavel.wav", 80)
+        os.utime(gavel, ns=(1, 1))
+
+        bank = AssetBank(music, cache_dir=cache_dir)
+        assert len(bank.get("sfx", "gavel")) == 80
+        assert bank.decoded == 1
+        assert len(list(cache_dir.glob("gavel-*.npy"))) == 1
+
+    def test_label_changes_when_file_is_replaced(self, music):
+        bank = AssetBank(music, cache_dir=None)
+        intro = music["jingles"] / "intro.wav"
+        before = bank.label(intro)
+        os.utime(intro, ns=(1, 1))
+
+        assert before.startswith(f"asset:{intro.resolve()}@")
+        assert bank.label(intro) != before
+        assert bank.label(intro) == bank.label(music["jingles"] / "transitions" / ".." / "intro.wav")
+
+    def test_same_name_in_two_folders_keeps_both(self, music, tmp_path):
+        cache_dir = tmp_path / "cache"
+        write_wav(music["transitions"] / "gavel.wav", 120)
+        bank = AssetBank(music, cache_dir=cache_dir)
+        bank.preload()
+
+        fresh = AssetBank(music, cache_dir=cache_dir)
+        assert len(fresh.get("sfx", "gavel")) == 50
+        assert len(fresh.get("transitions", "gavel")) == 120
+        assert fresh.decoded == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
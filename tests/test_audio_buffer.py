@@ -0,0 +1,125 @@
+"""
+Unit tests for audio/buffer.py module.
+
+Tests format conversion into the fixed mixing format and the
+vectorized gain, fade, overlay and concatenation operations.
+"""
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from src.audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE, concatenate
+
+
+def tone(duration_ms, value=0.5):
+    """Constant-valued buffer (easy to reason about after mixing)."""
+    frames = int(SAMPLE_RATE * duration_ms / 1000)
+    return AudioBuffer(np.full((frames, CHANNELS), value, dtype=np.float32))
+
+
+class TestConversion:
+    """Test getting audio into and out of the fixed format."""
+
+    def test_mono_pcm_is_resampled_and_duplicated(self):
+        buffer = AudioBuffer.from_pcm(np.linspace(-1, 1, 24000, dtype=np.float32), 24000)
+
+        assert buffer.samples.shape == (SAMPLE_RATE, CHANNELS)
+        assert buffer.samples.dtype == np.float32
+        assert len(buffer) == 1000
+        assert np.array_equal(buffer.samples[:, 0], buffer.samples[:, 1])
+
+    def test_segment_round_trip(self):
+        pcm = np.array([0, 16384, -16384, 32767] * 100, dtype=np.int16)
+        segment = AudioSegment(data=np.repeat(pcm, 2).tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=2)
+
+        buffer = AudioBuffer.from_segment(segment)
+        assert buffer.samples[1, 0] == pytest.approx(0.5)
+
+        back = buffer.to_segment()
+        assert (back.frame_rate, back.channels, back.sample_width) == (SAMPLE_RATE, CHANNELS, 2)
+        assert np.abs(np.frombuffer(back.raw_data, dtype=np.int16)[::2] - pcm).max() <= 1
+
+    def test_from_file_reads_wav(self, tmp_path):
+        path = tmp_path / "jingle.wav"
+        AudioSegment.silent(duration=250, frame_rate=48000).export(path, format="wav")
+
+        assert len(AudioBuffer.from_file(path)) == 250
+
+    def test_export_clips_instead_of_wrapping(self):
+        segment = tone(10, value=1.5).to_segment()
+
+        assert max(segment.get_array_of_samples()) == 32767
+
+
+class TestOperations:
+    """Test vectorized gain, fades, slicing and overlay."""
+
+    def test_gain(self):
+        assert tone(10).gain(-20).samples[0, 0] == pytest.approx(0.05)
+
+    def test_fades_leave_source_untouched(self):
+        source = tone(100)
+        faded = source.fade_out(50)
+
+        assert faded.samples[-1, 0] == pytest.approx(0.0, abs=1e-3)
+        assert faded.samples[0, 0] == pytest.approx(0.5)
+        assert source.samples[-1, 0] == pytest.approx(0.5)
+
+    def test_slicing_in_ms(self):
+        assert len(tone(1000)[250:750]) == 500
+        assert len(tone(1000)[-100:]) == 100
+
+    def test_mix_is_in_place_and_clipped_to_length(self):
+        base = tone(100, value=0.25)
+        result = base.mix(tone(100, value=0.25), position_ms=50)
+
+        assert result is base
+        assert len(base) == 100
+        assert base.samples[0, 0] == pytest.approx(0.25)
+        assert base.samples[-1, 0] == pytest.approx(0.5)
+
+    def test_overlay_returns_copy(self):
+        base = tone(100, value=0.25)
+        mixed = base.overlay(tone(50, value=0.25))
+
+        assert mixed.samples[0, 0] == pytest.approx(0.5)
+        assert base.samples[0, 0] == pytest.approx(0.25)
+
+
+class TestConcatenate:
+    """Test single-allocation joins with crossfades."""
+
+    def test_lengths_match_pydub_append(self):
+        parts = [tone(1000), tone(500), tone(800)]
+
+        assert len(concatenate(parts)) == 2300
+        assert len(concatenate(parts, crossfade_ms=200)) == 2300 - 400
+
+    def test_crossfade_of_equal_signals_is_flat(self):
+        result = concatenate([tone(300), tone(300), tone(300)], crossfade_ms=100)
+
+        assert np.allclose(result.samples, 0.5)
+
+    def test_crossfade_blends_neighbours(self):
+        result = concatenate([tone(100, value=1.0), tone(100, value=0.0)], crossfade_ms=50)
+        join = result.samples[int(SAMPLE_RATE * 0.05):int(SAMPLE_RATE * 0.1), 0]
+
+        assert join[0] == pytest.approx(1.0)
+        assert np.all(np.diff(join) < 0)
+
+    def test_crossfade_is_clamped_to_short_parts(self):
+        result = concatenate([tone(1000), tone(50), tone(1000)], crossfade_ms=200)
+
+        assert 1000 < len(result) < 2050
+        assert np.all(np.isfinite(result.samples))
+
+    def test_per_join_crossfades(self):
+        assert len(concatenate([tone(500), tone(500), tone(500)], crossfade_ms=[0, 100])) == 1400
+
+    def test_empty_input(self):
+        assert len(concatenate([])) == 0
+        assert len(concatenate([None, tone(100)])) == 100
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+"""
+Unit tests for audio/effects.py module.
+
+Tests the compiled SFX trigger matcher and placing effects on the
+episode timeline.
+"""
+
+import os
+import json
+import numpy as np
+import pytest
+import soundfile as sf
+from unittest.mock import patch
+from pydub import AudioSegment
+from src.audio import effects
+from src.audio.bank import AssetBank
+from src.audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE
+from src.audio.effects import SfxMatcher, add_sfx_to_timeline, get_sfx_matcher, sfx_library
+from src.audio.timeline import Timeline
+from src.tts.normalize import normalize_for_tts, spoken_offset
+
+RULES = [
+    {"name": "criticism", "sfx": "gavel", "words": ["terrible", "nightmare"], "speakers": ["Sam"], "offset_ms": 100},
+    {"name": "celebration", "sfx": "applause", "words": ["amazing", "love it"], "anchor": "end", "offset_ms": -500},
+    {"name": "security", "sfx": "alert", "words": ["security flaw", "hack"], "gain_db": -6},
+]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    """Memory-only asset bank with one-frame-loud SFX files."""
+    sfx_dir = tmp_path / "sfx"
+    sfx_dir.mkdir()
+    for name in ("gavel", "applause", "alert"):
+        sf.write(str(sfx_dir / f"{name}.wav"), np.full((SAMPLE_RATE // 10, CHANNELS), 0.5, dtype=np.float32), SAMPLE_RATE)
+    bank = AssetBank({"sfx": sfx_dir}, cache_dir=None)
+    with patch("src.audio.effects.get_asset_bank", return_value=bank):
+        yield bank
+
+
+class TestSfxMatcher:
+    """Test rule compilation and matching."""
+
+    def test_one_cue_per_line_highest_priority_rule(self):
+        script = [
+            {"speaker": "Sam", "text": "This is amazing but also terrible."},
+            {"speaker": "Alex", "text": "A terrible, amazing hack."},
+            {"speaker": "Alex", "text": "Nothing to see here."},
+        ]
+
+        cues = SfxMatcher(RULES).match(script)
+
+        assert [(c.line_index, c.sfx) for c in cues] == [(0, "gavel"), (1, "applause")]
+
+    def test_word_anchor_is_character_offset(self):
+        text = "Honestly the security   flaw is wide open."
+        cue, = SfxMatcher(RULES).match([{"speaker": "Marcus", "text": text}])
+
+        assert cue.sfx == "alert" and cue.gain_db == -6
+        assert (cue.char, cue.position) == (text.index("security"), None)
+
+    def test_end_anchor_and_case_insensitive_phrases(self):
+        cue, = SfxMatcher(RULES).match([{"speaker": "Alex", "text": "I LOVE   IT."}])
+
+        assert (cue.position, cue.char, cue.offset_ms) == (1.0, None, -500)
+
+    def test_whole_words_only(self):
+        script = [{"speaker": "Alex", "text": "The hackathon was shacked up."}]
+
+        assert SfxMatcher(RULES).match(script) == []
+
+    def test_phrases_do_not_span_lines(self):
+        script = [{"speaker": "Alex", "text": "love"}, {"speaker": "Alex", "text": "it"}, "not a dict"]
+
+        assert SfxMatcher(RULES).match(script) == []
+
+    def test_invalid_rule_raises(self):
+        with pytest.raises(ValueError):
+            SfxMatcher([{"name": "bad", "sfx": "x", "words": ["y"], "anchor": "middle"}])
+
+    def test_matcher_rebuilt_when_rule_file_changes(self, tmp_path, monkeypatch):
+        rules = tmp_path / "rules.json"
+        rules.write_text(json.dumps({"rules": RULES[:1]}))
+        monkeypatch.setenv("SFX_RULES_PATH", str(rules))
+        first = get_sfx_matcher()
+
+        assert get_sfx_matcher() is first
+        rules.write_text(json.dumps({"rules": RULES}))
+        os.utime(rules, ns=(1, 1))
+        assert len(get_sfx_matcher().rules) == 3
+
+
+class TestTimelinePlacement:
+    """Test mixing effects into the episode at their trigger words."""
+
+    def test_effect_lands_at_the_trigger_word(self, bank):
+        lines = {0: AudioBuffer.silent(1000), 1: AudioBuffer.silent(2000)}
+        timeline = Timeline.sequence([lines[0], lines[1]])
+        text = "Well, that is a hack."
+        labels = {}
+
+        placed = add_sfx_to_timeline(timeline, [{"speaker": "Alex", "text": "Hi."}, {"speaker": "Alex", "text": text}],
+                                     lines, labels, matcher=SfxMatcher(RULES))
+
+        assert placed == 1
+        mixed = timeline.render().samples[:, 0]
+        onset = int(np.argmax(mixed > 0))
+        expected = SAMPLE_RATE + int(text.index("hack") / len(text) * 2 * SAMPLE_RATE)
+        assert abs(onset - expected) <= 1
+        assert mixed[onset] == pytest.approx(0.5 * 10 ** (-6 / 20), rel=1e-4)
+        assert "sfx:alert:-6" in labels.values()
+
+    def test_effect_follows_the_spoken_timing(self, bank):
+        """Test that a line's alignment places the cue, in the normalized text the engine spoke."""
+        text = "We read package.json first, then a hack."
+        spoken_length = len(normalize_for_tts(text))
+        line = AudioSegment.silent(duration=4000, frame_rate=24000)
+        # Speech starts 500ms in; the second half of the spoken text takes three times as long
+        line.alignment = [[0, 500], [spoken_length // 2, 1000], [spoken_length, 4000]]
+        timeline = Timeline.sequence([line])
+
+        add_sfx_to_timeline(timeline, [{"speaker": "Alex", "text": text}], {0: line}, matcher=SfxMatcher(RULES))
+
+        onset = next(clip.start for clip in timeline.clips if clip.source is not line)
+        expected_ms = 1000 + (spoken_offset(text, text.index("hack")) - spoken_length // 2) / (
+            spoken_length - spoken_length // 2) * 3000
+        assert abs(onset - expected_ms * SAMPLE_RATE / 1000) <= 1
+
+    def test_unaligned_line_is_estimated_from_its_speech(self, bank):
+        """Test that a line without timestamps is timed within the sentence holding the trigger."""
+        tone = AudioSegment(data=(np.sin(np.arange(24000) / 3) * 8000).astype(np.int16).tobytes(),
+                            sample_width=2, frame_rate=24000, channels=1)
+        pause = AudioSegment.silent(duration=600, frame_rate=24000)
+        # A long first sentence spoken quickly, then a short one spoken slowly
+        line = pause + tone[:800] + pause + tone + tone[:500] + pause
+        text = "This first sentence goes on for quite a long while indeed. What a hack."
+        timeline = Timeline.sequence([line])
+
+        add_sfx_to_timeline(timeline, [{"speaker": "Alex", "text": text}], {0: line}, matcher=SfxMatcher(RULES))
+
+        onset_ms = next(clip.start for clip in timeline.clips if clip.source is not line) * 1000 / SAMPLE_RATE
+        second = text.index("What")
+        expected_ms = 2000 + (text.index("hack") - second) / (len(text) - second) * 1500
+        assert abs(onset_ms - expected_ms) <= 20
+
+    def test_effect_past_the_end_extends_the_timeline(self, bank):
+        lines = {0: AudioBuffer.silent(300)}
+        timeline = Timeline.sequence([lines[0]])
+
+        add_sfx_to_timeline(timeline, [{"speaker": "Alex", "text": "Amazing"}], lines,
+                            matcher=SfxMatcher([dict(RULES[1], offset_ms=0)]))
+
+        assert len(timeline) == 400
+
+    def test_missing_sfx_file_is_skipped(self, bank):
+        lines = {0: AudioBuffer.silent(300)}
+        rules = [{"name": "boom", "sfx": "explosion", "words": ["boom"]}]
+
+        assert add_sfx_to_timeline(Timeline.sequence([lines[0]]), [{"text": "boom"}], lines, matcher=SfxMatcher(rules)) == 0
+
+    def test_legacy_per_line_overlay_uses_the_rules(self, bank):
+        with patch.object(effects, "get_sfx_matcher", return_value=SfxMatcher(RULES)):
+            result = sfx_library.detect_and_add_sfx({"speaker": "Sam", "text": "terrible"}, AudioBuffer.silent(1000))
+
+        assert int(np.argmax(result.samples[:, 0] > 0)) == SAMPLE_RATE // 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+"""
+Unit tests for audio/encode.py module.
+
+Tests the pipelined ffmpeg encoder stage, multi-format output
+and the encoding report.
+"""
+
+import time
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from src.audio.buffer import CHANNELS, SAMPLE_RATE
+from src.audio.encode import Encoder, EncoderError, encode_stream, format_encode_report, get_output_formats, to_pcm16
+
+
+def blocks(count, frames=SAMPLE_RATE // 2):
+    for i in range(count):
+        yield np.full((frames, CHANNELS), 0.1 * (i % 3), dtype=np.float32)
+
+
+class TestEncodeStream:
+    """Test streaming blocks to encoded files."""
+
+    def test_blocks_are_encoded_to_mp3(self, tmp_path):
+        path = tmp_path / "episode.mp3"
+
+        report = encode_stream(blocks(6), [(path, "mp3", None)])
+
+        assert report["duration_ms"] == 3000
+        assert report["outputs"][0]["bitrate"] == "128k"
+        decoded = AudioSegment.from_file(path, format="mp3", codec="mp3")
+        assert abs(len(decoded) - 3000) < 100
+
+    def test_one_pass_writes_every_format(self, tmp_path):
+        outputs = [(tmp_path / "e.mp3", "mp3", "96k"), (tmp_path / "e.opus", "opus", None), (tmp_path / "e.m4a", "aac", None)]
+
+        report = encode_stream(blocks(4), outputs)
+
+        assert [o["format"] for o in report["outputs"]] == ["mp3", "opus", "aac"]
+        assert all(o["bytes"] > 0 for o in report["outputs"])
+        assert (tmp_path / "e.opus").read_bytes()[:4] == b"OggS"
+        assert b"ftyp" in (tmp_path / "e.m4a").read_bytes()[:16]
+
+    def test_encoder_consumes_before_the_stream_ends(self, tmp_path):
+        encoder = Encoder(tmp_path / "e.mp3", queue_blocks=2).start()
+        for block in blocks(5, frames=SAMPLE_RATE):
+            encoder.write(to_pcm16(block))
+
+        deadline = time.time() + 5
+        while not encoder._queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+        assert encoder._queue.empty()  # fed to ffmpeg while more audio could still arrive
+        encoder.close()
+        assert encoder.stats()["bytes"] > 0
+
+    def test_report_is_formatted(self, tmp_path):
+        report = encode_stream(blocks(2), [(tmp_path / "e.opus", "opus", "48k")])
+
+        summary = format_encode_report(report)
+        assert "opus 48k" in summary and "Encoded 1s" in summary
+
+    def test_pcm_is_clipped(self):
+        pcm = np.frombuffer(to_pcm16(np.array([[2.0, -2.0]], dtype=np.float32)), dtype="<i2")
+
+        assert list(pcm) == [32767, -32767]
+
+
+class TestEncoderErrors:
+    """Test failures in ffmpeg or the mixer."""
+
+    def test_unknown_format_raises(self, tmp_path):
+        with pytest.raises(EncoderError):
+            encode_stream(blocks(1), [(tmp_path / "e.wma", "wma", None)])
+
+    def test_ffmpeg_failure_raises(self, tmp_path):
+        with pytest.raises(EncoderError, match="mp3"):
+            encode_stream(blocks(2), [(tmp_path / "e.mp3", "mp3", "not-a-bitrate")])
+
+    def test_mix_failure_stops_encoders(self, tmp_path):
+        def failing_blocks():
+            yield from blocks(2)
+            raise RuntimeError("mix failed")
+
+        with pytest.raises(RuntimeError, match="mix failed"):
+            encode_stream(failing_blocks(), [(tmp_path / "e.mp3", "mp3", None), (tmp_path / "e.opus", "opus", None)])
+
+
+class TestOutputFormats:
+    """Test EPISODE_FORMATS configuration."""
+
+    def test_defaults_to_mp3(self, monkeypatch):
+        monkeypatch.delenv("EPISODE_FORMATS", raising=False)
+        monkeypatch.delenv("EPISODE_MP3_BITRATE", raising=False)
+
+        assert get_output_formats() == [("mp3", "128k")]
+
+    def test_formats_and_bitrates_from_env(self, monkeypatch):
+        monkeypatch.setenv("EPISODE_FORMATS", "opus, AAC")
+        monkeypatch.setenv("EPISODE_OPUS_BITRATE", "48k")
+        monkeypatch.delenv("EPISODE_AAC_BITRATE", raising=False)
+
+        assert get_output_formats() == [("opus", "48k"), ("aac", "128k")]
+
+    def test_unknown_format_in_env_raises(self, monkeypatch):
+        monkeypatch.setenv("EPISODE_FORMATS", "mp3,flac")
+
+        with pytest.raises(EncoderError, match="flac"):
+            get_output_formats()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
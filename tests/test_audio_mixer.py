@@ -0,0 +1,204 @@
+"""
+Unit tests for audio/mixer.py module.
+
+Tests episode timeline assembly, jingles and background music
+on NumPy audio buffers.
+"""
+
+import tracemalloc
+import numpy as np
+import pytest
+import soundfile as sf
+from unittest.mock import patch
+from src.audio.bank import AssetBank
+from src.audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE, concatenate
+from src.audio.mixer import (
+    add_crossfade_between_segments, add_intro_outro, build_timeline, ducking_gain, overlay_background_music,
+    plan_timeline, stream_episode, tile_loop,
+)
+
+
+@pytest.fixture(autouse=True)
+def asset_bank():
+    """Memory-only asset bank so tests never write decoded assets to ~/.cache."""
+    bank = AssetBank(cache_dir=None)
+    with patch("src.audio.mixer.get_asset_bank", return_value=bank):
+        yield bank
+
+
+def tone(duration_ms, value=0.5):
+    frames = int(SAMPLE_RATE * duration_ms / 1000)
+    return AudioBuffer(np.full((frames, CHANNELS), value, dtype=np.float32))
+
+
+def write_wav(path, duration_ms, value=0.5, sample_rate=SAMPLE_RATE):
+    sf.write(str(path), np.full((int(sample_rate * duration_ms / 1000), 2), value, dtype=np.float32), sample_rate)
+    return path
+
+
+class TestBuildTimeline:
+    """Test assembling the whole episode at once."""
+
+    def test_crossfaded_lines(self):
+        assert len(build_timeline([tone(1000)] * 3, crossfade_ms=200)) == 2600
+
+    def test_silence_gaps_follow_every_line(self):
+        timeline = build_timeline([tone(1000)] * 2, crossfade_ms=0, gap_ms=300)
+
+        assert len(timeline) == 2600
+        assert timeline.samples[-1, 0] == 0.0
+
+    def test_jingles_are_not_crossfaded(self):
+        timeline = build_timeline([tone(1000)] * 2, crossfade_ms=200, intro=tone(400), outro=tone(600))
+
+        assert len(timeline) == 400 + 500 + 1800 + 500 + 600
+
+    def test_crossfade_wrapper_matches(self):
+        assert len(add_crossfade_between_segments([tone(1000)] * 3, crossfade_ms=200)) == 2600
+        assert len(add_crossfade_between_segments([])) == 0
+
+
+class TestJingles:
+    """Test intro/outro handling."""
+
+    def test_missing_jingles_leave_dialogue_alone(self, tmp_path):
+        dialogue = tone(1000)
+
+        assert add_intro_outro(dialogue, tmp_path / "none.wav", tmp_path / "none.wav") is dialogue
+
+    def test_intro_and_outro_added(self, tmp_path):
+        intro = write_wav(tmp_path / "intro.wav", 400, sample_rate=48000)
+        outro = write_wav(tmp_path / "outro.wav", 600)
+
+        assert len(add_intro_outro(tone(1000), intro, outro)) == 400 + 500 + 1000 + 500 + 600
+
+
+class TestBackgroundMusic:
+    """Test looping/trimming and ducked overlay of the music bed."""
+
+    def test_short_track_is_looped_to_dialogue_length(self, tmp_path):
+        track = write_wav(tmp_path / "bed.wav", 2000, value=0.5)
+        dialogue = tone(5000, value=0.0)
+
+        mixed = overlay_background_music(dialogue, track, volume_reduction_db=20, ducking={"duck_db": 0})
+
+        assert len(mixed) == 5000
+        assert np.allclose(mixed.samples, 0.05, atol=1e-3)
+
+    def test_long_track_is_trimmed_and_faded(self, tmp_path):
+        track = write_wav(tmp_path / "bed.wav", 6000, value=0.5)
+
+        mixed = overlay_background_music(tone(4000, value=0.0), track, volume_reduction_db=20, ducking={"duck_db": 0})
+
+        assert len(mixed) == 4000
+        assert mixed.samples[0, 0] == pytest.approx(0.05, abs=1e-3)
+        assert abs(mixed.samples[-1, 0]) < 1e-3
+
+    def test_unreadable_track_returns_dialogue(self, tmp_path):
+        broken = tmp_path / "broken.wav"
+        broken.write_bytes(b"not audio")
+        dialogue = tone(100)
+
+        assert overlay_background_music(dialogue, broken) is dialogue
+
+    def test_music_ducks_under_speech(self, tmp_path):
+        track = write_wav(tmp_path / "bed.wav", 2500, value=0.5)  # looped, so no end fade
+        dialogue = build_timeline([tone(2000, value=0.0), tone(2000, value=0.2), tone(2000, value=0.0)], crossfade_ms=0)
+
+        mixed = overlay_background_music(dialogue.copy(), track, volume_reduction_db=20,
+                                         ducking={"duck_db": 10, "threshold_db": -45, "attack_ms": 100, "release_ms": 500})
+        music = mixed.samples[:, 0] - dialogue.samples[:, 0]
+
+        def level(ms):
+            return music[int(SAMPLE_RATE * ms / 1000)]
+
+        assert level(3000) == pytest.approx(0.05, rel=0.02)          # -20dB under speech
+        assert level(500) == pytest.approx(0.05 * 10 ** 0.5, rel=0.02)  # +10dB in the pause
+        assert level(500) > level(1950) > level(3000)                 # attack ramps down ahead of speech
+        assert level(4100) < level(4400) < level(5000)                # release ramps back up
+
+
+class TestDucking:
+    """Test the vectorized loop tiling and sidechain gain."""
+
+    def test_tile_loop_matches_crossfaded_appends(self):
+        rng = np.random.default_rng(0)
+        track = AudioBuffer(rng.standard_normal((SAMPLE_RATE * 3, CHANNELS)).astype(np.float32))
+        frames = SAMPLE_RATE * 10
+
+        tiled = tile_loop(track, frames, crossfade_ms=1000)
+        appended = concatenate([track] * 5, crossfade_ms=1000)
+
+        assert tiled.frames == frames
+        assert np.allclose(tiled.samples, appended.samples[:frames], atol=1e-5)
+
+    def test_tile_loop_handles_tiny_tracks(self):
+        assert tile_loop(tone(300), SAMPLE_RATE * 2).frames == SAMPLE_RATE * 2
+
+    def test_gain_is_zero_during_speech_and_full_in_pauses(self):
+        envelope = np.full(300, -90.0)
+        envelope[100:200] = -20.0
+
+        gain = ducking_gain(envelope, duck_db=10, threshold_db=-45, attack_ms=100, release_ms=500, block_ms=10)
+
+        assert np.all(gain[100:200] == 0)
+        assert gain[0] == 10 and gain[-1] == 10
+        assert 0 < gain[95] < 10          # within the attack window
+        assert 0 < gain[230] < gain[280]  # releasing
+        assert np.all(np.diff(gain[200:260]) >= 0)
+
+    def test_silent_dialogue_is_not_ducked(self):
+        assert np.all(ducking_gain(np.full(50, -120.0), duck_db=6) == 6)
+
+
+class TestStreamEpisode:
+    """Test block-by-block mixing of the whole episode."""
+
+    def speech(self):
+        rng = np.random.default_rng(0)
+        return [AudioBuffer(rng.uniform(-0.3, 0.3, (SAMPLE_RATE * ms // 1000, CHANNELS)).astype(np.float32))
+                for ms in (1500, 700, 2300)]
+
+    @pytest.mark.parametrize("bed_ms", [1800, 9000])
+    def test_stream_matches_whole_episode_mix(self, tmp_path, bed_ms):
+        track = write_wav(tmp_path / "bed.wav", bed_ms, value=0.5)
+        ducking = {"duck_db": 10, "threshold_db": -45, "attack_ms": 120, "release_ms": 600}
+        parts = self.speech()
+        music = AssetBank(cache_dir=None).load_file(track)
+
+        streamed = np.concatenate(list(stream_episode(plan_timeline(parts, crossfade_ms=0, gap_ms=400), music,
+                                                      ducking=ducking, block_ms=250)))
+        whole = overlay_background_music(build_timeline(parts, crossfade_ms=0, gap_ms=400), track, ducking=ducking)
+
+        assert streamed.shape == whole.samples.shape
+        assert np.allclose(streamed, whole.samples, atol=1e-5)
+
+    def test_without_music_streams_dialogue(self):
+        parts = self.speech()
+
+        streamed = np.concatenate(list(stream_episode(plan_timeline(parts, crossfade_ms=200), block_ms=100)))
+
+        assert np.allclose(streamed, build_timeline(parts, crossfade_ms=200).samples, atol=1e-6)
+
+    def test_memory_does_not_grow_with_episode_length(self, tmp_path):
+        music = AssetBank(cache_dir=None).load_file(write_wav(tmp_path / "bed.wav", 3000, value=0.2))
+        lines = self.speech()
+
+        def peak_mb(minutes):
+            # Same few line buffers repeated, so only the mixer's own allocations grow with length
+            segments = [lines[i % len(lines)] for i in range(minutes * 60 // 4)]
+            tracemalloc.start()
+            for _ in stream_episode(plan_timeline(segments, crossfade_ms=200), music):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak / 1e6
+
+        short, long = peak_mb(2), peak_mb(20)
+        full_episode_mb = 20 * 60 * SAMPLE_RATE * CHANNELS * 4 / 1e6
+        assert long < short * 1.5 + 2
+        assert long < full_episode_mb / 20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
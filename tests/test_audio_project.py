@@ -0,0 +1,153 @@
+"""
+Unit tests for audio/project.py module.
+
+Tests the edit decision list diff, partial re-mixing of the dialogue
+master and line stems.
+"""
+
+import json
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from src.audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE
+from src.audio.project import EDL_VERSION, EpisodeProject, changed_region, clip_entries
+from src.audio.timeline import Timeline
+
+
+def line(duration_ms, seed):
+    samples = (np.random.default_rng(seed).standard_normal(24 * duration_ms) * 3000).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+
+
+def layout(names, lines, crossfade_ms=200):
+    """Timeline and labels for named lines (name -> AudioSegment)."""
+    sources = [lines[name] for name in names]
+    return Timeline.sequence(sources, crossfade_ms=crossfade_ms), {id(lines[name]): name for name in names}
+
+
+@pytest.fixture
+def lines():
+    return {name: line(ms, seed) for seed, (name, ms) in enumerate(
+        [("a", 1200), ("b", 800), ("c", 1500), ("d", 600), ("e", 1000), ("b2", 1100)])}
+
+
+def entries(names, lines):
+    timeline, labels = layout(names, lines)
+    return clip_entries(timeline, labels), timeline.frames
+
+
+class TestChangedRegion:
+    """Test finding what an edit changed."""
+
+    def test_unchanged_timeline(self, lines):
+        old, frames = entries("abcde", lines)
+
+        assert changed_region(old, frames, old, frames) is None
+
+    def test_edited_line_changes_only_its_neighbourhood(self, lines):
+        old, old_frames = entries("abcde", lines)
+        new, new_frames = entries(["a", "b2", "c", "d", "e"], lines)
+
+        start, stop, shift = changed_region(old, old_frames, new, new_frames)
+
+        assert shift == new_frames - old_frames > 0
+        assert start == new[1]["start"]               # where the edited line starts
+        assert stop == new[1]["start"] + new[1]["frames"]
+        assert stop < new[-1]["start"]                # d and e are reused
+
+    def test_removed_and_inserted_lines(self, lines):
+        old, old_frames = entries("abcde", lines)
+
+        removed = changed_region(old, old_frames, *entries("abde", lines))
+        inserted = changed_region(old, old_frames, *entries(["a", "b", "b2", "c", "d", "e"], lines))
+
+        assert removed[2] < 0 and inserted[2] > 0
+        assert removed[0] >= old[1]["start"] and inserted[0] >= old[1]["start"]
+
+    def test_edit_at_the_end_runs_to_the_end(self, lines):
+        old, old_frames = entries("abcde", lines)
+        new, new_frames = entries("abcdb", lines)
+
+        assert changed_region(old, old_frames, new, new_frames)[1] == new_frames
+
+
+class TestEpisodeProject:
+    """Test re-mixing only the changed region of the master."""
+
+    @pytest.mark.parametrize("edit", [["a", "b2", "c", "d", "e"], list("abde"), list("abcdeb"), list("bcde")])
+    def test_partial_remix_matches_full_mix(self, tmp_path, lines, edit):
+        project = EpisodeProject(tmp_path / "project")
+        timeline, labels = layout("abcde", lines)
+        clips, _ = project.update_master(timeline, labels)
+        project.save_edl({"frames": timeline.frames, "clips": clips})
+
+        timeline, labels = layout(edit, lines)
+        _, (start, stop) = project.update_master(timeline, labels, project.load_edl())
+
+        expected = layout(edit, lines)[0].render().samples
+        assert np.allclose(project.master(), expected, atol=1e-6)
+        if edit[0] == "a":
+            assert start > 0
+
+    def test_unchanged_master_is_not_rewritten(self, tmp_path, lines):
+        project = EpisodeProject(tmp_path)
+        timeline, labels = layout("abc", lines)
+        clips, _ = project.update_master(timeline, labels)
+        project.save_edl({"frames": timeline.frames, "clips": clips})
+
+        assert project.update_master(*layout("abc", lines), project.load_edl())[1] == (0, 0)
+
+    def test_missing_master_mixes_everything(self, tmp_path, lines):
+        project = EpisodeProject(tmp_path)
+        timeline, labels = layout("abc", lines)
+        project.save_edl({"frames": timeline.frames, "clips": clip_entries(timeline, labels)})
+
+        assert project.update_master(timeline, labels, project.load_edl())[1] == (0, timeline.frames)
+
+    def test_master_timeline_streams_the_master(self, tmp_path, lines):
+        project = EpisodeProject(tmp_path)
+        timeline, labels = layout("ab", lines)
+        project.update_master(timeline, labels)
+
+        blocks = list(project.master_timeline().blocks(SAMPLE_RATE // 2))
+        assert np.allclose(np.concatenate(blocks), timeline.render().samples)
+
+    def test_unlabeled_silence_matches(self):
+        gap = AudioBuffer.silent(300)
+        noise = AudioBuffer(np.ones((100, CHANNELS), dtype=np.float32))
+
+        labels = [e["source"] for e in clip_entries(Timeline.sequence([gap, noise]), {})]
+        assert labels == ["silence", "unlabeled:1"]
+
+
+class TestProjectFiles:
+    """Test stems and the EDL on disk."""
+
+    def test_stems_round_trip_and_prune(self, tmp_path):
+        project = EpisodeProject(tmp_path)
+        project.save_stem("k1", line(500, 1))
+        project.save_stem("k2", line(500, 2))
+
+        assert project.load_stem("k1").raw_data == line(500, 1).raw_data
+        assert project.load_stem("missing") is None
+        project.prune_stems({"k2"})
+        assert project.load_stem("k1") is None and project.load_stem("k2") is not None
+
+    def test_edl_round_trip(self, tmp_path):
+        project = EpisodeProject(tmp_path)
+        project.save_edl({"frames": 10, "clips": [], "music": None})
+
+        edl = project.load_edl()
+        assert edl["frames"] == 10 and edl["version"] == EDL_VERSION
+
+    def test_edl_from_another_version_is_ignored(self, tmp_path):
+        (tmp_path / "edl.json").write_text(json.dumps({"version": EDL_VERSION + 1, "sample_rate": SAMPLE_RATE}))
+        (tmp_path / "broken").mkdir()
+        (tmp_path / "broken" / "edl.json").write_text("{nope")
+
+        assert EpisodeProject(tmp_path).load_edl() is None
+        assert EpisodeProject(tmp_path / "broken").load_edl() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,85 @@
+"""
+Unit tests for audio/timeline.py module.
+
+Tests clip layout, block-by-block mixing and lazy conversion of
+rendered lines.
+"""
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from unittest.mock import patch
+from src.audio import timeline as timeline_module
+from src.audio.buffer import AudioBuffer, CHANNELS, SAMPLE_RATE, concatenate
+from src.audio.timeline import Clip, Timeline
+
+
+def noise(duration_ms, seed):
+    frames = int(SAMPLE_RATE * duration_ms / 1000)
+    return AudioBuffer(np.random.default_rng(seed).uniform(-0.5, 0.5, (frames, CHANNELS)).astype(np.float32))
+
+
+def line(duration_ms, value=1000):
+    samples = np.full(24 * duration_ms, value, dtype=np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+
+
+class TestSequence:
+    """Test laying sources out end to end."""
+
+    def test_render_matches_concatenate(self):
+        parts = [noise(700, 1), noise(300, 2), noise(1200, 3), noise(50, 4)]
+
+        rendered = Timeline.sequence(parts, crossfade_ms=[200, 500, 100]).render()
+        expected = concatenate(parts, crossfade_ms=[200, 500, 100])
+
+        assert rendered.frames == expected.frames
+        assert np.allclose(rendered.samples, expected.samples, atol=1e-6)
+
+    def test_segments_are_laid_out_without_converting(self):
+        with patch.object(timeline_module.AudioBuffer, "from_segment", side_effect=AssertionError("converted")):
+            timeline = Timeline.sequence([line(1000), line(500)], crossfade_ms=200)
+
+        assert len(timeline) == 1300
+
+    def test_empty_timeline(self):
+        assert Timeline.sequence([]).render().frames == 0
+
+
+class TestBlocks:
+    """Test mixing the timeline in fixed-size blocks."""
+
+    @pytest.mark.parametrize("block_frames", [441, 1000, SAMPLE_RATE])
+    def test_blocks_join_to_full_render(self, block_frames):
+        parts = [noise(900, 1), noise(400, 2), noise(1500, 3)]
+        timeline = Timeline.sequence(parts, crossfade_ms=250)
+
+        blocks = list(timeline.blocks(block_frames))
+
+        assert all(len(b) == block_frames for b in blocks[:-1])
+        assert np.allclose(np.concatenate(blocks), concatenate(parts, crossfade_ms=250).samples, atol=1e-6)
+
+    def test_overlapping_clips_are_summed(self):
+        timeline = Timeline([Clip(noise(1000, 1), 0), Clip(noise(200, 2), SAMPLE_RATE // 2)])
+        mixed = np.concatenate(list(timeline.blocks(4410)))
+
+        assert timeline.frames == SAMPLE_RATE
+        start = SAMPLE_RATE // 2
+        expected = noise(1000, 1).samples[start:start + 100] + noise(200, 2).samples[:100]
+        assert np.allclose(mixed[start:start + 100], expected)
+
+    def test_lines_are_converted_once_and_released(self):
+        segments = [line(1000), line(1000), line(1000)]
+        timeline = Timeline.sequence(segments)
+
+        with patch.object(timeline_module.AudioBuffer, "from_segment",
+                          wraps=timeline_module.AudioBuffer.from_segment) as convert:
+            for _ in timeline.blocks(SAMPLE_RATE // 4):
+                held = sum(clip._samples is not None for clip in timeline.clips)
+                assert held <= 1
+
+        assert convert.call_count == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -12,10 +12,20 @@ from unittest.mock import patch, mock_open, MagicMock
 from src.brain import load_character, generate_script, BASE_PROMPT
 
 
+@pytest.fixture
+def character_registry(tmp_path):
+    """Registry over a temporary characters directory, patched into brain."""
+    from src.character_registry import CharacterRegistry
+    
+    registry = CharacterRegistry(tmp_path, check_interval=0)
+    with patch("src.brain.get_registry", return_value=registry):
+        yield tmp_path
+
+
 class TestLoadCharacter:
     """Test character loading functionality."""
     
-    def test_load_character_success(self):
+    def test_load_character_success(self, character_registry):
         """Test successful character loading."""
         mock_data = {
             "name": "Alex",
@@ -23,34 +33,46 @@ class TestLoadCharacter:
             "kokoro_voice": "am_michael",
             "elevenlabs_voice": "test_voice_id"
         }
+        (character_registry / "alex.json").write_text(json.dumps(mock_data))
         
-        with patch("builtins.open", mock_open(read_data=json.dumps(mock_data))):
-            with patch("src.brain.log_character_load"):
-                result = load_character("Alex")
+        with patch("src.brain.log_character_load"):
+            result = load_character("Alex")
                 
         assert result["name"] == "Alex"
         assert result["description"] == "The Hype Man"
         assert "kokoro_voice" in result
     
-    def test_load_character_file_not_found(self):
+    def test_load_character_file_not_found(self, character_registry):
         """Test character loading when file doesn't exist."""
-        with patch("builtins.open", side_effect=FileNotFoundError()):
-            with patch("src.brain.log_character_load"):
-                result = load_character("NonExistent")
+        with patch("src.brain.log_character_load"):
+            result = load_character("NonExistent")
         
         # Should return fallback character
         assert result["name"] == "NonExistent"
         assert result["description"] == "A standard radio host."
     
-    def test_load_character_invalid_json(self):
+    def test_load_character_invalid_json(self, character_registry):
         """Test character loading with invalid JSON."""
-        with patch("builtins.open", mock_open(read_data="invalid json")):
-            with patch("src.brain.log_character_load"):
-                result = load_character("BadJson")
+        (character_registry / "badjson.json").write_text("invalid json")
         
-        # Should return fallback character
+        with patch("src.brain.log_character_load") as mock_log:
+            result = load_character("BadJson")
+        
+        # Should return fallback character and report the parse error
         assert result["name"] == "BadJson"
         assert result["description"] == "A standard radio host."
+        assert mock_log.call_args.args[1] is False
+    
+    def test_load_character_is_cached(self, character_registry):
+        """Test that repeated loads don't re-read unchanged files."""
+        (character_registry / "sam.json").write_text(json.dumps({"name": "Sam", "description": "Tired"}))
+        
+        with patch("src.brain.log_character_load"):
+            load_character("Sam")
+            with patch("builtins.open", side_effect=AssertionError("file re-read")):
+                result = load_character("Sam")
+        
+        assert result["description"] == "Tired"
 
 
 class TestGenerateScript:
@@ -153,6 +175,110 @@ class TestGenerateScript:
         assert "- MARCUS: The Skeptic" in system_prompt
 
 
+class TestModelTiers:
+    """Test per-task model and option routing."""
+    
+    def test_defaults_keep_original_model(self):
+        """Test that every task defaults to the original 8B model."""
+        from src.llm.tiers import get_task_config, TASKS
+        
+        llm = MagicMock()
+        llm.name = "ollama"
+        for task in TASKS:
+            model, options = get_task_config(task, llm)
+            assert model == "llama3.1:8b"
+            assert "num_predict" in options
+    
+    def test_env_overrides_per_task(self):
+        """Test that LLM_<TASK>_* variables only affect their own task."""
+        from src.llm.tiers import get_task_config
+        
+        llm = MagicMock()
+        llm.name = "ollama-router"
+        env = {"LLM_PLANNING_MODEL": "llama3.2:3b", "LLM_PLANNING_NUM_PREDICT": "64"}
+        with patch.dict(os.environ, env):
+            planning_model, planning_options = get_task_config("planning", llm)
+            dialogue_model, dialogue_options = get_task_config("dialogue", llm)
+        
+        assert planning_model == "llama3.2:3b"
+        assert planning_options["num_predict"] == 64
+        assert dialogue_model == "llama3.1:8b"
+        assert dialogue_options["num_predict"] == 200
+    
+    def test_tasks_on_one_model_share_num_ctx(self):
+        """Test that tasks on the same model load it with one context size."""
+        from src.llm.tiers import get_task_config
+        
+        llm = MagicMock()
+        llm.name = "ollama"
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("LLM_PLANNING_MODEL", None)
+            _, planning_options = get_task_config("planning", llm)
+            _, dialogue_options = get_task_config("dialogue", llm)
+            assert planning_options["num_ctx"] == dialogue_options["num_ctx"] == 8192
+            
+            os.environ["LLM_PLANNING_MODEL"] = "llama3.2:3b"
+            os.environ["LLM_AD_COPY_MODEL"] = "llama3.2:3b"
+            _, planning_options = get_task_config("planning", llm)
+            _, ad_options = get_task_config("ad_copy", llm)
+            assert planning_options["num_ctx"] == ad_options["num_ctx"] == 8192
+            
+            os.environ["LLM_DIALOGUE_NUM_CTX"] = "16384"
+            _, planning_options = get_task_config("planning", llm)
+            _, dialogue_options = get_task_config("dialogue", llm)
+            assert planning_options["num_ctx"] == 8192
+            assert dialogue_options["num_ctx"] == 16384
+    
+    @patch("src.brain.get_host_ip")
+    def test_job_models_carry_load_options(self, mock_ip):
+        """Test that warmup gets each job model with the num_ctx its tasks use."""
+        from src.brain import get_job_models
+        
+        mock_ip.return_value = "tier-test-host"
+        with patch.dict(os.environ, {"LLM_PLANNING_MODEL": "llama3.2:3b"}):
+            models = get_job_models("Local (Ollama)")
+        
+        assert models == {"llama3.2:3b": {"num_ctx": 8192}, "llama3.1:8b": {"num_ctx": 8192}}
+    
+    def test_cloud_provider_uses_its_default_model(self):
+        """Test that cloud providers ignore local model names."""
+        from src.llm.tiers import get_task_config
+        
+        llm = MagicMock()
+        llm.name = "openai"
+        llm.default_model = "gpt-4o-mini"
+        with patch.dict(os.environ, {"LLM_PLANNING_MODEL": "llama3.2:3b"}):
+            model, _ = get_task_config("planning", llm)
+        
+        assert model == "gpt-4o-mini"
+    
+    def test_unknown_task_rejected(self):
+        """Test that typos in task names fail loudly."""
+        from src.llm.tiers import get_task_config
+        
+        with pytest.raises(ValueError, match="Unknown LLM task"):
+            get_task_config("planing", MagicMock())
+    
+    @patch("src.brain.requests.post")
+    @patch("src.brain.get_host_ip")
+    def test_plan_research_uses_planning_tier(self, mock_ip, mock_post):
+        """Test that plan_research sends the planning model and options."""
+        from src.brain import plan_research
+        
+        mock_ip.return_value = "tier-test-host"
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"response": '["src/main.py"]'}
+        mock_post.return_value = mock_response
+        
+        with patch.dict(os.environ, {"LLM_PLANNING_MODEL": "llama3.2:3b"}):
+            result = plan_research("src/main.py", "Local (Ollama)")
+        
+        assert result == ["src/main.py"]
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["model"] == "llama3.2:3b"
+        assert payload["options"]["num_ctx"] == 8192
+
+
 class TestPromptTemplate:
     """Test BASE_PROMPT template structure."""
     
@@ -0,0 +1,140 @@
+"""
+Unit tests for character_registry.py module.
+
+Tests validation, mtime-based reloading and
+speaker name/alias resolution.
+"""
+
+import os
+import json
+import pytest
+from src.character_registry import CharacterRegistry, CharacterError, validate_character, CHARACTERS_DIR
+
+
+def write_character(directory, stem, data, mtime=None):
+    path = directory / f"{stem}.json"
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+class TestValidateCharacter:
+    """Test character file validation."""
+
+    def test_valid_character(self):
+        data = {"name": "Alex", "description": "Hype", "kokoro_voice": "am_michael"}
+        assert validate_character(data) is data
+
+    def test_missing_required_field(self):
+        with pytest.raises(CharacterError, match="description"):
+            validate_character({"name": "Alex"})
+
+    def test_wrong_voice_type(self):
+        with pytest.raises(CharacterError, match="kokoro_voice"):
+            validate_character({"name": "Alex", "description": "Hype", "kokoro_voice": 3})
+
+    def test_not_an_object(self):
+        with pytest.raises(CharacterError, match="JSON object"):
+            validate_character(["Alex"])
+
+
+class TestCharacterRegistry:
+    """Test loading, invalidation and resolution."""
+
+    def test_loads_valid_and_reports_invalid(self, tmp_path):
+        write_character(tmp_path, "alex", {"name": "Alex", "description": "Hype"})
+        write_character(tmp_path, "broken", "{not json")
+        write_character(tmp_path, "nameless", {"description": "Who?"})
+
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        assert list(registry.all()) == ["Alex"]
+        assert set(registry.errors) == {"broken.json", "nameless.json"}
+
+    def test_reloads_only_on_mtime_change(self, tmp_path):
+        write_character(tmp_path, "sam", {"name": "Sam", "description": "Tired"}, mtime=1_000_000_000)
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+        assert registry.resolve("Sam")["description"] == "Tired"
+
+        # Same mtime: cached copy is kept even though the content changed
+        write_character(tmp_path, "sam", {"name": "Sam", "description": "Awake"}, mtime=1_000_000_000)
+        assert registry.resolve("Sam")["description"] == "Tired"
+
+        write_character(tmp_path, "sam", {"name": "Sam", "description": "Awake"}, mtime=2_000_000_000)
+        assert registry.resolve("Sam")["description"] == "Awake"
+
+    def test_picks_up_added_and_removed_files(self, tmp_path):
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+        assert registry.all() == {}
+
+        path = write_character(tmp_path, "riley", {"name": "Riley", "description": "PM"})
+        assert "Riley" in registry.all()
+
+        path.unlink()
+        assert registry.all() == {}
+        assert registry.resolve("Riley") is None
+
+    def test_check_interval_throttles_rescans(self, tmp_path):
+        registry = CharacterRegistry(tmp_path, check_interval=3600)
+        registry.refresh(force=True)
+        write_character(tmp_path, "casey", {"name": "Casey", "description": "Junior"})
+
+        assert registry.resolve("Casey") is None
+        registry.refresh(force=True)
+        assert registry.resolve("Casey")["name"] == "Casey"
+
+    @pytest.mark.parametrize("speaker", ["Alex", "ALEX", "alex:", "Host Alex", "Alex Chen", "  alex  ", "The Hype Man"])
+    def test_resolves_llm_speaker_spellings(self, tmp_path, speaker):
+        write_character(tmp_path, "alex", {"name": "Alex", "description": "Hype", "aliases": ["The Hype Man"]})
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        assert registry.resolve(speaker)["name"] == "Alex"
+
+    def test_unknown_speaker(self, tmp_path):
+        write_character(tmp_path, "alex", {"name": "Alex", "description": "Hype"})
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        assert registry.resolve("Narrator") is None
+        assert registry.resolve("") is None
+
+    def test_ambiguous_names_resolve_to_nothing(self, tmp_path):
+        write_character(tmp_path, "sam", {"name": "Sam Rivera", "description": "Host"})
+        write_character(tmp_path, "samuel", {"name": "Sam Okafor", "description": "Guest"})
+        write_character(tmp_path, "alex", {"name": "Alex Chen", "description": "Hype", "aliases": ["The Host"]})
+        write_character(tmp_path, "marcus", {"name": "Marcus", "description": "Skeptic", "aliases": ["The Host"]})
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        # "sam" is one file's stem, so it beats the other's first name
+        assert registry.resolve("Sam")["name"] == "Sam Rivera"
+        assert registry.resolve("Sam Okafor")["name"] == "Sam Okafor"
+        assert registry.resolve("Alex")["name"] == "Alex Chen"
+        assert registry.resolve("The Host") is None
+        assert registry.resolve("Sam and Alex") is None
+        assert registry.resolve("Alex and Marcus") is None
+
+    def test_shared_first_name_is_not_guessed(self, tmp_path):
+        write_character(tmp_path, "jordan_a", {"name": "Jordan Lee", "description": "Host"})
+        write_character(tmp_path, "jordan_b", {"name": "Jordan Park", "description": "Guest"})
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        assert registry.resolve("Jordan") is None
+        assert registry.resolve("Jordan Park")["name"] == "Jordan Park"
+
+    def test_returned_data_is_a_copy(self, tmp_path):
+        write_character(tmp_path, "alex", {"name": "Alex", "description": "Hype"})
+        registry = CharacterRegistry(tmp_path, check_interval=0)
+
+        registry.resolve("Alex")["description"] = "changed"
+        assert registry.resolve("Alex")["description"] == "Hype"
+
+    def test_bundled_characters_are_valid(self):
+        """Every shipped character file must pass validation."""
+        registry = CharacterRegistry(CHARACTERS_DIR, check_interval=0)
+
+        assert registry.errors == {}
+        assert len(registry.all()) >= 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
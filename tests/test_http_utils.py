@@ -0,0 +1,27 @@
+"""
+Unit tests for http_utils.py module.
+
+Tests rate-limit header parsing shared by the LLM and TTS clients.
+"""
+
+import pytest
+from src.http_utils import parse_retry_after
+
+
+class TestParseRetryAfter:
+    """Test rate-limit header parsing."""
+
+    def test_retry_after_ms_preferred(self):
+        assert parse_retry_after({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+
+    def test_retry_after_seconds(self):
+        assert parse_retry_after({"retry-after": "3"}) == 3.0
+
+    def test_missing_or_invalid(self):
+        assert parse_retry_after({}) is None
+        assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+        assert parse_retry_after(None) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
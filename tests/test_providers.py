@@ -0,0 +1,286 @@
+"""
+Unit tests for llm/providers.py module.
+
+Runs the OpenAI-compatible provider against a local stub server
+to cover streaming, rate-limit retries and concurrency limits, and a
+fake provider for the limit shared by concurrent episodes.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from src.llm.providers import (
+    LLMProvider,
+    OpenAICompatibleProvider,
+    OllamaProvider,
+    ProviderError,
+    RateLimitError,
+    run_sync,
+)
+
+
+class StubOpenAIServer:
+    """Minimal /v1/chat/completions server that streams canned content."""
+
+    def __init__(self, content='{"speaker": "Alex", "text": "Hello!"}', rate_limit_first=0, delay=0.0):
+        self.content = content
+        self.rate_limit_remaining = rate_limit_first
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append(body)
+                    if stub.rate_limit_remaining > 0:
+                        stub.rate_limit_remaining -= 1
+                        limited = True
+                    else:
+                        limited = False
+                        stub.in_flight += 1
+                        stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+
+                if limited:
+                    payload = json.dumps({"error": {"message": "slow down", "type": "rate_limit"}}).encode()
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("retry-after-ms", "10")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                time.sleep(stub.delay)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                # Stream the content in a few pieces
+                pieces = [stub.content[i:i + 8] for i in range(0, len(stub.content), 8)]
+                for piece in pieces:
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                with stub.lock:
+                    stub.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestOpenAICompatibleProvider:
+    """Test the OpenAI-compatible provider against a stub server."""
+
+    def test_streamed_completion_is_assembled(self):
+        """Test that streamed chunks are joined into one completion."""
+        with StubOpenAIServer() as stub:
+            provider = OpenAICompatibleProvider(base_url=stub.base_url, api_key="test", model="stub-model")
+            result = run_sync(provider.complete("Say hi in JSON", options={"num_predict": 50, "temperature": 0.5}))
+
+        assert json.loads(result) == {"speaker": "Alex", "text": "Hello!"}
+        request = stub.requests[0]
+        assert request["model"] == "stub-model"
+        assert request["stream"] is True
+        assert request["max_tokens"] == 50
+        assert request["response_format"] == {"type": "json_object"}
+
+    def test_stream_yields_incremental_chunks(self):
+        """Test that stream() yields pieces as they arrive."""
+        async def collect(provider):
+            return [piece async for piece in provider.stream("hi", json_mode=False)]
+
+        with StubOpenAIServer(content="abcdefghijklmnopqrstuvwxyz") as stub:
+            provider = OpenAICompatibleProvider(base_url=stub.base_url, api_key="test")
+            pieces = run_sync(collect(provider))
+
+        assert len(pieces) > 1
+        assert "".join(pieces) == "abcdefghijklmnopqrstuvwxyz"
+        assert "response_format" not in stub.requests[0]
+
+    def test_rate_limit_retries_then_succeeds(self):
+        """Test that 429 responses are retried after the advertised delay."""
+        with StubOpenAIServer(rate_limit_first=2) as stub:
+            provider = OpenAICompatibleProvider(base_url=stub.base_url, api_key="test", max_retries=3)
+            result = run_sync(provider.complete("hi"))
+
+        assert json.loads(result)["speaker"] == "Alex"
+        assert len(stub.requests) == 3
+
+    def test_rate_limit_exhausts_retries(self):
+        """Test that persistent 429s raise RateLimitError."""
+        with StubOpenAIServer(rate_limit_first=10) as stub:
+            provider = OpenAICompatibleProvider(base_url=stub.base_url, api_key="test", max_retries=1)
+            with pytest.raises(RateLimitError):
+                run_sync(provider.complete("hi"))
+
+        assert len(stub.requests) == 2
+
+    def test_concurrency_limit_is_respected(self):
+        """Test that no more than max_concurrency requests are in flight."""
+        import asyncio
+
+        async def fan_out(provider):
+            return await asyncio.gather(*[provider.complete("hi") for _ in range(6)])
+
+        with StubOpenAIServer(delay=0.05) as stub:
+            provider = OpenAICompatibleProvider(base_url=stub.base_url, api_key="test", max_concurrency=2)
+            results = run_sync(fan_out(provider))
+
+        assert len(results) == 6
+        assert stub.max_in_flight <= 2
+
+    def test_connection_error_raises_provider_error(self):
+        """Test that an unreachable endpoint surfaces as ProviderError."""
+        provider = OpenAICompatibleProvider(base_url="http://127.0.0.1:9/v1", api_key="test", max_retries=0)
+        with pytest.raises(ProviderError):
+            run_sync(provider.complete("hi"))
+
+
+class FlakyProvider(LLMProvider):
+    """Provider whose "flaky" prompt fails once; records how many calls overlap."""
+
+    name = "flaky"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _complete_once(self, prompt, model, options, json_mode):
+        self.calls.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if prompt == "flaky" and self.calls.count("flaky") == 1:
+                raise ProviderError("boom")
+            return f"done:{prompt}"
+        finally:
+            self.in_flight -= 1
+
+
+class TestSharedConcurrency:
+    """Test the concurrency limit shared by concurrent episodes."""
+
+    def test_serial_episodes_fill_the_parallel_limit(self):
+        """Test that one-line-at-a-time episodes together keep max_concurrency busy."""
+        provider = FlakyProvider(max_concurrency=3)
+
+        async def episode(e):
+            return [await provider.complete(f"{e}-{i}") for i in range(3)]
+
+        async def go():
+            return await asyncio.gather(*[episode(e) for e in range(6)])
+
+        results = run_sync(go())
+
+        assert results[5] == ["done:5-0", "done:5-1", "done:5-2"]
+        assert provider.max_in_flight == 3
+
+    def test_backoff_releases_the_slot(self):
+        """Test that a request waiting to retry lets other requests run."""
+        provider = FlakyProvider(max_concurrency=1, backoff_base=0.3, backoff_max=0.3)
+
+        async def go():
+            with patch("src.llm.providers.random.uniform", return_value=0.3):
+                flaky = asyncio.ensure_future(provider.complete("flaky"))
+                await asyncio.sleep(0.05)
+                other = await provider.complete("other")
+                return other, await flaky
+
+        assert run_sync(go()) == ("done:other", "done:flaky")
+        assert provider.calls == ["flaky", "other", "flaky"]
+
+
+class TestOllamaProvider:
+    """Test the Ollama provider request mapping."""
+
+    @patch("src.llm.providers.requests.post")
+    def test_ollama_payload(self, mock_post):
+        """Test that options and JSON mode map onto the Ollama payload."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"response": ' {"speaker": "Sam", "text": "Hey"} '}
+        mock_post.return_value = mock_response
+
+        provider = OllamaProvider("http://localhost:11434")
+        result = run_sync(provider.complete("hi", options={"num_predict": 10}))
+
+        assert result == '{"speaker": "Sam", "text": "Hey"}'
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["model"] == "llama3.1:8b"
+        assert payload["format"] == "json"
+        assert payload["options"] == {"num_predict": 10}
+        assert "keep_alive" not in payload
+
+    @patch("src.llm.providers.requests.post")
+    def test_ollama_warmup_sends_empty_prompt(self, mock_post):
+        """Test that warmup loads the model with an empty prompt and keep_alive."""
+        mock_post.return_value = MagicMock(status_code=200)
+
+        provider = OllamaProvider("http://localhost:11434", keep_alive="30m")
+        duration_ms = run_sync(provider.warmup("llama3.2:3b"))
+
+        assert duration_ms >= 0
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload == {"model": "llama3.2:3b", "prompt": "", "stream": False, "keep_alive": "30m"}
+
+    @patch("src.llm.providers.requests.post")
+    def test_ollama_warmup_loads_with_job_options(self, mock_post):
+        """Test that warmup loads the model with the num_ctx later requests use."""
+        mock_post.return_value = MagicMock(status_code=200)
+
+        provider = OllamaProvider("http://localhost:11434")
+        run_sync(provider.warmup("llama3.1:8b", {"num_ctx": 8192}))
+
+        assert mock_post.call_args.kwargs["json"]["options"] == {"num_ctx": 8192}
+
+    @patch("src.llm.providers.requests.post")
+    def test_warmup_is_not_counted_as_steady_state(self, mock_post):
+        """Test that only real completions feed the latency summary."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"response": "{}"}
+        mock_post.return_value = mock_response
+
+        provider = OllamaProvider("http://localhost:11434")
+        run_sync(provider.warmup(None))
+        assert provider.latency_summary()["count"] == 0
+
+        run_sync(provider.complete("hi"))
+        summary = provider.latency_summary()
+        assert summary["count"] == 1
+        assert summary["p50_ms"] is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,185 @@
+"""
+Unit tests for llm/router.py module.
+
+Runs the multi-host Ollama router against local stub servers to cover
+balancing, health/model probes and hedged requests.
+"""
+
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.llm.router import OllamaRouter, ProviderError, normalize_model_name, ollama_base_url
+from src.llm.providers import run_sync
+
+
+class StubOllamaServer:
+    """Minimal Ollama server exposing /api/tags and /api/generate."""
+
+    def __init__(self, models=("llama3.1:8b",), delay=0.0, reply="ok"):
+        self.models = list(models)
+        self.delay = delay
+        self.reply = reply
+        self.generate_calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, data):
+                payload = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._send_json({"models": [{"name": m} for m in stub.models]})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                stub.generate_calls += 1
+                time.sleep(stub.delay)
+                self._send_json({"response": stub.reply})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_router(urls, **kwargs):
+    kwargs.setdefault("probe_interval", 60)
+    kwargs.setdefault("backoff_base", 0.01)
+    return OllamaRouter(urls, **kwargs)
+
+
+class TestHostParsing:
+    """Test OLLAMA_HOSTS entry parsing."""
+
+    def test_bare_ip_gets_scheme_and_port(self):
+        assert ollama_base_url("192.168.1.119") == "http://192.168.1.119:11434"
+
+    def test_host_with_port(self):
+        assert ollama_base_url("gpu2:8080") == "http://gpu2:8080"
+
+    def test_full_url_kept(self):
+        assert ollama_base_url("https://gpu3:11434/") == "https://gpu3:11434"
+
+    def test_model_name_normalization(self):
+        assert normalize_model_name("llama3.1") == "llama3.1:latest"
+        assert normalize_model_name("llama3.1:8b") == "llama3.1:8b"
+
+
+class TestEndpointSelection:
+    """Test least-outstanding-requests selection."""
+
+    def test_picks_least_outstanding(self):
+        router = make_router(["a", "b", "c"])
+        router.endpoints[0].outstanding = 3
+        router.endpoints[1].outstanding = 1
+        router.endpoints[2].outstanding = 2
+
+        assert router.pick("llama3.1:8b") is router.endpoints[1]
+
+    def test_ties_go_to_first_listed(self):
+        router = make_router(["a", "b", "c"])
+        router.endpoints[0].outstanding = 2
+
+        assert router.pick("llama3.1:8b") is router.endpoints[1]
+        assert router.pick("llama3.1:8b", exclude=[router.endpoints[1]]) is router.endpoints[2]
+
+    def test_skips_unhealthy_and_missing_model(self):
+        router = make_router(["a", "b", "c"])
+        router.endpoints[0].healthy = False
+        router.endpoints[1].models = {"mistral:latest"}
+        router.endpoints[2].outstanding = 10
+        router.endpoints[2].models = {"llama3.1:8b"}
+
+        assert router.pick("llama3.1:8b") is router.endpoints[2]
+
+    def test_falls_back_when_nothing_healthy(self):
+        router = make_router(["a", "b"])
+        for endpoint in router.endpoints:
+            endpoint.healthy = False
+
+        assert router.pick("llama3.1:8b") in router.endpoints
+
+    def test_hedge_delay_needs_samples(self):
+        router = make_router(["a", "b"], hedge_percentile=90, hedge_min_samples=10)
+        router.call_latencies.extend([0.1] * 5)
+        assert router.hedge_delay() is None
+
+        router.call_latencies.extend([0.1] * 4 + [5.0])
+        assert router.hedge_delay() == 5.0
+
+
+class TestRouterRequests:
+    """Test routing against stub Ollama servers."""
+
+    def test_probe_marks_down_and_missing_model(self):
+        """Test that probes drop dead servers and servers without the model."""
+        with StubOllamaServer(models=["mistral"]) as wrong_model, StubOllamaServer(reply="good") as good:
+            router = make_router([wrong_model.url, good.url, "127.0.0.1:9"])
+            results = [run_sync(router.complete("hi")) for _ in range(4)]
+
+        assert results == ["good"] * 4
+        assert good.generate_calls == 4
+        assert wrong_model.generate_calls == 0
+        assert router.endpoints[2].healthy is False
+        assert router.endpoints[0].models == {"mistral:latest"}
+
+    def test_failed_endpoint_is_retried_elsewhere(self):
+        """Test that a request failing on one server succeeds on another."""
+        with StubOllamaServer(reply="good") as good:
+            router = make_router(["127.0.0.1:9", good.url])
+            # Pretend the dead server looked healthy at the last probe
+            router._probe_task = object()
+
+            result = run_sync(router.complete("hi"))
+
+        assert result == "good"
+        assert router.endpoints[0].healthy is False
+        assert router.endpoints[0].failures == 1
+
+    def test_hedged_request_wins_on_fast_server(self):
+        """Test that a slow request is hedged onto a second server."""
+        with StubOllamaServer(delay=1.0, reply="slow") as slow, StubOllamaServer(reply="fast") as fast:
+            router = make_router([slow.url, fast.url], hedge_percentile=50, hedge_min_samples=5)
+            router.call_latencies.extend([0.05] * 10)
+            router._probe_task = object()
+            # Force the slow server to be chosen first
+            router.endpoints[1].outstanding = 1
+
+            start = time.monotonic()
+            result = run_sync(router.complete("hi"))
+            elapsed = time.monotonic() - start
+            router.endpoints[1].outstanding = 0
+
+        assert result == "fast"
+        assert elapsed < 0.9
+        assert router.hedges_fired == 1
+        assert router.hedges_won == 1
+
+    def test_all_endpoints_down_raises(self):
+        """Test that a router with no reachable servers raises ProviderError."""
+        router = make_router(["127.0.0.1:9", "127.0.0.1:7"], max_retries=1)
+        with pytest.raises(ProviderError):
+            run_sync(router.complete("hi"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,89 @@
+"""
+Unit tests for tts/alignment.py module.
+
+Tests timing sentences from the speech in rendered audio, stitching part
+timings into a line and looking up when a character is spoken.
+"""
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from src.tts.alignment import estimate_alignment, line_alignment, sentence_spans, time_at, voiced_runs
+from src.tts.normalize import normalize_for_tts, spoken_offset
+
+RATE = 24000
+
+
+def tone(ms):
+    samples = (np.sin(np.arange(RATE * ms // 1000) / 3) * 8000).astype(np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=RATE, channels=1)
+
+
+def pause(ms):
+    return AudioSegment.silent(duration=ms, frame_rate=RATE)
+
+
+class TestEstimate:
+    """Test timing text that came without timestamps."""
+
+    def test_sentences_land_on_their_speech(self):
+        """Test that each sentence is placed on its own stretch of speech, not spread by length."""
+        text = "A long opening sentence that keeps going for a while. Short one."
+        audio = pause(200) + tone(600) + pause(400) + tone(1500) + pause(300)
+
+        anchors = estimate_alignment(text, audio)
+
+        second = text.index("Short")
+        assert voiced_runs(audio) == [[200, 800], [1200, 2700]]
+        assert anchors == [[0, 200], [second - 1, 800], [second, 1200], [len(text), 2700]]
+
+    def test_pauses_inside_a_sentence_are_not_sentence_ends(self):
+        """Test that a comma pause doesn't take a sentence end from the pause nearest it."""
+        text = "One, two three four. Five six seven eight nine ten."
+        audio = tone(200) + pause(200) + tone(600) + pause(300) + tone(1200)
+
+        anchors = estimate_alignment(text, audio)
+
+        assert [text.index("Five") - 1, 1000] in anchors and [text.index("Five"), 1300] in anchors
+
+    def test_silent_audio_spreads_over_normalized_length(self):
+        text = "Open package.json now."
+        anchors = estimate_alignment(text, pause(1000))
+
+        assert anchors == [[0, 0], [len(normalize_for_tts(text)), 1000]]
+
+    def test_sentence_spans(self):
+        assert sentence_spans("Hi there. How are you?  Fine!") == [(0, 9), (10, 22), (24, 29)]
+
+
+class TestLineAlignment:
+    """Test stitching part timings into a line."""
+
+    def test_parts_are_offset_by_duration_and_gap(self):
+        """Test that the second part's timing starts after the first part and the stitch gap."""
+        first, second = "Check src/main.py today.", "Then ship it."
+        timed = tone(500)
+        timed.alignment = [[0, 0], [len(normalize_for_tts(second)), 500]]
+
+        anchors = line_alignment(f"{first} {second}", [first, second], [pause(100) + tone(800) + pause(100), timed],
+                                 gap_ms=150)
+
+        spoken_first = len(normalize_for_tts(first))
+        assert anchors[:2] == [[0, 100], [spoken_first, 900]]
+        assert anchors[2:] == [[spoken_first + 1, 1150], [spoken_first + 1 + len(normalize_for_tts(second)), 1650]]
+
+    def test_time_at_maps_written_offset_through_normalized_text(self):
+        """Test that a word after a long code token is timed by where it falls in the spoken text."""
+        text = "Edit src/components/Header.tsx now"
+        line = pause(1000)
+        spoken = normalize_for_tts(text)
+        line.alignment = [[0, 0], [len(spoken), 1000]]
+
+        at = time_at(text, line, text.index("now"))
+
+        assert at == pytest.approx(spoken_offset(text, text.index("now")) / len(spoken) * 1000)
+        assert at > text.index("now") / len(text) * 1000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
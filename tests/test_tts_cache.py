@@ -0,0 +1,131 @@
+"""
+Unit tests for tts/cache.py module.
+
+Tests key derivation, FLAC round trips, the memory LRU,
+disk eviction and hit-rate reporting.
+"""
+
+import os
+import numpy as np
+import pytest
+from src.tts.cache import SegmentCache, segment_key, pcm_to_segment, segment_to_pcm, format_cache_stats
+
+
+def make_segment(seconds=0.1, sample_rate=24000, channels=1, seed=0):
+    rng = np.random.default_rng(seed)
+    pcm = rng.integers(-20000, 20000, size=(int(seconds * sample_rate), channels), dtype=np.int16)
+    return pcm_to_segment(pcm, sample_rate)
+
+
+class TestSegmentKey:
+    """Test cache key derivation."""
+
+    def test_whitespace_is_normalized(self):
+        assert segment_key("Local", "af_bella", "Hello   world\n") == segment_key("Local", "af_bella", " Hello world")
+
+    @pytest.mark.parametrize("field, value", [
+        ("provider", "Cloud"), ("voice_id", "bf_emma"), ("text", "Hello World"),
+        ("speed", 1.1), ("lang", "en-gb"), ("engine_version", "v2"),
+    ])
+    def test_every_field_changes_the_key(self, field, value):
+        base = dict(provider="Local", voice_id="af_bella", text="Hello world", speed=1.0, lang="en-us", engine_version="v1")
+        assert segment_key(**base) != segment_key(**dict(base, **{field: value}))
+
+
+class TestSegmentCache:
+    """Test the two cache levels."""
+
+    def test_disk_round_trip_is_lossless(self, tmp_path):
+        segment = make_segment(channels=2, sample_rate=44100)
+        SegmentCache(tmp_path).put("ab" * 32, segment)
+
+        # A fresh instance (new process) only has the disk level
+        cached = SegmentCache(tmp_path).get("ab" * 32)
+
+        assert cached.raw_data == segment.raw_data
+        assert (cached.frame_rate, cached.channels, cached.sample_width) == (44100, 2, 2)
+        assert list(tmp_path.glob("ab/*.flac"))
+
+    def test_alignment_is_kept_on_disk(self, tmp_path):
+        """Test that a segment's spoken-time alignment survives the FLAC round trip."""
+        segment = make_segment()
+        segment.alignment = [[0, 12], [5, 80]]
+        SegmentCache(tmp_path).put("cd" * 32, segment)
+
+        assert SegmentCache(tmp_path).get("cd" * 32).alignment == [[0, 12], [5, 80]]
+
+    def test_flac_is_smaller_than_pcm(self, tmp_path):
+        tone = (np.sin(np.linspace(0, 400 * np.pi, 24000)) * 8000).astype(np.int16)
+        SegmentCache(tmp_path).put("cd" * 32, pcm_to_segment(tone, 24000))
+
+        stored = next(tmp_path.glob("cd/*.flac")).stat().st_size
+        assert stored < tone.nbytes / 2
+
+    def test_memory_then_disk_then_miss(self, tmp_path):
+        cache = SegmentCache(tmp_path)
+        cache.put("k1" * 32, make_segment())
+
+        assert cache.get("k1" * 32) is not None
+        cache.memory.clear()
+        assert cache.get("k1" * 32) is not None
+        assert cache.get("k2" * 32) is None
+
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+        assert format_cache_stats(stats).startswith("TTS cache: 2/3 hits (67%")
+
+    def test_memory_lru_is_bounded(self):
+        one = len(make_segment().raw_data)
+        cache = SegmentCache(directory=None, max_memory_bytes=one * 2)
+        for key in ("a", "b", "c"):
+            cache.put(key, make_segment())
+            if key == "b":
+                cache.get("a")  # a is now more recent than b
+
+        assert set(cache.memory) == {"a", "c"}
+        assert cache.memory_bytes <= one * 2
+
+    def test_disk_eviction_drops_least_recently_used(self, tmp_path):
+        segment = make_segment(seconds=0.5)
+        probe = SegmentCache(tmp_path / "probe")
+        probe.put("00" * 32, segment)
+        entry_size = next((tmp_path / "probe").glob("*/*.flac")).stat().st_size
+
+        cache = SegmentCache(tmp_path / "cache", max_disk_bytes=int(entry_size * 2.5))
+        for i, key in enumerate(("aa" * 32, "bb" * 32)):
+            cache.put(key, segment)
+            os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+        cache.get("aa" * 32)  # refreshes aa's mtime, so bb is now the oldest
+        cache.put("cc" * 32, segment)
+
+        assert not cache._path("bb" * 32).exists()
+        assert cache._path("aa" * 32).exists() and cache._path("cc" * 32).exists()
+        assert cache.stats()["evictions"] == 1
+        assert cache.disk_bytes <= cache.max_disk_bytes
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        cache = SegmentCache(tmp_path)
+        path = cache._path("ef" * 32)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"not flac")
+
+        assert cache.get("ef" * 32) is None
+
+    def test_memory_only_mode_writes_nothing(self, tmp_path):
+        cache = SegmentCache(tmp_path, max_disk_bytes=0)
+        cache.put("k" * 64, make_segment())
+
+        assert cache.get("k" * 64) is not None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_pcm_helpers_round_trip(self):
+        segment = make_segment()
+        pcm, sample_rate = segment_to_pcm(segment)
+
+        assert pcm.shape == (2400, 1)
+        assert pcm_to_segment(pcm, sample_rate).raw_data == segment.raw_data
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
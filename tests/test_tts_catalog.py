@@ -0,0 +1,134 @@
+"""
+Unit tests for tts/catalog.py module.
+
+Tests ad template expansion, building the pre-rendered ad catalog,
+catalog hits at render time and invalidation.
+"""
+
+import json
+import random
+import pytest
+from unittest.mock import patch
+from pydub import AudioSegment
+from src.ads import AD_TEMPLATES, COMMON_PACKAGES, FALLBACK_AD, expand_ad_texts, generate_fake_ad
+from src.tts.cache import SegmentCache
+from src.tts.catalog import AdCatalog, catalog_fingerprint
+
+PROVIDER = "Cloud (ElevenLabs)"
+
+
+@pytest.fixture
+def characters(tmp_path):
+    """Two hosts with distinct voices, patched into voice."""
+    from src.character_registry import CharacterRegistry
+
+    directory = tmp_path / "characters"
+    directory.mkdir()
+    for name, voice in (("alex", "voice_a"), ("sam", "voice_s")):
+        (directory / f"{name}.json").write_text(json.dumps(
+            {"name": name.capitalize(), "description": "Host", "kokoro_voice": voice, "elevenlabs_voice": voice}))
+    registry = CharacterRegistry(directory, check_interval=0)
+    with patch("src.voice.get_registry", return_value=registry):
+        yield directory
+
+
+@pytest.fixture
+def tts(tmp_path, monkeypatch):
+    """Fake cloud TTS recording what it synthesized; catalog under tmp_path."""
+    monkeypatch.setenv("AD_CATALOG_DIR", str(tmp_path / "ads"))
+    synthesized = []
+
+    def fake_tts(text, voice_id, provider, speaker="System", tts=None):
+        synthesized.append((voice_id, text))
+        return AudioSegment.silent(duration=200 + len(text), frame_rate=24000)
+
+    with patch("src.voice.synthesize_text", side_effect=fake_tts), \
+         patch("src.voice.get_tts_version", return_value="test"), \
+         patch("src.voice.get_segment_cache", return_value=SegmentCache(directory=None)):
+        yield synthesized
+
+
+class TestExpandAdTexts:
+    """Test that the catalog covers what the ad generator produces."""
+
+    def test_generated_ads_are_in_the_expansion(self):
+        """Test that every ad for a common package is one of the expanded texts."""
+        texts = set(expand_ad_texts(COMMON_PACKAGES[:5] + ["react-dom"]))
+        dependencies = "\n".join(COMMON_PACKAGES[:5] + ["react-dom"])
+        random.seed(0)
+        for _ in range(200):
+            assert generate_fake_ad(dependencies, ["Alex"])["text"] in texts
+        assert generate_fake_ad("", ["Alex"])["text"] in texts
+
+    def test_special_templates_are_not_expanded_per_package(self):
+        """Test that packages with special templates don't add generic variants."""
+        texts = expand_ad_texts(["react", "react-dom"])
+        special = sum(len(t) for key, t in AD_TEMPLATES.items() if key != "generic")
+        assert len(texts) == special + 1
+        assert texts[0] == FALLBACK_AD
+
+
+class TestAdCatalog:
+    """Test building the catalog and using it at render time."""
+
+    def test_build_then_ad_line_needs_no_tts(self, characters, tts, capsys):
+        """Test that a built catalog serves ad lines without synthesis."""
+        from src.voice import build_ad_catalog, render_script_lines
+
+        result = build_ad_catalog(PROVIDER, packages=["flask"], max_workers=2)
+        texts = expand_ad_texts(["flask"])
+        assert result["lines"] == result["rendered"] == 2 * len(texts)
+        assert {voice for voice, _ in tts} == {"voice_a", "voice_s"}
+
+        tts.clear()
+        script = [{"speaker": "Sam", "text": texts[5], "type": "ad"},
+                  {"speaker": "Alex", "text": "Back to the code!"}]
+        segments = render_script_lines(script, PROVIDER, max_workers=2)
+        assert tts == [("voice_a", "Back to the code!")]
+        assert len(segments[0]) == 200 + len(texts[5])
+        assert "1 ad lines from the catalog" in capsys.readouterr().out
+
+    def test_rebuild_reuses_entries(self, characters, tts):
+        """Test that building again only renders what is missing."""
+        from src.voice import build_ad_catalog
+
+        build_ad_catalog(PROVIDER, packages=[], max_workers=2)
+        tts.clear()
+        result = build_ad_catalog(PROVIDER, packages=["flask"], max_workers=2)
+        generic = len(expand_ad_texts(["flask"])) - len(expand_ad_texts([]))
+        assert len(tts) == result["rendered"] == 2 * generic
+        assert result["reused"] == 2 * len(expand_ad_texts([]))
+
+    def test_template_or_voice_change_invalidates(self, characters, tts, tmp_path):
+        """Test that the catalog is ignored once templates or voices change."""
+        from src.voice import ad_catalog_fingerprint, build_ad_catalog, get_catalog_dir, line_stem_key
+
+        build_ad_catalog(PROVIDER, packages=[], max_workers=2)
+        key = line_stem_key(FALLBACK_AD, "voice_a", PROVIDER)
+        assert AdCatalog(get_catalog_dir(PROVIDER), ad_catalog_fingerprint(PROVIDER)).get(key) is not None
+
+        # tts.catalog imports ads the way the app does
+        with patch.dict("ads.AD_TEMPLATES", {"flask": ["Flask: tiny, until it isn't."]}):
+            catalog = AdCatalog(get_catalog_dir(PROVIDER), ad_catalog_fingerprint(PROVIDER))
+            assert catalog.stale and catalog.get(key) is None
+
+        (characters / "riley.json").write_text(json.dumps(
+            {"name": "Riley", "description": "Host", "kokoro_voice": "voice_r", "elevenlabs_voice": "voice_r"}))
+        catalog = AdCatalog(get_catalog_dir(PROVIDER), ad_catalog_fingerprint(PROVIDER))
+        assert catalog.stale and catalog.get(key) is None
+
+    def test_fingerprint_covers_engine_version(self):
+        """Test that a new TTS engine version changes the fingerprint."""
+        assert catalog_fingerprint(PROVIDER, "v1", ["a"]) != catalog_fingerprint(PROVIDER, "v2", ["a"])
+        assert catalog_fingerprint(PROVIDER, "v1", ["a", "b"]) == catalog_fingerprint(PROVIDER, "v1", ["b", "a"])
+
+    def test_missing_catalog_falls_back_to_tts(self, characters, tts):
+        """Test that ad lines render normally without a catalog."""
+        from src.voice import render_script_lines
+
+        segments = render_script_lines([{"speaker": "Alex", "text": FALLBACK_AD, "type": "ad"}], PROVIDER, 1)
+        assert tts == [("voice_a", FALLBACK_AD)] and 0 in segments
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,312 @@
+"""
+Unit tests for tts/cloud.py module.
+
+Runs the ElevenLabs client against a local stub server to cover
+streaming, connection reuse, 429 backoff and retries.
+"""
+
+import io
+import json
+import base64
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from pydub import AudioSegment
+from src.tts.cloud import AdaptiveLimiter, CloudTTSError, ElevenLabsTTS, RateLimitError, pcm_format_rate
+
+PCM_200MS = b"\x01\x00" * 4800  # 200ms of 16-bit mono at 24kHz
+
+
+class StubElevenLabsServer:
+    """Minimal /v1/text-to-speech/{voice}/stream server streaming canned audio.
+
+    Answers 429 once more than `concurrency_limit` requests are in flight,
+    like an account's concurrent-request cap.
+    """
+
+    def __init__(self, audio=PCM_200MS, concurrency_limit=None, rate_limit_first=0, fail_first=0,
+                 status=500, delay=0.0, relative_times=False):
+        self.audio = audio
+        self.relative_times = relative_times
+        self.concurrency_limit = concurrency_limit
+        self.rate_limit_remaining = rate_limit_first
+        self.fail_remaining = fail_first
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.clients = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, payload, headers=()):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_timestamped(self, text):
+                """Two JSON lines, each half the audio and half the characters, 10ms per character."""
+                half_audio, half_text = len(stub.audio) // 4 * 2, len(text) // 2
+                lines = []
+                for i, (audio, chars) in enumerate(((stub.audio[:half_audio], text[:half_text]),
+                                                    (stub.audio[half_audio:], text[half_text:]))):
+                    first = 0 if stub.relative_times else i * half_text
+                    lines.append(json.dumps({
+                        "audio_base64": base64.b64encode(audio).decode(),
+                        "alignment": {"characters": list(chars),
+                                      "character_start_times_seconds": [(first + j) / 100 for j in range(len(chars))],
+                                      "character_end_times_seconds": [(first + j + 1) / 100 for j in range(len(chars))]},
+                    }).encode() + b"\n")
+                body = b"".join(lines)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                url = urlparse(self.path)
+                with stub.lock:
+                    stub.requests.append({"path": url.path, "query": parse_qs(url.query), "body": body,
+                                          "api_key": self.headers.get("xi-api-key")})
+                    stub.clients.add(self.client_address)
+                    if stub.rate_limit_remaining > 0 or \
+                            (stub.concurrency_limit and stub.in_flight >= stub.concurrency_limit):
+                        stub.rate_limit_remaining = max(0, stub.rate_limit_remaining - 1)
+                        outcome = "limited"
+                    elif stub.fail_remaining > 0:
+                        stub.fail_remaining -= 1
+                        outcome = "failed"
+                    else:
+                        outcome = "ok"
+                        stub.in_flight += 1
+                        stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+
+                if outcome == "limited":
+                    self.send_json(429, {"detail": {"status": "too_many_concurrent_requests"}},
+                                   headers=[("retry-after-ms", "10")])
+                    return
+                if outcome == "failed":
+                    self.send_json(stub.status, {"detail": {"status": "error"}})
+                    return
+
+                if url.path.endswith("/with-timestamps"):
+                    try:
+                        self.send_timestamped(body["text"])
+                    finally:
+                        with stub.lock:
+                            stub.in_flight -= 1
+                    return
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "audio/pcm")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    # Stream in a few chunks, pausing so requests overlap
+                    for i in range(0, len(stub.audio), 4096):
+                        time.sleep(stub.delay / 4)
+                        chunk = stub.audio[i:i + 4096]
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("timestamps", False)
+    return ElevenLabsTTS("test-key", base_url=server.base_url, **kwargs)
+
+
+class TestElevenLabsTTS:
+    """Test the ElevenLabs client against a stub server."""
+
+    def test_streamed_pcm_is_decoded(self):
+        with StubElevenLabsServer() as server:
+            segment = make_client(server).synthesize("Hello there.", "voice123")
+
+        assert (segment.frame_rate, segment.channels, segment.sample_width) == (24000, 1, 2)
+        assert len(segment) == 200
+        request = server.requests[0]
+        assert request["path"] == "/v1/text-to-speech/voice123/stream"
+        assert request["query"]["output_format"] == ["pcm_24000"]
+        assert request["body"] == {"text": "Hello there.", "model_id": "eleven_turbo_v2"}
+        assert request["api_key"] == "test-key"
+
+    @pytest.mark.parametrize("relative_times", [False, True])
+    def test_timestamps_become_the_alignment(self, relative_times):
+        """Test that character timings from every streamed chunk line up over the whole text."""
+        with StubElevenLabsServer(relative_times=relative_times) as server:
+            segment = make_client(server, timestamps=True).synthesize("Hello there.", "voice123")
+
+        assert server.requests[0]["path"] == "/v1/text-to-speech/voice123/stream/with-timestamps"
+        assert len(segment) == 200
+        assert segment.alignment == [[i, 10 * i] for i in range(len("Hello there.") + 1)]
+
+    def test_mp3_output_is_decoded_in_memory(self):
+        buffer = io.BytesIO()
+        AudioSegment.silent(duration=200, frame_rate=24000).export(buffer, format="mp3")
+
+        with StubElevenLabsServer(audio=buffer.getvalue()) as server:
+            segment = make_client(server, output_format="mp3_44100_128").synthesize("Hi", "voice")
+
+        assert 150 <= len(segment) <= 300
+
+    def test_connection_is_reused_across_lines(self):
+        with StubElevenLabsServer() as server:
+            client = make_client(server)
+            for text in ("One.", "Two.", "Three."):
+                client.synthesize(text, "voice")
+
+        assert len(server.clients) == 1
+
+    def test_rate_limit_retries_then_succeeds(self):
+        with StubElevenLabsServer(rate_limit_first=2) as server:
+            client = make_client(server, max_concurrency=4)
+            segment = client.synthesize("Hi", "voice")
+
+        assert len(segment) == 200
+        assert len(server.requests) == 3
+        assert client.limiter.limit < 4
+
+    def test_rate_limit_exhausts_retries(self):
+        with StubElevenLabsServer(rate_limit_first=10) as server:
+            with pytest.raises(RateLimitError):
+                make_client(server, max_retries=2).synthesize("Hi", "voice")
+
+        assert len(server.requests) == 3
+
+    def test_server_errors_are_retried(self):
+        with StubElevenLabsServer(fail_first=2, status=503) as server:
+            segment = make_client(server).synthesize("Hi", "voice")
+
+        assert len(segment) == 200
+        assert len(server.requests) == 3
+
+    def test_client_errors_are_not_retried(self):
+        with StubElevenLabsServer(fail_first=5, status=401) as server:
+            with pytest.raises(CloudTTSError, match="401"):
+                make_client(server).synthesize("Hi", "voice")
+
+        assert len(server.requests) == 1
+
+    def test_missing_api_key_fails_without_request(self):
+        with StubElevenLabsServer() as server:
+            with pytest.raises(CloudTTSError, match="ELEVENLABS_API_KEY"):
+                ElevenLabsTTS(None, base_url=server.base_url).synthesize("Hi", "voice")
+
+        assert server.requests == []
+
+    def test_concurrency_adapts_to_account_limit(self):
+        """Every line renders even though the workers outnumber the account's slots."""
+        with StubElevenLabsServer(concurrency_limit=2, delay=0.05) as server:
+            client = make_client(server, max_concurrency=8, max_retries=8)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                segments = list(executor.map(lambda i: client.synthesize(f"Line {i}", "voice"), range(16)))
+
+        assert all(len(segment) == 200 for segment in segments)
+        assert server.max_in_flight <= 2
+        assert client.limiter.limit < 8
+
+    def test_connection_error_raises_after_retries(self):
+        client = ElevenLabsTTS("test-key", base_url="http://127.0.0.1:9", max_retries=1, backoff_base=0.01)
+
+        with pytest.raises(CloudTTSError, match="request failed"):
+            client.synthesize("Hi", "voice")
+
+
+class TestAdaptiveLimiter:
+    """Test the AIMD concurrency limiter."""
+
+    def test_rate_limit_halves_once_per_window(self):
+        limiter = AdaptiveLimiter(8)
+        started_at = time.monotonic()
+
+        limiter.on_rate_limit(started_at, 0)
+        limiter.on_rate_limit(started_at, 0)  # same window: already counted
+
+        assert limiter.limit == 4
+
+    def test_limit_never_drops_below_minimum(self):
+        limiter = AdaptiveLimiter(4)
+        for _ in range(5):
+            limiter.on_rate_limit(time.monotonic(), 0)
+
+        assert limiter.limit == 1
+
+    def test_successes_grow_limit_back(self):
+        limiter = AdaptiveLimiter(4)
+        limiter.on_rate_limit(time.monotonic(), 0)
+        for _ in range(20):
+            limiter.on_success()
+
+        assert limiter.limit == 4
+
+    def test_cooldown_delays_new_requests(self):
+        limiter = AdaptiveLimiter(4)
+        limiter.on_rate_limit(time.monotonic(), 0.05)
+
+        start = time.monotonic()
+        with limiter.slot():
+            pass
+
+        assert time.monotonic() - start >= 0.04
+
+    def test_slots_are_capped_at_limit(self):
+        limiter = AdaptiveLimiter(2)
+        peak = []
+
+        def hold():
+            with limiter.slot():
+                peak.append(limiter.in_flight)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=hold) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(peak) == 2
+
+
+def test_pcm_format_rate():
+    assert pcm_format_rate("pcm_24000") == 24000
+    assert pcm_format_rate("mp3_44100_128") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
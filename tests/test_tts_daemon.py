@@ -0,0 +1,187 @@
+"""
+Unit tests for tts/daemon.py module.
+
+Runs the TTS daemon over a fake engine to cover the HTTP protocol,
+priority and per-client scheduling, and voice.py's client mode.
+"""
+
+import time
+import threading
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+# The error class the daemon module itself raises (it imports tts.engine like the app)
+from src.tts.daemon import DaemonClient, SynthesisScheduler, TTSEngineError, serve
+
+
+class FakeEngine:
+    """Engine stand-in: each text becomes len(text) samples of a value derived from it."""
+
+    version = "kokoro-onnx-test:fake.onnx"
+    sessions = 1
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+
+    def create_batch(self, texts, voice, speed=1.0, lang="en-us"):
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append((voice, list(texts)))
+        if voice == "broken":
+            raise RuntimeError("no such voice")
+        return [(np.full(len(text), len(text) / 100, dtype=np.float32), 24000) for text in texts]
+
+
+@pytest.fixture
+def daemon():
+    """Scheduler with one worker and an HTTP server on a free port."""
+    servers = []
+
+    def start(engine):
+        scheduler = SynthesisScheduler(engine).start()
+        server = serve(scheduler, port=0)
+        servers.append((server, scheduler))
+        return f"http://127.0.0.1:{server.server_address[1]}", scheduler
+
+    yield start
+    for server, scheduler in servers:
+        server.shutdown()
+        scheduler.stop()
+
+
+class TestDaemonProtocol:
+    """Test synthesis and health over HTTP."""
+
+    def test_batch_round_trip(self, daemon):
+        """Test that a batch comes back split per text with the engine's samples."""
+        url, _ = daemon(FakeEngine())
+        client = DaemonClient(url)
+        assert client.available()
+        assert client.version == FakeEngine.version and client.sessions == 1
+
+        results = client.create_batch(["Hi.", "Hello there."], voice="am_michael")
+        assert [len(samples) for samples, _ in results] == [3, 12]
+        assert all(rate == 24000 for _, rate in results)
+        assert np.allclose(results[1][0], 0.12)
+
+    def test_engine_error_is_reported(self, daemon):
+        """Test that a failed synthesis surfaces as TTSEngineError on the client."""
+        url, _ = daemon(FakeEngine())
+        with pytest.raises(TTSEngineError, match="no such voice"):
+            DaemonClient(url).create("Hi.", voice="broken")
+
+    def test_unreachable_daemon_is_unavailable(self):
+        """Test that a daemon that isn't running is reported unavailable, not raised."""
+        client = DaemonClient("http://127.0.0.1:9")
+        assert not client.available()
+        with pytest.raises(TTSEngineError):
+            client.wait()
+
+
+class TestSynthesisScheduler:
+    """Test the order batches are served in."""
+
+    def test_priority_then_round_robin(self):
+        """Test that interactive work goes first and clients take turns within a priority."""
+        gate = threading.Event()
+        engine = FakeEngine(gate)
+        scheduler = SynthesisScheduler(engine).start()
+        try:
+            first = scheduler.submit(["blocker"], "v", client="a")
+            while scheduler.stats()["in_flight"] == 0:
+                time.sleep(0.001)
+            futures = [
+                scheduler.submit(["batch"], "v", priority="batch", client="catalog"),
+                scheduler.submit(["a1"], "v", client="a"),
+                scheduler.submit(["a2"], "v", client="a"),
+                scheduler.submit(["b1"], "v", client="b"),
+            ]
+            gate.set()
+            for future in [first] + futures:
+                future.result(timeout=5)
+        finally:
+            scheduler.stop()
+        assert [texts[0] for _, texts in engine.calls] == ["blocker", "a1", "b1", "a2", "batch"]
+
+    def test_unknown_priority_rejected(self):
+        """Test that only known priorities are accepted."""
+        scheduler = SynthesisScheduler(FakeEngine())
+        with pytest.raises(ValueError):
+            scheduler.submit(["x"], "v", priority="urgent")
+
+
+class TestVoiceClientMode:
+    """Test that voice.py renders through the daemon when it is available."""
+
+    def test_local_render_uses_daemon(self, daemon):
+        """Test that local lines and the cache version come from the daemon, not an in-process engine."""
+        from src.tts.cache import SegmentCache
+        from src.voice import get_tts_version, render_script_lines
+
+        url, _ = daemon(FakeEngine())
+        engine = MagicMock()
+        with patch("src.voice.get_daemon_client", return_value=DaemonClient(url)), \
+             patch("src.voice.get_engine", return_value=engine), \
+             patch("src.voice.get_segment_cache", return_value=SegmentCache(directory=None)):
+            segments = render_script_lines([{"speaker": "Alex", "text": "Hello from the daemon."}],
+                                           "Local (Kokoro)", max_workers=1)
+            assert get_tts_version("Local (Kokoro)").startswith(FakeEngine.version)
+        assert len(segments[0]) == round(1000 * len("Hello from the daemon.") / 24000)
+        engine.create.assert_not_called()
+        engine.create_batch.assert_not_called()
+
+    def test_backend_is_picked_once_per_render(self, daemon):
+        """Test that a render probes for the daemon once, not for every line and cache key."""
+        from src.tts.cache import SegmentCache
+        import src.voice as voice
+
+        url, _ = daemon(FakeEngine())
+        script = [{"speaker": "Alex", "text": f"Line number {i}."} for i in range(6)]
+        with patch("src.voice.get_daemon_client", return_value=DaemonClient(url)), \
+             patch("src.voice.get_segment_cache", return_value=SegmentCache(directory=None)), \
+             patch("src.voice.get_local_tts", wraps=voice.get_local_tts) as resolve:
+            segments = voice.render_script_lines(script, "Local (Kokoro)", max_workers=2)
+        assert len(segments) == 6
+        assert resolve.call_count == 1
+
+    def test_daemon_lost_mid_render_is_an_error(self):
+        """Test that a daemon that stops answering fails the render instead of loading Kokoro in-process."""
+        from src.tts.cache import SegmentCache
+        from src.voice import render_script_lines
+        # voice.py catches the error class of the daemon module it imports (tts.daemon, like the app)
+        from tts import daemon as app_daemon
+
+        scheduler = SynthesisScheduler(FakeEngine()).start()
+        server = serve(scheduler, port=0)
+        client = app_daemon.DaemonClient(f"http://127.0.0.1:{server.server_address[1]}")
+        assert client.available()
+        server.shutdown()
+        server.server_close()
+        scheduler.stop()
+
+        engine = MagicMock()
+        script = [{"speaker": "Alex", "text": f"Line number {i}."} for i in range(4)]
+        with patch("src.voice.get_daemon_client", return_value=client), \
+             patch("src.voice.get_engine", return_value=engine), \
+             patch("src.voice.get_segment_cache", return_value=SegmentCache(directory=None)):
+            with pytest.raises(app_daemon.DaemonUnavailableError):
+                render_script_lines(script, "Local (Kokoro)", max_workers=2)
+        engine.create.assert_not_called()
+        engine.create_batch.assert_not_called()
+
+    def test_falls_back_to_engine_without_daemon(self):
+        """Test that the in-process engine is used when no daemon answers or it is disabled."""
+        from src.voice import get_local_tts
+
+        engine = MagicMock()
+        with patch("src.voice.get_daemon_client", return_value=DaemonClient("http://127.0.0.1:9")), \
+             patch("src.voice.get_engine", return_value=engine):
+            assert get_local_tts() is engine
+        with patch("src.voice.get_daemon_client", return_value=None), \
+             patch("src.voice.get_engine", return_value=engine):
+            assert get_local_tts() is engine
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,377 @@
+"""
+Unit tests for tts/engine.py module.
+
+Tests model path configuration, background loading,
+readiness states, load failures and the session pool.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+import threading
+import types
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from src.tts import engine as tts_engine
+from src.tts.engine import KokoroEngine, TTSEngineError, get_model_paths
+
+
+class FakeKokoro:
+    """Kokoro stand-in that records how its session was configured."""
+
+    gate = None
+    # Seconds per synthesized character, by intra-op thread count
+    speed_by_threads = {}
+
+    def __init__(self, session, voices_path):
+        if FakeKokoro.gate is not None:
+            FakeKokoro.gate.wait(5)
+        self.session = session
+        self.voices_path = voices_path
+        self.in_use = False
+
+    @classmethod
+    def from_session(cls, session, voices_path):
+        return cls(session, voices_path)
+
+    def get_voice_style(self, voice):
+        return voice
+
+    def create(self, text, voice, speed=1.0, lang="en-us", is_phonemes=False):
+        assert not self.in_use, "session used by two threads at once"
+        self.in_use = True
+        try:
+            time.sleep(self.speed_by_threads.get(self.session["intra"], 0) * len(text))
+        finally:
+            self.in_use = False
+        return [0.0] * len(text), 24000
+
+
+@pytest.fixture
+def fake_kokoro(monkeypatch):
+    """Install a fake kokoro_onnx module and skip downloads and real sessions."""
+    FakeKokoro.gate = None
+    FakeKokoro.speed_by_threads = {}
+    monkeypatch.setitem(sys.modules, "kokoro_onnx", types.SimpleNamespace(Kokoro=FakeKokoro))
+    monkeypatch.setattr(tts_engine, "check_and_install_models", lambda *args: {})
+    monkeypatch.setenv("KOKORO_MMAP_WEIGHTS", "0")
+    monkeypatch.setattr(tts_engine, "create_session",
+                        lambda path, intra, inter, mapped=False: {"path": str(path), "intra": intra, "inter": inter})
+    monkeypatch.setattr(tts_engine, "phonemize_texts", lambda texts, lang, phonemize: list(texts))
+    return FakeKokoro
+
+
+class TestModelPaths:
+    """Test resolving model files from configuration."""
+
+    def test_defaults_to_project_root(self, monkeypatch, tmp_path):
+        for var in ("KOKORO_MODEL_DIR", "KOKORO_MODEL_PATH", "KOKORO_VOICES_PATH"):
+            monkeypatch.delenv(var, raising=False)
+        monkeypatch.chdir(tmp_path)
+
+        model_path, voices_path = get_model_paths()
+
+        # Independent of the working directory
+        assert model_path == tts_engine.DEFAULT_MODEL_DIR / "kokoro-v1.0.onnx"
+        assert voices_path == tts_engine.DEFAULT_MODEL_DIR / "voices-v1.0.bin"
+
+    def test_model_dir_and_file_overrides(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("KOKORO_MODEL_DIR", str(tmp_path))
+        monkeypatch.setenv("KOKORO_VOICES_PATH", "/opt/voices.bin")
+        monkeypatch.delenv("KOKORO_MODEL_PATH", raising=False)
+
+        model_path, voices_path = get_model_paths()
+
+        assert model_path == tmp_path / "kokoro-v1.0.onnx"
+        assert str(voices_path) == "/opt/voices.bin"
+
+
+class TestModelVariants:
+    """Test selecting quantized weights."""
+
+    @pytest.fixture(autouse=True)
+    def clean_env(self, monkeypatch, tmp_path):
+        for var in ("KOKORO_MODEL_PATH", "KOKORO_VOICES_PATH", "KOKORO_MODEL_VARIANT"):
+            monkeypatch.delenv(var, raising=False)
+        monkeypatch.setenv("KOKORO_MODEL_DIR", str(tmp_path))
+
+    def test_quantized_variants_get_their_own_folder(self, tmp_path):
+        assert get_model_paths("fp32") == (tmp_path / "kokoro-v1.0.onnx", tmp_path / "voices-v1.0.bin")
+        assert get_model_paths("int8") == (tmp_path / "int8" / "kokoro-v1.0.int8.onnx", tmp_path / "voices-v1.0.bin")
+        assert get_model_paths("fp16")[0] == tmp_path / "fp16" / "kokoro-v1.0.fp16.onnx"
+
+    def test_variant_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("KOKORO_MODEL_VARIANT", "INT8")
+        engine = KokoroEngine()
+
+        assert engine.variant == "int8"
+        assert engine.model_path == tmp_path / "int8" / "kokoro-v1.0.int8.onnx"
+        assert engine.model_url.endswith("/kokoro-v1.0.int8.onnx")
+        # Segment cache entries never mix fp32 and quantized audio
+        assert engine.version != KokoroEngine(variant="fp32").version
+
+    def test_unknown_variant(self, monkeypatch):
+        monkeypatch.setenv("KOKORO_MODEL_VARIANT", "int4")
+
+        with pytest.raises(TTSEngineError, match="int4"):
+            KokoroEngine()
+
+    def test_downloads_the_variant_url(self, tmp_path):
+        downloads = []
+
+        def fake_download(url, path):
+            downloads.append(url)
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_bytes(b"weights")
+
+        model_path, voices_path = get_model_paths("int8")
+        with patch("src.tts.engine.download_file", side_effect=fake_download):
+            digests = tts_engine.check_and_install_models(model_path, voices_path, f"{tts_engine.MODEL_RELEASE}/kokoro-v1.0.int8.onnx")
+
+        assert downloads == [f"{tts_engine.MODEL_RELEASE}/kokoro-v1.0.int8.onnx", tts_engine.VOICES_URL]
+        assert set(digests) == {"kokoro-v1.0.int8.onnx", "voices-v1.0.bin"}
+
+
+class TestChecksums:
+    """Test model file verification."""
+
+    def test_first_use_records_digest(self, tmp_path):
+        path = tmp_path / "model.onnx"
+        path.write_bytes(b"weights")
+
+        digest = tts_engine.verify_checksum(path)
+
+        assert digest == hashlib.sha256(b"weights").hexdigest()
+        assert json.loads((tmp_path / "model.onnx.sha256").read_text())["sha256"] == digest
+
+    def test_unchanged_file_is_not_rehashed(self, tmp_path):
+        path = tmp_path / "model.onnx"
+        path.write_bytes(b"weights")
+        tts_engine.verify_checksum(path)
+
+        with patch("src.tts.engine.file_sha256", side_effect=AssertionError("rehashed")):
+            tts_engine.verify_checksum(path)
+
+    def test_modified_file_fails(self, tmp_path):
+        path = tmp_path / "model.onnx"
+        path.write_bytes(b"weights")
+        tts_engine.verify_checksum(path)
+        path.write_bytes(b"truncat")
+        os.utime(path, ns=(1, 1))
+
+        with pytest.raises(TTSEngineError, match="changed since it was first verified"):
+            tts_engine.verify_checksum(path)
+
+    def test_pinned_digest(self, tmp_path):
+        path = tmp_path / "model.onnx"
+        path.write_bytes(b"weights")
+
+        with pytest.raises(TTSEngineError, match="checksum mismatch"):
+            tts_engine.verify_checksum(path, expected="0" * 64)
+        assert tts_engine.verify_checksum(path, expected=hashlib.sha256(b"weights").hexdigest().upper())
+
+    def test_redownload_resets_record(self, tmp_path):
+        model, voices = tmp_path / "model.onnx", tmp_path / "voices.bin"
+        voices.write_bytes(b"voices")
+        model.write_bytes(b"old")
+        tts_engine.verify_checksum(model)
+        model.write_bytes(b"")  # empty file triggers a fresh download
+
+        with patch("src.tts.engine.download_file", side_effect=lambda url, path: Path(path).write_bytes(b"new weights")):
+            digests = tts_engine.check_and_install_models(model, voices)
+
+        assert digests["model.onnx"] == hashlib.sha256(b"new weights").hexdigest()
+
+
+class TestKokoroEngine:
+    """Test lazy loading and readiness."""
+
+    def test_nothing_loads_until_needed(self, fake_kokoro):
+        engine = KokoroEngine("model.onnx", "voices.bin")
+
+        assert engine.state == "idle"
+        assert engine._thread is None
+
+    def test_start_returns_before_load_finishes(self, fake_kokoro):
+        fake_kokoro.gate = threading.Event()
+        engine = KokoroEngine("model.onnx", "voices.bin")
+
+        start_time = time.monotonic()
+        engine.start()
+        assert time.monotonic() - start_time < 0.5
+        assert engine.state == "loading"
+
+        fake_kokoro.gate.set()
+        assert engine.wait(timeout=5) is engine
+        assert engine.ready
+
+    def test_wait_starts_loading_and_create_synthesizes(self, fake_kokoro):
+        engine = KokoroEngine("model.onnx", "voices.bin")
+
+        samples, sample_rate = engine.create("hello", voice="af_bella")
+
+        assert engine.state == "ready"
+        assert len(samples) == 5
+        assert sample_rate == 24000
+        assert engine.load_ms is not None
+
+    def test_start_is_idempotent(self, fake_kokoro):
+        engine = KokoroEngine("model.onnx", "voices.bin")
+        engine.start()
+        first = engine._thread
+        engine.start()
+
+        assert engine._thread is first
+        engine.wait(timeout=5)
+
+    def test_wait_timeout(self, fake_kokoro):
+        fake_kokoro.gate = threading.Event()
+        engine = KokoroEngine("model.onnx", "voices.bin")
+
+        with pytest.raises(TTSEngineError, match="still loading"):
+            engine.wait(timeout=0.05)
+        fake_kokoro.gate.set()
+
+    def test_load_failure_is_reported(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(tts_engine, "check_and_install_models", lambda *args: {})
+        engine = KokoroEngine(tmp_path / "missing.onnx", tmp_path / "missing.bin")
+
+        with patch.dict(sys.modules, {"kokoro_onnx": types.SimpleNamespace(Kokoro=None)}):
+            with pytest.raises(TTSEngineError, match="failed to load"):
+                engine.wait(timeout=5)
+
+        assert engine.state == "failed"
+        assert engine.error is not None
+
+
+class TestSessionPool:
+    """Test the pool layout and auto-tuning."""
+
+    def test_explicit_layout(self, fake_kokoro):
+        engine = KokoroEngine("model.onnx", "voices.bin", sessions=3, intra_op_threads=2, inter_op_threads=1)
+        engine.wait(timeout=5)
+
+        sessions = [engine._pool.get() for _ in range(engine.sessions)]
+        assert engine.sessions == 3
+        assert all(k.session == {"path": "model.onnx", "intra": 2, "inter": 1} for k in sessions)
+
+    def test_threads_default_to_cpu_share(self, fake_kokoro, monkeypatch):
+        monkeypatch.setattr(tts_engine.os, "cpu_count", lambda: 8)
+        engine = KokoroEngine("model.onnx", "voices.bin", sessions=2, intra_op_threads=0)
+        engine.wait(timeout=5)
+
+        assert engine.intra_op_threads == 4
+
+    def test_pool_config_from_env(self, monkeypatch):
+        monkeypatch.setenv("KOKORO_SESSIONS", "Auto")
+        monkeypatch.setenv("KOKORO_INTRA_OP_THREADS", "3")
+        monkeypatch.delenv("KOKORO_INTER_OP_THREADS", raising=False)
+
+        assert tts_engine.get_pool_config() == ("auto", 3, 1)
+
+    def test_concurrent_lines_never_share_a_session(self, fake_kokoro):
+        fake_kokoro.speed_by_threads = {1: 0.001}
+        engine = KokoroEngine("model.onnx", "voices.bin", sessions=2, intra_op_threads=1)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda i: engine.create("x" * 10, voice="af_bella"), range(12)))
+
+        assert len(results) == 12
+
+    def test_autotune_candidates(self):
+        assert tts_engine.autotune_candidates(cpus=8) == [(1, 8, 1), (2, 4, 1), (4, 2, 1), (8, 1, 1)]
+        assert tts_engine.autotune_candidates(cpus=1) == [(1, 1, 1)]
+
+    def test_autotune_picks_best_rtf(self, fake_kokoro, monkeypatch):
+        # Two narrow sessions beat one wide one on this "host"
+        monkeypatch.setattr(tts_engine, "autotune_candidates", lambda: [(1, 4, 1), (2, 2, 1), (4, 1, 1)])
+        monkeypatch.setattr(tts_engine, "AUTOTUNE_TEXT", "x" * 20)
+        fake_kokoro.speed_by_threads = {4: 0.0008, 2: 0.0006, 1: 0.0030}
+        engine = KokoroEngine("model.onnx", "voices.bin", sessions="auto")
+        engine.wait(timeout=30)
+
+        assert (engine.sessions, engine.intra_op_threads) == (2, 2)
+        assert set(engine.tuning) == {(1, 4, 1), (2, 2, 1), (4, 1, 1)}
+        assert min(engine.tuning, key=engine.tuning.get) == (2, 2, 1)
+
+
+class TestBatchedSynthesis:
+    """Test create_batch and batched phonemization."""
+
+    def test_phonemize_batch_matches_per_text(self):
+        tokenizer_module = pytest.importorskip("kokoro_onnx.tokenizer")
+        try:
+            tokenizer = tokenizer_module.Tokenizer()
+        except Exception as e:
+            pytest.skip(f"espeak-ng unavailable: {e}")
+        kokoro = types.SimpleNamespace(tokenizer=tokenizer)
+        texts = ["Hello there, welcome to RepoRadio!", "This repo uses FastAPI.  It's fine.", "Wow... okay?"]
+
+        assert tts_engine.phonemize_batch(kokoro, texts) == [tokenizer.phonemize(t) for t in texts]
+
+    def test_create_batch_uses_one_session_and_one_style_lookup(self, fake_kokoro, monkeypatch):
+        calls = []
+        monkeypatch.setattr(tts_engine, "phonemize_texts", lambda texts, lang, phonemize: [t.upper() for t in texts])
+        monkeypatch.setattr(FakeKokoro, "get_voice_style", lambda self, voice: calls.append(("style", voice)) or "STYLE")
+        original_create = FakeKokoro.create
+
+        def create(self, text, voice, speed=1.0, lang="en-us", is_phonemes=False):
+            calls.append(("create", text, voice, is_phonemes, id(self)))
+            return original_create(self, text, voice, speed, lang)
+
+        monkeypatch.setattr(FakeKokoro, "create", create)
+        engine = KokoroEngine("model.onnx", "voices.bin", sessions=2, intra_op_threads=1)
+
+        results = engine.create_batch(["one", "three"], voice="af_bella")
+
+        assert [len(samples) for samples, _ in results] == [3, 5]
+        assert calls[0] == ("style", "af_bella")
+        creates = calls[1:]
+        assert [c[1:4] for c in creates] == [("ONE", "STYLE", True), ("THREE", "STYLE", True)]
+        assert len({c[4] for c in creates}) == 1
+        assert engine._pool.qsize() == 2
+
+
+class TestDownload:
+    """Test model download handling."""
+
+    def test_failed_download_leaves_no_partial_file(self, tmp_path):
+        class BrokenResponse:
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                yield b"half a model"
+                raise IOError("connection reset")
+
+        target = tmp_path / "models" / "kokoro.onnx"
+        with patch("src.tts.engine.requests.get", return_value=BrokenResponse()):
+            tts_engine.download_file("http://example/model", target)
+
+        assert not target.exists()
+        assert list(target.parent.iterdir()) == []
+
+
+class TestVoiceImport:
+    """Test that importing voice doesn't load the model."""
+
+    def test_import_does_not_start_engine(self):
+        """Importing voice (as app.py does) must not construct or load Kokoro."""
+        src_dir = Path(__file__).parent.parent / "src"
+        code = (
+            "import sys, voice, tts.engine; "
+            "assert tts.engine._engine is None; "
+            "assert 'kokoro_onnx' not in sys.modules"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=src_dir, capture_output=True, text=True, timeout=60)
+
+        assert result.returncode == 0, result.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,189 @@
+"""
+Unit tests for tts/normalize.py module.
+
+Tests the code-token normalizer, the pronunciation lexicon
+and the persistent token -> phoneme cache.
+"""
+
+import json
+import pytest
+from src.tts.normalize import (
+    PhonemeCache, get_lexicon, load_lexicon, normalize_for_tts, phonemize_texts, speak_token, split_code_tokens,
+    spoken_offset,
+)
+
+
+class FakePhonemizer:
+    """Records every batch and 'phonemizes' by upper-casing."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, lines):
+        assert all(line for line in lines), "empty inputs are dropped by phonemizer"
+        self.batches.append(list(lines))
+        return [line.upper() for line in lines]
+
+
+class TestSpeakToken:
+    """Test spoken forms of code tokens."""
+
+    @pytest.mark.parametrize("token, spoken", [
+        ("package.json", "package dot jason"),
+        ("src/main.py", "source slash main dot pie"),
+        ("README.md", "read me dot markdown"),
+        (".env", "dot env"),
+        ("node_modules", "node modules"),
+        ("useState", "use State"),
+        ("FastAPI", "fast A P I"),
+        ("GitHub", "git hub"),
+        ("npm", "N P M"),
+        ("C++", "C plus plus"),
+        ("v2.0.1", "version 2 point 0 point 1"),
+        ("3.11", "3 point 11"),
+        ("src/components/", "source slash components"),
+    ])
+    def test_spoken_forms(self, token, spoken):
+        assert speak_token(token) == spoken
+
+
+class TestSplitCodeTokens:
+    """Test finding code tokens inside ordinary sentences."""
+
+    def test_plain_prose_is_untouched(self):
+        text = "It's a normal sentence. Nothing to see... right?"
+        assert split_code_tokens(text) == [(False, text)]
+        assert normalize_for_tts(text) == text
+
+    def test_code_tokens_are_isolated(self):
+        segments = split_code_tokens("Check package.json, then run npm install.")
+
+        assert segments == [(False, "Check "), (True, "package.json"), (False, ", then run "),
+                            (True, "npm"), (False, " install.")]
+
+    @pytest.mark.parametrize("text", [
+        "That costs $3.50 a month.",
+        "The build finished at 5.30 p.m. yesterday.",
+        "Most users are in the U.S. right now.",
+        "Uptime was 99.9% last quarter.",
+        "It needs Python 3.11 or newer.",
+    ])
+    def test_prose_numbers_and_abbreviations_are_untouched(self, text):
+        assert split_code_tokens(text) == [(False, text)]
+        assert normalize_for_tts(text) == text
+
+    @pytest.mark.parametrize("text, normalized", [
+        ("Version v1.2.3 is out.", "Version 1 point 2 point 3 is out."),
+        ("Upgrade to v2.0 today.", "Upgrade to version 2 point 0 today."),
+        ("Pin it to 1.2.3 for now.", "Pin it to 1 point 2 point 3 for now."),
+        ("It runs on Node.js, see index.js.", "It runs on Node J S, see index dot J S."),
+    ])
+    def test_versions_and_dotted_names(self, text, normalized):
+        assert normalize_for_tts(text) == normalized
+
+    def test_backticks_and_abbreviations(self):
+        assert normalize_for_tts("Set `API_KEY` in .env, e.g. with direnv.") == \
+            "Set A P I KEY in dot env, for example with direnv."
+
+    def test_spoken_offset_follows_the_normalized_text(self):
+        """Test that every word outside code tokens keeps its place in the spoken text."""
+        text = "Bump version v1.2.3 in package.json, then `src/main.py` e.g. here."
+        spoken = normalize_for_tts(text)
+        for word in ("Bump", "in", "then", "here"):
+            at = spoken_offset(text, text.index(word))
+            assert spoken[at:at + len(word)] == word
+        assert spoken_offset(text, len(text)) == len(spoken)
+
+
+class TestPhonemizeTexts:
+    """Test code-aware phonemization and the phoneme cache."""
+
+    def test_one_phonemizer_call_per_batch(self):
+        phonemize = FakePhonemizer()
+        result = phonemize_texts(["Open package.json now.", "Plain line."], "en-us", phonemize, cache=PhonemeCache(None))
+
+        assert result == ["OPEN PACKAGE DOT JASON NOW.", "PLAIN LINE."]
+        assert phonemize.batches == [["Open", "now.", "Plain line.", "package dot jason"]]
+
+    def test_cached_tokens_skip_g2p(self):
+        cache = PhonemeCache(None)
+        phonemize_texts(["Run npm install."], "en-us", FakePhonemizer(), cache=cache)
+
+        phonemize = FakePhonemizer()
+        result = phonemize_texts(["Then npm test, and npm run build."], "en-us", phonemize, cache=cache)
+
+        assert result == ["THEN N P M TEST, AND N P M RUN BUILD."]
+        assert all("N P M" not in line for line in phonemize.batches[0])
+        assert cache.hits == 1
+
+    def test_cache_is_per_language(self):
+        cache = PhonemeCache(None)
+        phonemize_texts(["npm"], "en-us", FakePhonemizer(), cache=cache)
+        phonemize = FakePhonemizer()
+        phonemize_texts(["npm"], "en-gb", phonemize, cache=cache)
+
+        assert phonemize.batches == [["N P M"]]
+
+    def test_cache_persists_across_instances(self, tmp_path):
+        path = tmp_path / "phonemes.json"
+        phonemize_texts(["Edit src/main.py."], "en-us", FakePhonemizer(), cache=PhonemeCache(path))
+
+        assert json.loads(path.read_text()) == {"en-us|source slash main dot pie": "SOURCE SLASH MAIN DOT PIE"}
+        phonemize = FakePhonemizer()
+        phonemize_texts(["src/main.py"], "en-us", phonemize, cache=PhonemeCache(path))
+        assert phonemize.batches == []
+
+    def test_corrupt_cache_file_is_ignored(self, tmp_path):
+        path = tmp_path / "phonemes.json"
+        path.write_text("{broken")
+
+        assert phonemize_texts(["npm"], "en-us", FakePhonemizer(), cache=PhonemeCache(path)) == ["N P M"]
+
+    def test_lexicon_phoneme_overrides(self, tmp_path):
+        lexicon_file = tmp_path / "lexicon.json"
+        lexicon_file.write_text(json.dumps({"words": {"kubectl": "kube control"}, "phonemes": {"kubectl": "kjˈuːb"}}))
+        phonemize = FakePhonemizer()
+
+        result = phonemize_texts(["Use kubectl."], "en-us", phonemize, cache=PhonemeCache(None),
+                                 lexicon=load_lexicon(lexicon_file))
+
+        assert result == ["USE kjˈuːb."]
+        assert phonemize.batches == [["Use", "."]]
+
+    def test_matches_espeak_for_plain_text(self):
+        """Without code tokens the output is exactly kokoro's own phonemization."""
+        tokenizer_module = pytest.importorskip("kokoro_onnx.tokenizer")
+        try:
+            tokenizer = tokenizer_module.Tokenizer()
+        except Exception as e:
+            pytest.skip(f"espeak-ng unavailable: {e}")
+        import types
+        from src.tts.engine import phonemize_batch
+
+        kokoro = types.SimpleNamespace(tokenizer=tokenizer)
+        text = "Welcome back to the show, everyone!"
+        result = phonemize_texts([text], "en-us", lambda lines: phonemize_batch(kokoro, lines), cache=PhonemeCache(None))
+
+        assert result == [tokenizer.phonemize(text)]
+
+
+class TestLexicon:
+    """Test the bundled lexicon file."""
+
+    def test_bundled_lexicon_loads_with_lowercase_keys(self):
+        lexicon = get_lexicon()
+
+        assert lexicon["words"]["npm"] == "N P M"
+        assert all(key == key.lower() for section in ("words", "extensions", "phonemes") for key in lexicon[section])
+
+    def test_version_tracks_content(self, tmp_path):
+        path = tmp_path / "lexicon.json"
+        path.write_text(json.dumps({"words": {"npm": "N P M"}}))
+        first = load_lexicon(path)["version"]
+        path.write_text(json.dumps({"words": {"npm": "node package manager"}}))
+
+        assert load_lexicon(path)["version"] != first
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""
+Unit tests for tts/scheduling.py module.
+
+Tests sentence splitting, longest-first job planning
+and stitching of split lines.
+"""
+
+import pytest
+from pydub import AudioSegment
+from src.tts.scheduling import (
+    RenderJob, split_sentences, plan_render_jobs, group_jobs_by_voice, stitch_segments, get_split_config, get_batch_size,
+)
+
+
+class TestSplitSentences:
+    """Test splitting long lines at sentence boundaries."""
+
+    def test_short_line_is_untouched(self):
+        assert split_sentences("Hello there. How are you?", max_chars=200) == ["Hello there. How are you?"]
+
+    def test_packs_sentences_up_to_limit(self):
+        text = "One two three. Four five six! Seven eight nine? Ten."
+        chunks = split_sentences(text, max_chars=30)
+
+        assert chunks == ["One two three. Four five six!", "Seven eight nine? Ten."]
+        assert " ".join(chunks) == text
+
+    def test_oversized_sentence_is_kept_whole(self):
+        long_sentence = "This sentence has no break at all and keeps going for a while"
+        assert split_sentences(f"Hi. {long_sentence}. Bye.", max_chars=20) == ["Hi.", f"{long_sentence}.", "Bye."]
+
+    def test_does_not_split_inside_numbers_or_closing_quotes(self):
+        text = 'Version 3.11 shipped. He said "ship it." Then we did.'
+        assert split_sentences(text, max_chars=25) == ["Version 3.11 shipped.", 'He said "ship it."', "Then we did."]
+
+    def test_zero_disables_splitting(self):
+        text = "A. " * 200
+        assert split_sentences(text, max_chars=0) == [text.strip()]
+
+    def test_empty_text(self):
+        assert split_sentences("   ", max_chars=10) == []
+
+
+class TestPlanRenderJobs:
+    """Test job planning."""
+
+    def test_jobs_are_longest_first_and_counted_per_line(self):
+        lines = [
+            (0, "Short.", "a"),
+            (1, "A fairly long first sentence here. And another long sentence too.", "b"),
+            (2, "Medium length line.", "a"),
+        ]
+        jobs, part_counts = plan_render_jobs(lines, max_chars=40)
+
+        assert part_counts == {0: 1, 1: 2, 2: 1}
+        assert [len(j.text) for j in jobs] == sorted((len(j.text) for j in jobs), reverse=True)
+        assert {(j.line_index, j.part_index) for j in jobs} == {(0, 0), (1, 0), (1, 1), (2, 0)}
+        assert all(j.voice_id == "b" for j in jobs if j.line_index == 1)
+
+
+class TestGroupJobsByVoice:
+    """Test packing jobs into same-voice batches."""
+
+    @staticmethod
+    def jobs(voices):
+        return [RenderJob(i, 0, "x" * (100 - i), voice) for i, voice in enumerate(voices)]
+
+    def test_batches_never_mix_voices(self):
+        batches = group_jobs_by_voice(self.jobs("abab" "a"), batch_size=8)
+
+        assert sorted(len(b) for b in batches) == [2, 3]
+        assert all(len({job.voice_id for job in batch}) == 1 for batch in batches)
+
+    def test_batch_size_cap_and_longest_first(self):
+        batches = group_jobs_by_voice(self.jobs("a" * 7), batch_size=3)
+
+        assert [len(b) for b in batches] == [3, 3, 1]
+        assert batches[0][0].line_index == 0
+
+    def test_batches_shrink_to_keep_workers_busy(self):
+        batches = group_jobs_by_voice(self.jobs("a" * 8), batch_size=8, workers=4)
+
+        assert len(batches) == 4
+
+    def test_batch_size_by_provider(self, monkeypatch):
+        monkeypatch.setenv("KOKORO_BATCH_LINES", "5")
+
+        assert get_batch_size("Local (Kokoro)") == 5
+        assert get_batch_size("Cloud (ElevenLabs)") == 1
+
+
+class TestStitchSegments:
+    """Test joining split parts."""
+
+    def test_gap_between_parts(self):
+        parts = [AudioSegment.silent(duration=300, frame_rate=24000) for _ in range(3)]
+        stitched = stitch_segments(parts, gap_ms=150)
+
+        assert len(stitched) == 3 * 300 + 2 * 150
+        assert stitched.frame_rate == 24000
+
+    def test_single_part_is_returned_as_is(self):
+        part = AudioSegment.silent(duration=300)
+        assert stitch_segments([part], gap_ms=150) is part
+
+
+def test_split_config_from_env(monkeypatch):
+    monkeypatch.setenv("TTS_SPLIT_CHARS", "120")
+    monkeypatch.setenv("TTS_SENTENCE_GAP_MS", "90")
+
+    assert get_split_config() == (120, 90)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
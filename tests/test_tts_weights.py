@@ -0,0 +1,229 @@
+"""
+Unit tests for tts/weights.py module.
+
+Tests moving ONNX initializers into a mappable file, the shared voices
+table, the engine's use of both, and the per-worker memory of sessions
+in separate processes.
+"""
+
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+import pytest
+from pathlib import Path
+from src.tts import engine as tts_engine
+from src.tts.weights import (
+    ALIGNMENT,
+    MappedVoices,
+    encode_field,
+    externalize_initializers,
+    iter_fields,
+    mapped_rss,
+    prepare_mapped_model,
+    prepare_mapped_voices,
+)
+
+rt = pytest.importorskip("onnxruntime")
+
+SIZE = 1024
+
+
+def matmul_model(path, layers=2, size=SIZE, seed=0):
+    """A MatMul chain as a raw ONNX protobuf, weights embedded like kokoro-v1.0.onnx."""
+    rng = np.random.default_rng(seed)
+
+    def value_info(name):
+        dims = b"".join(encode_field(1, encode_field(1, d)) for d in (1, size))
+        return encode_field(1, name.encode()) + encode_field(2, encode_field(1, encode_field(1, 1) + encode_field(2, dims)))
+
+    nodes, initializers, previous = b"", b"", "x"
+    for i in range(layers):
+        output = f"h{i}"
+        nodes += encode_field(1, encode_field(1, previous.encode()) + encode_field(1, f"w{i}".encode())
+                              + encode_field(2, output.encode()) + encode_field(4, b"MatMul"))
+        weights = (rng.standard_normal((size, size)) * 0.05).astype("<f4")
+        initializers += encode_field(5, encode_field(1, size) + encode_field(1, size) + encode_field(2, 1)
+                                     + encode_field(8, f"w{i}".encode()) + encode_field(9, weights.tobytes()))
+        previous = output
+    # A small bias that should stay in the graph
+    nodes += encode_field(1, encode_field(1, previous.encode()) + encode_field(1, b"tiny")
+                          + encode_field(2, b"y") + encode_field(4, b"Add"))
+    initializers += encode_field(5, encode_field(1, 1) + encode_field(2, 1) + encode_field(8, b"tiny")
+                                 + encode_field(9, np.full(1, 0.5, dtype="<f4").tobytes()))
+    graph = nodes + encode_field(2, b"g") + initializers + encode_field(11, value_info("x")) + encode_field(12, value_info("y"))
+    Path(path).write_bytes(encode_field(1, 8) + encode_field(8, encode_field(1, b"") + encode_field(2, 13))
+                           + encode_field(7, graph))
+    return path
+
+
+def run(model_path, mapped=False):
+    session = tts_engine.create_session(model_path, 1, 1, mapped=mapped)
+    return session.run(None, {"x": np.linspace(-1, 1, SIZE, dtype=np.float32)[None]})[0]
+
+
+class TestMappedModel:
+    """Test the externalized model."""
+
+    def test_same_output_as_embedded_weights(self, tmp_path):
+        """Test that the converted model computes what the original does."""
+        model = matmul_model(tmp_path / "model.onnx")
+        mapped = prepare_mapped_model(model, digest="abc123")
+
+        assert np.allclose(run(mapped, mapped=True), run(model), atol=1e-5)
+        assert mapped.stat().st_size < 2048
+        assert mapped.with_name(mapped.stem + ".weights").stat().st_size >= 2 * SIZE * SIZE * 4
+
+    def test_large_initializers_are_external_and_aligned(self, tmp_path):
+        """Test that only large tensors move, each at an aligned offset."""
+        out, data = tmp_path / "out.onnx", tmp_path / "out.weights"
+        moved = externalize_initializers(matmul_model(tmp_path / "model.onnx"), out, data)
+        assert moved == {"tensors": 2, "bytes": 2 * SIZE * SIZE * 4}
+
+        graph = next(value for number, value, _ in iter_fields(memoryview(out.read_bytes())) if number == 7)
+        offsets = []
+        for number, tensor, _ in iter_fields(graph):
+            if number != 5:
+                continue
+            fields = {n: v for n, v, _ in iter_fields(tensor)}
+            if bytes(fields[8]) == b"tiny":
+                assert 9 in fields and 14 not in fields
+                continue
+            entries = dict((bytes(v) for n, v, _ in iter_fields(entry) if n in (1, 2))
+                           for number, entry, _ in iter_fields(tensor) if number == 13)
+            assert entries[b"location"] == b"out.weights"
+            offsets.append(int(entries[b"offset"]))
+        assert offsets and all(offset % ALIGNMENT == 0 for offset in offsets)
+
+    def test_conversion_is_reused_and_keyed_by_digest(self, tmp_path):
+        """Test that a converted model is reused, and a new digest converts again."""
+        model = matmul_model(tmp_path / "model.onnx")
+        first = prepare_mapped_model(model, digest="aaaa")
+        mtime = first.stat().st_mtime_ns
+        assert prepare_mapped_model(model, digest="aaaa").stat().st_mtime_ns == mtime
+        assert prepare_mapped_model(model, digest="bbbb") != first
+        assert not list((tmp_path / "mmap").glob("*.part"))
+
+
+class TestMappedVoices:
+    """Test the voices table."""
+
+    def test_matches_npz_and_is_mapped(self, tmp_path):
+        """Test that every voice reads back from one read-only memory map."""
+        voices = {name: np.random.default_rng(i).standard_normal((510, 1, 256)).astype(np.float32)
+                  for i, name in enumerate(["am_michael", "af_bella", "bf_emma"])}
+        path = tmp_path / "voices.bin"
+        with open(path, "wb") as f:
+            np.savez(f, **voices)
+
+        mapped = prepare_mapped_voices(path, digest="v1")
+        assert isinstance(mapped, MappedVoices)
+        assert sorted(mapped) == sorted(voices) and "af_bella" in mapped
+        for name, style in voices.items():
+            assert np.array_equal(mapped[name], style)
+        assert isinstance(mapped.table, np.memmap) and not mapped.table.flags.writeable
+        assert json.loads((tmp_path / "mmap" / "voices.v1.json").read_text()) == sorted(voices)
+
+
+class TestEngineUsesMappedWeights:
+    """Test that the engine builds its sessions on the mapped files."""
+
+    def test_sessions_share_mapped_model_and_voices(self, tmp_path, monkeypatch):
+        """Test that every session loads the converted model and reads the same voices table."""
+        model = matmul_model(tmp_path / "model.onnx")
+        voices_path = tmp_path / "voices.bin"
+        with open(voices_path, "wb") as f:
+            np.savez(f, af_bella=np.zeros((510, 1, 256), dtype=np.float32))
+        sessions = []
+
+        class FakeKokoro:
+            @classmethod
+            def from_session(cls, session, voices_path):
+                instance = cls()
+                instance.voices = np.load(voices_path)
+                return instance
+
+        def fake_session(path, intra, inter, mapped=False):
+            sessions.append((Path(path), mapped))
+            return object()
+
+        monkeypatch.setenv("KOKORO_MMAP_WEIGHTS", "1")
+        monkeypatch.setitem(sys.modules, "kokoro_onnx", type(sys)("kokoro_onnx"))
+        sys.modules["kokoro_onnx"].Kokoro = FakeKokoro
+        monkeypatch.setattr(tts_engine, "check_and_install_models", lambda *args: {"model.onnx": "d" * 64})
+        monkeypatch.setattr(tts_engine, "create_session", fake_session)
+
+        engine = tts_engine.KokoroEngine(model, voices_path, sessions=2, intra_op_threads=1).wait(timeout=10)
+        instances = [engine._pool.get() for _ in range(2)]
+        assert [mapped for _, mapped in sessions] == [True, True]
+        assert sessions[0][0] == tmp_path / "mmap" / "model.dddddddddddd.onnx"
+        assert instances[0].voices is instances[1].voices is engine.voices
+
+    def test_off_by_default(self, tmp_path, monkeypatch):
+        """Test that weights keep ONNX Runtime's pre-packing unless mapping is asked for."""
+        monkeypatch.delenv("KOKORO_MMAP_WEIGHTS", raising=False)
+        engine = tts_engine.KokoroEngine(tmp_path / "model.onnx", tmp_path / "voices.bin", sessions=2)
+        assert not engine.mmap_weights
+
+    def test_opt_out(self, tmp_path, monkeypatch):
+        """Test that KOKORO_MMAP_WEIGHTS=0 loads weights the usual way."""
+        monkeypatch.setenv("KOKORO_MMAP_WEIGHTS", "0")
+        engine = tts_engine.KokoroEngine(tmp_path / "model.onnx", tmp_path / "voices.bin")
+        assert not engine.mmap_weights
+
+
+WORKER = """
+import sys, numpy as np
+from tts.engine import create_session
+from tts.weights import mapped_rss
+session = create_session(sys.argv[1], 1, 1, mapped=sys.argv[2] == "1")
+session.run(None, {"x": np.ones((1, %d), dtype=np.float32)})
+print("loaded", flush=True)
+sys.stdin.readline()  # every worker is loaded before any of them measures
+print(__import__("json").dumps({"total": mapped_rss(), "weights": mapped_rss(".weights")}), flush=True)
+""" % SIZE
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps"), reason="needs Linux /proc/self/smaps")
+class TestPerWorkerMemory:
+    """Measure what each TTS worker process adds when the weights are mapped."""
+
+    def workers(self, model_path, mapped, count=3):
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parents[1] / "src"))
+        procs = [subprocess.Popen([sys.executable, "-c", WORKER, str(model_path), "1" if mapped else "0"],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+                 for _ in range(count)]
+        for proc in procs:
+            assert proc.stdout.readline().strip() == "loaded"
+        for proc in procs:
+            proc.stdin.write("\n")
+            proc.stdin.flush()
+        results = [json.loads(proc.stdout.readline()) for proc in procs]
+        for proc in procs:
+            proc.wait(timeout=30)
+        return results
+
+    def test_workers_share_one_copy_of_the_weights(self, tmp_path):
+        """Test that mapped weights are shared and each worker's private memory excludes them."""
+        model = matmul_model(tmp_path / "model.onnx", layers=4)
+        weights_mb = 4 * SIZE * SIZE * 4 / (1024 * 1024)
+        mapped = prepare_mapped_model(model, digest="rss")
+        os.sync()  # freshly written pages would otherwise count as dirty
+
+        embedded = self.workers(model, mapped=False)
+        shared = self.workers(mapped, mapped=True)
+
+        for result in shared:
+            assert result["weights"]["shared"] >= 0.9 * weights_mb
+            assert result["weights"]["private"] < 0.1 * weights_mb
+        # Per-worker overhead: everything a worker holds that no other worker shares
+        overhead = max(r["total"]["private"] for r in shared)
+        baseline = min(r["total"]["private"] for r in embedded)
+        print(f"\nper-worker private memory: {overhead:.0f}MB mapped vs {baseline:.0f}MB embedded "
+              f"({weights_mb:.0f}MB of weights)")
+        assert baseline - overhead >= 0.8 * weights_mb
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
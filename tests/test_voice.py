@@ -11,74 +11,119 @@ from unittest.mock import patch, mock_open, MagicMock
 from src.voice import get_voice_id
 
 
+@pytest.fixture
+def characters_dir(tmp_path):
+    """Registry over a temporary characters directory, patched into voice."""
+    from src.character_registry import CharacterRegistry
+    
+    registry = CharacterRegistry(tmp_path, check_interval=0)
+    with patch("src.voice.get_registry", return_value=registry):
+        yield tmp_path
+
+
+@pytest.fixture(autouse=True)
+def no_tts_daemon(monkeypatch):
+    """Render in-process even if a TTS daemon happens to run on this machine."""
+    monkeypatch.setenv("TTS_DAEMON_URL", "")
+
+
+@pytest.fixture(autouse=True)
+def segment_cache():
+    """Memory-only segment cache so tests never read or write ~/.cache."""
+    from src.tts.cache import SegmentCache
+    
+    cache = SegmentCache(directory=None)
+    with patch("src.voice.get_segment_cache", return_value=cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def asset_bank():
+    """Memory-only asset bank so tests never write decoded assets to ~/.cache."""
+    from src.audio.bank import AssetBank
+    
+    bank = AssetBank(cache_dir=None)
+    with patch("src.voice.get_asset_bank", return_value=bank), \
+         patch("audio.mixer.get_asset_bank", return_value=bank):
+        yield bank
+
+
+def write_character(directory, filename, data):
+    content = data if isinstance(data, str) else json.dumps(data)
+    (directory / filename).write_text(content)
+
+
 class TestGetVoiceId:
     """Test voice ID resolution for different providers."""
     
-    def test_get_voice_id_local_provider(self):
+    def test_get_voice_id_local_provider(self, characters_dir):
         """Test voice ID resolution for local Kokoro provider."""
         mock_data = {
             "name": "Alex",
+            "description": "Hype",
             "kokoro_voice": "am_michael",
             "elevenlabs_voice": "cloud_voice_id"
         }
+        write_character(characters_dir, "alex.json", mock_data)
         
-        with patch("builtins.open", mock_open(read_data=json.dumps(mock_data))):
-            result = get_voice_id("Alex", "Local (Kokoro)")
+        result = get_voice_id("Alex", "Local (Kokoro)")
         
         assert result == "am_michael"
     
-    def test_get_voice_id_cloud_provider(self):
+    def test_get_voice_id_cloud_provider(self, characters_dir):
         """Test voice ID resolution for cloud ElevenLabs provider."""
         mock_data = {
             "name": "Marcus",
+            "description": "Paranoid",
             "kokoro_voice": "local_voice",
             "elevenlabs_voice": "cloud_marcus_voice"
         }
+        write_character(characters_dir, "marcus.json", mock_data)
         
-        with patch("builtins.open", mock_open(read_data=json.dumps(mock_data))):
-            result = get_voice_id("Marcus", "Cloud (ElevenLabs)")
+        result = get_voice_id("Marcus", "Cloud (ElevenLabs)")
         
         assert result == "cloud_marcus_voice"
     
-    def test_get_voice_id_file_not_found(self):
+    def test_get_voice_id_file_not_found(self, characters_dir):
         """Test fallback when character file doesn't exist."""
-        with patch("builtins.open", side_effect=FileNotFoundError()):
-            result = get_voice_id("NonExistent", "Local (Kokoro)")
+        result = get_voice_id("NonExistent", "Local (Kokoro)")
         
         # Should return default fallback voice
         assert result == "af_bella"
     
-    def test_get_voice_id_invalid_json(self):
+    def test_get_voice_id_invalid_json(self, characters_dir):
         """Test fallback when character JSON is invalid."""
-        with patch("builtins.open", mock_open(read_data="invalid json")):
-            result = get_voice_id("BadJson", "Local (Kokoro)")
+        write_character(characters_dir, "badjson.json", "invalid json")
+        
+        result = get_voice_id("BadJson", "Local (Kokoro)")
         
         assert result == "af_bella"
     
-    def test_get_voice_id_missing_voice_field(self):
+    def test_get_voice_id_missing_voice_field(self, characters_dir):
         """Test fallback when voice field is missing from character."""
         mock_data = {
             "name": "Incomplete",
             "description": "Missing voice fields"
         }
+        write_character(characters_dir, "incomplete.json", mock_data)
         
-        with patch("builtins.open", mock_open(read_data=json.dumps(mock_data))):
-            result = get_voice_id("Incomplete", "Local (Kokoro)")
+        result = get_voice_id("Incomplete", "Local (Kokoro)")
         
         # Should return default from .get() fallback
         assert result == "af_bella"
     
-    def test_get_voice_id_handles_full_name(self):
+    def test_get_voice_id_handles_full_name(self, characters_dir):
         """Test that function extracts first name from full name."""
         mock_data = {
             "name": "Sam",
+            "description": "Cynical",
             "kokoro_voice": "bf_emma",
             "elevenlabs_voice": "sam_cloud"
         }
+        write_character(characters_dir, "sam.json", mock_data)
         
-        with patch("builtins.open", mock_open(read_data=json.dumps(mock_data))):
-            # Pass full name with space
-            result = get_voice_id("Sam Anderson", "Local (Kokoro)")
+        # Pass full name with space
+        result = get_voice_id("Sam Anderson", "Local (Kokoro)")
         
         # Should extract "sam" and find the file
         assert result == "bf_emma"
@@ -87,18 +132,21 @@ class TestGetVoiceId:
 class TestRenderAudio:
     """Test audio rendering functionality."""
     
-    @patch("src.voice.kokoro")
     @patch("src.voice.get_voice_id")
     @patch("src.voice.AudioSegment")
-    def test_render_audio_local_provider(self, mock_audio_segment, mock_get_voice, mock_kokoro):
+    def test_render_audio_local_provider(self, mock_audio_segment, mock_get_voice, tmp_path, monkeypatch):
         """Test audio rendering with local Kokoro provider."""
         from src.voice import render_audio
         
-        # Mock kokoro as available
-        mock_kokoro_instance = MagicMock()
-        mock_kokoro_instance.create.return_value = (b"fake audio data", None)
+        monkeypatch.chdir(tmp_path)
+        
+        # Mock kokoro engine as available
+        mock_engine = MagicMock()
+        mock_engine.version = "kokoro-test"
+        mock_engine.create.return_value = (b"fake audio data", None)
+        mock_engine.wait.return_value.sessions = 2
         
-        with patch("src.voice.kokoro", mock_kokoro_instance):
+        with patch("src.voice.get_engine", return_value=mock_engine):
             mock_get_voice.return_value = "am_michael"
             
             # Mock AudioSegment operations
@@ -115,6 +163,7 @@ class TestRenderAudio:
             
             # Should return output file path
             assert result == "final_episode.mp3"
+            mock_engine.wait.assert_called()
     
     def test_render_audio_validates_script_format(self):
         """Test that render_audio validates script is a list."""
@@ -124,15 +173,429 @@ class TestRenderAudio:
         with pytest.raises(Exception, match="Script must be a list"):
             render_audio("not a list", "Local (Kokoro)")
     
-    @patch("src.voice.kokoro", None)
     def test_render_audio_fails_when_kokoro_not_loaded(self):
         """Test that render fails gracefully when Kokoro isn't available."""
-        from src.voice import render_audio
+        from src.voice import render_audio, TTSEngineError
+        
+        mock_engine = MagicMock()
         
+        mock_engine.version = "kokoro-test"
+        mock_engine.wait.side_effect = TTSEngineError("model file missing")
         script = [{"speaker": "Alex", "text": "Test"}]
         
-        with pytest.raises(Exception, match="Kokoro failed to load"):
-            render_audio(script, "Local (Kokoro)")
+        with patch("src.voice.get_engine", return_value=mock_engine):
+            with pytest.raises(Exception, match="Kokoro failed to load"):
+                render_audio(script, "Local (Kokoro)")
+    
+    def test_cloud_render_does_not_load_kokoro(self, tmp_path, monkeypatch):
+        """Test that the ElevenLabs path never waits on the local engine."""
+        from src.voice import render_audio
+        
+        monkeypatch.chdir(tmp_path)
+        
+        mock_engine = MagicMock()
+        
+        mock_engine.version = "kokoro-test"
+        with patch("src.voice.get_engine", return_value=mock_engine), \
+             patch("src.voice.synthesize_text", side_effect=RuntimeError("offline")), \
+             patch("src.voice.AudioSegment"):
+            render_audio([{"speaker": "Alex", "text": "Hi"}], "Cloud (ElevenLabs)", crossfade=False)
+        
+        mock_engine.wait.assert_not_called()
+
+    
+    def test_timeline_is_streamed_to_encoder(self, tmp_path, monkeypatch):
+        """Test that lines are laid out in one timeline and streamed into the MP3 encoder."""
+        from pydub import AudioSegment
+        from src.voice import render_audio, plan_timeline
+        
+        monkeypatch.chdir(tmp_path)
+        lines = {0: AudioSegment.silent(duration=1000, frame_rate=24000),
+                 1: AudioSegment.silent(duration=500, frame_rate=24000)}
+        timelines = []
+        
+        def capture(*args, **kwargs):
+            timelines.append(plan_timeline(*args, **kwargs))
+            return timelines[-1]
+        
+        with patch("src.voice.render_script_lines", return_value=lines), \
+             patch("src.voice.plan_timeline", side_effect=capture):
+            render_audio([{"speaker": "Alex", "text": "Hi"}, {"speaker": "Sam", "text": "Yo"}],
+                         "Cloud (ElevenLabs)", max_workers=1, crossfade=False)
+        
+        assert len(timelines) == 1
+        assert len(timelines[0]) == 1000 + 300 + 500 + 300
+        episode = AudioSegment.from_file(tmp_path / "final_episode.mp3", format="mp3", codec="mp3")
+        assert abs(len(episode) - 2100) < 100
+
+    def test_project_rerender_only_synthesizes_edited_lines(self, tmp_path, monkeypatch, capsys):
+        """Test that an episode project reuses stems and re-mixes only around the edit."""
+        from pydub import AudioSegment
+        from src.voice import render_audio
+        
+        monkeypatch.chdir(tmp_path)
+        synthesized = []
+        
+        def fake_tts(text, voice_id, provider, speaker="System", tts=None):
+            synthesized.append(text)
+            return AudioSegment.silent(duration=400 + 10 * len(text), frame_rate=24000)
+        
+        script = [{"speaker": "Alex", "text": f"Line number {i}."} for i in range(6)]
+        project = tmp_path / "project"
+        with patch("src.voice.synthesize_text", side_effect=fake_tts), \
+             patch("src.voice.get_tts_version", return_value="test"):
+            render_audio(script, "Cloud (ElevenLabs)", max_workers=2, project_dir=project)
+            assert len(synthesized) == 6
+            assert "Re-mixed 100%" in capsys.readouterr().out
+            
+            synthesized.clear()
+            script[4] = {"speaker": "Alex", "text": "An edited line."}
+            render_audio(script, "Cloud (ElevenLabs)", max_workers=2, project_dir=project)
+        
+        assert synthesized == ["An edited line."]
+        output = capsys.readouterr().out
+        assert "Reusing 5 line stems" in output
+        assert "Re-mixed 100%" not in output
+        assert len(list((project / "stems").glob("*.flac"))) == 6
+        edl = json.loads((project / "edl.json").read_text())
+        assert [line["index"] for line in edl["lines"]] == list(range(6))
+        assert (tmp_path / "final_episode.mp3").exists()
+
+    def test_project_rerender_picks_up_replaced_jingle(self, tmp_path, monkeypatch, capsys):
+        """Test that a new intro file under the same name is mixed again, not reused from the master."""
+        import os
+        import numpy as np
+        import soundfile as sf
+        from pydub import AudioSegment
+        from src.voice import render_audio
+        from src.audio.bank import AssetBank
+        
+        monkeypatch.chdir(tmp_path)
+        music = tmp_path / "music"
+        music.mkdir()
+        intro = music / "intro.wav"
+        sf.write(str(intro), np.full(4800, 0.25, dtype=np.float32), 24000)
+        bank = AssetBank({"jingles": music}, cache_dir=None)
+        
+        script = [{"speaker": "Alex", "text": f"Line number {i}."} for i in range(4)]
+        project = tmp_path / "project"
+        with patch("src.voice.synthesize_text", side_effect=lambda *args, **kwargs: AudioSegment.silent(duration=500, frame_rate=24000)), \
+             patch("src.voice.get_tts_version", return_value="test"), \
+             patch("src.voice.get_asset_bank", return_value=bank), \
+             patch("audio.mixer.get_asset_bank", return_value=bank):
+            render_audio(script, "Cloud (ElevenLabs)", max_workers=1, project_dir=project, enable_jingles=True)
+            capsys.readouterr()
+            render_audio(script, "Cloud (ElevenLabs)", max_workers=1, project_dir=project, enable_jingles=True)
+            assert "Re-mixed 0%" in capsys.readouterr().out
+            
+            sf.write(str(intro), np.full(4800, -0.5, dtype=np.float32), 24000)
+            os.utime(intro, ns=(1, 1))
+            render_audio(script, "Cloud (ElevenLabs)", max_workers=1, project_dir=project, enable_jingles=True)
+        
+        assert "Re-mixed 0%" not in capsys.readouterr().out
+
+class TestRenderWorkers:
+    """Test concurrency for CPU-bound vs IO-bound voice providers."""
+    
+    def test_local_uses_one_worker_per_session(self):
+        from src.voice import get_render_workers
+        
+        mock_engine = MagicMock()
+        
+        mock_engine.version = "kokoro-test"
+        mock_engine.wait.return_value.sessions = 3
+        with patch("src.voice.get_engine", return_value=mock_engine):
+            assert get_render_workers("Local (Kokoro)") == 3
+    
+    def test_cloud_workers_configurable(self, monkeypatch):
+        from src.voice import get_render_workers
+        
+        monkeypatch.delenv("TTS_CLOUD_WORKERS", raising=False)
+        assert get_render_workers("Cloud (ElevenLabs)") == 8
+        monkeypatch.setenv("TTS_CLOUD_WORKERS", "12")
+        assert get_render_workers("Cloud (ElevenLabs)") == 12
+
+
+class TestInMemoryRendering:
+    """Test that rendered lines stay in memory."""
+    
+    def test_samples_to_segment_pcm16(self):
+        """Test float samples become 16-bit mono PCM at the source rate."""
+        import numpy as np
+        from src.voice import samples_to_segment
+        
+        samples = np.array([0.0, 0.5, -0.5, 1.5, -1.5], dtype=np.float32)
+        segment = samples_to_segment(samples, 24000)
+        
+        assert segment.frame_rate == 24000
+        assert segment.channels == 1
+        assert segment.sample_width == 2
+        assert list(segment.get_array_of_samples()) == [0, 16383, -16383, 32767, -32767]
+    
+    def test_render_line_writes_no_temp_files(self, tmp_path, monkeypatch):
+        """Test that a Kokoro line is rendered without touching the filesystem."""
+        import numpy as np
+        from src.voice import render_audio_line
+        
+        monkeypatch.chdir(tmp_path)
+        mock_kokoro = MagicMock()
+        mock_kokoro.version = "kokoro-test"
+        mock_kokoro.create.return_value = (np.zeros(2400, dtype=np.float32), 24000)
+        
+        with patch("src.voice.get_engine", return_value=mock_kokoro), patch("src.voice.get_voice_id", return_value="am_michael"):
+            index, segment = render_audio_line(3, {"speaker": "Alex", "text": "Hi"}, "Local (Kokoro)")
+        
+        assert index == 3
+        assert len(segment) == 100  # ms
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_render_line_uses_shared_cloud_client(self, tmp_path, monkeypatch):
+        """Test that ElevenLabs lines go through the pooled client, in memory."""
+        from pydub import AudioSegment
+        from src.voice import render_audio_line
+        
+        monkeypatch.chdir(tmp_path)
+        mock_cloud = MagicMock()
+        mock_cloud.version = "elevenlabs-test"
+        mock_cloud.synthesize.return_value = AudioSegment.silent(duration=200, frame_rate=24000)
+        
+        with patch("src.voice.get_cloud_tts", return_value=mock_cloud), \
+             patch("src.voice.get_voice_id", return_value="voice"):
+            render_audio_line(0, {"speaker": "Alex", "text": "Hi"}, "Cloud (ElevenLabs)")
+            index, segment = render_audio_line(1, {"speaker": "Alex", "text": "Hello there"}, "Cloud (ElevenLabs)")
+        
+        assert len(segment) == 200
+        assert mock_cloud.synthesize.call_count == 2
+        assert list(tmp_path.iterdir()) == []
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestLengthAwareRendering:
+    """Test sentence splitting and longest-first scheduling in render_script_lines."""
+    
+    @staticmethod
+    def timed_engine(seconds_per_char, log):
+        """Engine whose synthesis time is proportional to text length."""
+        import time
+        import numpy as np
+        
+        engine = MagicMock()
+        engine.version = "kokoro-test"
+        
+        def create(text, voice, speed=1.0, lang="en-us"):
+            log.append(text)
+            time.sleep(seconds_per_char * len(text))
+            return np.full(len(text) * 10, 0.1, dtype=np.float32), 1000
+        
+        engine.create.side_effect = create
+        engine.create_batch.side_effect = lambda texts, voice, speed=1.0, lang="en-us": [
+            engine.create(text, voice=voice) for text in texts
+        ]
+        return engine
+    
+    def test_long_line_is_split_and_stitched_in_order(self, monkeypatch):
+        from src.voice import render_script_lines
+        
+        monkeypatch.setenv("TTS_SPLIT_CHARS", "30")
+        monkeypatch.setenv("TTS_SENTENCE_GAP_MS", "100")
+        log = []
+        script = [
+            {"speaker": "Alex", "text": "First sentence is here. Second one follows it. Third ends it."},
+            {"speaker": "Sam", "text": "Short."},
+        ]
+        
+        with patch("src.voice.get_engine", return_value=self.timed_engine(0, log)), \
+             patch("src.voice.get_voice_id", return_value="am_michael"):
+            segments = render_script_lines(script, "Local (Kokoro)", max_workers=2)
+        
+        assert sorted(log) == sorted(["First sentence is here.", "Second one follows it.", "Third ends it.", "Short."])
+        # 10 samples/char at 1kHz = 10ms per char, plus two 100ms gaps
+        chars = len("First sentence is here.") + len("Second one follows it.") + len("Third ends it.")
+        assert len(segments[0]) == chars * 10 + 200
+        assert len(segments[1]) == len("Short.") * 10
+        # Each part's speech starts after the earlier parts and their gaps
+        second = script[0]["text"].index("Second")
+        assert [second, len("First sentence is here.") * 10 + 100] in segments[0].alignment
+    
+    def test_failed_part_drops_the_line(self, monkeypatch):
+        from src.voice import render_script_lines
+        
+        monkeypatch.setenv("TTS_SPLIT_CHARS", "20")
+        engine = self.timed_engine(0, [])
+        create = engine.create.side_effect
+        engine.create.side_effect = lambda text, **kw: (_ for _ in ()).throw(RuntimeError("bad")) if text.startswith("Broken") else create(text, **kw)
+        script = [{"speaker": "Alex", "text": "Fine sentence here. Broken sentence here."}, {"speaker": "Sam", "text": "Okay."}]
+        
+        with patch("src.voice.get_engine", return_value=engine), \
+             patch("src.voice.get_voice_id", return_value="am_michael"):
+            segments = render_script_lines(script, "Local (Kokoro)", max_workers=2)
+        
+        assert set(segments) == {1}
+    
+    def test_wall_time_approaches_work_over_workers(self, monkeypatch):
+        """One long line shouldn't dominate: splitting + LPT beats line-at-a-time in script order."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from src.voice import render_script_lines
+        
+        monkeypatch.setenv("TTS_SPLIT_CHARS", "60")
+        long_text = " ".join(f"This is sentence number {n} of the monologue." for n in range(8))
+        script = [{"speaker": "Sam", "text": "Quick one."} for _ in range(4)]
+        script.insert(2, {"speaker": "Alex", "text": long_text})
+        per_char = 0.0005
+        
+        with patch("src.voice.get_voice_id", return_value="am_michael"):
+            engine = self.timed_engine(per_char, [])
+            with patch("src.voice.get_engine", return_value=engine):
+                start_time = time.monotonic()
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    list(executor.map(lambda line: engine.create(line["text"], voice="x"), script))
+                unsplit = time.monotonic() - start_time
+                
+                start_time = time.monotonic()
+                render_script_lines(script, "Local (Kokoro)", max_workers=4)
+                planned = time.monotonic() - start_time
+        
+        ideal = sum(len(line["text"]) for line in script) * per_char / 4
+        assert planned < unsplit * 0.6
+        assert planned < ideal * 2
+
+
+class TestBatchedRendering:
+    """Test voice-grouped batch synthesis."""
+    
+    def test_lines_are_batched_per_voice(self, monkeypatch):
+        from src.voice import render_script_lines
+        
+        monkeypatch.setenv("KOKORO_BATCH_LINES", "8")
+        engine = TestLengthAwareRendering.timed_engine(0, [])
+        voices = {"Alex": "am_michael", "Sam": "bf_emma"}
+        script = [{"speaker": name, "text": f"Line {i} from {name}."} for i, name in enumerate(["Alex", "Sam", "Alex", "Alex", "Sam"])]
+        
+        with patch("src.voice.get_engine", return_value=engine), \
+             patch("src.voice.get_voice_id", side_effect=lambda speaker, provider: voices[speaker]):
+            segments = render_script_lines(script, "Local (Kokoro)", max_workers=1)
+        
+        batches = sorted((c.kwargs["voice"], len(c.args[0])) for c in engine.create_batch.call_args_list)
+        assert batches == [("am_michael", 3), ("bf_emma", 2)]
+        # Every line gets its own audio back, in its own slot
+        assert {i: len(seg) for i, seg in segments.items()} == {i: len(line["text"]) * 10 for i, line in enumerate(script)}
+    
+    def test_batch_failure_falls_back_to_single_lines(self, monkeypatch):
+        from src.voice import render_script_lines
+        
+        monkeypatch.setenv("KOKORO_BATCH_LINES", "8")
+        engine = TestLengthAwareRendering.timed_engine(0, [])
+        create = engine.create.side_effect
+        engine.create_batch.side_effect = RuntimeError("phonemizer crashed")
+        engine.create.side_effect = lambda text, **kw: (_ for _ in ()).throw(RuntimeError("bad")) if "bad" in text else create(text, **kw)
+        script = [{"speaker": "Alex", "text": "Good line."}, {"speaker": "Alex", "text": "A bad line."}, {"speaker": "Alex", "text": "Fine too."}]
+        
+        with patch("src.voice.get_engine", return_value=engine), \
+             patch("src.voice.get_voice_id", return_value="am_michael"):
+            segments = render_script_lines(script, "Local (Kokoro)", max_workers=1)
+        
+        assert set(segments) == {0, 2}
+    
+    def test_cached_lines_are_left_out_of_the_batch(self, monkeypatch):
+        from src.voice import synthesize_batch
+        
+        engine = TestLengthAwareRendering.timed_engine(0, [])
+        with patch("src.voice.get_engine", return_value=engine):
+            synthesize_batch(["Cached already."], "am_michael", "Local (Kokoro)")
+            synthesize_batch(["Cached already.", "Brand new."], "am_michael", "Local (Kokoro)")
+        
+        assert [c.args[0] for c in engine.create_batch.call_args_list] == [["Cached already."], ["Brand new."]]
+    
+    def test_cloud_is_never_batched(self):
+        from src.voice import render_script_lines
+        
+        with patch("src.voice.get_voice_id", return_value="voice"), \
+             patch("src.voice.synthesize_text", return_value=MagicMock()) as synthesize_text, \
+             patch("src.voice.synthesize_batch") as synthesize_batch, \
+             patch("src.voice.stitch_segments", side_effect=lambda parts, gap: parts[0]):
+            render_script_lines([{"speaker": "Alex", "text": "Hi."}, {"speaker": "Alex", "text": "Yo."}], "Cloud (ElevenLabs)", max_workers=2)
+        
+        assert synthesize_text.call_count == 2
+        synthesize_batch.assert_not_called()
+
+
+class TestCodeAwareText:
+    """Test that code tokens are spelled out for text-based engines."""
+    
+    def test_cloud_gets_spoken_code_tokens(self):
+        from src.voice import synthesize_text
+        
+        mock_cloud = MagicMock()
+        mock_cloud.version = "elevenlabs-test"
+        
+        with patch("src.voice.get_cloud_tts", return_value=mock_cloud):
+            synthesize_text("Open src/main.py and run npm test.", "voice", "Cloud (ElevenLabs)")
+        
+        assert mock_cloud.synthesize.call_args.args[0] == "Open source slash main dot pie and run N P M test."
+    
+    def test_lexicon_version_is_part_of_cache_key(self):
+        from src.voice import get_tts_version
+        
+        with patch("src.voice.lexicon_version", return_value="aaa"):
+            first = get_tts_version("Cloud (ElevenLabs)")
+        with patch("src.voice.lexicon_version", return_value="bbb"):
+            assert get_tts_version("Cloud (ElevenLabs)") != first
+
+
+class TestSegmentCacheIntegration:
+    """Test that cached lines skip synthesis."""
+    
+    def test_repeat_line_hits_cache(self, segment_cache):
+        import numpy as np
+        from src.voice import render_audio_line
+        
+        mock_engine = MagicMock()
+        mock_engine.version = "kokoro-test"
+        mock_engine.create.return_value = (np.zeros(2400, dtype=np.float32), 24000)
+        line = {"speaker": "Alex", "text": "This episode is brought to you by npm."}
+        
+        with patch("src.voice.get_engine", return_value=mock_engine), \
+             patch("src.voice.get_voice_id", return_value="am_michael"):
+            _, first = render_audio_line(0, line, "Local (Kokoro)")
+            _, second = render_audio_line(5, dict(line, text=line["text"].replace(" ", "  ")), "Local (Kokoro)")
+        
+        assert mock_engine.create.call_count == 1
+        assert second.raw_data == first.raw_data
+        assert segment_cache.stats()["memory_hits"] == 1
+    
+    def test_voice_and_engine_version_are_part_of_key(self, segment_cache):
+        import numpy as np
+        from src.voice import render_audio_line
+        
+        mock_engine = MagicMock()
+        mock_engine.version = "kokoro-test"
+        mock_engine.create.return_value = (np.zeros(2400, dtype=np.float32), 24000)
+        line = {"speaker": "Alex", "text": "Hello"}
+        
+        with patch("src.voice.get_engine", return_value=mock_engine):
+            with patch("src.voice.get_voice_id", return_value="am_michael"):
+                render_audio_line(0, line, "Local (Kokoro)")
+            with patch("src.voice.get_voice_id", return_value="bf_emma"):
+                render_audio_line(1, line, "Local (Kokoro)")
+            mock_engine.version = "kokoro-test-int8"
+            with patch("src.voice.get_voice_id", return_value="am_michael"):
+                render_audio_line(2, line, "Local (Kokoro)")
+        
+        assert mock_engine.create.call_count == 3
+    
+    def test_failed_lines_are_not_cached(self, segment_cache):
+        from src.voice import render_audio_line
+        
+        mock_engine = MagicMock()
+        mock_engine.version = "kokoro-test"
+        mock_engine.create.side_effect = RuntimeError("onnx exploded")
+        
+        with patch("src.voice.get_engine", return_value=mock_engine), \
+             patch("src.voice.get_voice_id", return_value="am_michael"):
+            assert render_audio_line(0, {"speaker": "Alex", "text": "Hi"}, "Local (Kokoro)") == (0, None)
+        
+        assert segment_cache.stats()["writes"] == 0
 
 
 class TestVoiceProviderSelection: